@@ -0,0 +1,937 @@
+"""
+Benchmark suite.
+
+    python scripts/bench.py startup [--runs 5] [--no-warmup]
+    python scripts/bench.py quant [--n 20000] [--queries 200] [--oversample 2 4 8]
+    python scripts/bench.py ann [--n 100000] [--queries 200] [--nprobe 4 8 16 32]
+    python scripts/bench.py mmap [--n 100000] [--queries 200]
+    python scripts/bench.py batch [--n 5000] [--batch 10] [--rounds 5]
+    python scripts/bench.py fts [--n 50000] [--queries 200] [--legacy-queries 5]
+    python scripts/bench.py transfer [--n 100000]
+    python scripts/bench.py ingest [--n 500]
+    python scripts/bench.py ids [--n 20000] [--sizes 10 50 500] [--rounds 500]
+    python scripts/bench.py analysis [--n 500] [--words 2000]
+    python scripts/bench.py serialize [--n 200] [--words 3000] [--limit 10] [--rounds 50]
+    python scripts/bench.py health [--n 100000] [--rounds 20]
+    python scripts/bench.py window [--n 100000] [--days 365] [--queries 100] [--windows 1 7 30 180]
+    python scripts/bench.py tiering [--n 100000] [--cold 0.8] [--queries 200]
+    python scripts/bench.py workers [--workers 4] [--texts 400] [--concurrency 16]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+
+# ---------------- startup ----------------
+
+_STARTUP_CHILD = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import mcp_memory.mcp_server as srv
+t_import = time.perf_counter()
+torch_at_import = "torch" in sys.modules
+if srv.settings.embedding_warmup:
+    srv._embed.start_warmup()
+
+async def main():
+    await srv.ensure_init()
+    t_init = time.perf_counter()
+    await srv.memory_health()
+    t_health = time.perf_counter()
+    await srv._embed.embed_one("hello world")
+    t_embed = time.perf_counter()
+    return t_init, t_health, t_embed
+
+t_init, t_health, t_embed = asyncio.run(main())
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000.0,
+    "torch_at_import": torch_at_import,
+    "init_ms": (t_init - t0) * 1000.0,
+    "first_health_ms": (t_health - t0) * 1000.0,
+    "first_embed_ms": (t_embed - t0) * 1000.0,
+}))
+"""
+
+
+def bench_startup(args: argparse.Namespace) -> None:
+    """Cold-start timings for the MCP stdio server, each run in a fresh interpreter."""
+    tmp = tempfile.mkdtemp(prefix="mcp-bench-")
+    env = dict(os.environ)
+    env.update({
+        "MCP_MEMORY_DB_PATH": os.path.join(tmp, "memory.db"),
+        "MCP_MEMORY_REDIS_URL": "disabled",
+        "MCP_MEMORY_EMBEDDING_WARMUP": "false" if args.no_warmup else "true",
+    })
+    samples: list[dict] = []
+    for _ in range(args.runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _STARTUP_CHILD],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"startup ({args.runs} runs, warmup={'off' if args.no_warmup else 'on'}) median ms:")
+    for key in ("import_ms", "init_ms", "first_health_ms", "first_embed_ms"):
+        print(f"  {key:<16} {statistics.median(s[key] for s in samples):9.1f}")
+    print(f"  torch loaded by import: {any(s['torch_at_import'] for s in samples)}")
+
+
+# ---------------- shared fixtures ----------------
+
+def _synthetic_vectors(n: int, dim: int, *, clusters: int = 64, noise: float = 0.35, seed: int = 0):
+    """Clustered unit vectors: closer to real sentence embeddings than isotropic noise."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    noisy = noise * rng.standard_normal((n, dim)).astype("float32")
+    x = centers[rng.integers(0, clusters, n)] + noisy
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _data_and_queries(n: int, n_queries: int, dim: int):
+    """`n` data vectors and `n_queries` held-out queries drawn from the same clusters."""
+    x = _synthetic_vectors(n + n_queries, dim)
+    return x[:n], x[n:]
+
+
+async def _bench_db(name: str, *, tmp: str | None = None, **kw):
+    """An initialized SQLiteManager at <tmp>/<name>, in a fresh temp dir unless `tmp` is given."""
+    from mcp_memory.storage.sqlite_manager import SQLiteManager
+
+    db = SQLiteManager(os.path.join(tmp or tempfile.mkdtemp(prefix="mcp-bench-"), name), **kw)
+    await db.initialize()
+    return db
+
+
+async def _load_vectors(db, vecs, *, user_id: str = "default") -> list[str]:
+    """Bulk-insert one memory row + vector per input vector in a single transaction."""
+    ids: list[str] = []
+    for i, v in enumerate(vecs):
+        mid = f"bench-{i}"  # stable across DBs so result lists are comparable
+        cur = await db.execute(
+            "bench_insert",
+            "INSERT INTO memories"
+            " (id, user_id, content, keywords, category, content_hash, embedding_version)"
+            " VALUES (?, ?, ?, '[]', 'other', ?, ?)",
+            (mid, user_id, f"synthetic memory {i}", mid, db.embedding_version),
+        )
+        await db._write_vector(db.vec_table, cur.lastrowid, array("f", v.tolist()).tobytes())
+        ids.append(mid)
+    await db.commit()
+    return ids
+
+
+async def _run_queries(db, queries, *, k: int = 10) -> tuple[list[list[str]], list[float]]:
+    """vector_topk per query: (result ids, latency ms)."""
+    from mcp_memory.search.vector_search import vector_topk
+
+    got, lat = [], []
+    for q in queries:
+        t = time.perf_counter()
+        res = await vector_topk(db, q.tolist(), k=k)
+        lat.append((time.perf_counter() - t) * 1000.0)
+        got.append([mid for mid, _ in res])
+    return got, lat
+
+
+def _recall_row(label: str, got: list[list[str]], exact: list[list[str]], lat: list[float]) -> str:
+    rec = statistics.mean(len(set(g) & set(e)) / max(1, len(e)) for g, e in zip(got, exact))
+    lat = sorted(lat)
+    return f"{label}{rec:>11.3f}{lat[len(lat) // 2]:>9.2f}{lat[int(len(lat) * 0.95)]:>9.2f}"
+
+
+_WORDS = (
+    "project meeting deadline budget python sqlite redis vector search memory agent travel "
+    "invoice contract design review deploy server latency cache index query model embedding "
+    "family birthday dinner recipe doctor flight hotel report bug release customer roadmap"
+).split()
+
+
+def _synthetic_texts(n: int, *, words: int = 12, seed: int = 0) -> list[str]:
+    import random
+
+    rng = random.Random(seed)
+    vocab = [f"{w}{j}" if j else w for w in _WORDS for j in range(10)]  # ~360 terms
+    return [" ".join(rng.choice(vocab) for _ in range(words)) for _ in range(n)]
+
+
+async def _load_texts(
+    db, embed, texts: list[str], *, user_id: str = "default", batch: int = 256
+) -> None:
+    """Insert memories with real embeddings (one encode per batch) and FTS content."""
+    for start in range(0, len(texts), batch):
+        chunk = texts[start : start + batch]
+        vecs = await embed.embed_many(chunk)
+        for i, (text, vec) in enumerate(zip(chunk, vecs), start=start):
+            cur = await db.execute(
+                "bench_insert",
+                "INSERT INTO memories"
+                " (id, user_id, content, keywords, category, content_hash, embedding_version)"
+                " VALUES (?, ?, ?, '[]', 'other', ?, ?)",
+                (f"bench-{i}", user_id, text, f"bench-{i}", db.embedding_version),
+            )
+            await db._write_vector(db.vec_table, cur.lastrowid, array("f", vec).tobytes())
+        await db.commit()
+
+
+def _db_bytes(path: str) -> int:
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+# ---------------- quant ----------------
+
+async def _bench_quant(args: argparse.Namespace) -> None:
+    from mcp_memory.config import settings
+
+    dim = 384
+    data, queries = _data_and_queries(args.n, args.queries, dim)
+    tmp = tempfile.mkdtemp(prefix="mcp-bench-")
+
+    dbs = {}
+    for mode in ("none", "int8", "binary"):
+        db = await _bench_db(f"{mode}.db", tmp=tmp, quantization=mode)
+        await _load_vectors(db, data)
+        await db.execute("bench_checkpoint", "PRAGMA wal_checkpoint(TRUNCATE)")
+        dbs[mode] = db
+
+    exact, exact_lat = await _run_queries(dbs["none"], queries)
+    scan_bytes = {"none": 4 * dim, "int8": dim, "binary": dim // 8}
+    print(f"quant: n={args.n} dim={dim} queries={args.queries}")
+    print(f"  {'mode':<8}{'oversample':>11}{'recall@10':>11}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'scan B/vec':>12}{'db MB':>8}")
+
+    def row(mode: str, over: str, got: list[list[str]], lat: list[float]) -> None:
+        mb = _db_bytes(dbs[mode].db_path) / 1e6
+        print(_recall_row(f"  {mode:<8}{over:>11}", got, exact, lat)
+              + f"{scan_bytes[mode]:>12}{mb:>8.1f}")
+
+    row("none", "-", exact, exact_lat)
+    for mode in ("int8", "binary"):
+        for over in args.oversample:
+            settings.quant_oversample = over
+            got, lat = await _run_queries(dbs[mode], queries)
+            row(mode, str(over), got, lat)
+    for db in dbs.values():
+        await db.close()
+
+
+def bench_quant(args: argparse.Namespace) -> None:
+    """recall@10 and latency of int8 / binary KNN + float re-rank against exact float KNN."""
+    asyncio.run(_bench_quant(args))
+
+
+# ---------------- ann ----------------
+
+async def _bench_ann(args: argparse.Namespace) -> None:
+    from mcp_memory.config import settings
+
+    dim = 384
+    data, queries = _data_and_queries(args.n, args.queries, dim)
+    db = await _bench_db("ann.db", quantization="none", vector_index="ivf")
+    await _load_vectors(db, data)
+
+    exact, exact_lat = await _run_queries(db, queries)  # index not built yet: sqlite-vec scan
+    t = time.perf_counter()
+    stats = await db.rebuild_index()
+    build_s = time.perf_counter() - t
+    print(f"ann: n={args.n} dim={dim} queries={args.queries} nlist={stats['nlist']}"
+          f" build={build_s:.1f}s")
+    print(f"  {'engine':<8}{'nprobe':>8}{'recall@10':>11}{'p50 ms':>9}{'p95 ms':>9}")
+    print(_recall_row(f"  {'exact':<8}{'-':>8}", exact, exact, exact_lat))
+    for nprobe in args.nprobe:
+        settings.ivf_nprobe = nprobe
+        got, lat = await _run_queries(db, queries)
+        print(_recall_row(f"  {'ivf':<8}{nprobe:>8}", got, exact, lat))
+    await db.close()
+
+
+def bench_ann(args: argparse.Namespace) -> None:
+    """recall@10 and latency of the IVF index per nprobe against the exact sqlite-vec scan."""
+    asyncio.run(_bench_ann(args))
+
+
+# ---------------- mmap ----------------
+
+async def _bench_mmap(args: argparse.Namespace) -> None:
+    dim = 384
+    data, queries = _data_and_queries(args.n, args.queries, dim)
+    tmp = tempfile.mkdtemp(prefix="mcp-bench-")
+    db = await _bench_db("mmap.db", tmp=tmp, quantization="none")
+    await _load_vectors(db, data)
+    exact, exact_lat = await _run_queries(db, queries)
+    await db.close()
+
+    t = time.perf_counter()
+    # The writer copies the vec table into the mmap files as it opens.
+    db = await _bench_db("mmap.db", tmp=tmp, quantization="none", vector_index="mmap")
+    build_s = time.perf_counter() - t
+    got, lat = await _run_queries(db, queries)
+    print(f"mmap: n={args.n} dim={dim} queries={args.queries} build={build_s:.1f}s")
+    print(f"  {'engine':<8}{'recall@10':>11}{'p50 ms':>9}{'p95 ms':>9}")
+    print(_recall_row(f"  {'exact':<8}", exact, exact, exact_lat))
+    print(_recall_row(f"  {'mmap':<8}", got, exact, lat))
+    await db.close()
+
+
+def bench_mmap(args: argparse.Namespace) -> None:
+    """Latency of exact search over the mmap matrix against the sqlite-vec scan."""
+    asyncio.run(_bench_mmap(args))
+
+
+# ---------------- batch ----------------
+
+async def _bench_batch(args: argparse.Namespace) -> None:
+    from mcp_memory.config import settings
+    from mcp_memory.intelligence.embeddings import EmbeddingService
+    from mcp_memory.tools.recall_memory import recall_memories_tool, recall_memory_tool
+
+    db = await _bench_db("batch.db")
+    embed = EmbeddingService(model_name=db.embedding_model)
+    await _load_texts(db, embed, _synthetic_texts(args.n))
+    # Fresh phrasings each round so neither path hits the embedding cache (none here anyway).
+    rounds = [_synthetic_texts(args.batch, words=3, seed=100 + r) for r in range(args.rounds)]
+    common = dict(db=db, cache=None, embed=embed, limit=10, rrf_k=settings.rrf_k,
+                  recency_half_life_days=settings.recency_half_life_days)
+
+    seq, bat = [], []
+    for queries in rounds:
+        t = time.perf_counter()
+        for q in queries:
+            await recall_memory_tool(query=q, **common)
+        seq.append((time.perf_counter() - t) * 1000.0)
+        t = time.perf_counter()
+        await recall_memories_tool(queries=queries, **common)
+        bat.append((time.perf_counter() - t) * 1000.0)
+    single = statistics.median(s / args.batch for s in seq)
+    print(f"batch: n={args.n} queries/batch={args.batch} rounds={args.rounds} (median ms)")
+    print(f"  one recall               {single:9.1f}")
+    print(f"  {args.batch} sequential recalls    {statistics.median(seq):9.1f}")
+    print(f"  recall_memories x{args.batch:<7} {statistics.median(bat):9.1f}")
+    await db.close()
+
+
+def bench_batch(args: argparse.Namespace) -> None:
+    """N sequential recall_memory calls vs one recall_memories call over the same queries."""
+    asyncio.run(_bench_batch(args))
+
+
+# ---------------- fts ----------------
+
+_LEGACY_TEXT_SQL = """
+SELECT m.id AS id, bm25(memories_fts) AS bm
+FROM memories_fts f
+JOIN memories m ON m.rowid = f.rowid
+WHERE m.user_id = ? AND m.deleted_at IS NULL
+  AND f.memories_fts MATCH ?
+ORDER BY bm ASC
+LIMIT ?
+"""
+
+
+async def _bench_fts(args: argparse.Namespace) -> None:
+    import random
+
+    from mcp_memory.search.text_search import _match_topk, text_topk
+
+    db = await _bench_db("fts.db")
+    for i, text in enumerate(_synthetic_texts(args.n)):
+        await db.execute(
+            "bench_insert",
+            "INSERT INTO memories (id, user_id, content, keywords, category, content_hash)"
+            " VALUES (?, 'default', ?, '[]', 'other', ?)",
+            (f"bench-{i}", text, f"bench-{i}"),
+        )
+    await db.commit()
+    # Questions as people type them: filler words around a few content terms.
+    rng = random.Random(7)
+    vocab = _synthetic_texts(args.queries * 4, words=1, seed=8)
+    filler = ["what", "is", "the", "for", "my", "how", "do", "a", "of", "with"]
+
+    def question() -> str:
+        words = rng.sample(filler, 3)
+        for _ in range(rng.randint(2, 4)):
+            words.append(vocab[rng.randrange(len(vocab))])
+        return " ".join(words)
+
+    queries = [question() for _ in range(args.queries)]
+
+    def and_all(q: str) -> str:
+        return " AND ".join(f'"{t}"' for t in q.split())
+
+    async def old_join(q: str) -> list:
+        return await db.fetchall("bench_legacy_text", _LEGACY_TEXT_SQL, ("default", and_all(q), 50))
+
+    print(f"fts: n={args.n} queries={args.queries} tokenize={db.fts_tokenize!r}"
+          f" prefix={db.fts_prefix!r}")
+    print(f"  {'query':<26}{'hit rate':>9}{'mean hits':>11}{'p50 ms':>9}{'p95 ms':>9}")
+    runs = (
+        # The old join walks every row of the user; a few queries are enough to show it.
+        (f"AND, old join (x{args.legacy_queries})", old_join, queries[: args.legacy_queries]),
+        ("AND", lambda q: _match_topk(db, and_all(q), user_id="default", k=50), queries),
+        ("planned", lambda q: text_topk(db, q, k=50), queries),
+    )
+    for label, fn, qs in runs:
+        lat, hits = [], []
+        for q in qs:
+            t = time.perf_counter()
+            hits.append(len(await fn(q)))
+            lat.append((time.perf_counter() - t) * 1000.0)
+        lat.sort()
+        rate = sum(1 for h in hits if h) / len(hits)
+        print(f"  {label:<26}{rate:9.2f}{statistics.mean(hits):11.1f}"
+              f"{lat[len(lat) // 2]:9.2f}{lat[int(len(lat) * 0.95)]:9.2f}")
+    await db.close()
+
+
+def bench_fts(args: argparse.Namespace) -> None:
+    """Text hits and latency: the old AND-only query against the planned one."""
+    asyncio.run(_bench_fts(args))
+
+
+# ---------------- transfer ----------------
+
+async def _bench_transfer(args: argparse.Namespace) -> None:
+    from mcp_memory.storage.transfer import export_stream, file_chunks, import_stream
+
+    tmp = tempfile.mkdtemp(prefix="mcp-bench-")
+    src = await _bench_db("src.db", tmp=tmp)
+    await _load_vectors(src, _synthetic_vectors(args.n, src.embedding_dim))
+    path = os.path.join(tmp, "export.mcpx")
+
+    t = time.perf_counter()
+    with open(path, "wb") as f:
+        async for chunk in export_stream(src):
+            f.write(chunk)
+    t_export = time.perf_counter() - t
+    await src.close()
+
+    dst = await _bench_db("dst.db", tmp=tmp)
+    t = time.perf_counter()
+    res = await import_stream(dst, file_chunks(path))
+    t_import = time.perf_counter() - t
+    assert res["vectors"] == args.n, res
+    await dst.close()
+
+    mib = os.path.getsize(path) / 2**20
+    print(f"transfer: n={args.n} dim={src.embedding_dim} file={mib:.1f} MiB")
+    for label, secs in (("export", t_export), ("import + FTS rebuild", t_import)):
+        mins = 1e6 / args.n * secs / 60
+        print(f"  {label:<22}{secs:8.1f} s{args.n / secs:10.0f} rows/s   1M ≈ {mins:5.1f} min")
+
+
+def bench_transfer(args: argparse.Namespace) -> None:
+    """Export to a file and bulk-import it into an empty DB, vectors carried over."""
+    asyncio.run(_bench_transfer(args))
+
+
+# ---------------- ingest ----------------
+
+async def _bench_ingest(args: argparse.Namespace) -> None:
+    from mcp_memory.background.ingest import IngestEmbedder
+    from mcp_memory.intelligence.embeddings import EmbeddingService
+    from mcp_memory.tools.store_memory import store_memory_tool
+
+    tmp = tempfile.mkdtemp(prefix="mcp-bench-")
+    texts = _synthetic_texts(2 * args.n, words=20, seed=7)
+    print(f"ingest: n={args.n} stores per mode (ms per store)")
+    for mode, later in (("sync embed", False), ("async queue", True)):
+        db = await _bench_db(f"ingest-{int(later)}.db", tmp=tmp)
+        embed = EmbeddingService(model_name=db.embedding_model)
+        await embed.embed_one("warmup")
+        ingest = IngestEmbedder(db, embed)
+        if later:
+            await ingest.start()
+        lat = []
+        t0 = time.perf_counter()
+        for text in texts[int(later) * args.n : (int(later) + 1) * args.n]:
+            t = time.perf_counter()
+            await store_memory_tool(db=db, cache=None, embed=embed, content=text, embed_later=later)
+            lat.append((time.perf_counter() - t) * 1000.0)
+        acked = time.perf_counter() - t0
+        while (await db.embed_queue_stats())["pending"]:
+            await asyncio.sleep(0.01)
+        searchable = time.perf_counter() - t0
+        await ingest.stop()
+        lat.sort()
+        print(f"  {mode:<12} p50 {statistics.median(lat):7.2f}"
+              f"  p99 {lat[int(len(lat) * 0.99) - 1]:7.2f}"
+              f"   all acked {acked:6.2f} s   all embedded {searchable:6.2f} s")
+        await db.close()
+
+
+def bench_ingest(args: argparse.Namespace) -> None:
+    """store_memory latency with inline embedding vs the async embed queue."""
+    asyncio.run(_bench_ingest(args))
+
+
+# ---------------- ids ----------------
+
+async def _legacy_hydrate(db, ids: list[str]) -> list[dict]:
+    """The old shape: one `?` per id, so the SQL text changes with the list length."""
+    q = ",".join("?" for _ in ids)
+    rows = [dict(r) for r in await db.fetchall(
+        "hydrate_legacy",
+        f"SELECT * FROM memories WHERE id IN ({q}) AND deleted_at IS NULL",
+        tuple(ids),
+    )]
+    pos = {mid: i for i, mid in enumerate(ids)}
+    rows.sort(key=lambda r: pos.get(r["id"], 1_000_000))
+    return rows
+
+
+async def _bench_ids(args: argparse.Namespace) -> None:
+    import random
+
+    db = await _bench_db("ids.db")
+    texts = _synthetic_texts(args.n, words=40, seed=3)
+    await db.executemany(
+        "bench_insert",
+        "INSERT INTO memories (id, user_id, content, keywords, category, content_hash)"
+        " VALUES (?, 'default', ?, '[]', 'other', ?)",
+        [(f"bench-{i}", text, f"bench-{i}") for i, text in enumerate(texts)],
+    )
+    await db.commit()
+    all_ids = [f"bench-{i}" for i in range(args.n)]
+    rng = random.Random(0)
+    print(f"ids: hydrate n={args.n}, {args.rounds} calls per size,"
+          f" list length varies in (size/2, size] (us per call)")
+    for size in args.sizes:
+        lists = [rng.sample(all_ids, rng.randint(size // 2 + 1, size)) for _ in range(args.rounds)]
+        for label, fn in (
+            ("IN (?,?,...)", lambda ids: _legacy_hydrate(db, ids)),
+            ("json_each(?)", db.fetch_many_by_ids_ordered),
+        ):
+            lat = []
+            for ids in lists:
+                t = time.perf_counter()
+                rows = await fn(ids)
+                lat.append((time.perf_counter() - t) * 1e6)
+                assert [r["id"] for r in rows] == ids
+            lat.sort()
+            print(f"  size {size:>4}  {label:<13} p50 {statistics.median(lat):8.1f}"
+                  f"  p99 {lat[int(len(lat) * 0.99) - 1]:8.1f}")
+    await db.close()
+
+
+def bench_ids(args: argparse.Namespace) -> None:
+    """Hydration by id list: per-length IN lists vs one JSON array through json_each."""
+    asyncio.run(_bench_ids(args))
+
+
+# ---------------- analysis ----------------
+
+def _legacy_simhash64(text: str) -> str:
+    """The per-feature, per-bit loop simhash64 used before."""
+    from mcp_memory.intelligence.utils import _hash64, tokens
+
+    toks = tokens(text)
+    v = [0] * 64
+    for g in list(toks) + [f"{a} {b}" for a, b in zip(toks, toks[1:])]:
+        hv = _hash64(g)
+        for i in range(64):
+            v[i] += 1 if hv & (1 << i) else -1
+    return f"{sum(1 << i for i in range(64) if v[i] >= 0):016x}"
+
+
+def bench_analysis(args: argparse.Namespace) -> None:
+    """Store-path text analysis on long documents: separate passes vs one TextAnalysis."""
+    from mcp_memory.intelligence.analysis import analyze, analyze_many
+    from mcp_memory.intelligence.categorize import categorize
+    from mcp_memory.intelligence.keywords import extract_keywords
+    from mcp_memory.intelligence.utils import normalize_text, sha256_hex, simhash64
+
+    docs = _synthetic_texts(args.n, words=args.words, seed=11)
+    mb = sum(len(d) for d in docs) / 1e6
+
+    def separate(simhash):
+        def run():
+            for d in docs:
+                n = normalize_text(d)
+                kws = extract_keywords(n)
+                sha256_hex(n), simhash(n), categorize(n, kws)
+        return run
+
+    print(f"analysis: {args.n} docs x {args.words} words ({mb:.1f} MB)")
+    for label, fn in (
+        ("separate, legacy simhash", separate(_legacy_simhash64)),
+        ("separate", separate(simhash64)),
+        ("analyze", lambda: [analyze(d) for d in docs]),
+        ("analyze_many", lambda: analyze_many(docs)),
+    ):
+        t = time.perf_counter()
+        fn()
+        s = time.perf_counter() - t
+        print(f"  {label:<26} {s * 1000.0 / args.n:8.2f} ms/doc  {mb / s:7.2f} MB/s")
+
+
+# ---------------- serialize ----------------
+
+async def _bench_serialize(args: argparse.Namespace) -> None:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from mcp_memory import json_codec
+    from mcp_memory.intelligence.embeddings import EmbeddingService
+    from mcp_memory.server import FastJSONResponse
+    from mcp_memory.tools.recall_memory import recall_memory_tool
+
+    db = await _bench_db("serialize.db")
+    embed = EmbeddingService(model_name=db.embedding_model)
+    await _load_texts(db, embed, _synthetic_texts(args.n, words=args.words, seed=5))
+    keywords = json.dumps(["alpha beta", "gamma"] * 4)
+    await db.execute("bench_keywords", "UPDATE memories SET keywords = ?", (keywords,))
+    await db.commit()
+    queries = _synthetic_texts(args.rounds, words=3, seed=6)
+    print(f"serialize: {args.n} memories x {args.words} words, limit {args.limit},"
+          f" {args.rounds} recalls (orjson: {json_codec.orjson is not None},"
+          f" pass-through: {json_codec.RAW_JSON})")
+    for label, raw, encode in (
+        ("jsonable_encoder + json", False, lambda res: JSONResponse(jsonable_encoder(res)).body),
+        ("FastJSONResponse", True, lambda res: FastJSONResponse(res).body),
+    ):
+        ser, hyd, size = [], [], []
+        for q in queries:
+            res = await recall_memory_tool(db=db, cache=None, embed=embed, query=q,
+                                           limit=args.limit, raw_json=raw)
+            hyd.append(res["timings_ms"]["db_hydrate_ms"])
+            t = time.perf_counter()
+            body = encode({"success": True, "data": res})
+            ser.append((time.perf_counter() - t) * 1000.0)
+            size.append(len(body))
+        print(f"  {label:<24} {statistics.mean(size) / 1024:8.1f} KiB/recall"
+              f"  hydrate p50 {statistics.median(hyd):6.2f} ms"
+              f"  serialize p50 {statistics.median(ser):6.2f} ms")
+    await db.close()
+
+
+def bench_serialize(args: argparse.Namespace) -> None:
+    """Recall response encoding: FastAPI's default path vs FastJSONResponse, bytes and time."""
+    asyncio.run(_bench_serialize(args))
+
+
+# ---------------- health ----------------
+
+async def _bench_health(args: argparse.Namespace) -> None:
+    from mcp_memory.tools.memory_health import memory_health_tool
+
+    db = await _bench_db("health.db")
+    await _load_vectors(db, _synthetic_vectors(args.n, db.embedding_dim))
+
+    async def scans():
+        """What memory_health counted before the counters: two full scans."""
+        await db.fetchone(
+            "health_count", "SELECT COUNT(*) AS c FROM memories WHERE deleted_at IS NULL"
+        )
+        await db.fetchone("health_embeddings", f"SELECT COUNT(*) AS c FROM {db.vec_table}")
+
+    print(f"health: n={args.n}, {args.rounds} calls (ms per call)")
+    for label, fn in (
+        ("COUNT(*) scans", scans),
+        ("memory_health", lambda: memory_health_tool(db=db, cache=None, db_path=db.db_path)),
+        ("memory_health exact",
+         lambda: memory_health_tool(db=db, cache=None, db_path=db.db_path, exact=True)),
+    ):
+        lat = []
+        for _ in range(args.rounds):
+            t = time.perf_counter()
+            await fn()
+            lat.append((time.perf_counter() - t) * 1000.0)
+        print(f"  {label:<20} p50 {statistics.median(lat):8.2f}  max {max(lat):8.2f}")
+    await db.close()
+
+
+def bench_health(args: argparse.Namespace) -> None:
+    """memory_health from maintained counters vs counting rows."""
+    asyncio.run(_bench_health(args))
+
+
+# ---------------- window ----------------
+
+async def _bench_window(args: argparse.Namespace) -> None:
+    import numpy as np
+    from mcp_memory.config import settings
+    from mcp_memory.search.vector_search import SCAN_ROW_COST, vector_topk, window_topk
+
+    db = await _bench_db("window.db")
+    data, queries = _data_and_queries(args.n, args.queries, db.embedding_dim)
+    ids = await _load_vectors(db, data)
+    # Row i is i * days / n days old, newest last.
+    await db.execute(
+        "bench_spread",
+        "UPDATE memories SET created_at = datetime('now', printf('-%f days', (? - rowid) * ? / ?))",
+        (args.n, float(args.days), args.n),
+    )
+    await db.commit()
+    age = (args.n - np.arange(1, args.n + 1)) * args.days / args.n
+    k = 10
+
+    print(f"window: n={args.n} over {args.days} days, {args.queries} queries "
+          f"(recall@{k} vs exact, ms)")
+    print(f"  {'days':>6}{'rows':>8}  {'path':<12}{'recall':>8}{'p50':>9}{'p95':>9}")
+    for days in args.windows:
+        inside = np.flatnonzero(age < days)
+        window = (time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - days * 86400)), None)
+        exact = [[ids[i] for i in inside[np.argsort(-(data[inside] @ q))[:k]]] for q in queries]
+        cap = min(int(settings.time_window_scan_max), args.n // SCAN_ROW_COST)
+        plan = "scan" if len(inside) <= cap else "knn"
+
+        async def windowed(q, window=window):
+            return await window_topk(db, q.tolist(), k=k, window=window)
+
+        async def global_then_filter(q, window=window):
+            """Before: one global top-50, then only the rows that fall in the window."""
+            hits = await vector_topk(db, q.tolist(), k=50)
+            live = {r["id"] for r in await db.fetch_window("default", window, limit=args.n)}
+            return [h for h in hits if h[0] in live][:k]
+
+        for label, fn in ((f"window/{plan}", windowed), ("global+filter", global_then_filter)):
+            got, lat = [], []
+            for q in queries:
+                t = time.perf_counter()
+                res = await fn(q)
+                lat.append((time.perf_counter() - t) * 1000.0)
+                got.append([mid for mid, _ in res])
+            print(_recall_row(f"  {days:>6}{len(inside):>8}  {label:<12}", got, exact, lat))
+    await db.close()
+
+
+def bench_window(args: argparse.Namespace) -> None:
+    """Time-window recall: exact window scan / filtered KNN vs global KNN then filter."""
+    asyncio.run(_bench_window(args))
+
+
+# ---------------- tiering ----------------
+
+async def _bench_tiering(args: argparse.Namespace) -> None:
+    from mcp_memory.background.tiering import TieringJob
+    from mcp_memory.search.text_search import _match_topk
+    from mcp_memory.search.vector_search import vector_topk
+
+    db = await _bench_db("tiering.db", tiered=True)
+    data, queries = _data_and_queries(args.n, args.queries, db.embedding_dim)
+    await _load_vectors(db, data)
+    texts = _synthetic_texts(args.n)
+    await db.executemany(
+        "bench_content", "UPDATE memories SET content = ? WHERE rowid = ?",
+        [(t, i) for i, t in enumerate(texts, start=1)],
+    )
+    # The oldest `cold` share was last touched half a year ago and never recalled.
+    await db.execute(
+        "bench_age",
+        "UPDATE memories SET last_accessed = datetime('now', '-180 days') WHERE rowid <= ?",
+        (int(args.n * args.cold),),
+    )
+    await db.commit()
+    # One fixed expression: text_topk relaxes further on a smaller table, which hides the gain.
+    terms = [" OR ".join(f'"{w}"' for w in t.split())
+             for t in _synthetic_texts(args.queries, words=2, seed=2)]
+
+    async def measure(label: str) -> None:
+        vec, txt = [], []
+        for q, t in zip(queries, terms):
+            t0 = time.perf_counter()
+            await vector_topk(db, q.tolist(), k=50)
+            t1 = time.perf_counter()
+            await _match_topk(db, t, user_id="default", k=50)
+            vec.append((t1 - t0) * 1000.0)
+            txt.append((time.perf_counter() - t1) * 1000.0)
+        vec.sort(), txt.sort()
+        hot = (await db.fetchone("bench_count", "SELECT COUNT(*) AS c FROM memories"))["c"]
+        print(f"  {label:<8}{hot:>9}{vec[len(vec) // 2]:>10.2f}{vec[int(len(vec) * 0.95)]:>10.2f}"
+              f"{txt[len(txt) // 2]:>10.2f}{txt[int(len(txt) * 0.95)]:>10.2f}")
+
+    print(f"tiering: n={args.n}, cold share {args.cold}, {args.queries} queries (top-50, ms)")
+    print(f"  {'tier':<8}{'hot rows':>9}"
+          f"{'knn p50':>10}{'knn p95':>10}{'fts p50':>10}{'fts p95':>10}")
+    await measure("before")
+    t = time.perf_counter()
+    moved = await TieringJob(db, duty_cycle=1.0).run()
+    took = time.perf_counter() - t
+    await measure("after")
+    print(f"  moved {moved} rows in {took:.1f} s ({moved / max(took, 1e-9):,.0f} rows/s)")
+    await db.close()
+
+
+def bench_tiering(args: argparse.Namespace) -> None:
+    """Hot-tier KNN and FTS latency before and after archiving the cold share."""
+    asyncio.run(_bench_tiering(args))
+
+
+# ---------------- workers ----------------
+
+_WORKER_CHILD = r"""
+import asyncio, json, sys, time
+from mcp_memory.intelligence.embeddings import EmbeddingService
+
+def peak_mb(pid="self"):
+    with open(f"/proc/{pid}/status") as f:
+        return next(int(l.split()[1]) for l in f if l.startswith("VmHWM")) / 1024.0
+
+async def main(n, concurrency):
+    embed = EmbeddingService(sys.argv[1])
+    await embed.get_model()
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with gate:
+            await embed.embed_one(f"worker text {i} about the quarterly roadmap review")
+
+    t = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    return time.perf_counter() - t
+
+took = asyncio.run(main(int(sys.argv[2]), int(sys.argv[3])))
+print(json.dumps({"rss_mb": peak_mb(), "sec": took}))
+"""
+
+
+def _peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024.0
+
+
+def bench_workers(args: argparse.Namespace) -> None:
+    """N server-like processes embedding at once: a model in each vs one shared sidecar."""
+    from mcp_memory.config import settings
+
+    tmp = tempfile.mkdtemp(prefix="mcp-bench-")
+    sock = os.path.join(tmp, "embed.sock")
+    print(f"workers: {args.workers} processes x {args.texts} embeds,"
+          f" {args.concurrency} in flight each")
+    print(f"  {'mode':<12}{'worker MB':>10}{'sidecar MB':>12}{'total MB':>10}{'texts/s':>10}")
+    for mode in ("in-process", "sidecar"):
+        env = dict(os.environ, MCP_MEMORY_REDIS_URL="disabled", MCP_MEMORY_EMBED_SOCKET="")
+        side = None
+        if mode == "sidecar":
+            env["MCP_MEMORY_EMBED_SOCKET"] = sock
+            side = subprocess.Popen(
+                [sys.executable, "-m", "mcp_memory.intelligence.sidecar", "--socket", sock,
+                 "--model", settings.embedding_model],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        try:
+            t = time.perf_counter()
+            argv = [sys.executable, "-c", _WORKER_CHILD, settings.embedding_model, str(args.texts),
+                    str(args.concurrency)]
+            kids = [
+                subprocess.Popen(argv, env=env, stdout=subprocess.PIPE, text=True)
+                for _ in range(args.workers)
+            ]
+            outs = [json.loads(k.communicate()[0].strip().splitlines()[-1]) for k in kids]
+            wall = time.perf_counter() - t
+            side_mb = _peak_rss_mb(side.pid) if side else 0.0
+        finally:
+            if side:
+                side.terminate()
+                side.wait()
+        worker_mb = statistics.mean(o["rss_mb"] for o in outs)
+        rate = args.workers * args.texts / max(o["sec"] for o in outs)
+        total_mb = worker_mb * args.workers + side_mb
+        print(f"  {mode:<12}{worker_mb:>10.0f}{side_mb:>12.0f}{total_mb:>10.0f}"
+              f"{rate:>10.0f}   (wall {wall:.1f} s incl. model loads)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="mcp-memory benchmarks")
+    sub = ap.add_subparsers(dest="suite", required=True)
+
+    p = sub.add_parser("startup", help="cold start of the MCP stdio server")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--no-warmup", action="store_true", help="disable background model warm-up")
+    p.set_defaults(fn=bench_startup)
+
+    p = sub.add_parser("quant", help="quantized KNN + float re-rank vs exact")
+    p.add_argument("--n", type=int, default=20000)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--oversample", type=int, nargs="+", default=[2, 4, 8])
+    p.set_defaults(fn=bench_quant)
+
+    p = sub.add_parser("ann", help="IVF index vs exact sqlite-vec scan")
+    p.add_argument("--n", type=int, default=100000)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    p.set_defaults(fn=bench_ann)
+
+    p = sub.add_parser("mmap", help="mmap float32 matrix vs sqlite-vec scan")
+    p.add_argument("--n", type=int, default=100000)
+    p.add_argument("--queries", type=int, default=200)
+    p.set_defaults(fn=bench_mmap)
+
+    p = sub.add_parser("batch", help="batched recall vs sequential recalls")
+    p.add_argument("--n", type=int, default=5000)
+    p.add_argument("--batch", type=int, default=10)
+    p.add_argument("--rounds", type=int, default=5)
+    p.set_defaults(fn=bench_batch)
+
+    p = sub.add_parser("fts", help="FTS query planner vs AND-only text search")
+    p.add_argument("--n", type=int, default=50000)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--legacy-queries", type=int, default=5)
+    p.set_defaults(fn=bench_fts)
+
+    p = sub.add_parser("transfer", help="streaming export / bulk import with embeddings")
+    p.add_argument("--n", type=int, default=100000)
+    p.set_defaults(fn=bench_transfer)
+
+    p = sub.add_parser("ingest", help="store latency: inline embedding vs async embed queue")
+    p.add_argument("--n", type=int, default=500)
+    p.set_defaults(fn=bench_ingest)
+
+    p = sub.add_parser("ids", help="id-list hydration: IN (?,...) vs json_each")
+    p.add_argument("--n", type=int, default=20000)
+    p.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 500])
+    p.add_argument("--rounds", type=int, default=500)
+    p.set_defaults(fn=bench_ids)
+
+    p = sub.add_parser("analysis", help="text analysis throughput on long documents")
+    p.add_argument("--n", type=int, default=500)
+    p.add_argument("--words", type=int, default=2000)
+    p.set_defaults(fn=bench_analysis)
+
+    p = sub.add_parser("serialize", help="recall response bytes and encoding time")
+    p.add_argument("--n", type=int, default=200)
+    p.add_argument("--words", type=int, default=3000)
+    p.add_argument("--limit", type=int, default=10)
+    p.add_argument("--rounds", type=int, default=50)
+    p.set_defaults(fn=bench_serialize)
+
+    p = sub.add_parser("health", help="memory_health cost: counters vs COUNT(*) scans")
+    p.add_argument("--n", type=int, default=100000)
+    p.add_argument("--rounds", type=int, default=20)
+    p.set_defaults(fn=bench_health)
+
+    p = sub.add_parser("window",
+                       help="time-window recall: window scan / filtered KNN vs global KNN")
+    p.add_argument("--n", type=int, default=100000)
+    p.add_argument("--days", type=int, default=365)
+    p.add_argument("--queries", type=int, default=100)
+    p.add_argument("--windows", type=int, nargs="+", default=[1, 7, 30, 180])
+    p.set_defaults(fn=bench_window)
+
+    p = sub.add_parser("tiering",
+                       help="hot-tier search latency before/after archiving cold memories")
+    p.add_argument("--n", type=int, default=100000)
+    p.add_argument("--cold", type=float, default=0.8)
+    p.add_argument("--queries", type=int, default=200)
+    p.set_defaults(fn=bench_tiering)
+
+    p = sub.add_parser("workers",
+                       help="per-worker memory and embed throughput: in-process model vs sidecar")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--texts", type=int, default=400)
+    p.add_argument("--concurrency", type=int, default=16)
+    p.set_defaults(fn=bench_workers)
+
+    args = ap.parse_args()
+    args.fn(args)
+
+
+if __name__ == "__main__":
+    main()
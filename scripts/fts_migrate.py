@@ -0,0 +1,27 @@
+import argparse
+import asyncio
+
+from mcp_memory.background.fts_migrate import FtsMigrationJob
+from mcp_memory.config import settings
+from mcp_memory.storage.sqlite_manager import SQLiteManager
+
+async def main(batch_size: int, duty_cycle: float) -> None:
+    db = SQLiteManager(settings.db_path)
+    await db.initialize()
+    print("current:", repr(db.fts_tokenize), repr(db.fts_prefix))
+    print("wanted: ", *(repr(v) for v in db.fts_wanted()))
+    if await FtsMigrationJob(db, batch_size=batch_size, duty_cycle=duty_cycle).run():
+        print("migrated:", repr(db.fts_tokenize), repr(db.fts_prefix))
+    else:
+        print("no migration needed")
+    await db.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(
+        description="Rebuild the FTS index with MCP_MEMORY_FTS_TOKENIZER/PREFIX (resumable)"
+    )
+    ap.add_argument("--batch-size", type=int, default=settings.fts_migrate_batch_size)
+    ap.add_argument("--duty-cycle", type=float, default=1.0,
+                    help="1.0 = no throttling (offline run)")
+    args = ap.parse_args()
+    asyncio.run(main(args.batch_size, args.duty_cycle))
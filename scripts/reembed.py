@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+
+from mcp_memory.background.reembed import ReembedJob
+from mcp_memory.config import settings
+from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.storage.sqlite_manager import SQLiteManager
+
+async def main(model: str, batch_size: int, duty_cycle: float) -> None:
+    db = SQLiteManager(settings.db_path)
+    await db.initialize()
+    print("active:", db.embedding_version, db.embedding_model, db.embedding_dim)
+    job = ReembedJob(db, EmbeddingService(model_name=model, warmup=True),
+                     batch_size=batch_size, duty_cycle=duty_cycle)
+    space = await job.run()
+    if space:
+        print("activated:", space["version"], space["model"], space["dim"])
+    else:
+        print("no migration needed; missing vectors repaired")
+    await db.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Re-embed all memories with a new model (resumable)")
+    ap.add_argument("--model", default=settings.embedding_model)
+    ap.add_argument("--batch-size", type=int, default=settings.reembed_batch_size)
+    ap.add_argument("--duty-cycle", type=float, default=1.0,
+                    help="1.0 = no throttling (offline run)")
+    args = ap.parse_args()
+    asyncio.run(main(args.model, args.batch_size, args.duty_cycle))
@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+import os
+import time
+
+from mcp_memory.config import settings
+from mcp_memory.storage.sqlite_manager import SQLiteManager
+
+async def main(args: argparse.Namespace) -> None:
+    db = SQLiteManager(settings.db_path)
+    await db.initialize()
+    if args.cmd == "snapshot":
+        name = time.strftime("memory-%Y%m%d-%H%M%S.db")
+        dest = args.dest or os.path.join(settings.snapshot_dir, name)
+        stats = await db.snapshot(dest, step_pages=args.step_pages, pause_ms=args.pause_ms)
+    else:
+        stats = await db.restore(args.src)
+    print(f"{args.cmd}: {stats['path']} pages={stats['pages']} steps={stats['steps']} "
+          f"bytes={stats['bytes']} ms={stats['duration_ms']:.0f}")
+    await db.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Online snapshot / restore of the memory DB")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("snapshot", help="copy the live DB; safe while the server runs")
+    p.add_argument("dest", nargs="?", help=f"default: {settings.snapshot_dir}/memory-<time>.db")
+    p.add_argument("--step-pages", type=int, default=settings.snapshot_step_pages)
+    p.add_argument("--pause-ms", type=float, default=settings.snapshot_step_pause_ms)
+    p = sub.add_parser("restore", help="replace the DB with a snapshot"
+                                       " (use POST /admin/restore on a running server)")
+    p.add_argument("src")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,38 @@
+import argparse
+import asyncio
+import os
+import time
+
+from mcp_memory.config import settings
+from mcp_memory.storage.sqlite_manager import SQLiteManager
+from mcp_memory.storage.transfer import export_stream, file_chunks, import_stream
+
+async def main(args: argparse.Namespace) -> None:
+    db = SQLiteManager(settings.db_path)
+    await db.initialize()
+    t = time.perf_counter()
+    if args.cmd == "export":
+        with open(args.path + ".partial", "wb") as f:
+            async for chunk in export_stream(db, user_id=args.user, chunk_rows=args.chunk_rows):
+                await asyncio.to_thread(f.write, chunk)
+        os.replace(args.path + ".partial", args.path)
+        print(f"exported {args.path} bytes={os.path.getsize(args.path)}", end="")
+    else:
+        res = await import_stream(db, file_chunks(args.path), user_id=args.user)
+        print("imported", " ".join(f"{k}={v}" for k, v in res.items()), end="")
+    print(f" s={time.perf_counter() - t:.1f}")
+    await db.close()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(
+        description="Move memories with their embeddings between databases"
+    )
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("export", help="write live memories + vectors to a file")
+    p.add_argument("path")
+    p.add_argument("--user", help="only this user's memories (default: all)")
+    p.add_argument("--chunk-rows", type=int, default=settings.export_chunk_rows)
+    p = sub.add_parser("import", help="bulk-load an export into MCP_MEMORY_DB_PATH")
+    p.add_argument("path")
+    p.add_argument("--user", help="store every memory under this user id")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from .config import settings
+from .obs.metrics import METRICS
+
+class Overloaded(Exception):
+    """No slot within the wait budget; `retry_after` is a hint in whole seconds."""
+
+    def __init__(self, gate: str, retry_after: int) -> None:
+        super().__init__(f"{gate} is overloaded, retry in {retry_after}s")
+        self.gate = gate
+        self.retry_after = retry_after
+
+class AdmissionGate:
+    """
+    At most `max_inflight` requests run; up to `max_queued` more wait (FIFO) for a slot, each
+    no longer than its wait budget. Anything beyond is refused at once, so a burst costs the
+    excess callers a fast 429 instead of slowing every request down together.
+    """
+
+    def __init__(self, name: str, *, max_inflight: int, max_queued: int) -> None:
+        self.name = name
+        self.max_inflight = max(1, int(max_inflight))
+        self.max_queued = max(0, int(max_queued))
+        self._sem = asyncio.Semaphore(self.max_inflight)
+        self.inflight = 0
+        self.waiting = 0
+        self.service_ms = 0.0  # moving average of time holding a slot
+
+    def retry_after(self) -> int:
+        backlog = (self.waiting + 1) / self.max_inflight
+        return max(1, math.ceil(backlog * self.service_ms / 1000.0))
+
+    async def _refuse(self) -> Overloaded:
+        await METRICS.inc(f"admission_{self.name}_rejected_total")
+        return Overloaded(self.name, self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, wait_ms: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold a slot for the block. Raises Overloaded when none frees up within `wait_ms`."""
+        if self.inflight + self.waiting >= self.max_inflight + self.max_queued:
+            raise await self._refuse()
+        cap = settings.admission_wait_ms
+        wait = float(cap if wait_ms is None else min(wait_ms, cap))
+        t = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout=max(0.0, wait) / 1000.0)
+        except asyncio.TimeoutError:
+            raise await self._refuse() from None
+        finally:
+            self.waiting -= 1
+        await METRICS.observe_ms(f"admission_{self.name}_wait", (time.perf_counter() - t) * 1000.0)
+        self.inflight += 1
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            self._sem.release()
+            ms = (time.perf_counter() - t) * 1000.0
+            self.service_ms = ms if self.service_ms == 0.0 else 0.9 * self.service_ms + 0.1 * ms
+
+    def stats(self) -> dict:
+        return {"inflight": self.inflight, "waiting": self.waiting,
+                "max_inflight": self.max_inflight, "max_queued": self.max_queued,
+                "service_ms": round(self.service_ms, 2)}
+
+def make_gates() -> dict[str, AdmissionGate]:
+    """One gate per endpoint class: reads, writes and admin jobs don't starve each other."""
+    return {
+        "recall": AdmissionGate("recall", max_inflight=settings.recall_max_inflight,
+                                max_queued=settings.recall_max_queued),
+        "store": AdmissionGate("store", max_inflight=settings.store_max_inflight,
+                               max_queued=settings.store_max_queued),
+        "admin": AdmissionGate("admin", max_inflight=settings.admin_max_inflight,
+                               max_queued=settings.admin_max_queued),
+    }
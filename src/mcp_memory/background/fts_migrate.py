@@ -0,0 +1,64 @@
+from __future__ import annotations
+import asyncio
+import time
+from typing import Optional
+from structlog import get_logger
+from mcp_memory.storage.sqlite_manager import SQLiteManager
+from mcp_memory.config import settings
+from mcp_memory.obs.metrics import METRICS
+from mcp_memory.obs.tracing import span
+
+log = get_logger()
+
+class FtsMigrationJob:
+    """
+    Rebuilds memories_fts with the configured tokenizer/prefix options while it keeps serving.
+
+    A second FTS table is filled in rowid order with the cursor checkpointed per batch, so a
+    restart resumes where it stopped; triggers keep rows behind the cursor in sync with writes.
+    Once the cursor reaches the end the tables are swapped in one transaction. The job sleeps
+    between batches so it uses at most `duty_cycle` of wall time.
+    """
+
+    def __init__(
+        self,
+        db: SQLiteManager,
+        *,
+        batch_size: int | None = None,
+        duty_cycle: float | None = None,
+        stopping: Optional[asyncio.Event] = None,
+    ) -> None:
+        self.db = db
+        self.batch_size = int(batch_size or settings.fts_migrate_batch_size)
+        self.duty_cycle = min(1.0, max(0.01, float(duty_cycle or settings.fts_migrate_duty_cycle)))
+        self.stopping = stopping or asyncio.Event()
+
+    async def run(self) -> bool:
+        """Migrate if the options differ. True once the new table serves queries."""
+        if not self.db.fts_needs_migration():
+            return False
+        tokenize, prefix = self.db.fts_wanted()
+        state = await self.db.begin_fts_build(tokenize, prefix)
+        cursor = int(state["cursor_rowid"])
+        log.info("fts_migrate_start", tokenize=tokenize, prefix=prefix, cursor=cursor)
+        while not self.stopping.is_set():
+            t = time.perf_counter()
+            with span("fts_migrate.batch"):
+                hi = await self.db.copy_fts_batch(cursor, self.batch_size)
+            if hi is None:
+                break
+            cursor = hi
+            elapsed = time.perf_counter() - t
+            await METRICS.observe_ms("fts_migrate_batch", elapsed * 1000.0)
+            pause = elapsed * (1.0 - self.duty_cycle) / self.duty_cycle
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=pause)
+            except asyncio.TimeoutError:
+                pass
+        else:
+            log.info("fts_migrate_paused", cursor=cursor)
+            return False
+        await self.db.finish_fts_build()
+        await METRICS.inc("fts_migrations_total")
+        log.info("fts_migrate_done", tokenize=self.db.fts_tokenize, prefix=self.db.fts_prefix)
+        return True
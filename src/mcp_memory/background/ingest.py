@@ -0,0 +1,104 @@
+from __future__ import annotations
+import asyncio
+import time
+from typing import Optional
+from structlog import get_logger
+from mcp_memory.storage.sqlite_manager import SQLiteManager
+from mcp_memory.storage.redis_cache import RedisCache
+from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.config import settings
+from mcp_memory.obs.metrics import METRICS
+from mcp_memory.obs.tracing import span
+
+log = get_logger()
+
+class IngestEmbedder:
+    """
+    Drains the embed queue of one DB: rows stored with embed_later=True get their vectors here.
+
+    The queue is a table written in the store's own transaction, so it survives restarts and
+    is drained from the start on launch. A store wakes the loop; it then waits `max_wait_ms`
+    so a burst of stores shares one batched forward pass. Vectors and dequeue commit together.
+    Until then a row is found by full-text search only.
+    """
+
+    def __init__(
+        self,
+        db: SQLiteManager,
+        embed: EmbeddingService,
+        *,
+        cache: Optional[RedisCache] = None,
+        batch_size: int | None = None,
+        max_wait_ms: float | None = None,
+    ) -> None:
+        self.db = db
+        self.embed = embed
+        self.cache = cache
+        self.batch_size = int(batch_size or settings.ingest_batch_size)
+        self.max_wait_ms = float(
+            settings.ingest_max_wait_ms if max_wait_ms is None else max_wait_ms
+        )
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._stopping.clear()
+        self.db.embed_pending.set()  # whatever was queued before the restart
+        self._task = asyncio.create_task(self._loop(), name="ingest_embedder")
+
+    async def stop(self) -> None:
+        """Let the batch in flight commit; the rest stays queued for the next start."""
+        self._stopping.set()
+        self.db.embed_pending.set()
+        if self._task:
+            try:
+                await asyncio.wait_for(self._task, timeout=30)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        poll = float(settings.ingest_poll_sec)
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self.db.embed_pending.wait(), timeout=poll)
+            except asyncio.TimeoutError:
+                pass  # rows queued by another process on the same DB
+            if self._stopping.is_set():
+                break
+            self.db.embed_pending.clear()
+            await asyncio.sleep(self.max_wait_ms / 1000.0)
+            try:
+                await self.drain()
+            except Exception as e:
+                log.warning("ingest_embed_error", error=str(e))
+                await METRICS.inc("ingest_errors_total")
+
+    async def drain(self) -> int:
+        """Embed queued rows until the queue is empty or stop is requested; returns rows written."""
+        done = 0
+        while not self._stopping.is_set():
+            batch = await self.db.fetch_embed_queue(self.batch_size)
+            if not batch:
+                break
+            done += await self._step(batch)
+        return done
+
+    async def _step(self, batch: list[dict]) -> int:
+        t = time.perf_counter()
+        live = [r for r in batch if r["content"] is not None]
+        with span("ingest.batch", n=len(live)):
+            vecs = await self.embed.embed_many([r["content"] for r in live]) if live else []
+            space = await self.db.active_space()
+            items = [(r["rowid"], r["content_hash"], vec) for r, vec in zip(live, vecs)]
+            n = await self.db.write_space_vectors(space, items, dequeue=[r["rowid"] for r in batch])
+        now = time.time()
+        await METRICS.inc("ingest_embedded_total", len(live))
+        await METRICS.observe_ms("ingest_batch", (time.perf_counter() - t) * 1000.0)
+        for r in live:
+            await METRICS.observe_ms("ingest_lag", (now - float(r["enqueued_at"])) * 1000.0)
+        if self.cache:
+            # Rankings cached while these rows were text-only would miss their vector hits.
+            for user_id in {r["user_id"] for r in live}:
+                await self.cache.for_user(user_id).touch_last_write()
+        return n
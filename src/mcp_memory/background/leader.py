@@ -0,0 +1,86 @@
+from __future__ import annotations
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import Optional
+from structlog import get_logger
+from mcp_memory.storage.sqlite_manager import SQLiteManager
+from mcp_memory.config import settings
+from mcp_memory.obs.metrics import METRICS
+
+log = get_logger()
+
+class LeaderLease:
+    """
+    Elects one process per DB file, e.g. one of `uvicorn --workers N`, through a row in the
+    DB's `leases` table.
+
+    Every holder tries to take or renew the lease every `ttl_sec / 3`; it succeeds while it
+    holds it or once the current holder has let it lapse (stopped, crashed or stalled for
+    `ttl_sec`). `leading` turns false as soon as the last renewal is `ttl_sec` old, even if
+    the renewal task itself is stalled, so two processes never both believe they lead.
+    """
+
+    def __init__(
+        self,
+        db: SQLiteManager,
+        *,
+        name: str = "maintenance",
+        ttl_sec: float | None = None,
+        holder: str | None = None,
+    ) -> None:
+        self.db = db
+        self.name = name
+        self.ttl_sec = max(1.0, float(ttl_sec or settings.leader_lease_sec))
+        self.renew_sec = self.ttl_sec / 3.0
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._valid_until = 0.0  # monotonic
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def leading(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    async def start(self) -> None:
+        """First attempt before returning, so a lone process leads from the start."""
+        await self._tick()
+        self._task = asyncio.create_task(self._loop(), name=f"lease_{self.name}")
+
+    async def stop(self) -> None:
+        """Hand the lease back, so a follower takes over at its next attempt, not after ttl."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.leading:
+            self._valid_until = 0.0
+            try:
+                await self.db.release_lease(self.name, self.holder)
+            except Exception as e:
+                log.warning("lease_release_error", lease=self.name, err=str(e))
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.renew_sec)
+            await self._tick()
+
+    async def _tick(self) -> None:
+        was = self.leading
+        t = time.monotonic()
+        try:
+            held = await self.db.acquire_lease(self.name, self.holder, self.ttl_sec)
+        except Exception as e:
+            log.warning("lease_error", lease=self.name, err=str(e))
+            held = False
+        if held:
+            # Counted from before the write: the row may expire no later than this.
+            self._valid_until = t + self.ttl_sec
+        if self.leading != was:
+            await METRICS.inc("leader_changes_total")
+            log.info("leader_acquired" if self.leading else "leader_lost", lease=self.name,
+                     holder=self.holder, db=self.db.db_path)
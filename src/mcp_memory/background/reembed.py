@@ -0,0 +1,114 @@
+from __future__ import annotations
+import asyncio
+import time
+from typing import Callable, Optional
+from structlog import get_logger
+from mcp_memory.storage.sqlite_manager import SQLiteManager
+from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.config import settings
+from mcp_memory.obs.metrics import METRICS
+from mcp_memory.obs.tracing import span
+
+log = get_logger()
+
+class ReembedJob:
+    """
+    Builds the vector table for `target`'s model and switches recall to it.
+
+    Rows stream in rowid order through batched inference and the cursor is checkpointed with
+    every batch, so a restart resumes where it stopped. Rows inserted or edited behind the
+    cursor still carry the old embedding_version; passes repeat from rowid 0 until one finds
+    nothing, then the space is activated. The job sleeps between batches so it uses at most
+    `duty_cycle` of wall time.
+    """
+
+    def __init__(
+        self,
+        db: SQLiteManager,
+        target: EmbeddingService,
+        *,
+        batch_size: int | None = None,
+        duty_cycle: float | None = None,
+        stopping: Optional[asyncio.Event] = None,
+        on_activate: Optional[Callable[[dict], None]] = None,
+    ) -> None:
+        self.db = db
+        self.target = target
+        self.batch_size = int(batch_size or settings.reembed_batch_size)
+        self.duty_cycle = min(1.0, max(0.01, float(duty_cycle or settings.reembed_duty_cycle)))
+        self.stopping = stopping or asyncio.Event()
+        self.on_activate = on_activate
+
+    async def run(self) -> Optional[dict]:
+        """Migrate to the target model if needed. Returns the activated space, else None."""
+        dim = await self.target.dimension()
+        if self.db.embedding_model == self.target.model_name and self.db.embedding_dim == dim:
+            await self.repair()
+            return None
+
+        space = await self.db.create_embedding_space(self.target.model_name, dim)
+        version = int(space["version"])
+        cursor = int(space["cursor_rowid"])
+        log.info("reembed_start", version=version, model=space["model"], dim=dim, cursor=cursor)
+        pass_from_zero, pass_rows = cursor == 0, 0
+        while not self.stopping.is_set():
+            batch = await self.db.fetch_unembedded_batch(
+                version, after_rowid=cursor, limit=self.batch_size
+            )
+            if not batch:
+                if pass_from_zero and pass_rows == 0:
+                    break
+                cursor, pass_from_zero, pass_rows = 0, True, 0
+                continue
+            cursor = batch[-1][0]
+            pass_rows += len(batch)
+            await self._step(space, batch, cursor_rowid=cursor)
+        else:
+            log.info("reembed_paused", version=version, cursor=cursor)
+            return None
+
+        active = await self.db.activate_embedding_space(version)
+        if self.on_activate:
+            self.on_activate(active)
+        await METRICS.inc("reembed_activations_total")
+        log.info("reembed_activated", version=version, model=active["model"])
+        # Anything written with the old model while we switched.
+        await self.repair()
+        return active
+
+    async def repair(self) -> int:
+        """Embed live rows that are missing from the active space."""
+        space = await self.db.active_space()
+        version = int(space["version"])
+        done = 0
+        cursor = 0
+        while not self.stopping.is_set():
+            batch = await self.db.fetch_unembedded_batch(
+                version, after_rowid=cursor, limit=self.batch_size
+            )
+            if not batch:
+                break
+            cursor = batch[-1][0]
+            done += await self._step(space, batch)
+        if done:
+            log.info("reembed_repaired", version=version, rows=done)
+        return done
+
+    async def _step(
+        self, space: dict, batch: list[tuple[int, str, str]], *, cursor_rowid: int | None = None
+    ) -> int:
+        t = time.perf_counter()
+        with span("reembed.batch", n=len(batch)):
+            vecs = await self.target.embed_many([content for _, content, _ in batch])
+            items = [(rowid, ch, vec) for (rowid, _, ch), vec in zip(batch, vecs)]
+            n = await self.db.write_space_vectors(space, items, cursor_rowid=cursor_rowid)
+        elapsed = time.perf_counter() - t
+        await METRICS.inc("reembed_rows_total", n)
+        await METRICS.observe_ms("reembed_batch", elapsed * 1000.0)
+        # Throttle: keep the job at `duty_cycle` of wall time so foreground latency holds.
+        pause = elapsed * (1.0 - self.duty_cycle) / self.duty_cycle
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=pause)
+        except asyncio.TimeoutError:
+            pass
+        return n
@@ -0,0 +1,76 @@
+from __future__ import annotations
+import asyncio
+import time
+from typing import Optional
+from structlog import get_logger
+from mcp_memory.storage.sqlite_manager import SQLiteManager
+from mcp_memory.config import settings
+from mcp_memory.obs.metrics import METRICS
+from mcp_memory.obs.tracing import span
+
+log = get_logger()
+
+class TieringJob:
+    """
+    Moves cold memories (never recalled, untouched for `idle_days`) to the archive, out of the
+    hot vector table and FTS index that every recall scans.
+
+    One pass walks the table in windows of `batch_rows` rowids; a window's cold rows are
+    copied to the archive and deleted here before the next one, so a stop loses nothing and
+    the next pass picks up what is left. The job sleeps between windows so it uses at most
+    `duty_cycle` of wall time.
+    """
+
+    def __init__(
+        self,
+        db: SQLiteManager,
+        *,
+        idle_days: float | None = None,
+        batch_rows: int | None = None,
+        duty_cycle: float | None = None,
+        stopping: Optional[asyncio.Event] = None,
+    ) -> None:
+        self.db = db
+        self.idle_days = float(settings.tier_idle_days if idle_days is None else idle_days)
+        self.batch_rows = int(batch_rows or settings.tier_batch_rows)
+        self.duty_cycle = min(1.0, max(0.01, float(duty_cycle or settings.tier_duty_cycle)))
+        self.stopping = stopping or asyncio.Event()
+
+    async def run(self) -> int:
+        """One pass. Returns the number of memories moved."""
+        if self.db.archive is None:
+            return 0
+        if not self.db.archive_matches():
+            # Moved rows would lose their vectors; wait for the re-embed job to align the archive.
+            log.info("tiering_skipped", reason="archive embedding space differs",
+                     hot=self.db.embedding_model, archive=self.db.archive.embedding_model)
+            return 0
+        cursor, moved = 0, 0
+        while not self.stopping.is_set():
+            t = time.perf_counter()
+            with span("tiering.batch") as sp:
+                window = await self.db.fetch_cold_window(
+                    cursor, self.batch_rows, idle_days=self.idle_days
+                )
+                if window is None:
+                    break
+                cursor, rows = window
+                n = await self.db.demote(rows)
+                sp.set(cold=len(rows), moved=n)
+            moved += n
+            elapsed = time.perf_counter() - t
+            await METRICS.inc("tiered_total", n)
+            await METRICS.observe_ms("tiering_batch", elapsed * 1000.0)
+            pause = elapsed * (1.0 - self.duty_cycle) / self.duty_cycle
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=pause)
+            except asyncio.TimeoutError:
+                pass
+        if moved:
+            # Deleted rows stay in the FTS segments as delete markers until a merge; every
+            # text query would read through them.
+            with span("tiering.fts_optimize"):
+                await self.db.fts_optimize()
+                await self.db.archive.fts_optimize()
+            log.info("tiering_done", moved=moved)
+        return moved
@@ -0,0 +1,148 @@
+from __future__ import annotations
+import asyncio
+import time
+from typing import Optional
+from structlog import get_logger
+from mcp_memory.storage.sqlite_manager import SQLiteManager
+from mcp_memory.storage.redis_cache import RedisCache
+from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.background.leader import LeaderLease
+from mcp_memory.tools.recall_memory import _ranking, _search_type
+from mcp_memory.config import settings
+from mcp_memory.obs.metrics import METRICS
+from mcp_memory.obs.tracing import span
+
+log = get_logger()
+
+class CacheWarmer:
+    """
+    Keeps the hot set of one DB and replays it after a restart.
+
+    Recall counts its queries in memory (SQLiteManager.note_query); they are folded into the
+    hot_queries table every `hot_query_save_sec` and on stop. With several processes on the
+    file, only the holder of the maintenance `lease` decays the stored counts. At start the
+    hottest queries are embedded in batches (filling the embedding cache) and ranked (filling
+    the query cache and the FTS/vector pages they touch), then the rows and vectors of the
+    most-accessed memories are read into SQLite's page cache. Replay is paced to
+    `warm_rate_per_sec` queries and backs off while foreground statements are queued on the DB.
+    """
+
+    BATCH = 16      # queries embedded per batch
+    ROW_CHUNK = 256  # memories touched per statement
+
+    def __init__(
+        self,
+        db: SQLiteManager,
+        embed: EmbeddingService,
+        *,
+        cache: Optional[RedisCache] = None,
+        rate_per_sec: float | None = None,
+        lease: Optional[LeaderLease] = None,
+    ) -> None:
+        self.db = db
+        self.embed = embed
+        self.cache = cache
+        self.lease = lease
+        self.rate = max(0.1, float(rate_per_sec or settings.warm_rate_per_sec))
+        self._stopping = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self, *, warm: bool = True) -> None:
+        self._stopping.clear()
+        if warm:
+            self._tasks.append(asyncio.create_task(self.warm(), name="cache_warm"))
+        self._tasks.append(asyncio.create_task(self._loop_save(), name="hot_query_save"))
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        for t in self._tasks:
+            t.cancel()
+        for t in self._tasks:
+            try:
+                await t
+            except asyncio.CancelledError:
+                pass
+        self._tasks.clear()
+        await self.save()
+
+    async def save(self) -> None:
+        if self.db.conn is None:
+            return
+        # Every process adds its counts; fading them once per interval is the leader's job.
+        decay = float(settings.hot_query_decay)
+        if self.lease is not None and not self.lease.leading:
+            decay = 1.0
+        try:
+            await self.db.save_hot_queries(keep=int(settings.warm_queries), decay=decay)
+        except Exception as e:
+            log.warning("hot_query_save_error", error=str(e))
+
+    async def _loop_save(self) -> None:
+        interval = float(settings.hot_query_save_sec)
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                await self.save()
+
+    async def _pace(self, started: float, n: int) -> None:
+        """Sleep until `n` items at `rate` per second have had their time; wait out DB pressure."""
+        while self.db.inflight >= max(1, int(settings.degrade_db_inflight) // 2):
+            await asyncio.sleep(0.05)
+        ahead = started + n / self.rate - time.perf_counter()
+        if ahead > 0:
+            await asyncio.sleep(ahead)
+
+    async def warm(self) -> dict:
+        t0 = time.perf_counter()
+        queries = rows = 0
+        try:
+            queries = await self.warm_queries()
+            rows = await self.warm_rows()
+        except Exception as e:  # a cold cache is only slower
+            log.warning("cache_warm_error", error=str(e))
+            await METRICS.inc("warm_errors_total")
+        ms = (time.perf_counter() - t0) * 1000.0
+        await METRICS.observe_ms("warm", ms)
+        log.info("cache_warm_done", queries=queries, rows=rows, ms=round(ms, 1))
+        return {"queries": queries, "rows": rows, "ms": ms}
+
+    async def warm_queries(self) -> int:
+        hot = await self.db.fetch_hot_queries(int(settings.warm_queries))
+        started, done = time.perf_counter(), 0
+        for i in range(0, len(hot), self.BATCH):
+            batch = hot[i : i + self.BATCH]
+            with span("warm.queries", n=len(batch)):
+                if self.cache and self.cache.enabled:
+                    # One batched forward pass; the rankings below then hit the embedding cache.
+                    await self.embed.embed_many([h["query"] for h in batch])
+                for h in batch:
+                    cache = self.cache.for_user(h["user_id"]) if self.cache else None
+                    search_type = _search_type(h["category"])
+                    if cache and await cache.get_query_ranking(h["query"], search_type):
+                        await METRICS.inc("warm_query_cache_hits_total")
+                    else:
+                        await _ranking(
+                            db=self.db, cache=cache, embed=self.embed, query=h["query"],
+                            user_id=h["user_id"], category_filter=h["category"],
+                            rrf_k=int(settings.rrf_k),
+                            recency_half_life_days=int(settings.recency_half_life_days),
+                            timings={},
+                        )
+                    done += 1
+                    await METRICS.inc("warm_queries_total")
+                    await self._pace(started, done)
+        return done
+
+    async def warm_rows(self) -> int:
+        rowids = await self.db.fetch_hot_rowids(int(settings.warm_memories))
+        started, done = time.perf_counter(), 0
+        for i in range(0, len(rowids), self.ROW_CHUNK):
+            t = time.perf_counter()
+            with span("warm.rows"):
+                done += await self.db.touch_rows(rowids[i : i + self.ROW_CHUNK])
+            await METRICS.observe_ms("warm_rows_chunk", (time.perf_counter() - t) * 1000.0)
+            # Rows are far cheaper than queries: pace them as one query per chunk.
+            await self._pace(started, i // self.ROW_CHUNK + 1)
+        await METRICS.inc("warm_rows_total", done)
+        return done
@@ -1,26 +1,64 @@
 from __future__ import annotations
 import asyncio
+import random
+import time
+from typing import Optional
 from structlog import get_logger
 from mcp_memory.storage.sqlite_manager import SQLiteManager
+from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.background.reembed import ReembedJob
+from mcp_memory.background.fts_migrate import FtsMigrationJob
+from mcp_memory.background.tiering import TieringJob
+from mcp_memory.background.leader import LeaderLease
 from mcp_memory.config import settings
 from mcp_memory.obs.metrics import METRICS
+from mcp_memory.obs.tracing import span
 
 log = get_logger()
 
 class BackgroundWorker:
-    def __init__(self, db: SQLiteManager) -> None:
+    """
+    Maintenance jobs for one DB. With several processes on the same file (`leader_lease_sec`
+    > 0), only the one holding the DB's "maintenance" lease runs them; the others follow the
+    spaces and FTS options it switches. Each process has its own in-process vector index and
+    catches it up with the rows the others write (and reloads it after a restore by one of
+    them); only the process holding the index's file lock builds and saves it.
+    """
+
+    def __init__(
+        self, db: SQLiteManager, embed: Optional[EmbeddingService] = None, *,
+        jitter_sec: float = 0.0,
+    ) -> None:
         self.db = db
+        self.embed = embed
+        # Delay each job's first run by up to this much: many workers (one per open tenant)
+        # would otherwise run every job at the same moment.
+        self.jitter_sec = jitter_sec
         self._tasks: list[asyncio.Task] = []
         self._stopping = asyncio.Event()
+        self.lease: Optional[LeaderLease] = None
 
     async def start(self) -> None:
         self._stopping.clear()
+        if float(settings.leader_lease_sec) > 0:
+            self.lease = LeaderLease(self.db)
+            await self.lease.start()
         self._tasks = [
             asyncio.create_task(self._loop_ttl_sweeper(), name="ttl_sweeper"),
             asyncio.create_task(self._loop_dedup(), name="dedup"),
             asyncio.create_task(self._loop_vacuum(), name="vacuum"),
         ]
-        log.info("bg_started")
+        if self.embed is not None:
+            self._tasks.append(asyncio.create_task(self._loop_reembed(), name="reembed"))
+        if self.db.index is not None:
+            self._tasks.append(asyncio.create_task(self._loop_index(), name="index_rebuild"))
+        if self.db.fts_needs_migration():
+            self._tasks.append(asyncio.create_task(self._run_fts_migration(), name="fts_migrate"))
+        if settings.tiering and self.db.archive is not None:
+            self._tasks.append(asyncio.create_task(self._loop_tiering(), name="tiering"))
+        if self.lease is not None:
+            self._tasks.append(asyncio.create_task(self._loop_follow(), name="follow"))
+        log.info("bg_started", leading=self.lease.leading if self.lease else None)
 
     async def stop(self) -> None:
         self._stopping.set()
@@ -32,36 +70,61 @@ class BackgroundWorker:
             except asyncio.CancelledError:
                 pass
         self._tasks.clear()
+        if self.lease is not None:
+            await self.lease.stop()
+            self.lease = None
         log.info("bg_stopped")
 
-    async def _sleep(self, seconds: int) -> None:
+    async def _stagger(self, interval: int) -> None:
+        if self.jitter_sec > 0:
+            await self._sleep(random.uniform(0, min(interval, self.jitter_sec)))
+
+    async def _sleep(self, seconds: float) -> None:
         try:
             await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
         except asyncio.TimeoutError:
             return
 
+    async def _leading(self) -> bool:
+        """
+        Whether this process runs the shared jobs now. A follower first waits one lease period,
+        so its loops notice a takeover that soon.
+        """
+        if self.lease is None or self.lease.leading:
+            return True
+        await self._sleep(self.lease.renew_sec)
+        return False
+
     async def _loop_ttl_sweeper(self) -> None:
         interval = int(settings.ttl_sweep_interval_sec)
+        await self._stagger(interval)
         while not self._stopping.is_set():
+            if not await self._leading():
+                continue
             try:
-                ids = await self.db.fetch_ttl_expired_ids(limit=1000)
-                if ids:
-                    n = await self.db.soft_delete_ids(ids)
-                    await METRICS.inc("ttl_deleted_total", n)
-                    log.info("ttl_sweep", deleted=n)
+                with span("bg.ttl_sweep"):
+                    ids = await self.db.fetch_ttl_expired_ids(limit=1000)
+                    if ids:
+                        n = await self.db.soft_delete_ids(ids)
+                        await METRICS.inc("ttl_deleted_total", n)
+                        log.info("ttl_sweep", deleted=n)
             except Exception as e:
                 log.warning("ttl_sweep_error", err=str(e))
             await self._sleep(interval)
 
     async def _loop_dedup(self) -> None:
         interval = int(settings.dedup_interval_sec)
+        await self._stagger(interval)
         while not self._stopping.is_set():
+            if not await self._leading():
+                continue
             try:
-                ids = await self.db.find_simhash_dupe_ids(limit_groups=200)
-                if ids:
-                    n = await self.db.soft_delete_ids(ids)
-                    await METRICS.inc("dedup_deleted_total", n)
-                    log.info("dedup", deleted=n)
+                with span("bg.dedup"):
+                    ids = await self.db.find_simhash_dupe_ids(limit_groups=200)
+                    if ids:
+                        n = await self.db.soft_delete_ids(ids)
+                        await METRICS.inc("dedup_deleted_total", n)
+                        log.info("dedup", deleted=n)
             except Exception as e:
                 log.warning("dedup_error", err=str(e))
             await self._sleep(interval)
@@ -69,12 +132,125 @@ class BackgroundWorker:
     async def _loop_vacuum(self) -> None:
         interval = int(settings.vacuum_interval_sec)
         keep_days = int(settings.purge_soft_deleted_after_days)
+        await self._stagger(interval)
         while not self._stopping.is_set():
+            if not await self._leading():
+                continue
             try:
-                purged = await self.db.purge_soft_deleted(older_than_days=keep_days)
-                await self.db.vacuum_analyze()
-                await METRICS.inc("purged_total", purged)
-                log.info("vacuum", purged=purged)
+                with span("bg.vacuum"):
+                    purged = await self.db.purge_soft_deleted(older_than_days=keep_days)
+                    dropped = await self.db.drop_retired_spaces()
+                    await self.db.vacuum_analyze()
+                    archive = self.db.archive
+                    if archive is not None:
+                        purged += await archive.purge_soft_deleted(older_than_days=keep_days)
+                        await archive.drop_retired_spaces()
+                        await archive.vacuum_analyze()
+                    await METRICS.inc("purged_total", purged)
+                    log.info("vacuum", purged=purged, dropped_spaces=dropped)
             except Exception as e:
                 log.warning("vacuum_error", err=str(e))
             await self._sleep(interval)
+
+    async def _loop_reembed(self) -> None:
+        """Migrate to settings.embedding_model when the active space differs; else repair gaps."""
+        assert self.embed is not None
+        interval = int(settings.reembed_interval_sec)
+        target: Optional[EmbeddingService] = None
+        await self._stagger(interval)
+        while not self._stopping.is_set():
+            if not await self._leading():
+                continue
+            try:
+                with span("bg.reembed"):
+                    if settings.embedding_model == self.embed.model_name:
+                        target = self.embed
+                    elif target is None or target.model_name != settings.embedding_model:
+                        target = EmbeddingService(model_name=settings.embedding_model, warmup=True)
+                    job = ReembedJob(
+                        self.db, target, stopping=self._stopping,
+                        on_activate=lambda _space, t=target: self.embed.adopt(t),
+                    )
+                    await job.run()
+                    if self.db.archive is not None:
+                        # The archive follows the same model, or recall can't search it by vector.
+                        await ReembedJob(self.db.archive, target, stopping=self._stopping).run()
+            except Exception as e:
+                log.warning("reembed_error", err=str(e))
+            await self._sleep(interval)
+
+    async def _loop_index(self) -> None:
+        """
+        In every process: catch the in-process vector index up with other processes' writes
+        every `index_sync_sec`. Every `ann_rebuild_interval_sec`, build it when due, compact
+        it as inserts/deletes pile up, or save it (the last two only where it holds the lock).
+        """
+        every = max(0.1, float(settings.index_sync_sec))
+        interval = int(settings.ann_rebuild_interval_sec)
+        check_at = time.monotonic()
+        if self.jitter_sec > 0:
+            check_at += random.uniform(0, min(interval, self.jitter_sec))
+        while not self._stopping.is_set():
+            try:
+                await self.db.sync_index(force=True)
+                if time.monotonic() >= check_at:
+                    check_at = time.monotonic() + interval
+                    with span("bg.index_rebuild"):
+                        if await self.db.index_needs_rebuild():
+                            stats = await self.db.rebuild_index()
+                            await METRICS.inc("index_rebuilds_total")
+                            log.info("index_rebuild", **(stats or {}))
+                        else:
+                            await self.db.save_index()
+            except Exception as e:
+                log.warning("index_rebuild_error", err=str(e))
+            await self._sleep(every)
+
+    async def _loop_tiering(self) -> None:
+        """Move memories that went cold since the last pass to the archive."""
+        interval = int(settings.tier_interval_sec)
+        await self._stagger(interval)
+        while not self._stopping.is_set():
+            if not await self._leading():
+                continue
+            try:
+                with span("bg.tiering"):
+                    await TieringJob(self.db, stopping=self._stopping).run()
+            except Exception as e:
+                log.warning("tiering_error", err=str(e))
+            await self._sleep(interval)
+
+    async def _run_fts_migration(self) -> None:
+        """
+        FTS options only change with settings, so this runs once per start (resuming a partial
+        build).
+        """
+        while not self._stopping.is_set():
+            if not await self._leading():
+                if not self.db.fts_needs_migration():
+                    return  # the leader finished it
+                continue
+            try:
+                with span("bg.fts_migrate"):
+                    await FtsMigrationJob(self.db, stopping=self._stopping).run()
+                return
+            except Exception as e:
+                log.warning("fts_migrate_error", err=str(e))
+            await self._sleep(int(settings.reembed_interval_sec))
+
+    async def _loop_follow(self) -> None:
+        """While another process leads, pick up the embedding space and FTS index it switches to."""
+        assert self.lease is not None
+        while not self._stopping.is_set():
+            await self._sleep(self.lease.renew_sec)
+            if self.lease.leading:
+                continue
+            try:
+                if await self.db.refresh_shared_state() and self.embed is not None \
+                        and self.embed.model_name != self.db.embedding_model:
+                    model = self.db.embedding_model
+                    self.embed.adopt(EmbeddingService(model_name=model, warmup=True))
+                    log.info("embedding_space_followed", version=self.db.embedding_version,
+                             model=self.db.embedding_model)
+            except Exception as e:
+                log.warning("follow_error", err=str(e))
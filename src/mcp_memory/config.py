@@ -8,12 +8,61 @@ class Settings(BaseSettings):
 
     # Storage
     db_path: str = Field(default="~/.mcp/memory.db")
+    snapshot_dir: str = "~/.mcp/snapshots"     # where the admin endpoint writes/reads snapshots
+    snapshot_step_pages: int = 256             # pages copied per backup step
+    snapshot_step_pause_ms: float = 5.0        # pause between steps, leaving I/O to requests
+    export_chunk_rows: int = 5000              # memories per compressed export frame
     redis_url: str = Field(default="redis://localhost:6379/0")
+    redis_timeout_ms: float = 50.0             # budget per cache command; slower is a miss
+    redis_max_connections: int = 32            # connection pool size
+    redis_breaker_failures: int = 3            # consecutive errors that open the circuit breaker
+    redis_breaker_cooldown_sec: float = 5.0    # while open, probe Redis this often
 
     # Embeddings & search
     embedding_model: str = Field(default="all-MiniLM-L6-v2")
+    embedding_warmup: bool = True              # load the model in the background at launch
+    vector_quantization: str = "none"          # none | int8 | binary: KNN over a quantized index
+    quant_oversample: int = 4                  # candidates = k * this, re-ranked in float
+    vector_index: str = "exact"                # exact | ivf: in-process ANN, sqlite-vec as fallback
+    ivf_nlist: int = 0                         # 0 = sqrt(N) lists
+    ivf_nprobe: int = 16                       # lists scanned per query
+    ann_min_rows: int = 20000                  # below this the exact scan is fast enough
+    ann_max_churn: float = 0.2                 # compact once delta + tombstones exceed this share
+    index_sync_sec: float = 1.0                # add rows other processes wrote this often
     rrf_k: int = 60
+    snippet_chars: int = 160                   # "snippet": leading window for vector-only hits
+    snippet_tokens: int = 24                   # "snippet": FTS excerpt length around matches
     recency_half_life_days: int = 14
+    time_window_scan_max: int = 5000           # windows this small are scored row by row
+    fts_tokenizer: str = "porter unicode61 remove_diacritics 2"  # FTS5 tokenize= option
+    fts_prefix: str = "2 3"                    # FTS5 prefix= index lengths ("" = none)
+    fts_fallback_min_hits: int = 5             # fewer AND hits than this relaxes the query
+    fts_fallback_budget_ms: float = 25.0       # no relaxed query once text search took this long
+
+    # Ingest
+    ingest_async: bool = False                 # store returns after the insert; vectors follow
+    ingest_batch_size: int = 32                # queued rows embedded per forward pass
+    ingest_max_wait_ms: float = 20.0           # wait this long after a store to batch more
+    ingest_poll_sec: float = 5.0               # also poll the queue (rows from other processes)
+
+    # Admission control (HTTP server) and degraded recall
+    recall_max_inflight: int = 8               # concurrent recall/get requests per process
+    recall_max_queued: int = 32                # more waiting than this are refused with 429
+    store_max_inflight: int = 4                # concurrent store/forget/import requests
+    store_max_queued: int = 64
+    admin_max_inflight: int = 1                # snapshot/restore/export
+    admin_max_queued: int = 0
+    admission_wait_ms: float = 2000.0          # longest wait for a slot (or the request deadline)
+    degrade_embed_queue: int = 4               # recall goes text-only with this many embeds waiting
+    degrade_db_inflight: int = 16              # this many queued statements: recall is cached-only
+
+    # Cache warming
+    warm_on_start: bool = True                 # replay hot queries / read hot rows when a DB opens
+    warm_queries: int = 200                    # hottest recall queries kept and replayed
+    warm_memories: int = 2000                  # most-accessed memories read into the page cache
+    warm_rate_per_sec: float = 20.0            # replayed queries per second
+    hot_query_save_sec: int = 300              # persist query counts this often (and on shutdown)
+    hot_query_decay: float = 0.9               # older counts fade by this factor on every save
 
     # Categorization
     categories: List[str] = ["work", "personal", "technical", "contacts", "finance", "other"]
@@ -24,8 +73,44 @@ class Settings(BaseSettings):
     dedup_interval_sec: int = 1800             # 30 min
     vacuum_interval_sec: int = 86400           # 24 h
     purge_soft_deleted_after_days: int = 30    # hard-delete after 30 days
+    reembed_interval_sec: int = 600            # check for model migration / missing vectors
+    reembed_batch_size: int = 64
+    reembed_duty_cycle: float = 0.3            # max share of wall time the re-embed job may use
+    ann_rebuild_interval_sec: int = 900        # check whether the ANN index needs a (re)build
+    fts_migrate_batch_size: int = 2000         # rows copied per batch when FTS options change
+    fts_migrate_duty_cycle: float = 0.3        # max share of wall time the FTS rebuild may use
+
+    # Hot/cold tiering (the job runs with the background jobs)
+    tiering: bool = False                      # move cold memories to <db>.archive
+    tier_idle_days: float = 90.0               # untouched this long (never recalled) = cold
+    tier_interval_sec: int = 3600              # look for cold memories this often
+    tier_batch_rows: int = 5000                # rowids examined (and cold ones moved) per step
+    tier_duty_cycle: float = 0.3               # max share of wall time the tiering job may use
+    archive_fallthrough_cos: float = 0.45      # no hot hit this close: search the archive
+
+    # Several server processes on one DB (uvicorn --workers N)
+    leader_lease_sec: float = 30.0             # only the lease holder runs jobs (0 = all do)
+    embed_socket: str = ""                     # Unix socket of the embedding sidecar ("" = none)
+    embed_socket_wait_sec: float = 30.0        # wait for the sidecar, then load in-process
+    embed_batch_max: int = 64                  # sidecar: most texts encoded in one forward pass
+    embed_batch_wait_ms: float = 2.0           # sidecar: wait this long for requests to batch
+
+    # SQL profiling (opt-in)
+    sql_profile: bool = False
+    slow_query_ms: float = 50.0                # capture statements slower than this
+    slow_query_explain: bool = True            # attach EXPLAIN QUERY PLAN to slow entries
+    slow_query_ring: int = 50                  # keep the N slowest statements
+
+    # Tracing (offline; spans go to an in-memory ring or a local JSONL file)
+    trace_sample_rate: float = 0.0             # fraction of root spans recorded
+    trace_export: str = "memory"               # "memory" or a path to a .jsonl file
+    trace_buffer: int = 2000                   # spans kept by the in-memory collector
 
-    # User identity
-    user_id: str = "default"
+    # User identity / tenancy
+    user_id: str = "default"                   # tenant for requests that name none
+    tenant_sharding: bool = False              # one DB file per tenant under shard_dir
+    shard_dir: str = "~/.mcp/tenants"          # <user_id>.db; the default tenant keeps db_path
+    tenant_max_open: int = 64                  # open tenant DBs kept (LRU)
+    tenant_idle_sec: int = 600                 # close a tenant DB unused this long
 
 settings = Settings()
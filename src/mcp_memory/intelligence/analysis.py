@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from .categorize import categorize_blob
+from .keywords import keywords_from_tokens
+from .utils import sha256_hex, shingles, simhash_counts, tokens
+
+
+@dataclass(slots=True)
+class TextAnalysis:
+    """Everything the store path derives from a memory's text."""
+    normalized: str
+    content_hash: str
+    simhash64: str
+    keywords: list[str]
+    category: str
+
+
+def _normalize(text: str) -> str:
+    # normalize_text without the regex; str.split() and `\s` agree on what whitespace is.
+    return " ".join(text.lower().split())
+
+
+def analyze(text: str, *, category: Optional[str] = None) -> TextAnalysis:
+    """
+    normalize_text, sha256_hex, simhash64, extract_keywords and categorize in one pass:
+    the text is tokenized once, and all category rules run in one regex scan. Same outputs
+    as calling them in turn. An explicit `category` skips the rules.
+    """
+    return _analyze(text, category, None)
+
+
+def _analyze(text: str, category: Optional[str], memo: dict[str, bytes] | None) -> TextAnalysis:
+    n = _normalize(text)
+    toks = tokens(n)
+    kws = keywords_from_tokens(toks)
+    return TextAnalysis(
+        normalized=n,
+        content_hash=sha256_hex(n),
+        simhash64=simhash_counts(Counter(shingles(toks)), memo),
+        keywords=kws,
+        category=category or categorize_blob(f"{n} {' '.join(kws)}"),
+    )
+
+
+def analyze_many(texts: Iterable[str]) -> list[TextAnalysis]:
+    """analyze() for a bulk ingest; each distinct feature is hashed once for the whole batch."""
+    memo: dict[str, bytes] = {}
+    return [_analyze(t, None, memo) for t in texts]
@@ -11,9 +11,23 @@ _RULES: list[tuple[str, re.Pattern[str]]] = [
     ("work",      re.compile(r"\b(meeting|deadline|jira|ticket|client|deliverable|sprint)\b")),
 ]
 
+# All rules in one pass. The lookahead matches without consuming, so every start position is
+# tried and overlapping matches are not skipped; at each position the alternation tries the
+# rules in priority order, so the lowest rule index found anywhere is what the list would pick.
+_COMBINED = re.compile(
+    "(?=" + "|".join(f"(?P<r{i}>{rx.pattern})" for i, (_, rx) in enumerate(_RULES)) + ")"
+)
+
+
+def categorize_blob(blob: str) -> str:
+    """First rule (in list order) matching anywhere in the lowercased `blob`."""
+    best = len(_RULES)
+    for m in _COMBINED.finditer(blob):
+        best = min(best, int(m.lastgroup[1:]))
+        if best == 0:
+            break
+    return _RULES[best][0] if best < len(_RULES) else "personal"
+
+
 def categorize(text: str, keywords: Sequence[str]) -> str:
-    blob = f"{text.lower()} {' '.join(keywords).lower()}"
-    for name, rx in _RULES:
-        if rx.search(blob):
-            return name
-    return "personal"
+    return categorize_blob(f"{text.lower()} {' '.join(keywords).lower()}")
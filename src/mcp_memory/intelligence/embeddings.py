@@ -1,29 +1,161 @@
 from __future__ import annotations
-from typing import List, Optional
-from sentence_transformers import SentenceTransformer
+import asyncio
+import concurrent.futures
+import threading
+import time
+from typing import TYPE_CHECKING, Any, List, Optional
+from structlog import get_logger
 from .utils import normalize_text
+from .sidecar import SidecarModel
+from ..config import settings
 from ..storage.redis_cache import RedisCache
+from ..obs.tracing import span
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+log = get_logger()
 
 class EmbeddingService:
-    """Local sentence-transformers embedder with optional Redis caching."""
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", cache: Optional[RedisCache] = None) -> None:
+    """
+    Local sentence-transformers embedder with optional Redis caching.
+    The model (and torch) is imported and loaded lazily on a daemon thread, so constructing
+    the service is free and callers that never embed never pay for it. With `embed_socket`
+    set, encoding goes to the shared embedding sidecar instead and torch is never imported
+    here; if no sidecar answers within `embed_socket_wait_sec`, the model is loaded locally.
+    """
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        cache: Optional[RedisCache] = None,
+        *,
+        warmup: bool = False,
+    ) -> None:
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name)
         self.cache = cache
-        _ = self.model.encode(["warmup"], normalize_embeddings=True)
+        self._model: Optional[SentenceTransformer] = None
+        self._loading: Optional[concurrent.futures.Future] = None
+        self._load_lock = threading.Lock()
+        # Local encodes run one at a time on this thread, off the event loop; the model does
+        # not go faster for running several at once.
+        self._encoder = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="embed")
+        # Load signals for degraded recall: calls waiting on the model/encoder, and a moving
+        # average of one encode.
+        self.pending = 0
+        self.encode_ms = 0.0
+        if warmup:
+            self.start_warmup()
+
+    # ---------- model lifecycle ----------
+
+    def start_warmup(self) -> concurrent.futures.Future:
+        """Start loading the model in the background. Idempotent; needs no event loop."""
+        with self._load_lock:
+            if self._loading is None:
+                fut: concurrent.futures.Future = concurrent.futures.Future()
+
+                def run() -> None:
+                    try:
+                        fut.set_result(self._load())
+                    except BaseException as e:
+                        fut.set_exception(e)
+
+                threading.Thread(target=run, name="embed-warmup", daemon=True).start()
+                self._loading = fut
+            return self._loading
+
+    def _load(self) -> SentenceTransformer | SidecarModel:
+        t = time.perf_counter()
+        if settings.embed_socket:
+            remote = SidecarModel.connect(settings.embed_socket, self.model_name)
+            if remote is not None:
+                self._model = remote
+                log.info("embed_model_ready", model=self.model_name, sidecar=settings.embed_socket,
+                         load_ms=round((time.perf_counter() - t) * 1000.0, 1))
+                return remote
+            log.warning("embed_sidecar_unavailable", socket=settings.embed_socket,
+                        model=self.model_name)
+        from sentence_transformers import SentenceTransformer  # heavy: pulls in torch
+
+        model = SentenceTransformer(self.model_name)
+        _ = model.encode(["warmup"], normalize_embeddings=True)
+        self._model = model
+        log.info("embed_model_ready", model=self.model_name,
+                 load_ms=round((time.perf_counter() - t) * 1000.0, 1))
+        return model
+
+    @property
+    def ready(self) -> bool:
+        if self._model is None and self._loading is not None and self._loading.done():
+            if self._loading.exception() is None:
+                self._model = self._loading.result()  # loaded by the service this one adopted
+        return self._model is not None
+
+    async def get_model(self) -> SentenceTransformer:
+        if self.ready:
+            assert self._model is not None
+            return self._model
+        with span("embed.load_wait"):
+            return await asyncio.wrap_future(self.start_warmup())
+
+    async def dimension(self) -> int:
+        model = await self.get_model()
+        return int(model.get_sentence_embedding_dimension())
+
+    def adopt(self, other: EmbeddingService) -> None:
+        """Switch this service to another's model in place (on embedding space activation)."""
+        with self._load_lock:
+            self.model_name = other.model_name
+            self._model = other._model
+            self._loading = other._loading
+
+    def _encode(self, model: Any, texts: list[str]) -> Any:
+        return model.encode(texts, normalize_embeddings=True)
+
+    async def _encode_async(self, model: Any, texts: list[str]) -> Any:
+        """Sidecar requests are awaited; local encodes queue on the encoder thread."""
+        if isinstance(model, SidecarModel):
+            return await model.aencode(texts)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._encoder, self._encode, model, texts)
+
+    def _observe_encode(self, ms: float) -> None:
+        self.encode_ms = ms if self.encode_ms == 0.0 else 0.8 * self.encode_ms + 0.2 * ms
+
+    def expected_wait_ms(self) -> float:
+        """Rough time until a new embed_one returns: queued encodes run one after another."""
+        if not self.ready:
+            return float("inf")
+        return self.encode_ms * (self.pending + 1)
+
+    # ---------- embedding ----------
 
     async def embed_one(self, text: str) -> List[float]:
-        n = normalize_text(text)
-        if self.cache:
-            v = await self.cache.get_embedding(f"{self.model_name}:{n}")
-            if v is not None:
-                return v
-        vec = self.model.encode([n], normalize_embeddings=True)[0].tolist()
-        if self.cache:
-            await self.cache.set_embedding(f"{self.model_name}:{n}", vec)
-        return vec
+        with span("embed.one") as sp:
+            n = normalize_text(text)
+            if self.cache:
+                v = await self.cache.get_embedding(f"{self.model_name}:{n}")
+                if v is not None:
+                    sp.set(cache_hit=True)
+                    return v
+            self.pending += 1
+            try:
+                model = await self.get_model()
+                t = time.perf_counter()
+                with span("embed.encode", n=1):
+                    vec = (await self._encode_async(model, [n]))[0].tolist()
+                self._observe_encode((time.perf_counter() - t) * 1000.0)
+            finally:
+                self.pending -= 1
+            if self.cache:
+                await self.cache.set_embedding(f"{self.model_name}:{n}", vec)
+            return vec
 
     async def embed_many(self, texts: list[str]) -> list[list[float]]:
+        with span("embed.many", n=len(texts)):
+            return await self._embed_many(texts)
+
+    async def _embed_many(self, texts: list[str]) -> list[list[float]]:
         outs: list[list[float]] = []
         misses: list[tuple[int, str]] = []
         if self.cache:
@@ -40,7 +172,13 @@ class EmbeddingService:
             outs = [[] for _ in texts]
         if misses:
             normed = [n for _, n in misses]
-            mat = self.model.encode(normed, normalize_embeddings=True)
+            self.pending += 1
+            try:
+                model = await self.get_model()
+                with span("embed.encode", n=len(normed)):
+                    mat = await self._encode_async(model, normed)
+            finally:
+                self.pending -= 1
             for (i, n), row in zip(misses, mat):
                 vec = row.tolist()
                 outs[i] = vec
@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import heapq
 from collections import Counter
-from typing import Iterable
+from typing import Iterable, Sequence
 
 from .utils import tokens
 
@@ -13,10 +14,16 @@ _STOP = {
 }
 
 def extract_keywords(text: str, max_keywords: int = 8) -> list[str]:
-    toks = [t for t in tokens(text) if t not in _STOP]
+    return keywords_from_tokens(tokens(text), max_keywords)
+
+
+def keywords_from_tokens(toks: Sequence[str], max_keywords: int = 8) -> list[str]:
+    """extract_keywords over an already tokenized text."""
+    toks = [t for t in toks if t not in _STOP]
     bigrams = [f"{a} {b}" for a, b in zip(toks, toks[1:])]
     grams: list[str] = toks + bigrams
     counts = Counter(grams)
     # keep order by frequency then length (prefer informative n-grams)
-    top = sorted(counts.items(), key=lambda kv: (kv[1], len(kv[0])), reverse=True)[:max_keywords]
+    # nlargest == sorted(..., reverse=True)[:n], ties included, without sorting every gram.
+    top = heapq.nlargest(max_keywords, counts.items(), key=lambda kv: (kv[1], len(kv[0])))
     return [w for w, _ in top]
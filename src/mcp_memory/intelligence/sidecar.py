@@ -0,0 +1,303 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import socket
+import struct
+import time
+from typing import Any, Optional
+import numpy as np
+from structlog import get_logger
+from ..config import settings
+from ..obs.metrics import METRICS
+
+log = get_logger()
+
+# Frames both ways are _HEAD (request id, status, payload length) and the payload. A request
+# is JSON {"model", "texts"} with status 0; the reply is the float32 matrix, one row per text
+# (status 0), or an error message (status 1). Replies on a connection may come out of order.
+_HEAD = struct.Struct("<IBI")
+_OK, _ERROR = 0, 1
+
+def _frame(rid: int, status: int, payload: bytes) -> bytes:
+    return _HEAD.pack(rid, status, len(payload)) + payload
+
+# ---------- server ----------
+
+class EmbedSidecar:
+    """
+    One process holding the embedding models for every server worker on the host, so running
+    more workers does not load more copies of the model.
+
+    Requests for a model, from all connections, join one queue. Its batcher takes the first,
+    waits `batch_wait_ms` for more, and encodes up to `batch_max` texts in one forward pass off
+    the event loop; whatever arrives meanwhile makes up the next batch. A model is loaded on
+    the first request naming it.
+    """
+
+    def __init__(
+        self, path: str, *, batch_max: int | None = None, batch_wait_ms: float | None = None
+    ) -> None:
+        self.path = os.path.expanduser(path)
+        self.batch_max = max(1, int(batch_max or settings.embed_batch_max))
+        self.batch_wait_ms = float(
+            settings.embed_batch_wait_ms if batch_wait_ms is None else batch_wait_ms
+        )
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._batchers: list[asyncio.Task] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._conns: set[asyncio.StreamWriter] = set()
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left by a sidecar that did not shut down cleanly
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        os.chmod(self.path, 0o600)
+        log.info("embed_sidecar_listening", socket=self.path, batch_max=self.batch_max,
+                 batch_wait_ms=self.batch_wait_ms)
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            for w in list(self._conns):
+                w.close()  # wait_closed() waits for open connections
+            await self._server.wait_closed()
+            self._server = None
+        for t in self._batchers:
+            t.cancel()
+        await asyncio.gather(*self._batchers, return_exceptions=True)
+        self._batchers.clear()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        lock = asyncio.Lock()
+        inflight: set[asyncio.Task] = set()
+        self._conns.add(writer)
+
+        async def answer(rid: int, payload: bytes) -> None:
+            try:
+                req = json.loads(payload)
+                mat = await self.embed(str(req["model"]), [str(t) for t in req["texts"]])
+                out = _frame(rid, _OK, mat.astype("<f4", copy=False).tobytes())
+            except Exception as e:
+                out = _frame(rid, _ERROR, repr(e).encode("utf-8"))
+            async with lock:
+                writer.write(out)
+                await writer.drain()
+
+        try:
+            while True:
+                rid, _status, n = _HEAD.unpack(await reader.readexactly(_HEAD.size))
+                task = asyncio.create_task(answer(rid, await reader.readexactly(n)))
+                inflight.add(task)
+                task.add_done_callback(inflight.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # client went away
+        finally:
+            for t in inflight:
+                t.cancel()
+            self._conns.discard(writer)
+            writer.close()
+
+    async def embed(self, model: str, texts: list[str]) -> np.ndarray:
+        queue = self._queues.get(model)
+        if queue is None:
+            queue = self._queues[model] = asyncio.Queue()
+            self._batchers.append(
+                asyncio.create_task(self._batch(model, queue), name=f"embed_batch_{model}")
+            )
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        queue.put_nowait((texts, fut))
+        return await fut
+
+    async def _batch(self, name: str, queue: asyncio.Queue) -> None:
+        model: Any = None
+        while True:
+            items = [await queue.get()]
+            await asyncio.sleep(self.batch_wait_ms / 1000.0)
+            n = len(items[0][0])
+            while n < self.batch_max and not queue.empty():
+                items.append(queue.get_nowait())
+                n += len(items[-1][0])
+            texts = [t for ts, _ in items for t in ts]
+            t0 = time.perf_counter()
+            try:
+                if model is None:
+                    model = await asyncio.to_thread(_load_model, name)
+                mat = await asyncio.to_thread(model.encode, texts, normalize_embeddings=True)
+            except Exception as e:
+                log.warning("embed_sidecar_error", model=name, err=str(e))
+                for _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            await METRICS.observe_ms("embed_sidecar_batch", (time.perf_counter() - t0) * 1000.0)
+            await METRICS.inc("embed_sidecar_texts_total", len(texts))
+            at = 0
+            for ts, fut in items:
+                if not fut.done():
+                    fut.set_result(np.asarray(mat[at:at + len(ts)], dtype=np.float32))
+                at += len(ts)
+
+def _load_model(name: str) -> Any:
+    t = time.perf_counter()
+    from sentence_transformers import SentenceTransformer  # heavy: pulls in torch
+
+    model = SentenceTransformer(name)
+    _ = model.encode(["warmup"], normalize_embeddings=True)
+    log.info("embed_model_ready", model=name, load_ms=round((time.perf_counter() - t) * 1000.0, 1),
+             sidecar=True)
+    return model
+
+# ---------- client ----------
+
+class SidecarModel:
+    """
+    Stands in for a SentenceTransformer inside EmbeddingService when the model runs in an
+    EmbedSidecar: `aencode` sends the texts over one pipelined connection per process.
+    """
+
+    def __init__(self, path: str, model_name: str, dim: int) -> None:
+        self.path = path
+        self.model_name = model_name
+        self.dim = dim
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def connect(
+        cls, path: str, model_name: str, *, wait_sec: float | None = None
+    ) -> Optional[SidecarModel]:
+        """
+        Blocking handshake (on the warm-up thread): embed one text, which also has the sidecar
+        load the model. None when no sidecar answers within `wait_sec`.
+        """
+        path = os.path.expanduser(path)
+        wait = settings.embed_socket_wait_sec if wait_sec is None else wait_sec
+        deadline = time.monotonic() + float(wait)
+        while True:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                    s.connect(path)
+                    s.settimeout(600)  # a first load may download the model
+                    hello = json.dumps({"model": model_name, "texts": ["warmup"]}).encode("utf-8")
+                    s.sendall(_frame(0, _OK, hello))
+                    _rid, status, n = _HEAD.unpack(_recv_exactly(s, _HEAD.size))
+                    payload = _recv_exactly(s, n)
+            except OSError:
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(0.5)
+                continue
+            if status != _OK:
+                raise RuntimeError(f"embedding sidecar: {payload.decode('utf-8', 'replace')}")
+            return cls(path, model_name, len(payload) // 4)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    async def aencode(self, texts: list[str]) -> np.ndarray:
+        """[len(texts), dim] float32; reconnects once if the sidecar restarted."""
+        try:
+            return await self._request(texts)
+        except ConnectionError:
+            return await self._request(texts)
+
+    async def _request(self, texts: list[str]) -> np.ndarray:
+        rid = next(self._ids)
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        payload = json.dumps({"model": self.model_name, "texts": texts}).encode("utf-8")
+        async with self._lock:
+            writer = await self._connected()
+            self._pending[rid] = fut
+            try:
+                writer.write(_frame(rid, _OK, payload))
+                await writer.drain()
+            except OSError as e:
+                self._pending.pop(rid, None)
+                self._disconnect()
+                raise ConnectionError(str(e)) from e
+        status, body = await fut
+        if status != _OK:
+            raise RuntimeError(f"embedding sidecar: {body.decode('utf-8', 'replace')}")
+        return np.frombuffer(body, dtype="<f4").reshape(len(texts), -1)
+
+    async def _connected(self) -> asyncio.StreamWriter:
+        if self._writer is None or self._writer.is_closing():
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path)
+            except OSError as e:
+                raise ConnectionError(str(e)) from e
+            self._reader = asyncio.create_task(
+                self._read(reader, self._writer), name="embed_sidecar_reader"
+            )
+        return self._writer
+
+    async def _read(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                rid, status, n = _HEAD.unpack(await reader.readexactly(_HEAD.size))
+                body = await reader.readexactly(n)
+                fut = self._pending.pop(rid, None)
+                if fut is not None and not fut.done():
+                    fut.set_result((status, body))
+        except (asyncio.IncompleteReadError, OSError) as e:
+            if writer is self._writer:
+                self._disconnect()
+            log.warning("embed_sidecar_disconnected", socket=self.path, err=repr(e))
+            await METRICS.inc("embed_sidecar_disconnects_total")
+
+    def _disconnect(self) -> None:
+        """Fail what is in flight (callers retry on a new connection) and drop the connection."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        pending, self._pending = self._pending, {}
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError("embedding sidecar connection lost"))
+
+def _recv_exactly(s: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = s.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("embedding sidecar closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+# ---------- entry point ----------
+
+async def _run(path: str, preload: list[str]) -> None:
+    sidecar = EmbedSidecar(path)
+    await sidecar.start()
+    for name in preload:
+        await sidecar.embed(name, ["warmup"])
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+    await sidecar.close()
+
+def main() -> None:
+    ap = argparse.ArgumentParser(
+        description="Shared embedding process for the server workers on this host"
+    )
+    ap.add_argument("--socket", default=settings.embed_socket or "~/.mcp/embed.sock")
+    ap.add_argument("--model", action="append", default=None,
+                    help="load at start (repeatable); other models load on first use")
+    args = ap.parse_args()
+    models = args.model if args.model is not None else [settings.embedding_model]
+    asyncio.run(_run(args.socket, models))
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,10 @@ from __future__ import annotations
 
 import hashlib
 import re
-from typing import Iterable
+from collections import Counter
+from typing import Iterable, Mapping, Sequence
+
+import numpy as np
 
 
 _WS_RE = re.compile(r"\s+")
@@ -29,29 +32,42 @@ def _hash64(token: str) -> int:
     return int.from_bytes(h, "big", signed=False)
 
 
+def shingles(toks: Sequence[str]) -> list[str]:
+    """SimHash features: the tokens followed by their bigrams."""
+    return list(toks) + [f"{a} {b}" for a, b in zip(toks, toks[1:])]
+
+
+def simhash_counts(counts: Mapping[str, int], memo: dict[str, bytes] | None = None) -> str:
+    """
+    SimHash of features given with their multiplicity (same value as over the expanded list).
+    Bit i is set when at least half the features have it set; `memo` caches feature digests
+    across calls.
+    """
+    if memo is None:
+        memo = {}
+    digests = []
+    for g in counts:
+        d = memo.get(g)
+        if d is None:
+            d = memo[g] = hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest()
+        digests.append(d)
+    weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    # Digests are the big-endian hash values (_hash64): unpack MSB first, then flip to bit i.
+    packed = np.frombuffer(b"".join(digests), dtype=np.uint8).reshape(-1, 8)
+    bits = np.unpackbits(packed, axis=1)[:, ::-1]
+    ones = weights @ bits if digests else np.zeros(64, dtype=np.int64)
+    mask = np.packbits(2 * ones >= int(weights.sum()), bitorder="little")
+    return f"{int.from_bytes(mask.tobytes(), 'little'):016x}"
+
+
 def simhash64(text: str, ngrams: Iterable[str] | None = None) -> str:
     """
     64-bit SimHash over tokens + bigrams. Returns hex string.
     Deterministic and fast. Not cryptographic.
     """
     if ngrams is None:
-        toks = tokens(text)
-        bigrams = [f"{a} {b}" for a, b in zip(toks, toks[1:])]
-        ngrams = list(toks) + bigrams
-
-    v = [0] * 64
-    for g in ngrams:
-        hv = _hash64(g)
-        for i in range(64):
-            if hv & (1 << i):
-                v[i] += 1
-            else:
-                v[i] -= 1
-    out = 0
-    for i in range(64):
-        if v[i] >= 0:
-            out |= (1 << i)
-    return f"{out:016x}"
+        ngrams = shingles(tokens(text))
+    return simhash_counts(Counter(ngrams))
 
 
 def hamming_distance_hex64(a_hex: str, b_hex: str) -> int:
@@ -0,0 +1,53 @@
+from __future__ import annotations
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# orjson >= 3.9 splices pre-encoded JSON into its output unchanged.
+RAW_JSON = orjson is not None and hasattr(orjson, "Fragment")
+
+
+def _compact_strings(text: str) -> bool:
+    """`text` is a JSON array of strings exactly as dumps() writes it, with no escapes."""
+    if text == "[]":
+        return True
+    if len(text) < 4 or not (text.startswith('["') and text.endswith('"]')):
+        return False
+    if "\\" in text or min(text) < " ":
+        return False
+    return all('"' not in s for s in text[2:-2].split('","'))
+
+
+def dumps_str(obj: Any) -> str:
+    """dumps() as text, the form stored JSON columns are written in (see raw_json)."""
+    return dumps(obj).decode("utf-8")
+
+
+def raw_json(text: Any) -> Any:
+    """
+    A stored JSON value (e.g. a row's keywords) for dumps(): passed through as is when the
+    encoder supports it and the text is already what dumps() would write, decoded otherwise,
+    so the output bytes are the same either way. Invalid or missing JSON reads as [].
+    """
+    if not isinstance(text, str):
+        return text
+    if RAW_JSON and _compact_strings(text):
+        return orjson.Fragment(text)
+    if not text:
+        return []
+    try:
+        return json.loads(text)
+    except ValueError:
+        return []
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON. Unknown types are written as str(), like the stream endpoints."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        return orjson.dumps(obj, default=str, option=option)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
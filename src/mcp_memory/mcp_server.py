@@ -5,77 +5,144 @@ from typing import Optional
 from mcp.server.fastmcp import FastMCP
 
 from mcp_memory.config import settings
-from mcp_memory.storage.sqlite_manager import SQLiteManager
 from mcp_memory.storage.redis_cache import RedisCache
 from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.tenants import TenantRouter, valid_tenant
 from mcp_memory.tools.store_memory import store_memory_tool
-from mcp_memory.tools.recall_memory import recall_memory_tool
+from mcp_memory.tools.recall_memory import recall_memory_tool, recall_memories_tool
 from mcp_memory.tools.forget_memory import forget_memory_tool
+from mcp_memory.tools.get_memory import get_memory_tool
 from mcp_memory.tools.memory_health import memory_health_tool
 
 mcp = FastMCP("mcp-memory")
 
-_db: Optional[SQLiteManager] = None
-_cache: Optional[RedisCache] = None
-_embed: Optional[EmbeddingService] = None
+_router: Optional[TenantRouter] = None
+# Cheap to construct: the model loads on a background thread (see start_warmup) or on first use.
+_embed = EmbeddingService(model_name=settings.embedding_model)
 _initialized = False
 _lock = asyncio.Lock()
 
-async def ensure_init() -> None:
-    global _initialized, _db, _cache, _embed
-    if _initialized:
-        return
+async def ensure_init() -> TenantRouter:
+    """Open Redis and the default tenant's DB. Never waits on the embedding model."""
+    global _initialized, _router
+    if _initialized and _router:
+        return _router
     async with _lock:
-        if _initialized:
-            return
-        _db = SQLiteManager(settings.db_path)
-        await _db.initialize()
-        _cache = RedisCache(settings.redis_url, user_id=settings.user_id)
-        await _cache.initialize()
-        _embed = EmbeddingService(model_name=settings.embedding_model, cache=_cache)
-        _initialized = True
+        if not _initialized:
+            cache = RedisCache(settings.redis_url, user_id=settings.user_id)
+            await cache.initialize()
+            _embed.cache = cache
+            # Background jobs stay with the HTTP server; stdio sessions are short-lived.
+            _router = TenantRouter(cache=cache, embed=_embed, background=False)
+            await _router.start()
+            _initialized = True
+    assert _router
+    return _router
+
+def _invalid(user_id: str | None) -> dict | None:
+    if not user_id or valid_tenant(user_id):
+        return None
+    return {"success": False, "message": f"invalid user_id: {user_id!r}"}
 
 @mcp.tool()
 async def store_memory(content: str, category: str | None = None,
                        importance: float | None = None,
-                       ttl_seconds: int | None = None) -> dict:
-    await ensure_init()
-    assert _db and _embed
-    return await store_memory_tool(
-        db=_db, cache=_cache, embed=_embed,
-        content=content, user_id=settings.user_id,
-        category=category, importance=importance, ttl_seconds=ttl_seconds
-    )
+                       ttl_seconds: int | None = None,
+                       user_id: str | None = None) -> dict:
+    router = await ensure_init()
+    err = _invalid(user_id)
+    if err:
+        return err
+    async with router.tenant(user_id) as t:
+        return await store_memory_tool(
+            db=t.db, cache=t.cache, embed=t.embed,
+            content=content, user_id=t.user_id,
+            category=category, importance=importance, ttl_seconds=ttl_seconds
+        )
 
 @mcp.tool()
 async def recall_memory(query: str, category_filter: str | None = None,
-                        limit: int = 10) -> dict:
-    await ensure_init()
-    assert _db and _embed
-    return await recall_memory_tool(
-        db=_db, cache=_cache, embed=_embed,
-        query=query, user_id=settings.user_id,
-        category_filter=category_filter, limit=limit,
-        rrf_k=settings.rrf_k, recency_half_life_days=settings.recency_half_life_days
-    )
+                        limit: int = 10, cursor: str | None = None,
+                        fields: str = "full", user_id: str | None = None,
+                        deadline_ms: float | None = None,
+                        since: str | None = None, until: str | None = None,
+                        include_archive: bool = False) -> dict:
+    """
+    fields: ids | scores | snippet | full. Pass next_cursor back as cursor for the next page.
+    With deadline_ms the answer may degrade (listed in `degraded`) rather than run late.
+    since/until: only memories created in that range (ISO 8601, unix seconds or an age like
+    "7d"); with an empty query, the newest ones in it.
+    include_archive: also search memories moved to the archive for disuse.
+    """
+    router = await ensure_init()
+    err = _invalid(user_id)
+    if err:
+        return err
+    async with router.tenant(user_id) as t:
+        return await recall_memory_tool(
+            db=t.db, cache=t.cache, embed=t.embed,
+            query=query, user_id=t.user_id,
+            category_filter=category_filter, limit=limit,
+            rrf_k=settings.rrf_k, recency_half_life_days=settings.recency_half_life_days,
+            cursor=cursor, fields=fields, deadline_ms=deadline_ms, since=since, until=until,
+            include_archive=include_archive
+        )
+
+@mcp.tool()
+async def recall_memories(queries: list[str], category_filter: str | None = None,
+                          limit: int = 10, fields: str = "full",
+                          user_id: str | None = None,
+                          since: str | None = None, until: str | None = None,
+                          include_archive: bool = False) -> dict:
+    """Recall for several queries at once; cheaper than one recall_memory call per query."""
+    router = await ensure_init()
+    err = _invalid(user_id)
+    if err:
+        return err
+    async with router.tenant(user_id) as t:
+        return await recall_memories_tool(
+            db=t.db, cache=t.cache, embed=t.embed,
+            queries=queries, user_id=t.user_id,
+            category_filter=category_filter, limit=limit,
+            rrf_k=settings.rrf_k, recency_half_life_days=settings.recency_half_life_days,
+            fields=fields, since=since, until=until, include_archive=include_archive
+        )
+
+@mcp.tool()
+async def get_memory(memory_id: str, user_id: str | None = None) -> dict:
+    router = await ensure_init()
+    err = _invalid(user_id)
+    if err:
+        return err
+    async with router.tenant(user_id) as t:
+        return await get_memory_tool(db=t.db, memory_id=memory_id, user_id=t.user_id)
 
 @mcp.tool()
 async def forget_memory(memory_id: str | None = None,
                         query: str | None = None,
-                        confirm: bool = False) -> dict:
-    await ensure_init()
-    assert _db and _embed
-    return await forget_memory_tool(
-        db=_db, cache=_cache, embed=_embed,
-        user_id=settings.user_id, memory_id=memory_id,
-        query=query, confirm=confirm
-    )
+                        confirm: bool = False,
+                        user_id: str | None = None) -> dict:
+    router = await ensure_init()
+    err = _invalid(user_id)
+    if err:
+        return err
+    async with router.tenant(user_id) as t:
+        return await forget_memory_tool(
+            db=t.db, cache=t.cache, embed=t.embed,
+            user_id=t.user_id, memory_id=memory_id,
+            query=query, confirm=confirm
+        )
 
 @mcp.tool()
-async def memory_health() -> dict:
-    await ensure_init()
-    assert _db
-    return await memory_health_tool(db=_db, cache=_cache, db_path=settings.db_path)
+async def memory_health(user_id: str | None = None, exact: bool = False) -> dict:
+    router = await ensure_init()
+    err = _invalid(user_id)
+    if err:
+        return err
+    async with router.tenant(user_id) as t:
+        return await memory_health_tool(db=t.db, cache=t.cache, db_path=t.db.db_path, exact=exact)
 
 if __name__ == "__main__":
+    if settings.embedding_warmup:
+        _embed.start_warmup()  # overlaps model load with the MCP handshake
     mcp.run(transport="stdio")
@@ -0,0 +1,93 @@
+from __future__ import annotations
+import heapq
+import itertools
+import time
+from typing import Any, Sequence
+
+import aiosqlite
+from structlog import get_logger
+
+from mcp_memory.config import settings
+from mcp_memory.obs.metrics import METRICS
+
+log = get_logger()
+
+
+class SQLProfiler:
+    """
+    Opt-in per-statement SQL timing.
+    Every named statement feeds `sql_<name>` timers and row counters; statements slower
+    than the threshold land in a bounded ring of the slowest N, optionally with their plan.
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = False,
+        threshold_ms: float = 50.0,
+        explain: bool = True,
+        capacity: int = 50,
+    ) -> None:
+        self.enabled = enabled
+        self.threshold_ms = float(threshold_ms)
+        self.explain = explain
+        self.capacity = int(capacity)
+        self._slow: list[tuple[float, int, dict]] = []  # min-heap on ms
+        self._seq = itertools.count()
+
+    async def record(
+        self,
+        conn: aiosqlite.Connection,
+        name: str,
+        sql: str,
+        params: Sequence[Any],
+        ms: float,
+        rows: int,
+    ) -> None:
+        await METRICS.observe_ms(f"sql_{name}", ms)
+        await METRICS.inc(f"sql_{name}_rows_total", max(0, rows))
+        if ms < self.threshold_ms:
+            return
+        await METRICS.inc("sql_slow_total")
+        entry = {
+            "name": name,
+            "ms": round(ms, 3),
+            "rows": rows,
+            "sql": " ".join(sql.split()),
+            "at": time.time(),
+            "plan": None,
+        }
+        if self.explain and entry["sql"].upper().startswith(("SELECT", "WITH")):
+            entry["plan"] = await self._explain(conn, sql, params)
+        log.warning("slow_query", name=name, ms=entry["ms"], rows=rows)
+        item = (ms, next(self._seq), entry)
+        if len(self._slow) < self.capacity:
+            heapq.heappush(self._slow, item)
+        elif ms > self._slow[0][0]:
+            heapq.heapreplace(self._slow, item)
+
+    @staticmethod
+    async def _explain(
+        conn: aiosqlite.Connection, sql: str, params: Sequence[Any]
+    ) -> list[str] | None:
+        try:
+            cur = await conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [str(r[3]) for r in await cur.fetchall()]
+        except Exception as e:
+            log.warning("explain_error", err=str(e))
+            return None
+
+    def slowest(self, n: int | None = None) -> list[dict]:
+        out = [e for _, _, e in sorted(self._slow, key=lambda x: x[0], reverse=True)]
+        return out[:n] if n is not None else out
+
+    def reset(self) -> None:
+        self._slow.clear()
+
+
+SQL_PROFILER = SQLProfiler(
+    enabled=settings.sql_profile,
+    threshold_ms=settings.slow_query_ms,
+    explain=settings.slow_query_explain,
+    capacity=settings.slow_query_ring,
+)
@@ -0,0 +1,188 @@
+from __future__ import annotations
+import functools
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from mcp_memory.config import settings
+
+T = TypeVar("T")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str = ""
+    span_id: str = ""
+    parent_id: Optional[str] = None
+    sampled: bool = False
+    start_ts: float = 0.0
+    _t0: float = 0.0
+    duration_ms: float = 0.0
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attrs: Any) -> None:
+        if self.sampled:
+            self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start_ts,
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
+
+
+# Shared marker for "inside an unsampled trace": children reuse it instead of rolling again.
+_UNSAMPLED = Span(name="unsampled")
+_current: ContextVar[Optional[Span]] = ContextVar("mcp_memory_span", default=None)
+
+
+def _new_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class InMemoryCollector:
+    """Keeps the last N finished spans in a ring; grouped into traces on read."""
+
+    def __init__(self, capacity: int = 2000) -> None:
+        self._spans: deque[dict] = deque(maxlen=capacity)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span.to_dict())
+
+    def flush(self) -> None:
+        return
+
+    def traces(self, limit: int = 20) -> list[dict]:
+        by_trace: Dict[str, list[dict]] = {}
+        for s in self._spans:
+            by_trace.setdefault(s["trace_id"], []).append(s)
+        out = []
+        for tid, spans in list(by_trace.items())[-limit:]:
+            spans.sort(key=lambda s: s["start"])
+            out.append({"trace_id": tid, "spans": spans})
+        return out
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+
+class JsonlExporter:
+    """Appends one JSON object per finished span to a local file; flushed per trace."""
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.expanduser(path)
+        self._fh = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._fh.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def flush(self) -> None:
+        with self._lock:
+            self._fh.flush()
+
+    def traces(self, limit: int = 20) -> list[dict]:
+        return []
+
+
+class Tracer:
+    """
+    Minimal offline tracer. Spans live in a context var, so asyncio tasks spawned inside
+    a span inherit it as parent. Sampling is decided once per root span.
+    """
+
+    def __init__(self, *, sample_rate: float = 0.0, exporter: Any = None) -> None:
+        self.sample_rate = float(sample_rate)
+        self.exporter = exporter or InMemoryCollector()
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Span]:
+        parent = _current.get()
+        if parent is None:
+            if self.sample_rate <= 0.0 or random.random() >= self.sample_rate:
+                token = _current.set(_UNSAMPLED)
+                try:
+                    yield _UNSAMPLED
+                finally:
+                    _current.reset(token)
+                return
+        elif not parent.sampled:
+            yield parent
+            return
+
+        sp = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else _new_id(),
+            span_id=_new_id(),
+            parent_id=parent.span_id if parent else None,
+            sampled=True,
+            start_ts=time.time(),
+            _t0=time.perf_counter(),
+            attrs=dict(attrs),
+        )
+        token = _current.set(sp)
+        try:
+            yield sp
+        except BaseException as e:
+            sp.error = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            sp.duration_ms = (time.perf_counter() - sp._t0) * 1000.0
+            self.exporter.export(sp)
+            if sp.parent_id is None:
+                self.exporter.flush()
+
+    def traced(
+        self, name: str
+    ) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+        """Decorator: run an async function inside a span."""
+
+        def deco(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> T:
+                with self.span(name):
+                    return await fn(*args, **kwargs)
+
+            return wrapper
+
+        return deco
+
+
+@contextmanager
+def timed(timings: Dict[str, float], key: str, name: str, **attrs: Any) -> Iterator[Span]:
+    """Span that also writes its wall time (ms) into a timings dict, sampled or not."""
+    t = time.perf_counter()
+    with TRACER.span(name, **attrs) as sp:
+        try:
+            yield sp
+        finally:
+            timings[key] = (time.perf_counter() - t) * 1000.0
+
+
+def _make_exporter() -> Any:
+    target = settings.trace_export.strip()
+    if target and target.lower() != "memory":
+        return JsonlExporter(target)
+    return InMemoryCollector(capacity=settings.trace_buffer)
+
+
+TRACER = Tracer(sample_rate=settings.trace_sample_rate, exporter=_make_exporter())
+span = TRACER.span
+traced = TRACER.traced
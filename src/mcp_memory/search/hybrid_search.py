@@ -5,7 +5,7 @@ import time
 from collections import defaultdict
 from typing import Dict, Iterable, List, Sequence, Tuple
 
-from ..storage.sqlite_manager import SQLiteManager
+from ..storage.sqlite_manager import SQLiteManager, id_chunks
 
 
 def rrf_fuse(
@@ -54,11 +54,12 @@ async def apply_category_filter(
 ) -> List[str]:
     if not category or not ids:
         return list(ids)
-    assert db.conn is not None
-    qmarks = ",".join("?" for _ in ids)
-    sql = f"SELECT id FROM memories WHERE id IN ({qmarks}) AND category = ? AND deleted_at IS NULL"
-    cur = await db.conn.execute(sql, (*ids, category))
-    rows = [r["id"] for r in await cur.fetchall()]
+    sql = """
+    SELECT m.id FROM json_each(?) j CROSS JOIN memories m ON m.id = j.value
+    WHERE m.category = ? AND m.deleted_at IS NULL
+    """
+    keep: set[str] = set()
+    for chunk in id_chunks(ids):
+        keep.update(r["id"] for r in await db.fetchall("category_filter", sql, (chunk, category)))
     # preserve original order
-    keep = set(rows)
     return [i for i in ids if i in keep]
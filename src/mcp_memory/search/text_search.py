@@ -1,21 +1,91 @@
 from __future__ import annotations
 import re
-from typing import List, Tuple
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
 from aiosqlite import Row
-from ..storage.sqlite_manager import SQLiteManager
+from ..config import settings
+from ..intelligence.keywords import _STOP
+from ..storage.sqlite_manager import SQLiteManager, Window, id_chunks, window_sql
 
 _WORD = re.compile(r'"[^"]+"|\S+')
+_PUNCT = ".,;:!?()[]{}'`"
+
+# Phrases that match nothing are retried as NEAR groups this many tokens wide.
+NEAR_SPAN = 8
+
+# Markers around matched terms in excerpts; markdown bold reads well in chat clients.
+HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, ELLIPSIS = "**", "**", "…"
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+def _parse(q: str) -> Tuple[List[List[str]], List[str]]:
+    """
+    (phrases as word lists, terms). Stop-words are dropped unless nothing else is left.
+    A trailing * keeps a term as a prefix query ("kube*"); the prefix index makes short ones cheap.
+    """
+    phrases: List[List[str]] = []
+    terms: List[str] = []
+    for p in _WORD.findall(q):
+        if len(p) > 2 and p.startswith('"') and p.endswith('"'):
+            words = p[1:-1].split()
+            if words:
+                phrases.append(words)
+            continue
+        t = p.strip(_PUNCT)
+        if t:
+            terms.append(t)
+    kept = [t for t in terms if t.lower() not in _STOP]
+    return phrases, (kept if kept or phrases else terms)
+
+def _term(t: str) -> str:
+    if t.endswith("*") and len(t.rstrip("*")) > 0:
+        return _quote(t.rstrip("*")) + " *"
+    return _quote(t)
+
+def plan_fts_query(q: str) -> List[str]:
+    """
+    MATCH expressions for a query, strictest first: every phrase and term (AND), then phrases
+    relaxed to NEAR groups, then any of them (OR, which bm25 still ranks by how many match).
+    """
+    phrases, terms = _parse(q)
+    exact = [_quote(" ".join(w)) for w in phrases]
+    near = [f"NEAR({' '.join(_quote(x) for x in w)}, {NEAR_SPAN})" if len(w) > 1 else _quote(w[0])
+            for w in phrases]
+    loose = [_term(t) for t in terms]
+    plan: List[str] = []
+    for clauses, op in ((exact + loose, " AND "), (near + loose, " AND "), (near + loose, " OR ")):
+        expr = op.join(clauses)
+        if expr and expr not in plan:
+            plan.append(expr)
+    return plan or ['""']
 
 def build_fts_query(q: str) -> str:
-    """Phrases stay quoted. Other tokens AND'ed."""
-    parts = _WORD.findall(q)
-    clauses = []
-    for p in parts:
-        if p.startswith('"') and p.endswith('"'):
-            clauses.append(p)
-        else:
-            clauses.append(f'"{p}"')
-    return " AND ".join(clauses) if clauses else '""'
+    """The strictest expression: phrases stay quoted, other tokens AND'ed."""
+    return plan_fts_query(q)[0]
+
+async def _match_topk(
+    db: SQLiteManager, match: str, *, user_id: str, k: int, window: Optional[Window] = None
+) -> List[Tuple[str, float]]:
+    # CROSS JOIN keeps FTS as the outer loop; otherwise the planner may walk every row of the
+    # user (idx_user_created) and probe the FTS table once per row.
+    where, wparams = window_sql(window)
+    sql = f"""
+    SELECT m.id AS id, bm25(memories_fts) AS bm
+    FROM memories_fts f
+    CROSS JOIN memories m ON m.rowid = f.rowid
+    WHERE f.memories_fts MATCH ?
+      AND m.user_id = ? AND m.deleted_at IS NULL{where}
+    ORDER BY bm ASC
+    LIMIT ?
+    """
+    rows: List[Row] = await db.fetchall("text_topk", sql, (match, user_id, *wparams, k))
+    out: List[Tuple[str, float]] = []
+    for r in rows:
+        bm = float(r["bm"])
+        score = 1.0 / (1.0 + bm)
+        out.append((r["id"], score))
+    return out
 
 async def text_topk(
     db: SQLiteManager,
@@ -23,26 +93,53 @@ async def text_topk(
     *,
     user_id: str = "default",
     k: int = 50,
+    window: Optional[Window] = None,
 ) -> List[Tuple[str, float]]:
     """
     Returns [(memory_id, score)], where score = 1/(1+bm25).
+    Runs the strictest expression first; while it finds fewer than `fts_fallback_min_hits`
+    and the `fts_fallback_budget_ms` budget lasts, relaxed ones append hits below it.
+    With `window`, only memories created in that range count.
+    """
+    t0 = time.perf_counter()
+    out: List[Tuple[str, float]] = []
+    seen: set[str] = set()
+    for i, match in enumerate(plan_fts_query(query)):
+        if i and (
+            len(out) >= int(settings.fts_fallback_min_hits)
+            or (time.perf_counter() - t0) * 1000.0 >= float(settings.fts_fallback_budget_ms)
+        ):
+            break
+        for mid, score in await _match_topk(db, match, user_id=user_id, k=k, window=window):
+            if mid not in seen and len(out) < k:
+                seen.add(mid)
+                out.append((mid, score))
+    return out
+
+async def text_snippets(
+    db: SQLiteManager,
+    query: str,
+    ids: Sequence[str],
+    *,
+    tokens: int = 24,
+) -> Dict[str, str]:
     """
-    assert db.conn is not None
-    match = build_fts_query(query)
+    {memory_id: excerpt} from FTS5 snippet() around the query's matches, for just these ids.
+    Ids whose text does not match (vector-only hits) are absent.
+    """
+    if not ids or not query.strip():
+        return {}
     sql = """
-    SELECT m.id AS id, bm25(memories_fts) AS bm
+    SELECT m.id AS id, snippet(memories_fts, 0, ?, ?, ?, ?) AS snip
     FROM memories_fts f
     JOIN memories m ON m.rowid = f.rowid
-    WHERE m.user_id = ? AND m.deleted_at IS NULL
-      AND f.memories_fts MATCH ?
-    ORDER BY bm ASC
-    LIMIT ?
+    WHERE f.memories_fts MATCH ?
+      AND f.rowid IN (SELECT rowid FROM memories WHERE id IN (SELECT value FROM json_each(?)))
     """
-    cur = await db.conn.execute(sql, (user_id, match, k))
-    rows: List[Row] = await cur.fetchall()
-    out: List[Tuple[str, float]] = []
-    for r in rows:
-        bm = float(r["bm"])
-        score = 1.0 / (1.0 + bm)
-        out.append((r["id"], score))
+    # The loosest expression: any matching term is worth highlighting.
+    params = (HIGHLIGHT_OPEN, HIGHLIGHT_CLOSE, ELLIPSIS, int(tokens), plan_fts_query(query)[-1])
+    out: Dict[str, str] = {}
+    for chunk in id_chunks(ids):
+        rows = await db.fetchall("text_snippets", sql, (*params, chunk))
+        out.update((r["id"], r["snip"]) for r in rows)
     return out
@@ -1,10 +1,22 @@
 from __future__ import annotations
 
 import json
-from typing import List, Tuple
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from aiosqlite import Row
-from ..storage.sqlite_manager import SQLiteManager
+from ..config import settings
+from ..storage.sqlite_manager import SQLiteManager, Window, id_chunks, quantize_expr, window_sql
+from ..obs.tracing import span
+
+# Largest k sqlite-vec answers in one KNN query.
+KNN_MAX = 4096
+# Scoring one row by rowid lookup costs about as much as this many rows of a KNN scan
+# (scripts/bench.py window); windows over 1/this of the live rows go to the KNN instead.
+SCAN_ROW_COST = 16
+# Rows above the in-process index's `covered` mark (other processes' writes it has not caught
+# up with) are scored one by one; with more than this many the query goes to sqlite-vec.
+INDEX_TAIL_MAX = 1000
 
 
 async def vector_topk(
@@ -13,30 +25,215 @@ async def vector_topk(
     *,
     user_id: str = "default",
     k: int = 50,
+    category: str | None = None,
+    window: Optional[Window] = None,
+    fetch_k: Optional[int] = None,
 ) -> List[Tuple[str, float]]:
     """
     Returns [(memory_id, cosine_sim)].
+    Searches the active embedding space (db.vec_table); query_vec must come from its model.
     Assumes stored embeddings are L2-normalized.
     sqlite-vec returns L2 distance; convert to cosine: cos ≈ 1 - d^2/2
+    With vector_index=ivf|mmap and a ready index, the in-process engine answers instead,
+    together with an exact scan of the rows it does not cover yet.
+    `category` is applied during the scan by engines that can (mmap); callers still filter.
+    `window` keeps memories created in that range out of `fetch_k` nearest neighbours.
     """
-    assert db.conn is not None
-    sql = """
-    SELECT m.id AS id, v.distance AS dist
-    FROM (
-      SELECT rowid, distance
-      FROM memory_embeddings
-      WHERE embedding MATCH ?
-      ORDER BY distance
-      LIMIT ?
-    ) AS v
-    JOIN memories m ON m.rowid = v.rowid
-    WHERE m.user_id = ? AND m.deleted_at IS NULL
-    """
-    cur = await db.conn.execute(sql, (json.dumps(query_vec), k, user_id))
-    rows: List[Row] = await cur.fetchall()
+    n = min(KNN_MAX, max(k, fetch_k or k))
+    where, wparams = window_sql(window)
+    if db.index is not None:
+        await db.sync_index()  # rows other processes wrote since the last recall
+    if db.index is not None and db.index.ready:
+        covered = db.index.covered
+        tail = await db.max_memory_rowid() - covered
+        if tail <= INDEX_TAIL_MAX:
+            return await _index_topk(
+                db, query_vec, user_id=user_id, k=k, n=n, category=category, window=window,
+                tail_after=covered if tail > 0 else None,
+            )
+    qjson = json.dumps(query_vec)
+    if db.qvec_table:
+        rows = await _quantized_topk(db, query_vec, user_id=user_id, k=k, n=n, window=window)
+    elif db.vec_compact:
+        # The quantized index is not there yet (e.g. a new space): score every row.
+        sql = f"""
+        SELECT m.id AS id, vec_distance_l2({db.vec_expr()}, ?) AS dist
+        FROM {db.vec_table} v JOIN memories m ON m.rowid = v.rowid
+        WHERE m.user_id = ? AND m.deleted_at IS NULL{where}
+        ORDER BY dist
+        LIMIT ?
+        """
+        params = (array("f", query_vec).tobytes(), user_id, *wparams, k)
+        rows = await db.fetchall("vector_topk_compact", sql, params)
+    else:
+        sql = f"""
+        SELECT m.id AS id, v.distance AS dist
+        FROM (
+          SELECT rowid, distance
+          FROM {db.vec_table}
+          WHERE embedding MATCH ?
+          ORDER BY distance
+          LIMIT ?
+        ) AS v
+        JOIN memories m ON m.rowid = v.rowid
+        WHERE m.user_id = ? AND m.deleted_at IS NULL{where}
+        ORDER BY v.distance
+        LIMIT ?
+        """
+        rows = await db.fetchall("vector_topk", sql, (qjson, n, user_id, *wparams, k))
     out: List[Tuple[str, float]] = []
     for r in rows:
         d = float(r["dist"])
         cos = 1.0 - (d * d) / 2.0
         out.append((r["id"], cos))
     return out
+
+
+async def _index_topk(
+    db: SQLiteManager,
+    query_vec: List[float],
+    *,
+    user_id: str,
+    k: int,
+    n: int,
+    category: str | None,
+    window: Optional[Window],
+    tail_after: Optional[int] = None,
+) -> List[Tuple[str, float]]:
+    """
+    Engine candidates by rowid, then one lookup to map them to live ids of this user.
+    Rows above `tail_after` are scored exactly and merged in.
+    """
+    assert db.index is not None
+    with span("index.search", engine=db.vector_index) as sp:
+        hits = db.index.search(
+            query_vec, n, nprobe=int(settings.ivf_nprobe), user_id=user_id, category=category
+        )
+        sp.set(hits=len(hits))
+    where, wparams = window_sql(window)
+    out: List[Tuple[str, float]] = []
+    if hits:
+        # `+user_id` keeps the planner on rowid lookups instead of scanning the user's index.
+        rows = await db.fetchall(
+            "vector_topk_index",
+            f"""
+            SELECT m.rowid AS rowid, m.id AS id
+            FROM json_each(?) j CROSS JOIN memories m ON m.rowid = j.value
+            WHERE +m.user_id = ? AND m.deleted_at IS NULL{where}
+            """,
+            (json.dumps([r for r, _ in hits]), user_id, *wparams),
+        )
+        ids = {int(r["rowid"]): r["id"] for r in rows}
+        out = [(ids[r], cos) for r, cos in hits if r in ids]
+    if tail_after is None:
+        return out[:k]
+    # A rowid range over memories, then point lookups into the vector table.
+    rows = await db.fetchall(
+        "vector_topk_tail",
+        f"""
+        SELECT m.id AS id, vec_distance_l2({db.vec_expr()}, ?) AS dist
+        FROM memories m CROSS JOIN {db.vec_table} v ON v.rowid = m.rowid
+        WHERE m.rowid > ? AND +m.user_id = ? AND +m.deleted_at IS NULL{where}
+        ORDER BY dist
+        LIMIT ?
+        """,
+        (array("f", query_vec).tobytes(), tail_after, user_id, *wparams, k),
+    )
+    best = dict(out)
+    for r in rows:
+        d = float(r["dist"])
+        best[r["id"]] = max(best.get(r["id"], -1.0), 1.0 - (d * d) / 2.0)
+    return sorted(best.items(), key=lambda t: t[1], reverse=True)[:k]
+
+
+async def _quantized_topk(
+    db: SQLiteManager,
+    query_vec: List[float],
+    *,
+    user_id: str,
+    k: int,
+    n: int,
+    window: Optional[Window],
+) -> List[Row]:
+    """
+    KNN over the int8/bit index for n * quant_oversample candidates, then float re-rank
+    of just those rows (point lookups into the float16 table by rowid).
+    """
+    n_cand = min(KNN_MAX, n * max(1, int(settings.quant_oversample)))
+    where, wparams = window_sql(window)
+    sql = f"""
+    SELECT m.id AS id, r.dist AS dist
+    FROM (
+      SELECT c.rowid AS rowid, vec_distance_l2({db.vec_expr("e.embedding")}, ?) AS dist
+      FROM (
+        SELECT rowid
+        FROM {db.qvec_table}
+        WHERE embedding MATCH {quantize_expr(db.quantization)}
+        ORDER BY distance
+        LIMIT ?
+      ) AS c
+      JOIN {db.vec_table} e ON e.rowid = c.rowid
+      ORDER BY dist
+      LIMIT ?
+    ) AS r
+    JOIN memories m ON m.rowid = r.rowid
+    WHERE m.user_id = ? AND m.deleted_at IS NULL{where}
+    ORDER BY r.dist
+    LIMIT ?
+    """
+    qblob = array("f", query_vec).tobytes()
+    params = (qblob, qblob, n_cand, n, user_id, *wparams, k)
+    return await db.fetchall("vector_topk_quantized", sql, params)
+
+
+async def window_topk(
+    db: SQLiteManager,
+    query_vec: List[float],
+    *,
+    user_id: str = "default",
+    k: int = 50,
+    window: Window,
+    category: str | None = None,
+) -> List[Tuple[str, float]]:
+    """
+    [(memory_id, cosine_sim)] among the memories created in `window`.
+    A small window (at most `time_window_scan_max` rows and 1/SCAN_ROW_COST of the live rows)
+    is read off idx_user_created and each row scored exactly against its stored vector, so
+    its cost follows the window, not the corpus. A wider window holds at least that share of
+    the live rows: the KNN fetches enough extra neighbours for about 2k of them to fall
+    inside it, then filters on created_at.
+    """
+    live = (await db.fetch_stats()).get("live", 0)
+    cap = max(1, min(int(settings.time_window_scan_max), live // SCAN_ROW_COST))
+    with span("vector.window") as sp:
+        rows = await db.fetch_window(user_id, window, category=category, limit=cap + 1)
+        if len(rows) <= cap:
+            sp.set(plan="scan", rows=len(rows))
+            return await _score_rows(db, query_vec, rows, k=k)
+        fetch_k = -(-2 * k * live // cap)
+        sp.set(plan="knn", fetch_k=fetch_k)
+    return await vector_topk(db, query_vec, user_id=user_id, k=k, category=category, window=window,
+                             fetch_k=fetch_k)
+
+
+async def _score_rows(
+    db: SQLiteManager, query_vec: List[float], rows: Sequence[Dict[str, Any]], *, k: int
+) -> List[Tuple[str, float]]:
+    """
+    Exact distances for these rows (rowid point lookups into the vector table), best k.
+    The query goes in as a float32 blob: as JSON it would be parsed again for every row.
+    """
+    ids = {int(r["rowid"]): r["id"] for r in rows}
+    sql = f"""
+    SELECT j.value AS rowid, vec_distance_l2({db.vec_expr()}, ?) AS dist
+    FROM json_each(?) j CROSS JOIN {db.vec_table} v ON v.rowid = j.value
+    ORDER BY dist
+    LIMIT ?
+    """
+    qblob = array("f", query_vec).tobytes()
+    hits: List[Tuple[float, int]] = []
+    for chunk in id_chunks(ids):
+        rows = await db.fetchall("vector_window_scan", sql, (qblob, chunk, k))
+        hits.extend((float(r["dist"]), int(r["rowid"])) for r in rows)
+    hits.sort()
+    return [(ids[rowid], 1.0 - (d * d) / 2.0) for d, rowid in hits[:k]]
@@ -1,111 +1,405 @@
 from __future__ import annotations
-import os, pathlib, time
-from fastapi import FastAPI, Body, Response
+import math, os, pathlib, time
+from contextlib import AsyncExitStack
+from typing import Any
+from fastapi import FastAPI, Body, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from structlog import get_logger
 from .config import settings
-from .storage.sqlite_manager import SQLiteManager
 from .storage.redis_cache import RedisCache
+from .storage.transfer import export_stream, import_stream
 from .intelligence.embeddings import EmbeddingService
 from .tools.store_memory import store_memory_tool
-from .tools.recall_memory import recall_memory_tool
+from .tools.recall_memory import recall_memory_tool, recall_memories_tool, recall_memory_stream
 from .tools.forget_memory import forget_memory_tool
+from .tools.get_memory import get_memory_tool
 from .tools.memory_health import memory_health_tool
 from .obs.metrics import METRICS
-from .background.worker import BackgroundWorker
+from .obs.sql_profile import SQL_PROFILER
+from .obs.tracing import TRACER
+from .tenants import Tenant, TenantRouter, valid_tenant
+from .admission import Overloaded, make_gates
+from . import json_codec
 
 log = get_logger()
-app = FastAPI(title="mcp-memory", version="0.1.0")
 
-_db: SQLiteManager | None = None
+class FastJSONResponse(JSONResponse):
+    """JSON via json_codec: orjson when installed, stored JSON (keywords) spliced in unparsed."""
+
+    def render(self, content: Any) -> bytes:
+        return json_codec.dumps(content)
+
+app = FastAPI(title="mcp-memory", version="0.1.0", default_response_class=FastJSONResponse)
+
+_router: TenantRouter | None = None
 _cache: RedisCache | None = None
-_embed: EmbeddingService | None = None
-_bg: BackgroundWorker | None = None
+_gates = make_gates()
 
 @app.on_event("startup")
 async def startup() -> None:
-    global _db, _cache, _embed, _bg
+    global _router, _cache
     db_path = os.path.expanduser(settings.db_path)
     pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    _db = SQLiteManager(db_path)
-    await _db.initialize()
     _cache = RedisCache(settings.redis_url, user_id=settings.user_id)
     await _cache.initialize()
-    _embed = EmbeddingService(model_name=settings.embedding_model, cache=_cache)
-    if settings.enable_background:
-        _bg = BackgroundWorker(_db)
-        await _bg.start()
-    log.info("startup", db=db_path, redis=settings.redis_url, model=settings.embedding_model, bg=settings.enable_background)
+    # Tenants share loaded models by name; each DB embeds recall with the model of its active
+    # vector table, and a different configured model is migrated to by its re-embed job.
+    _router = TenantRouter(cache=_cache, embed=EmbeddingService(
+        model_name=settings.embedding_model, cache=_cache, warmup=settings.embedding_warmup))
+    await _router.start()
+    log.info("startup", db=db_path, redis=settings.redis_url, model=settings.embedding_model,
+             bg=settings.enable_background, sharded=settings.tenant_sharding,
+             embed_socket=settings.embed_socket or None)
 
 @app.on_event("shutdown")
 async def shutdown() -> None:
-    global _db, _cache, _bg
-    if _bg: await _bg.stop()
+    if _router: await _router.close()
     if _cache: await _cache.close()
-    if _db: await _db.close()
     log.info("shutdown")
 
+def _user_id(value: object) -> str:
+    return str(value) if value else settings.user_id
+
+def _invalid_user(user_id: str) -> dict | None:
+    if valid_tenant(user_id):
+        return None
+    return {"success": False, "message": f"invalid user_id: {user_id!r}"}
+
+def _deadline_ms(payload: dict) -> float | None:
+    """`deadline_ms` from a request body: None when absent, else a positive number."""
+    raw = payload.get("deadline_ms")
+    if not raw:
+        return None
+    try:
+        ms = float(raw)
+    except (TypeError, ValueError):
+        ms = math.nan
+    if not math.isfinite(ms) or ms <= 0:
+        raise ValueError(f"invalid deadline_ms: {raw!r}")
+    return ms
+
+async def _hold(gate: str, user_id: str) -> tuple[Tenant, AsyncExitStack]:
+    """An admission slot and the tenant's DB, for responses that outlive the handler."""
+    assert _router is not None
+    held = AsyncExitStack()
+    try:
+        await held.enter_async_context(_gates[gate].slot())
+        return await held.enter_async_context(_router.tenant(user_id)), held
+    except BaseException:
+        await held.aclose()
+        raise
+
+async def _respond(name: str, content: dict) -> FastJSONResponse:
+    """
+    Encode a result now: returning a Response skips FastAPI's jsonable_encoder copy of it,
+    which costs more than the encoding on large answers. Time and size go to /metrics.
+    """
+    t = time.perf_counter()
+    resp = FastJSONResponse(content)
+    await METRICS.observe_ms(f"serialize_{name}", (time.perf_counter() - t) * 1000.0)
+    await METRICS.inc(f"response_{name}_bytes_total", len(resp.body))
+    return resp
+
+@app.exception_handler(Overloaded)
+async def overloaded(_request: Request, exc: Overloaded):
+    return JSONResponse(status_code=429, headers={"Retry-After": str(exc.retry_after)},
+                        content={"success": False, "message": str(exc)})
+
 @app.get("/health")
 async def health():
-    return {"ok": True, "db_path": os.path.expanduser(settings.db_path), "redis_url": settings.redis_url}
+    assert _router is not None
+    return {"ok": True, "db_path": os.path.expanduser(settings.db_path),
+            "redis_url": settings.redis_url,
+            "tenants": _router.stats(), "admission": {k: g.stats() for k, g in _gates.items()}}
 
 @app.get("/metrics")
 async def metrics():
     text = await METRICS.export_prom()
     return Response(content=text, media_type="text/plain; version=0.0.4")
 
+@app.get("/debug/slow_queries")
+async def slow_queries(limit: int = 50, reset: bool = False):
+    out = {"enabled": SQL_PROFILER.enabled, "threshold_ms": SQL_PROFILER.threshold_ms,
+           "queries": SQL_PROFILER.slowest(limit)}
+    if reset:
+        SQL_PROFILER.reset()
+    return out
+
+@app.get("/debug/traces")
+async def traces(limit: int = 20):
+    return {"sample_rate": TRACER.sample_rate, "traces": TRACER.exporter.traces(limit)}
+
+def _snapshot_path(name: str | None) -> str:
+    """Snapshots live in settings.snapshot_dir; the endpoints only take a file name."""
+    name = name or time.strftime("memory-%Y%m%d-%H%M%S.db")
+    if os.path.basename(name) != name or name.startswith("."):
+        raise ValueError("name must be a plain file name")
+    return os.path.join(os.path.expanduser(settings.snapshot_dir), name)
+
+async def _observe_backup(kind: str, stats: dict) -> dict:
+    await METRICS.observe_ms(kind, stats["duration_ms"])
+    await METRICS.inc(f"{kind}_pages_total", stats["pages"])
+    await METRICS.inc(f"{kind}_steps_total", stats["steps"])
+    for ms in stats.pop("step_ms"):
+        await METRICS.observe_ms(f"{kind}_step", ms)
+    per_step = stats.pop("pages_per_step")
+    stats["max_pages_per_step"] = max(per_step, default=0)
+    return stats
+
+@app.post("/admin/snapshot")
+async def snapshot_ep(payload: dict = Body(default={})):
+    """Snapshots the DB of payload user_id (the default tenant's if unsharded or none is given)."""
+    assert _router is not None
+    try:
+        path = _snapshot_path(payload.get("name"))
+        async with _gates["admin"].slot(), _router.tenant(_user_id(payload.get("user_id"))) as t:
+            stats = await t.db.snapshot(path)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    await METRICS.inc("requests_snapshot_total")
+    return {"success": True, "data": await _observe_backup("snapshot", stats)}
+
+@app.post("/admin/restore")
+async def restore_ep(payload: dict = Body(...)):
+    assert _router is not None
+    if not payload.get("name"):
+        return {"success": False, "message": "Provide name"}
+    if not payload.get("confirm"):
+        return {"success": False, "message": "restore replaces every memory; pass confirm=true"}
+    try:
+        async with _gates["admin"].slot(), _router.tenant(_user_id(payload.get("user_id"))) as t:
+            stats = await t.db.restore(_snapshot_path(str(payload["name"])))
+            if t.cache:
+                await t.cache.touch_last_write()
+            if t.embed.model_name != t.db.embedding_model:
+                t.embed.adopt(EmbeddingService(model_name=t.db.embedding_model, warmup=True))
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    await METRICS.inc("requests_restore_total")
+    return {"success": True, "data": await _observe_backup("restore", stats)}
+
+@app.get("/admin/export")
+async def export_ep(user_id: str | None = None):
+    """Without user_id, every user of the default tenant's DB."""
+    assert _router is not None
+    err = _invalid_user(_user_id(user_id))
+    if err:
+        return err
+    # Slot and tenant DB are held until the last chunk is sent.
+    t, held = await _hold("admin", _user_id(user_id))
+    await METRICS.inc("requests_export_total")
+
+    async def body():
+        t0 = time.perf_counter()
+        try:
+            async for chunk in export_stream(t.db, user_id=user_id):
+                await METRICS.inc("export_bytes_total", len(chunk))
+                yield chunk
+        finally:
+            await held.aclose()
+        await METRICS.observe_ms("export", (time.perf_counter() - t0) * 1000.0)
+
+    disposition = 'attachment; filename="memories.mcpx"'
+    return StreamingResponse(body(), media_type="application/octet-stream",
+                             headers={"Content-Disposition": disposition})
+
+@app.post("/admin/import")
+async def import_ep(request: Request, user_id: str | None = None):
+    """Body: an export stream as produced by GET /admin/export. user_id re-owns every row."""
+    assert _router is not None
+    t0 = time.perf_counter()
+    try:
+        async with _gates["store"].slot(), _router.tenant(_user_id(user_id)) as t:
+            res = await import_stream(t.db, request.stream(), user_id=user_id)
+            if t.cache:
+                await t.cache.touch_last_write()
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    await METRICS.inc("requests_import_total")
+    await METRICS.inc("import_rows_total", res["inserted"])
+    await METRICS.observe_ms("import", (time.perf_counter() - t0) * 1000.0)
+    return {"success": True, "data": res}
+
 @app.post("/tools/store_memory")
 async def store_memory_ep(payload: dict = Body(...)):
-    assert _db and _embed is not None
+    assert _router is not None
     t0 = time.perf_counter()
-    res = await store_memory_tool(
-        db=_db, cache=_cache, embed=_embed,
-        content=str(payload.get("content", "")),
-        user_id=settings.user_id,
-        category=payload.get("category"),
-        importance=payload.get("importance"),
-        ttl_seconds=payload.get("ttl_seconds"),
-    )
+    uid = _user_id(payload.get("user_id"))
+    err = _invalid_user(uid)
+    if err:
+        return err
+    async with _gates["store"].slot(), _router.tenant(uid) as t:
+        res = await store_memory_tool(
+            db=t.db, cache=t.cache, embed=t.embed,
+            content=str(payload.get("content", "")),
+            user_id=t.user_id,
+            category=payload.get("category"),
+            importance=payload.get("importance"),
+            ttl_seconds=payload.get("ttl_seconds"),
+        )
     await METRICS.inc("requests_store_total")
     await METRICS.observe_ms("latency_store", (time.perf_counter() - t0) * 1000.0)
     return {"success": True, "data": res}
 
 @app.post("/tools/recall_memory")
 async def recall_memory_ep(payload: dict = Body(...)):
-    assert _db and _embed is not None
+    assert _router is not None
     t0 = time.perf_counter()
-    res = await recall_memory_tool(
-        db=_db, cache=_cache, embed=_embed,
+    uid = _user_id(payload.get("user_id"))
+    err = _invalid_user(uid)
+    if err:
+        return err
+    try:
+        deadline_ms = _deadline_ms(payload)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "message": str(e)})
+    async with _gates["recall"].slot(deadline_ms), _router.tenant(uid) as t:
+        left_ms = deadline_ms - (time.perf_counter() - t0) * 1000.0 if deadline_ms else None
+        res = await recall_memory_tool(
+            db=t.db, cache=t.cache, embed=t.embed,
+            query=str(payload.get("query", "")),
+            user_id=t.user_id,
+            category_filter=payload.get("category_filter"),
+            since=payload.get("since"),
+            until=payload.get("until"),
+            include_archive=bool(payload.get("include_archive", False)),
+            limit=int(payload.get("limit", 10)),
+            rrf_k=int(settings.rrf_k),
+            recency_half_life_days=int(settings.recency_half_life_days),
+            cursor=payload.get("cursor"),
+            fields=str(payload.get("fields", "full")),
+            deadline_ms=max(left_ms, 0.001) if left_ms is not None else None,
+            raw_json=True,
+        )
+    await METRICS.inc("requests_recall_total")
+    for mode in res.get("degraded", []):
+        await METRICS.inc(f"recall_degraded_{mode}_total")
+    await METRICS.observe_ms("latency_recall_total", (time.perf_counter() - t0) * 1000.0)
+    for k, v in res.get("timings_ms", {}).items():
+        await METRICS.observe_ms(f"stage_{k}", float(v))
+    return await _respond("recall", {"success": True, "data": res})
+
+@app.post("/tools/recall_memory/stream")
+async def recall_memory_stream_ep(request: Request, payload: dict = Body(...)):
+    """Answers as they hydrate: NDJSON by default, SSE when the client accepts text/event-stream."""
+    assert _router is not None
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    uid = _user_id(payload.get("user_id"))
+    err = _invalid_user(uid)
+    if err:
+        return err
+    # Slot and tenant DB are held until the last event is sent.
+    t, held = await _hold("recall", uid)
+    events = recall_memory_stream(
+        db=t.db, cache=t.cache, embed=t.embed,
         query=str(payload.get("query", "")),
-        user_id=settings.user_id,
+        user_id=t.user_id,
         category_filter=payload.get("category_filter"),
+        since=payload.get("since"),
+        until=payload.get("until"),
+        include_archive=bool(payload.get("include_archive", False)),
         limit=int(payload.get("limit", 10)),
         rrf_k=int(settings.rrf_k),
         recency_half_life_days=int(settings.recency_half_life_days),
+        cursor=payload.get("cursor"),
+        fields=str(payload.get("fields", "full")),
+        raw_json=True,
     )
-    await METRICS.inc("requests_recall_total")
-    await METRICS.observe_ms("latency_recall_total", (time.perf_counter() - t0) * 1000.0)
+
+    async def body():
+        t0 = time.perf_counter()
+        try:
+            async for ev in events:
+                if sse:
+                    data = json_codec.dumps(ev["data"])
+                    yield b"event: " + ev["event"].encode() + b"\ndata: " + data + b"\n\n"
+                else:
+                    yield json_codec.dumps(ev) + b"\n"
+        finally:
+            await held.aclose()
+        await METRICS.inc("requests_recall_stream_total")
+        await METRICS.observe_ms("latency_recall_stream_total", (time.perf_counter() - t0) * 1000.0)
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type)
+
+@app.post("/tools/recall_memories")
+async def recall_memories_ep(payload: dict = Body(...)):
+    assert _router is not None
+    t0 = time.perf_counter()
+    uid = _user_id(payload.get("user_id"))
+    err = _invalid_user(uid)
+    if err:
+        return err
+    async with _gates["recall"].slot(), _router.tenant(uid) as t:
+        res = await recall_memories_tool(
+            db=t.db, cache=t.cache, embed=t.embed,
+            queries=[str(q) for q in payload.get("queries", [])],
+            user_id=t.user_id,
+            category_filter=payload.get("category_filter"),
+            since=payload.get("since"),
+            until=payload.get("until"),
+            include_archive=bool(payload.get("include_archive", False)),
+            limit=int(payload.get("limit", 10)),
+            rrf_k=int(settings.rrf_k),
+            recency_half_life_days=int(settings.recency_half_life_days),
+            fields=str(payload.get("fields", "full")),
+            raw_json=True,
+        )
+    await METRICS.inc("requests_recall_batch_total")
+    await METRICS.inc("recall_batch_queries_total", len(res.get("results", [])))
+    await METRICS.observe_ms("latency_recall_batch_total", (time.perf_counter() - t0) * 1000.0)
     for k, v in res.get("timings_ms", {}).items():
-        await METRICS.observe_ms(f"stage_{k}", float(v))
-    return {"success": True, "data": res}
+        await METRICS.observe_ms(f"stage_batch_{k}", float(v))
+    return await _respond("recall_batch", {"success": True, "data": res})
+
+@app.post("/tools/get_memory")
+async def get_memory_ep(payload: dict = Body(...)):
+    assert _router is not None
+    t0 = time.perf_counter()
+    uid = _user_id(payload.get("user_id"))
+    err = _invalid_user(uid)
+    if err:
+        return err
+    async with _gates["recall"].slot(), _router.tenant(uid) as t:
+        res = await get_memory_tool(db=t.db, memory_id=str(payload.get("memory_id") or ""),
+                                    user_id=t.user_id, raw_json=True)
+    await METRICS.inc("requests_get_total")
+    await METRICS.observe_ms("latency_get", (time.perf_counter() - t0) * 1000.0)
+    return await _respond("get", {"success": True, "data": res})
 
 @app.post("/tools/forget_memory")
 async def forget_memory_ep(payload: dict = Body(...)):
-    assert _db and _embed is not None
+    assert _router is not None
     t0 = time.perf_counter()
-    res = await forget_memory_tool(
-        db=_db, cache=_cache, embed=_embed,
-        user_id=settings.user_id,
-        memory_id=payload.get("memory_id"),
-        query=payload.get("query"),
-        confirm=bool(payload.get("confirm", False)),
-    )
+    uid = _user_id(payload.get("user_id"))
+    err = _invalid_user(uid)
+    if err:
+        return err
+    async with _gates["store"].slot(), _router.tenant(uid) as t:
+        res = await forget_memory_tool(
+            db=t.db, cache=t.cache, embed=t.embed,
+            user_id=t.user_id,
+            memory_id=payload.get("memory_id"),
+            query=payload.get("query"),
+            confirm=bool(payload.get("confirm", False)),
+        )
     await METRICS.inc("requests_forget_total")
     await METRICS.observe_ms("latency_forget", (time.perf_counter() - t0) * 1000.0)
     return {"success": True, "data": res}
 
 @app.get("/tools/memory_health")
-async def memory_health_ep():
-    assert _db is not None
-    res = await memory_health_tool(db=_db, cache=_cache, db_path=settings.db_path)
+async def memory_health_ep(user_id: str | None = None, exact: bool = False):
+    assert _router is not None
+    uid = _user_id(user_id)
+    err = _invalid_user(uid)
+    if err:
+        return err
+    async with AsyncExitStack() as held:
+        if exact:  # a recount scans every table: admitted like the other admin jobs
+            await held.enter_async_context(_gates["admin"].slot())
+        t = await held.enter_async_context(_router.tenant(uid))
+        res = await memory_health_tool(db=t.db, cache=t.cache, db_path=t.db.db_path, exact=exact)
+    res["tenants"] = _router.stats()
     await METRICS.inc("requests_health_total")
     return {"success": True, "data": res}
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import Iterable, Optional
+
+import numpy as np
+
+try:  # one saver per file; without fcntl every process saves
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None  # type: ignore[assignment]
+
+# On-disk format revision; bump when the .npz layout changes.
+IVF_FORMAT = 1
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    n = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(n, 1e-12)
+
+
+def _kmeans(x: np.ndarray, nlist: int, *, iters: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit vectors. Empty lists are re-seeded from random points."""
+    rng = np.random.default_rng(seed)
+    c = x[rng.choice(len(x), size=nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = _assign(x, c)
+        sums = np.zeros_like(c)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = x[rng.choice(len(x), size=int(empty.sum()), replace=False)]
+        c = _normalize(sums)
+    return c
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, *, chunk: int = 65536) -> np.ndarray:
+    out = np.empty(len(x), dtype=np.int32)
+    for i in range(0, len(x), chunk):
+        out[i : i + chunk] = np.argmax(x[i : i + chunk] @ centroids.T, axis=1)
+    return out
+
+
+class IVFIndex:
+    """
+    In-process IVF-Flat index over the active embedding space, persisted next to the DB file.
+
+    Vectors are bucketed by their nearest k-means centroid and stored contiguously per list;
+    a query scores the centroids, then does an exact dot product over the `nprobe` closest
+    lists. Inserts after the build go to a per-list delta; deletes flip a tombstone bit.
+    Both are folded back in by `build` (the background compaction).
+
+    Every process sharing the DB keeps its own copy in memory and catches it up with the rows
+    the others write (`covered` is the rowid through which the DB's vectors are in it). Only
+    the process holding `<path>.lock` builds and saves the file; the others (`readonly`)
+    reload it when it changes.
+    """
+
+    def __init__(self, path: str, *, version: int, dim: int) -> None:
+        self.path = path
+        self.version = int(version)
+        self.dim = int(dim)
+        self.centroids: Optional[np.ndarray] = None       # (nlist, dim)
+        self.vecs = np.empty((0, self.dim), dtype=np.float32)  # (n, dim), grouped by list
+        self.rowids = np.empty(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)         # list i is vecs[offsets[i]:offsets[i+1]]
+        self.live = np.empty(0, dtype=bool)                # False = tombstoned
+        self._order = np.empty(0, dtype=np.int64)          # argsort(rowids), for rowid -> position
+        self.delta: dict[int, tuple[int, np.ndarray]] = {}  # rowid -> (list, vec)
+        self._delta_cache: Optional[tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._journal: Optional[list[tuple]] = None
+        self._lock = threading.RLock()
+        self._lock_fd: Optional[int] = None
+        self.readonly = False
+        self.covered = 0       # every live vector with rowid <= this is in the index
+        self.loaded_mtime = 0  # st_mtime_ns of the file this was loaded from
+        self.dirty = False
+
+    @classmethod
+    def open(cls, path: str, *, version: int, dim: int) -> "IVFIndex":
+        """The saved index (or an unbuilt one), as the file's saver if the lock is free."""
+        idx = cls.load(path, version=version, dim=dim) or cls(path, version=version, dim=dim)
+        idx.readonly = not idx.claim()
+        return idx
+
+    def claim(self) -> bool:
+        """Try to become the one process that saves the file (again, once its saver exits)."""
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+        self._lock_fd = fd
+        self.readonly = False
+        return True
+
+    def file_changed(self) -> bool:
+        """Whether the saver wrote the file since this copy was loaded."""
+        try:
+            return os.stat(self.path).st_mtime_ns != self.loaded_mtime
+        except OSError:
+            return False
+
+    # ---------------- State ----------------
+
+    @property
+    def ready(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def nlist(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def stats(self) -> dict:
+        dead = int(len(self.live) - int(self.live.sum()))
+        return {
+            "ready": self.ready,
+            "engine": "ivf",
+            "nlist": self.nlist,
+            "vectors": int(len(self.rowids)) - dead + len(self.delta),
+            "delta": len(self.delta),
+            "tombstones": dead,
+        }
+
+    def churn(self) -> float:
+        """Share of the index that is delta or tombstones; compaction is due when this grows."""
+        n = max(1, len(self.rowids))
+        return (len(self.delta) + int(len(self.live) - int(self.live.sum()))) / n
+
+    def __contains__(self, rowid: int) -> bool:
+        if rowid in self.delta:
+            return True
+        i = self._position(rowid)
+        return i is not None and bool(self.live[i])
+
+    def _position(self, rowid: int) -> Optional[int]:
+        if not len(self._order):
+            return None
+        i = int(np.searchsorted(self.rowids, rowid, sorter=self._order))
+        if i < len(self._order) and self.rowids[self._order[i]] == rowid:
+            return int(self._order[i])
+        return None
+
+    # ---------------- Incremental updates ----------------
+
+    def add(self, rowid: int, vec: bytes | Iterable[float] | np.ndarray, **_: object) -> None:
+        raw = np.frombuffer(vec, dtype=np.float32) if isinstance(vec, (bytes, bytearray)) else vec
+        v = _normalize(np.asarray(raw, dtype=np.float32).reshape(-1))
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("add", int(rowid), v, None, None))
+            if not self.ready:
+                return
+            self._tombstone(int(rowid))
+            self.delta[int(rowid)] = (int(np.argmax(self.centroids @ v)), v)
+            self._delta_cache = None
+            self.dirty = True
+
+    def remove(self, rowids: Iterable[int]) -> None:
+        with self._lock:
+            for rowid in rowids:
+                if self._journal is not None:
+                    self._journal.append(("remove", int(rowid), None, None, None))
+                if self.ready:
+                    self._tombstone(int(rowid))
+            self.dirty = True
+
+    def _tombstone(self, rowid: int) -> None:
+        if self.delta.pop(rowid, None) is not None:
+            self._delta_cache = None
+        i = self._position(rowid)
+        if i is not None:
+            self.live[i] = False
+
+    def begin_journal(self) -> None:
+        """Record adds/removes from here on, so a rebuild can replay what it did not see."""
+        with self._lock:
+            self._journal = []
+
+    def end_journal(self) -> list[tuple]:
+        with self._lock:
+            ops, self._journal = self._journal or [], None
+            return ops
+
+    def replay(self, ops: list[tuple]) -> None:
+        for op, rowid, v, _, _ in ops:
+            if op == "add":
+                self.add(rowid, v)
+            else:
+                self.remove([rowid])
+
+    # ---------------- Build / search ----------------
+
+    @classmethod
+    def build(
+        cls, path: str, *, version: int, dim: int, rowids: np.ndarray, vecs: np.ndarray,
+        nlist: int = 0, train_size: int = 64,
+    ) -> "IVFIndex":
+        """Train centroids on a sample, then bucket every vector. CPU-bound: run off the loop."""
+        idx = cls(path, version=version, dim=dim)
+        if len(rowids) == 0:
+            return idx
+        vecs = _normalize(np.ascontiguousarray(vecs, dtype=np.float32))
+        nlist = int(nlist) or max(1, int(np.sqrt(len(vecs))))
+        nlist = min(nlist, len(vecs))
+        rng = np.random.default_rng(0)
+        sample = vecs if len(vecs) <= nlist * train_size else vecs[
+            rng.choice(len(vecs), size=nlist * train_size, replace=False)
+        ]
+        centroids = _kmeans(sample, nlist)
+        assign = _assign(vecs, centroids)
+        order = np.argsort(assign, kind="stable")
+        idx.centroids = centroids
+        idx.vecs = vecs[order]
+        idx.rowids = np.asarray(rowids, dtype=np.int64)[order]
+        sizes = np.bincount(assign, minlength=nlist)
+        idx.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        idx.live = np.ones(len(order), dtype=bool)
+        idx._order = np.argsort(idx.rowids, kind="stable")
+        idx.dirty = True
+        return idx
+
+    def rebuilt(
+        self, *, rowids: np.ndarray, vecs: np.ndarray, nlist: int = 0, **_: object
+    ) -> "IVFIndex":
+        """The next build; it takes over this copy's save lock."""
+        nxt = IVFIndex.build(
+            self.path, version=self.version, dim=self.dim, rowids=rowids, vecs=vecs, nlist=nlist
+        )
+        nxt._lock_fd, nxt.readonly = self._lock_fd, self.readonly
+        return nxt
+
+    def close(self) -> None:
+        if self.dirty:
+            self.save()
+        self.discard()
+
+    def discard(self) -> None:
+        """Let go of the save lock without saving (the rows this copy holds are gone)."""
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def search(
+        self, q: Iterable[float], k: int, *, nprobe: int = 16, **_: object
+    ) -> list[tuple[int, float]]:
+        """
+        [(rowid, cosine)] best first, from the `nprobe` lists closest to q. Users are filtered
+        by the caller.
+        """
+        if not self.ready or k <= 0:
+            return []
+        qv = _normalize(np.asarray(q, dtype=np.float32).reshape(-1))
+        cs = self.centroids @ qv
+        nprobe = min(max(1, int(nprobe)), len(cs))
+        probe = np.argpartition(-cs, nprobe - 1)[:nprobe]
+
+        ids_parts, score_parts = [], []
+        for li in probe:
+            a, b = self.offsets[li], self.offsets[li + 1]
+            if a == b:
+                continue
+            s = self.vecs[a:b] @ qv
+            m = self.live[a:b]
+            ids_parts.append(self.rowids[a:b][m])
+            score_parts.append(s[m])
+        if self.delta:
+            d_ids, d_lists, d_vecs = self._delta_arrays()
+            sel = np.isin(d_lists, probe)
+            if sel.any():
+                ids_parts.append(d_ids[sel])
+                score_parts.append(d_vecs[sel] @ qv)
+        if not ids_parts:
+            return []
+        ids = np.concatenate(ids_parts)
+        scores = np.concatenate(score_parts)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def _delta_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._delta_cache is None:
+            with self._lock:
+                items = list(self.delta.items())
+            ids = np.fromiter((r for r, _ in items), dtype=np.int64, count=len(items))
+            lists = np.fromiter((li for _, (li, _) in items), dtype=np.int32, count=len(items))
+            vecs = (np.stack([v for _, (_, v) in items]) if items
+                    else np.empty((0, self.dim), np.float32))
+            self._delta_cache = (ids, lists, vecs)
+        return self._delta_cache
+
+    # ---------------- Persistence ----------------
+
+    def save(self) -> None:
+        """
+        Write atomically (tmp + rename) so a crash never leaves a torn index behind. Only the
+        lock holder writes; other processes' copies stay in memory.
+        """
+        if not self.ready or self.readonly:
+            return
+        with self._lock:
+            d_ids, d_lists, d_vecs = self._delta_arrays() if self.delta else (
+                np.empty(0, np.int64), np.empty(0, np.int32), np.empty((0, self.dim), np.float32)
+            )
+            arrays = dict(
+                meta=np.array([IVF_FORMAT, self.version, self.dim], dtype=np.int64),
+                centroids=self.centroids, vecs=self.vecs, rowids=self.rowids,
+                offsets=self.offsets, live=self.live,
+                delta_ids=d_ids, delta_lists=d_lists, delta_vecs=d_vecs,
+                covered=np.array([self.covered], dtype=np.int64),
+            )
+            self.dirty = False
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp, self.path)
+        self.loaded_mtime = os.stat(self.path).st_mtime_ns
+
+    @classmethod
+    def load(cls, path: str, *, version: int, dim: int) -> Optional["IVFIndex"]:
+        """The saved index, or None if missing, unreadable or built for another space."""
+        try:
+            with np.load(path) as z:
+                fmt, v, d = (int(x) for x in z["meta"])
+                if (fmt, v, d) != (IVF_FORMAT, int(version), int(dim)):
+                    return None
+                idx = cls(path, version=version, dim=dim)
+                idx.centroids = z["centroids"]
+                idx.vecs = z["vecs"]
+                idx.rowids = z["rowids"]
+                idx.offsets = z["offsets"]
+                idx.live = z["live"]
+                for r, li, vec in zip(z["delta_ids"], z["delta_lists"], z["delta_vecs"]):
+                    idx.delta[int(r)] = (int(li), vec)
+                idx.covered = int(z["covered"][0])
+            idx.loaded_mtime = os.stat(path).st_mtime_ns
+        except (OSError, KeyError, ValueError):
+            return None
+        idx._order = np.argsort(idx.rowids, kind="stable")
+        return idx
+
@@ -0,0 +1,374 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import Iterable, Optional, Sequence
+
+import numpy as np
+
+try:  # single-writer lock; without fcntl every process assumes it is the writer
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None  # type: ignore[assignment]
+
+MMAP_MAGIC = 0x4D4D5645  # "MMVE"
+MMAP_FORMAT = 1
+# Header slots (int64): magic, format, space version, dim, generation, count, capacity, and the
+# rowid through which the DB's vectors are in the matrix.
+_H_MAGIC, _H_FORMAT, _H_VERSION, _H_DIM, _H_GEN, _H_COUNT, _H_CAP, _H_COVERED = range(8)
+_HEADER_LEN = 8
+
+META_DTYPE = np.dtype([("rowid", "<i8"), ("user", "<u8"), ("cat", "<u8"), ("live", "u1")])
+
+
+def key_hash(value: Optional[str]) -> int:
+    """Stable 64-bit tag for user_id / category, so filters are integer compares."""
+    if value is None:
+        return 0
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class MmapVectorStore:
+    """
+    Exact KNN over a memory-mapped float32 matrix, for stores small enough to scan per query.
+
+    Layout next to the DB file (`base` = `<db>.vecs`):
+      <base>.hdr         int64 header: space version, dim, generation, count, capacity
+      <base>.<gen>.f32   capacity x dim float32 rows
+      <base>.<gen>.meta  capacity records: rowid, user hash, category hash, live flag
+
+    The matrix is an append log: a write appends a row and publishes the new count in the
+    header; an update appends and clears `live` on the old slot; a delete clears `live`.
+    Compaction writes the live rows to a new generation and flips the header to it.
+    One process holds the writer lock; others map the same files read-only (zero copy) and
+    follow the header, remapping when the generation or capacity changes. Followers cannot
+    append: the writer adds the rows they store when it catches up from the DB, and publishes
+    how far it got (`covered`); recall scores the rows above that from sqlite-vec. A follower
+    takes the lock over when the writer exits.
+    """
+
+    def __init__(self, base: str, *, version: int, dim: int, readonly: bool = False) -> None:
+        self.base = base
+        self.version = int(version)
+        self.dim = int(dim)
+        self.readonly = readonly
+        self.gen = 0
+        self.count = 0
+        self._hdr: Optional[np.memmap] = None
+        self._mat: Optional[np.memmap] = None
+        self._meta: Optional[np.memmap] = None
+        self._slots: dict[int, int] = {}   # writer only: rowid -> newest slot
+        self._dead = 0
+        self._covered = 0
+        self._published = False
+        self._prev_gen: Optional[int] = None
+        self._lock_fd: Optional[int] = None
+        self._journal: Optional[list[tuple]] = None
+        self._lock = threading.RLock()
+        self.dirty = False
+
+    # ---------------- Opening ----------------
+
+    @property
+    def header_path(self) -> str:
+        return f"{self.base}.hdr"
+
+    def _paths(self, gen: int) -> tuple[str, str]:
+        return f"{self.base}.{gen}.f32", f"{self.base}.{gen}.meta"
+
+    @classmethod
+    def open(cls, base: str, *, version: int, dim: int) -> "MmapVectorStore":
+        """Writer if the lock is free, else a read-only follower."""
+        store = cls(base, version=version, dim=dim)
+        if not store.claim():
+            store.readonly = True
+            store._refresh()
+        return store
+
+    def claim(self) -> bool:
+        """
+        Take the writer lock (at open, or as a follower once the writer is gone). A writer
+        whose files are missing or from another space comes back not ready; the caller fills it.
+        """
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(self.header_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+        with self._lock:
+            self._lock_fd = fd
+            self.readonly = False
+            if os.fstat(fd).st_size < _HEADER_LEN * 8:
+                os.ftruncate(fd, _HEADER_LEN * 8)
+            self._hdr = np.memmap(self.header_path, dtype="<i8", mode="r+", shape=(_HEADER_LEN,))
+            self._mat = self._meta = None
+            self.count = 0
+            h = self._hdr
+            if (int(h[_H_MAGIC]), int(h[_H_FORMAT]), int(h[_H_VERSION]), int(h[_H_DIM])) == (
+                MMAP_MAGIC, MMAP_FORMAT, self.version, self.dim
+            ):
+                self._map(int(h[_H_GEN]), int(h[_H_CAP]), writable=True)
+                self.count = min(int(h[_H_COUNT]), int(h[_H_CAP]))
+                self._covered = int(h[_H_COVERED])
+                self._published = True
+                self._index_slots()
+        return True
+
+    def _map(self, gen: int, capacity: int, *, writable: bool) -> None:
+        mat_path, meta_path = self._paths(gen)
+        mode = "r+" if writable else "r"
+        self._mat = np.memmap(mat_path, dtype=np.float32, mode=mode, shape=(capacity, self.dim))
+        self._meta = np.memmap(meta_path, dtype=META_DTYPE, mode=mode, shape=(capacity,))
+        self.gen = gen
+
+    def _index_slots(self) -> None:
+        assert self._meta is not None
+        meta = self._meta[: self.count]
+        live = np.flatnonzero(meta["live"])
+        self._slots = dict(zip(meta["rowid"][live].tolist(), live.tolist()))
+        self._dead = self.count - len(live)
+
+    def _refresh(self) -> None:
+        """Follower: pick up the writer's latest generation, capacity and count."""
+        if self._hdr is None:
+            p = self.header_path
+            if not os.path.exists(p) or os.path.getsize(p) < _HEADER_LEN * 8:
+                return
+            self._hdr = np.memmap(self.header_path, dtype="<i8", mode="r", shape=(_HEADER_LEN,))
+        h = self._hdr
+        if (int(h[_H_MAGIC]), int(h[_H_FORMAT]), int(h[_H_VERSION]), int(h[_H_DIM])) != (
+            MMAP_MAGIC, MMAP_FORMAT, self.version, self.dim
+        ):
+            self._mat = self._meta = None
+            return
+        gen, cap = int(h[_H_GEN]), int(h[_H_CAP])
+        if self._mat is None or gen != self.gen or cap != len(self._mat):
+            try:
+                self._map(gen, cap, writable=False)
+            except (OSError, ValueError):  # writer is mid-swap; keep the old mapping
+                pass
+        if self._mat is not None:
+            self.count = min(int(h[_H_COUNT]), len(self._mat))
+
+    # ---------------- State ----------------
+
+    @property
+    def ready(self) -> bool:
+        if self.readonly:
+            self._refresh()
+            return self._mat is not None
+        return self._mat is not None and self._published
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "engine": "mmap",
+            "role": "reader" if self.readonly else "writer",
+            "generation": self.gen,
+            "vectors": self.count - self._dead,
+            "tombstones": self._dead,
+            "capacity": 0 if self._mat is None else len(self._mat),
+        }
+
+    def churn(self) -> float:
+        return self._dead / max(1, self.count)
+
+    @property
+    def covered(self) -> int:
+        """Rowid through which the DB's vectors are in the matrix; followers read the writer's."""
+        if self.readonly:
+            self._refresh()
+            return int(self._hdr[_H_COVERED]) if self._mat is not None else 0
+        return self._covered
+
+    @covered.setter
+    def covered(self, rowid: int) -> None:
+        self._covered = int(rowid)
+        if self._published and not self.readonly:
+            self._hdr[_H_COVERED] = self._covered  # after the rows it covers are counted
+
+    def __contains__(self, rowid: int) -> bool:
+        return rowid in self._slots
+
+    # ---------------- Writes (writer only) ----------------
+
+    def add(
+        self, rowid: int, vec: bytes | Iterable[float] | np.ndarray, *,
+        user_id: Optional[str] = None, category: Optional[str] = None,
+    ) -> None:
+        if self.readonly:
+            return
+        raw = np.frombuffer(vec, dtype=np.float32) if isinstance(vec, (bytes, bytearray)) else vec
+        v = np.asarray(raw, dtype=np.float32).reshape(-1)
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(("add", int(rowid), v, user_id, category))
+            if self._mat is None:
+                return
+            self._tombstone(int(rowid))
+            if self.count == len(self._mat):
+                self._grow(max(1024, 2 * len(self._mat)))
+            slot = self.count
+            self._mat[slot] = v
+            self._meta[slot] = (int(rowid), key_hash(user_id), key_hash(category), 1)
+            self._slots[int(rowid)] = slot
+            self.count += 1
+            if self._published:
+                self._hdr[_H_COUNT] = self.count  # publish after the row is in place
+            self.dirty = True
+
+    def remove(self, rowids: Iterable[int]) -> None:
+        if self.readonly:
+            return
+        with self._lock:
+            for rowid in rowids:
+                if self._journal is not None:
+                    self._journal.append(("remove", int(rowid), None, None, None))
+                self._tombstone(int(rowid))
+            self.dirty = True
+
+    def _tombstone(self, rowid: int) -> None:
+        slot = self._slots.pop(rowid, None)
+        if slot is not None and self._meta is not None:
+            self._meta["live"][slot] = 0
+            self._dead += 1
+
+    def _grow(self, capacity: int) -> None:
+        """Extend both files in place and remap; followers remap when they see the new capacity."""
+        assert self._mat is not None and self._meta is not None
+        self._mat.flush()
+        self._meta.flush()
+        mat_path, meta_path = self._paths(self.gen)
+        os.truncate(mat_path, capacity * self.dim * 4)
+        os.truncate(meta_path, capacity * META_DTYPE.itemsize)
+        self._map(self.gen, capacity, writable=True)
+        if self._published:
+            self._hdr[_H_CAP] = capacity
+
+    def begin_journal(self) -> None:
+        with self._lock:
+            self._journal = []
+
+    def end_journal(self) -> list[tuple]:
+        with self._lock:
+            ops, self._journal = self._journal or [], None
+            return ops
+
+    def replay(self, ops: list[tuple]) -> None:
+        for op, rowid, v, user_id, category in ops:
+            if op == "add":
+                self.add(rowid, v, user_id=user_id, category=category)
+            else:
+                self.remove([rowid])
+
+    # ---------------- Build / compaction ----------------
+
+    def rebuilt(
+        self, *, rowids: np.ndarray, vecs: np.ndarray,
+        users: Sequence[Optional[str]], cats: Sequence[Optional[str]], **_: object,
+    ) -> "MmapVectorStore":
+        """
+        Write the given rows as the next generation and return its (unpublished) writer.
+        `save` on the result flips the header to it and removes the old generation's files.
+        """
+        assert not self.readonly and self._lock_fd is not None
+        nxt = MmapVectorStore(self.base, version=self.version, dim=self.dim)
+        nxt._lock_fd, nxt._hdr = self._lock_fd, self._hdr
+        n = len(rowids)
+        capacity = max(1024, int(n * 1.25))
+        gen = self.gen + 1
+        for path in self._paths(gen):
+            if os.path.exists(path):
+                os.remove(path)
+        mat_path, meta_path = self._paths(gen)
+        with open(mat_path, "wb") as fh:
+            fh.truncate(capacity * self.dim * 4)
+        with open(meta_path, "wb") as fh:
+            fh.truncate(capacity * META_DTYPE.itemsize)
+        nxt._map(gen, capacity, writable=True)
+        if n:
+            nxt._mat[:n] = vecs
+            nxt._meta["rowid"][:n] = rowids
+            nxt._meta["user"][:n] = [key_hash(u) for u in users]
+            nxt._meta["cat"][:n] = [key_hash(c) for c in cats]
+            nxt._meta["live"][:n] = 1
+        nxt.count = n
+        nxt._slots = dict(zip(np.asarray(rowids).tolist(), range(n)))
+        nxt._prev_gen = self.gen if self._published else None
+        nxt.dirty = True
+        return nxt
+
+    def save(self) -> None:
+        """Flush rows, then publish. A rebuilt generation's first save switches readers to it."""
+        if self.readonly or self._mat is None or self._hdr is None:
+            return
+        with self._lock:
+            self._mat.flush()
+            self._meta.flush()
+            h = self._hdr
+            if not self._published:
+                h[_H_COUNT] = 0  # followers clamp to the new mapping until count lands
+                h[_H_MAGIC], h[_H_FORMAT], h[_H_VERSION], h[_H_DIM] = (
+                    MMAP_MAGIC, MMAP_FORMAT, self.version, self.dim
+                )
+                h[_H_CAP] = len(self._mat)
+                h[_H_GEN] = self.gen
+                self._published = True
+            h[_H_COUNT] = self.count
+            h[_H_COVERED] = self._covered
+            h.flush()
+            self.dirty = False
+        prev = self._prev_gen
+        if prev is not None and prev != self.gen:
+            # Followers still mapping it keep their pages; the name just goes away.
+            for path in self._paths(prev):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._prev_gen = None
+
+    def close(self) -> None:
+        self.save()
+        self.discard()
+
+    def discard(self) -> None:
+        """Let go of the writer lock without publishing (the rows this copy holds are gone)."""
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    # ---------------- Search ----------------
+
+    def search(
+        self, q: Iterable[float], k: int, *,
+        user_id: Optional[str] = None, category: Optional[str] = None, **_: object,
+    ) -> list[tuple[int, float]]:
+        """[(rowid, cosine)] best first: one matrix-vector product, then argpartition."""
+        if k <= 0 or not self.ready:
+            return []
+        n = self.count
+        if n == 0:
+            return []
+        qv = np.asarray(q, dtype=np.float32).reshape(-1)
+        scores = self._mat[:n] @ qv
+        meta = self._meta[:n]
+        mask = meta["live"] == 1
+        if user_id is not None:
+            mask &= meta["user"] == np.uint64(key_hash(user_id))
+        if category is not None:
+            mask &= meta["cat"] == np.uint64(key_hash(category))
+        cand = np.flatnonzero(mask)
+        if len(cand) == 0:
+            return []
+        s = scores[cand]
+        if len(s) > k:
+            top = np.argpartition(-s, k - 1)[:k]
+        else:
+            top = np.arange(len(s))
+        top = top[np.argsort(-s[top])]
+        rowids = meta["rowid"]
+        return [(int(rowids[cand[i]]), float(s[i])) for i in top]
@@ -1,48 +1,178 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import json
 import time
-from typing import List, Optional, Sequence
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple
 
 from redis.asyncio import Redis, from_url
+from structlog import get_logger
 
+from ..config import settings
 from ..intelligence.utils import normalize_text
+from ..obs.metrics import METRICS
+from ..obs.tracing import traced
+
+log = get_logger()
+
+
+@dataclass
+class _Link:
+    """One connection pool and its circuit breaker, shared by a cache and its per-user views."""
+    client: Optional[Redis] = None
+    failures: int = 0          # consecutive errors
+    open: bool = False         # breaker open: calls skip Redis until a probe succeeds
+    missed_writes: bool = False  # a last-write bump was lost; cached rankings may be stale
+    probe: Optional[asyncio.Task] = None
+    lookups: Counter = field(default_factory=Counter)  # (kind, hit) -> count, since start
+
+
+_FAILED = object()
 
 
 class RedisCache:
     """
     Async Redis cache for embeddings and query results.
     Safe to disable by setting URL to 'disabled'.
+
+    Every command is bounded by `redis_timeout_ms` and a failure reads as a miss, so the cache
+    never adds errors or more than that latency to a request. After `redis_breaker_failures`
+    consecutive errors the breaker opens: commands are skipped outright while a background
+    task pings every `redis_breaker_cooldown_sec` and closes it once Redis answers again.
+    A Redis that is down at startup starts with the breaker open.
     """
 
     def __init__(self, redis_url: str, *, user_id: str = "default") -> None:
         self.redis_url = redis_url
         self.user_id = user_id
-        self.client: Optional[Redis] = None
-        self.enabled: bool = False
+        self._link = _Link()
+        self._view = False  # shares another instance's link (see for_user)
+        self._timeout = float(settings.redis_timeout_ms) / 1000.0
+
+    @property
+    def client(self) -> Optional[Redis]:
+        return self._link.client
+
+    @property
+    def enabled(self) -> bool:
+        return self._link.client is not None and not self._link.open
 
     # ---------- lifecycle ----------
 
     async def initialize(self) -> None:
         if self.redis_url.lower() == "disabled":
-            self.enabled = False
             return
-        self.client = from_url(self.redis_url, encoding="utf-8", decode_responses=True)
-        try:
-            pong = await self.client.ping()
-            self.enabled = bool(pong)
-        except Exception:
-            self.enabled = False
-            self.client = None
+        self._link.client = from_url(
+            self.redis_url,
+            encoding="utf-8",
+            decode_responses=True,
+            max_connections=int(settings.redis_max_connections),
+            socket_timeout=self._timeout,
+            socket_connect_timeout=self._timeout,
+            health_check_interval=30,
+        )
+        if await self._call(lambda c: c.ping()) is None:
+            await self._trip()
+
+    def for_user(self, user_id: str) -> RedisCache:
+        """This cache for another user: own query-cache and last-write keys, same connection."""
+        if user_id == self.user_id:
+            return self
+        view = RedisCache(self.redis_url, user_id=user_id)
+        view._link, view._view = self._link, True
+        return view
 
     async def close(self) -> None:
-        if self.client:
+        if self._view:
+            self._link = _Link()
+            return
+        link = self._link
+        if link.probe:
+            link.probe.cancel()
             try:
-                await self.client.aclose()
+                await link.probe
+            except asyncio.CancelledError:
+                pass
+            link.probe = None
+        if link.client:
+            try:
+                await link.client.aclose()
             finally:
-                self.client = None
-        self.enabled = False
+                link.client = None
+
+    def stats(self) -> dict:
+        link = self._link
+        if link.client is None:
+            return {"state": "disabled"}
+        ratios = {}
+        for kind in ("embedding", "query"):
+            hits, misses = link.lookups[(kind, True)], link.lookups[(kind, False)]
+            ratios[kind] = round(hits / (hits + misses), 4) if hits + misses else None
+        return {"state": "open" if link.open else "closed", "consecutive_failures": link.failures,
+                "hit_ratio": ratios}
+
+    def _lookup(self, kind: str, value: Any) -> Any:
+        """Count a get as a hit or miss (skipped and failed calls are misses) and pass it on."""
+        self._link.lookups[(kind, value is not None)] += 1
+        return value
+
+    # ---------- guarded calls ----------
+
+    async def _call(self, op: Callable[[Redis], Awaitable[Any]], default: Any = None) -> Any:
+        """Run one command; `default` when skipped (disabled, breaker open) or failed."""
+        link = self._link
+        if link.client is None:
+            return default
+        if link.open:
+            await METRICS.inc("cache_short_circuits_total")
+            return default
+        try:
+            async with asyncio.timeout(self._timeout):
+                out = await op(link.client)
+        except Exception as e:
+            link.failures += 1
+            await METRICS.inc("cache_errors_total")
+            if link.failures >= int(settings.redis_breaker_failures):
+                await self._trip(e)
+            return default
+        link.failures = 0
+        return out
+
+    async def _trip(self, error: Optional[BaseException] = None) -> None:
+        link = self._link
+        if link.open:
+            return
+        link.open = True
+        await METRICS.inc("cache_breaker_opened_total")
+        log.warning("redis_breaker_open", url=self.redis_url, failures=link.failures,
+                    error=repr(error) if error else None)
+        link.probe = asyncio.get_running_loop().create_task(self._probe(link), name="redis_probe")
+
+    async def _probe(self, link: _Link) -> None:
+        """Ping until Redis answers, then close the breaker (the pool reconnects on its own)."""
+        while link.client is not None:
+            await asyncio.sleep(float(settings.redis_breaker_cooldown_sec))
+            try:
+                async with asyncio.timeout(max(self._timeout, 1.0)):
+                    await link.client.ping()
+                if link.missed_writes:
+                    async with asyncio.timeout(30):
+                        await self._invalidate_all(link.client)
+            except Exception:
+                continue
+            link.failures, link.open, link.probe, link.missed_writes = 0, False, None, False
+            log.info("redis_breaker_closed", url=self.redis_url)
+            return
+
+    @staticmethod
+    async def _invalidate_all(client: Redis) -> None:
+        """Bump every user's last-write stamp: writes made during the outage never did."""
+        now = str(int(time.time()))
+        async for key in client.scan_iter(match="u:*:lw", count=500):
+            await client.set(key, now)
 
     # ---------- keys ----------
 
@@ -62,32 +192,35 @@ class RedisCache:
         lw = "0"
         return f"u:{self.user_id}:q:v{schema_v}:{self._sha256(query)}:{search_type}:{lw}"
 
-    async def _query_key_with_lw(self, query: str, search_type: str, schema_v: int) -> str:
-        lw = await self.last_write_ts()
-        return f"u:{self.user_id}:q:v{schema_v}:{self._sha256(query)}:{search_type}:{lw}"
+    async def _query_key_with_lw(
+        self, query: str, search_type: str, schema_v: int
+    ) -> Optional[str]:
+        """None when the last-write stamp can't be read: a key without it could serve stale hits."""
+        lw = await self._call(lambda c: c.get(self._lw_key()), _FAILED)
+        if lw is _FAILED:
+            return None
+        return f"u:{self.user_id}:q:v{schema_v}:{self._sha256(query)}:{search_type}:{lw or '0'}"
 
     # ---------- embedding cache ----------
 
+    @traced("cache.get_embedding")
     async def get_embedding(self, text: str) -> Optional[List[float]]:
-        if not (self.enabled and self.client):
-            return None
-        v = await self.client.get(self._embed_key(text))
+        v = self._lookup("embedding", await self._call(lambda c: c.get(self._embed_key(text))))
         return json.loads(v) if v else None
 
+    @traced("cache.set_embedding")
     async def set_embedding(self, text: str, vec: Sequence[float], ttl: int = 86400) -> None:
-        if not (self.enabled and self.client):
-            return
-        await self.client.setex(self._embed_key(text), ttl, json.dumps(list(vec)))
+        await self._call(lambda c: c.setex(self._embed_key(text), ttl, json.dumps(list(vec))))
 
     # ---------- query result cache ----------
 
+    @traced("cache.get_query_ids")
     async def get_query_ids(self, query: str, search_type: str, schema_v: int = 1) -> Optional[List[str]]:
-        if not (self.enabled and self.client):
-            return None
         k = await self._query_key_with_lw(query, search_type, schema_v)
-        v = await self.client.get(k)
+        v = self._lookup("query", await self._call(lambda c: c.get(k)) if k else None)
         return json.loads(v) if v else None
 
+    @traced("cache.set_query_ids")
     async def set_query_ids(
         self,
         query: str,
@@ -96,21 +229,40 @@ class RedisCache:
         ttl: int = 3600,
         schema_v: int = 1,
     ) -> None:
-        if not (self.enabled and self.client):
-            return
         k = await self._query_key_with_lw(query, search_type, schema_v)
-        await self.client.setex(k, ttl, json.dumps(list(ids)))
+        if k:
+            await self._call(lambda c: c.setex(k, ttl, json.dumps(list(ids))))
+
+    @traced("cache.get_query_ranking")
+    async def get_query_ranking(
+        self, query: str, search_type: str
+    ) -> Optional[List[Tuple[str, float]]]:
+        """Ranked [(id, score)]; the list recall pages through."""
+        k = await self._query_key_with_lw(query, search_type, 2)
+        v = self._lookup("query", await self._call(lambda c: c.get(k)) if k else None)
+        return [(mid, float(score)) for mid, score in json.loads(v)] if v else None
+
+    @traced("cache.set_query_ranking")
+    async def set_query_ranking(
+        self, query: str, search_type: str, ranked: Sequence[Tuple[str, float]], ttl: int = 3600
+    ) -> None:
+        k = await self._query_key_with_lw(query, search_type, 2)
+        if k:
+            payload = json.dumps([[mid, round(score, 6)] for mid, score in ranked])
+            await self._call(lambda c: c.setex(k, ttl, payload))
 
     # ---------- invalidation ----------
 
+    @traced("cache.touch_last_write")
     async def touch_last_write(self) -> None:
-        if not (self.enabled and self.client):
-            return
         now = int(time.time())
-        await self.client.set(self._lw_key(), str(now))
+        ok = await self._call(lambda c: c.set(self._lw_key(), str(now)))
+        if ok is None and self.client is not None:
+            self._link.missed_writes = True
 
+    @traced("cache.last_write_ts")
     async def last_write_ts(self) -> str:
-        if not (self.enabled and self.client):
+        if not self.enabled:
             return "0"
-        v = await self.client.get(self._lw_key())
+        v = await self._call(lambda c: c.get(self._lw_key()))
         return v or "0"
@@ -1,13 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import glob
+import json
 import os
 import pathlib
+import re
+import sqlite3
+import time
+import uuid
 from array import array
-from typing import Iterable, Optional, Sequence
+from collections import Counter
+from typing import Any, Iterable, Iterator, Optional, Sequence
 
 import aiosqlite
+import numpy as np
 import sqlite_vec  # pip install sqlite-vec
 
+from ..config import settings
+from .ann_index import IVFIndex
+from .mmap_store import MmapVectorStore
+from ..obs.sql_profile import SQL_PROFILER
+from ..obs.tracing import span
+
 PRAGMAS: list[str] = [
     "PRAGMA journal_mode=WAL;",
     "PRAGMA synchronous=NORMAL;",
@@ -36,50 +52,399 @@ CREATE TABLE IF NOT EXISTS memories (
 );
 
 -- vec0: embedding stored as float32 BLOB. Rowid matches memories.rowid.
+-- This is embedding space v1; later spaces get their own memory_embeddings_v<N> table.
 CREATE VIRTUAL TABLE IF NOT EXISTS memory_embeddings USING vec0(
   embedding FLOAT[384]
 );
 
--- FTS5 external content; rowid is memories.rowid.
-CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
-  content, keywords, category, content='memories', content_rowid='rowid'
+-- One row per embedding space (model + dimension + vec table). Exactly one is 'active'
+-- and serves recall; a 'building' space is being filled by the re-embedding job.
+CREATE TABLE IF NOT EXISTS embedding_spaces (
+  version INTEGER PRIMARY KEY,
+  model TEXT NOT NULL,
+  dim INTEGER NOT NULL,
+  vec_table TEXT NOT NULL,
+  state TEXT NOT NULL DEFAULT 'building',
+  cursor_rowid INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  activated_at TIMESTAMP NULL
+);
+
+-- Online rebuild of memories_fts with new tokenizer/prefix options (at most one row).
+CREATE TABLE IF NOT EXISTS fts_build (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  tokenize TEXT NOT NULL,
+  prefix TEXT NOT NULL,
+  cursor_rowid INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Rows stored without a vector yet (async ingest); drained in batches by the ingest embedder.
+CREATE TABLE IF NOT EXISTS embed_queue (
+  rowid INTEGER PRIMARY KEY,
+  enqueued_at REAL NOT NULL
+);
+
+-- Most frequent recall queries (decayed counts), replayed to warm caches after a restart.
+CREATE TABLE IF NOT EXISTS hot_queries (
+  user_id TEXT NOT NULL,
+  query TEXT NOT NULL,
+  category TEXT NOT NULL DEFAULT '',
+  hits REAL NOT NULL,
+  last_seen REAL NOT NULL,
+  PRIMARY KEY (user_id, query, category)
+);
+
+-- Counters kept in the writing transaction (triggers below, vector writes in code), so health
+-- reads them instead of scanning: live, deleted, ttl (live rows that expire), cat:<category>
+-- (live rows), vectors:<vec table>. recount_stats() rebuilds them exactly.
+CREATE TABLE IF NOT EXISTS memory_stats (
+  key TEXT PRIMARY KEY,
+  n INTEGER NOT NULL DEFAULT 0
+);
+
+-- Time-limited leases between processes sharing this file, e.g. which server worker runs the
+-- background jobs. A lease past expires_at (unix seconds) may be taken over.
+CREATE TABLE IF NOT EXISTS leases (
+  name TEXT PRIMARY KEY,
+  holder TEXT NOT NULL,
+  expires_at REAL NOT NULL
+);
+
+-- Replaced by every restore (at most one row), so the other processes on this file know that
+-- their in-process vector index describes rows that are gone.
+CREATE TABLE IF NOT EXISTS restores (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  token TEXT NOT NULL
 );
 
 CREATE INDEX IF NOT EXISTS idx_user_cat ON memories(user_id, category);
 CREATE INDEX IF NOT EXISTS idx_user_created ON memories(user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_content_hash ON memories(content_hash);
 CREATE INDEX IF NOT EXISTS idx_deleted_at ON memories(deleted_at);
+CREATE INDEX IF NOT EXISTS idx_embedding_version ON memories(embedding_version);
 
--- FTS sync and vec cleanup on delete.
-CREATE TRIGGER IF NOT EXISTS fts_ai AFTER INSERT ON memories BEGIN
-  INSERT INTO memories_fts(rowid, content, keywords, category)
-  VALUES (new.rowid, new.content, new.keywords, new.category);
-END;
-
-CREATE TRIGGER IF NOT EXISTS fts_ad AFTER DELETE ON memories BEGIN
-  INSERT INTO memories_fts(memories_fts, rowid, content)
-  VALUES ('delete', old.rowid, old.content);
+-- vec cleanup on delete (one trigger per embedding space table).
+CREATE TRIGGER IF NOT EXISTS vec_ad_memory_embeddings AFTER DELETE ON memories BEGIN
   DELETE FROM memory_embeddings WHERE rowid = old.rowid;
+  UPDATE memory_stats SET n = n - changes() WHERE key = 'vectors:memory_embeddings';
 END;
 
-CREATE TRIGGER IF NOT EXISTS fts_au AFTER UPDATE ON memories BEGIN
-  INSERT INTO memories_fts(memories_fts, rowid, content)
-  VALUES ('delete', old.rowid, old.content);
-  INSERT INTO memories_fts(rowid, content, keywords, category)
-  VALUES (new.rowid, new.content, new.keywords, new.category);
+CREATE TRIGGER IF NOT EXISTS embed_queue_ad AFTER DELETE ON memories BEGIN
+  DELETE FROM embed_queue WHERE rowid = old.rowid;
 END;
 """
 
+FTS_TABLE = "memories_fts"
+FTS_NEXT_TABLE = "memories_fts_next"
+FTS_DEFAULT_TOKENIZE = "unicode61"  # what FTS5 uses when the table names none
+
+
+def _fts_triggers_sql(table: str, prefix: str = "fts", when: str = "") -> list[str]:
+    """
+    FTS sync for external-content `table`. Only content columns re-index on update, so access
+    bumps stay cheap. `when` (a condition on the row's rowid) limits a table under construction
+    to rows already copied into it.
+    """
+    cols = "content, keywords, category"
+    new = "new.rowid, new.content, new.keywords, new.category"
+    old = "old.rowid, old.content, old.keywords, old.category"
+
+    def w(row: str) -> str:
+        return f" WHEN {when.format(rowid=row + '.rowid')}" if when else ""
+
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_ai AFTER INSERT ON memories{w('new')} BEGIN "
+        f"INSERT INTO {table}(rowid, {cols}) VALUES ({new}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_ad AFTER DELETE ON memories{w('old')} BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {cols}) VALUES ('delete', {old}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {prefix}_au AFTER UPDATE OF {cols} ON memories{w('old')}"
+        " BEGIN "
+        f"INSERT INTO {table}({table}, rowid, {cols}) VALUES ('delete', {old}); "
+        f"INSERT INTO {table}(rowid, {cols}) VALUES ({new}); END",
+    ]
+
+
+def _stats_delta_sql(row: str, sign: str) -> str:
+    """Upsert `row`'s contribution (old/new) to memory_stats, added or subtracted."""
+    live = f"{row}.deleted_at IS NULL"
+    return (
+        "INSERT INTO memory_stats(key, n) VALUES "
+        f"('live', {sign}({live})), ('deleted', {sign}({row}.deleted_at IS NOT NULL)), "
+        f"('ttl', {sign}({live} AND {row}.ttl_seconds IS NOT NULL)), "
+        f"('cat:' || IFNULL({row}.category, ''), {sign}({live})) "
+        "ON CONFLICT(key) DO UPDATE SET n = n + excluded.n;"
+    )
+
+
+STATS_TRIGGERS_SQL = [
+    "CREATE TRIGGER IF NOT EXISTS stats_ai AFTER INSERT ON memories "
+    f"BEGIN {_stats_delta_sql('new', '+')} END",
+    "CREATE TRIGGER IF NOT EXISTS stats_ad AFTER DELETE ON memories "
+    f"BEGIN {_stats_delta_sql('old', '-')} END",
+    "CREATE TRIGGER IF NOT EXISTS stats_au "
+    "AFTER UPDATE OF deleted_at, category, ttl_seconds ON memories "
+    f"BEGIN {_stats_delta_sql('old', '-')} {_stats_delta_sql('new', '+')} END",
+]
+
+
+def _sql_str(v: str) -> str:
+    return "'" + v.replace("'", "''") + "'"
+
+
+def _fts_table_sql(table: str, tokenize: str, prefix: str) -> str:
+    """FTS5 external content; rowid is memories.rowid."""
+    opts = f"content='memories', content_rowid='rowid', tokenize={_sql_str(tokenize)}"
+    if prefix:
+        opts += f", prefix={_sql_str(prefix)}"
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}"
+        f" USING fts5(content, keywords, category, {opts})"
+    )
+
+
+_FTS_OPT_RE = re.compile(r"\b(tokenize|prefix)\s*=\s*'((?:[^']|'')*)'", re.IGNORECASE)
+
+
+def fts_options(create_sql: str) -> tuple[str, str]:
+    """(tokenize, prefix) an FTS5 table was created with, normalized for comparison."""
+    opts = {k.lower(): v.replace("''", "'") for k, v in _FTS_OPT_RE.findall(create_sql or "")}
+    tokenize = " ".join(opts.get("tokenize", FTS_DEFAULT_TOKENIZE).split())
+    return tokenize, " ".join(opts.get("prefix", "").split())
+
+# Id lists are bound as one JSON array and expanded with json_each(?): the statement text is
+# the same for any list length, so SQLite's statement cache reuses its plan, and no list
+# reaches the bound-variable limit. Long lists are split into chunks of this many ids.
+ID_CHUNK = 500
+STATEMENT_CACHE = 256  # prepared statements kept per connection (sqlite3 default: 128)
+
+
+def _dicts(rows: Sequence[sqlite3.Row]) -> list[dict]:
+    """Rows as dicts, naming columns once per result instead of once per row."""
+    if not rows:
+        return []
+    cols = rows[0].keys()
+    return [dict(zip(cols, r)) for r in rows]
+
+
+def id_chunks(ids: Iterable[Any], size: int = ID_CHUNK) -> Iterator[str]:
+    """Distinct ids in first-seen order, as JSON arrays of at most `size` for json_each(?)."""
+    ids = list(dict.fromkeys(ids))
+    for i in range(0, len(ids), size):
+        yield json.dumps(ids[i : i + size])
+
+
+# The columns that carry a memory from one database to another (export/import, tiering).
+MEMORY_COLUMNS = (
+    "id", "user_id", "content", "keywords", "category", "importance_score", "access_count",
+    "created_at", "last_accessed", "content_hash", "simhash64", "ttl_seconds", "pii_flag", "source",
+)
+
+# A created_at range [since, until) in SQLite's CURRENT_TIMESTAMP form ("YYYY-MM-DD HH:MM:SS",
+# UTC), which orders as text; either end may be open (None).
+Window = tuple[Optional[str], Optional[str]]
+
+
+def window_sql(window: Optional[Window], alias: str = "m") -> tuple[str, tuple]:
+    """` AND ...` bounding `alias`.created_at to the window, and its parameters."""
+    since, until = window or (None, None)
+    sql, params = "", ()
+    if since:
+        sql, params = sql + f" AND {alias}.created_at >= ?", params + (since,)
+    if until:
+        sql, params = sql + f" AND {alias}.created_at < ?", params + (until,)
+    return sql, params
+
+LEGACY_VEC_TABLE = "memory_embeddings"
+LEGACY_VEC_DIM = 384
+
+
+def _vec_table_sql(table: str, dim: int, *, compact: bool = False) -> str:
+    """
+    A space's float table: vec0 (float32, scanned by exact KNN) or, with quantization on,
+    a plain table of float16 blobs only ever read by rowid (re-ranking, engines, export).
+    """
+    if compact:
+        return (
+            f"CREATE TABLE IF NOT EXISTS {table}"
+            "(rowid INTEGER PRIMARY KEY, embedding BLOB NOT NULL)"
+        )
+    return f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING vec0(embedding FLOAT[{int(dim)}])"
+
+
+def _f16(blob: Optional[bytes]) -> Optional[bytes]:
+    """vec_f16(): float32 vector blob to the float16 compact store."""
+    if blob is None:
+        return None
+    return np.frombuffer(blob, dtype=np.float32).astype(np.float16).tobytes()
+
+
+def _f32(blob: Optional[bytes]) -> Optional[bytes]:
+    """vec_f32(): float16 compact-store blob back to the float32 sqlite-vec reads."""
+    if blob is None:
+        return None
+    return np.frombuffer(blob, dtype=np.float16).astype(np.float32).tobytes()
+
+
+# Quantized companion tables: column type and the SQL that quantizes a float vector/param.
+QUANT_MODES: dict[str, tuple[str, str]] = {
+    "int8": ("int8", "vec_quantize_int8({}, 'unit')"),
+    "binary": ("bit", "vec_quantize_binary({})"),
+}
+
+
+def _quant_table_sql(table: str, mode: str, dim: int) -> str:
+    col_type, _ = QUANT_MODES[mode]
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING vec0(embedding {col_type}[{int(dim)}])"
+    )
+
+
+def quantize_expr(mode: str, arg: str = "?") -> str:
+    return QUANT_MODES[mode][1].format(arg)
+
+
+def _vec_trigger_sql(table: str, *, counted: bool = True) -> str:
+    """Vector cleanup on delete; a `counted` (float) table also keeps its vectors:<table> stat."""
+    count = (f"UPDATE memory_stats SET n = n - changes() WHERE key = 'vectors:{table}'; "
+             if counted else "")
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS vec_ad_{table} AFTER DELETE ON memories BEGIN "
+        f"DELETE FROM {table} WHERE rowid = old.rowid; {count}END"
+    )
+
+def _varint(buf: bytes, i: int) -> tuple[int, int]:
+    """SQLite varint at buf[i]: (value, offset after it)."""
+    v = 0
+    for k in range(8):
+        b = buf[i + k]
+        v = (v << 7) | (b & 0x7F)
+        if b < 0x80:
+            return v, i + k + 1
+    return (v << 8) | buf[i + 8], i + 9
+
+
+def fts_segment_count(structure: bytes) -> int:
+    """Segments in an FTS5 index, from its structure record (`<fts>_data` row 10)."""
+    i = 8 if structure[4:8] == b"\xff\x00\x00\x01" else 4  # 4-byte cookie, optional V2 marker
+    _, i = _varint(structure, i)  # levels
+    return _varint(structure, i)[0]
+
+
+def _check_snapshot(path: str) -> None:
+    """A restore source must be an intact memory DB. Raises ValueError otherwise."""
+    if not os.path.isfile(path):
+        raise ValueError(f"no such snapshot: {path}")
+    conn = sqlite3.connect(f"file:{pathlib.Path(path).absolute().as_posix()}?mode=ro", uri=True)
+    try:
+        ok = conn.execute("PRAGMA quick_check").fetchone()[0]
+        has = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'memories'"
+        ).fetchone()
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"not a SQLite database: {path}") from e
+    finally:
+        conn.close()
+    if ok != "ok" or not has:
+        raise ValueError(f"snapshot failed integrity check: {path}")
+
+
+def _backup_file(
+    src: str, dest: str, pages: int, pause_ms: float, *, in_place: bool = False
+) -> dict:
+    """
+    Copy `src` into `dest` with sqlite3_backup. The source stays in one read transaction,
+    so writers on other connections carry on (WAL) and never force the copy to restart.
+    `in_place` writes into the existing `dest` as a single transaction; otherwise into a
+    temporary file that replaces `dest` when done.
+    """
+    target = dest if in_place else f"{dest}.partial"
+    if not in_place:
+        pathlib.Path(target).unlink(missing_ok=True)
+    steps: list[int] = []
+    step_ms: list[float] = []
+    t0 = last = time.perf_counter()
+
+    def progress(_status: int, remaining: int, total: int) -> None:
+        nonlocal last
+        now = time.perf_counter()
+        steps.append(total - remaining)
+        step_ms.append((now - last) * 1000.0)
+        last = now + pause_ms / 1000.0  # the pause after this step is not step time
+
+    source = sqlite3.connect(src, isolation_level=None, timeout=30)
+    out = sqlite3.connect(target, timeout=30)
+    try:
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()  # pins the snapshot
+        source.backup(out, pages=pages, progress=progress, sleep=pause_ms / 1000.0)
+        source.execute("COMMIT")
+    finally:
+        out.close()
+        source.close()
+    if not in_place:
+        os.replace(target, dest)
+    copied = steps[-1] if steps else 0
+    per_step = [b - a for a, b in zip([0, *steps], steps)]
+    return {
+        "path": dest,
+        "pages": copied,
+        "steps": len(steps),
+        "pages_per_step": per_step,
+        "step_ms": [round(ms, 3) for ms in step_ms],
+        "duration_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+        "bytes": os.path.getsize(dest),
+    }
+
+
 class SQLiteManager:
     """SQLite + FTS5 + sqlite-vec manager."""
 
-    def __init__(self, db_path: str) -> None:
+    def __init__(
+        self,
+        db_path: str,
+        *,
+        quantization: str | None = None,
+        vector_index: str | None = None,
+        tiered: bool | None = None,
+    ) -> None:
         self.db_path = os.path.expanduser(db_path)
         self.conn: Optional[aiosqlite.Connection] = None
+        # Active embedding space; recall and the write path use these.
+        self.embedding_version: int = 1
+        self.embedding_model: str = settings.embedding_model
+        self.embedding_dim: int = LEGACY_VEC_DIM
+        self.vec_table: str = LEGACY_VEC_TABLE
+        # Optional int8/bit index of the active space, scanned first and re-ranked in float;
+        # the float vectors then move to a float16 table (vec_compact).
+        self.quantization: str = (quantization or settings.vector_quantization).lower()
+        if self.quantization not in ("none", *QUANT_MODES):
+            raise ValueError(f"unknown vector_quantization: {self.quantization}")
+        self.qvec_table: Optional[str] = None
+        # Optional in-process search engine over the active space; sqlite-vec stays the fallback.
+        self.vector_index: str = (vector_index or settings.vector_index).lower()
+        if self.vector_index not in ("exact", "ivf", "mmap"):
+            raise ValueError(f"unknown vector_index: {self.vector_index}")
+        self.index: Optional[IVFIndex | MmapVectorStore] = None
+        self._index_synced = 0.0  # monotonic time of the last sync_index
+        self._restore_token: Optional[str] = None  # restores row the index was loaded after
+        # Options memories_fts was created with; settings may ask for others (fts_needs_migration).
+        self.fts_tokenize: str = FTS_DEFAULT_TOKENIZE
+        self.fts_prefix: str = ""
+        # Set when a row is queued for embedding; the ingest embedder waits on it.
+        self.embed_pending = asyncio.Event()
+        # Statements submitted and not yet answered; they queue on the one connection.
+        self.inflight = 0
+        # Recall queries seen since the last save_hot_queries: (user_id, query, category) -> hits.
+        self.query_hits: Counter[tuple[str, str, str]] = Counter()
+        # Cold tier at <db>.archive: opened with tiering on (None: settings.tiering) or when
+        # the file exists, never for False (the archive itself).
+        self.tiered = tiered
+        self.archive: Optional[SQLiteManager] = None
 
     async def initialize(self) -> None:
         pathlib.Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-        self.conn = await aiosqlite.connect(self.db_path)
+        self.conn = await aiosqlite.connect(self.db_path, cached_statements=STATEMENT_CACHE)
         self.conn.row_factory = aiosqlite.Row
 
         for p in PRAGMAS:
@@ -88,15 +453,136 @@ class SQLiteManager:
         await self.conn.enable_load_extension(True)
         vec_path = sqlite_vec.loadable_path()
         await self.conn.execute("SELECT load_extension(?)", (vec_path,))
+        await self.conn.create_function("vec_f16", 1, _f16, deterministic=True)
+        await self.conn.create_function("vec_f32", 1, _f32, deterministic=True)
 
         await self.conn.executescript(SCHEMA_SQL)
         await self.conn.commit()
+        await self._migrate_triggers()
+        await self._ensure_stats()
+        await self._ensure_fts()
+        self._restore_token = await self._read_restore_token()
+        await self._load_active_space()
+        await self._open_archive()
+
+    @property
+    def vec_compact(self) -> bool:
+        """Float vectors are kept as float16 blobs in a plain table (quantized modes)."""
+        return self.quantization != "none"
+
+    def vec_expr(self, col: str = "v.embedding") -> str:
+        """SQL reading float table column `col` as the float32 blob sqlite-vec expects."""
+        return f"vec_f32({col})" if self.vec_compact else col
+
+    def _vec_param(self) -> str:
+        return "vec_f16(?)" if self.vec_compact else "?"
+
+    async def _migrate_triggers(self) -> None:
+        """
+        Older DBs cleaned memory_embeddings from fts_ad and re-indexed FTS on every UPDATE
+        (access bumps included). Drop those and let _ensure_fts recreate the current ones.
+        """
+        assert self.conn is not None
+        rows = await self.fetchall(
+            "schema_triggers",
+            "SELECT name, sql FROM sqlite_master"
+            " WHERE type = 'trigger' AND name IN ('fts_ad', 'fts_au')",
+        )
+        stale = [
+            r["name"]
+            for r in rows
+            if LEGACY_VEC_TABLE in r["sql"]
+            or (r["name"] == "fts_au" and "UPDATE OF" not in r["sql"])
+        ]
+        if not stale:
+            return
+        for name in stale:
+            await self.conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        await self.conn.commit()
 
     async def close(self) -> None:
+        if self.archive is not None:
+            await self.archive.close()
+            self.archive = None
+        if self.index is not None:
+            await asyncio.to_thread(self.index.close)
+            self.index = None
         if self.conn:
             await self.conn.close()
             self.conn = None
 
+    # ---------------- Instrumented execution ----------------
+    # Every statement goes through these so it can be timed and attributed by name.
+
+    @contextlib.contextmanager
+    def _busy(self) -> Iterator[None]:
+        self.inflight += 1
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+
+    async def execute(self, name: str, sql: str, params: Sequence[Any] = ()) -> aiosqlite.Cursor:
+        assert self.conn is not None
+        with span(f"sql.{name}"), self._busy():
+            if not SQL_PROFILER.enabled:
+                return await self.conn.execute(sql, params)
+            t = time.perf_counter()
+            cur = await self.conn.execute(sql, params)
+            ms = (time.perf_counter() - t) * 1000.0
+            await SQL_PROFILER.record(self.conn, name, sql, params, ms, cur.rowcount)
+            return cur
+
+    async def fetchall(
+        self, name: str, sql: str, params: Sequence[Any] = ()
+    ) -> list[aiosqlite.Row]:
+        assert self.conn is not None
+        with span(f"sql.{name}") as sp, self._busy():
+            t = time.perf_counter()
+            cur = await self.conn.execute(sql, params)
+            rows = list(await cur.fetchall())
+            sp.set(rows=len(rows))
+            if SQL_PROFILER.enabled:
+                ms = (time.perf_counter() - t) * 1000.0
+                await SQL_PROFILER.record(self.conn, name, sql, params, ms, len(rows))
+            return rows
+
+    async def fetchone(
+        self, name: str, sql: str, params: Sequence[Any] = ()
+    ) -> Optional[aiosqlite.Row]:
+        assert self.conn is not None
+        with span(f"sql.{name}"), self._busy():
+            t = time.perf_counter()
+            cur = await self.conn.execute(sql, params)
+            row = await cur.fetchone()
+            if SQL_PROFILER.enabled:
+                ms = (time.perf_counter() - t) * 1000.0
+                await SQL_PROFILER.record(self.conn, name, sql, params, ms, 1 if row else 0)
+            return row
+
+    async def executemany(
+        self, name: str, sql: str, seq: Sequence[Sequence[Any]]
+    ) -> aiosqlite.Cursor:
+        assert self.conn is not None
+        with span(f"sql.{name}", n=len(seq)), self._busy():
+            if not SQL_PROFILER.enabled:
+                return await self.conn.executemany(sql, seq)
+            t = time.perf_counter()
+            cur = await self.conn.executemany(sql, seq)
+            ms = (time.perf_counter() - t) * 1000.0
+            await SQL_PROFILER.record(self.conn, name, sql, seq[0] if seq else (), ms, cur.rowcount)
+            return cur
+
+    async def commit(self) -> None:
+        """Commit; profiled as `commit` so WAL fsync / lock waits show up separately."""
+        assert self.conn is not None
+        with span("sql.commit"), self._busy():
+            t = time.perf_counter()
+            await self.conn.commit()
+            if SQL_PROFILER.enabled:
+                ms = (time.perf_counter() - t) * 1000.0
+                await SQL_PROFILER.record(self.conn, "commit", "COMMIT", (), ms, 0)
+
     # ---------------- Writes ----------------
 
     async def insert_memory_row(
@@ -114,9 +600,11 @@ class SQLiteManager:
         ttl_seconds: int | None = None,
         pii_flag: int = 0,
         source: str = "user",
+        embed_later: bool = False,
     ) -> int:
-        assert self.conn is not None
-        cur = await self.conn.execute(
+        """Insert one memory and commit. `embed_later` queues its vector in the same transaction."""
+        cur = await self.execute(
+            "insert_memory",
             """
             INSERT INTO memories
               (id, user_id, content, keywords, category, importance_score,
@@ -138,99 +626,273 @@ class SQLiteManager:
                 source,
             ),
         )
-        await self.conn.commit()
+        if embed_later:
+            await self.execute(
+                "embed_enqueue",
+                "INSERT OR REPLACE INTO embed_queue(rowid, enqueued_at) VALUES (?, ?)",
+                (cur.lastrowid, time.time()),
+            )
+        await self.commit()
+        if embed_later:
+            self.embed_pending.set()
         return cur.lastrowid
 
     async def insert_vector(self, *, rowid: int, embedding: Sequence[float]) -> None:
-        assert self.conn is not None
-        buf = array("f", embedding).tobytes()
-        await self.conn.execute(
-            "INSERT INTO memory_embeddings(rowid, embedding) VALUES (?, ?)",
+        await self._write_vector(self.vec_table, rowid, array("f", embedding).tobytes())
+        await self.commit()
+
+    async def _write_vector(
+        self, table: str, rowid: int, buf: bytes, *, replace: bool = False
+    ) -> None:
+        """Insert one float32 vector; mirrored into the quantized table for the active space."""
+        mirror = self.qvec_table if table == self.vec_table else None
+        added = 1
+        if replace:
+            cur = await self.execute(
+                "delete_vector", f"DELETE FROM {table} WHERE rowid = ?", (rowid,)
+            )
+            added -= max(0, cur.rowcount)
+            if mirror:
+                await self.execute(
+                    "delete_vector", f"DELETE FROM {mirror} WHERE rowid = ?", (rowid,)
+                )
+        await self.execute(
+            "insert_vector",
+            f"INSERT INTO {table}(rowid, embedding) VALUES (?, {self._vec_param()})",
             (rowid, buf),
         )
-        await self.conn.commit()
+        if mirror:
+            await self.execute(
+                "insert_qvector",
+                f"INSERT INTO {mirror}(rowid, embedding)"
+                f" VALUES (?, {quantize_expr(self.quantization)})",
+                (rowid, buf),
+            )
+        if added:
+            await self.add_stat(f"vectors:{table}", added)
+        if self.index is not None and table == self.vec_table:
+            if isinstance(self.index, MmapVectorStore):
+                r = await self.fetchone(
+                    "vector_owner", "SELECT user_id, category FROM memories WHERE rowid = ?",
+                    (rowid,),
+                )
+                self.index.add(rowid, buf, user_id=r and r["user_id"], category=r and r["category"])
+            else:
+                self.index.add(rowid, buf)
 
-    async def soft_delete_ids(self, ids: Iterable[str]) -> int:
-        assert self.conn is not None
-        ids = list(ids)
-        if not ids:
-            return 0
-        q = ",".join("?" for _ in ids)
-        cur = await self.conn.execute(
-            f"UPDATE memories SET deleted_at = CURRENT_TIMESTAMP WHERE id IN ({q})",
-            tuple(ids),
+    async def begin_bulk_load(self) -> None:
+        """Stop indexing inserts into FTS row by row; end_bulk_load rebuilds it once."""
+        await self.execute("bulk_load", "DROP TRIGGER IF EXISTS fts_ai")
+        await self.commit()
+
+    async def end_bulk_load(self) -> None:
+        for sql in _fts_triggers_sql(FTS_TABLE):
+            await self.execute("bulk_load", sql)
+        await self.fts_rebuild()
+
+    async def bulk_insert_memories(
+        self, rows: Sequence[dict], vectors: Sequence[Optional[bytes]]
+    ) -> tuple[int, int]:
+        """
+        Insert memory rows (keeping their ids) with optional float32 vectors for the active
+        space, in one transaction. Rows whose id or content hash exists are skipped. Rows
+        without a vector get embedding_version 0 so the re-embed job picks them up.
+        Returns (rows inserted, vectors written).
+        """
+        if not rows:
+            return 0, 0
+        cols = list(rows[0])
+        r = await self.fetchone("bulk_hi", "SELECT COALESCE(MAX(rowid), 0) AS hi FROM memories")
+        hi = int(r["hi"]) if r else 0
+        await self.executemany(
+            "bulk_insert",
+            f"INSERT OR IGNORE INTO memories ({', '.join(cols)}, embedding_version) "
+            f"VALUES ({', '.join('?' for _ in cols)}, ?)",
+            [
+                (*(row[c] for c in cols), self.embedding_version if vec is not None else 0)
+                for row, vec in zip(rows, vectors)
+            ],
         )
-        await self.conn.commit()
-        return cur.rowcount
+        vec_by_id = {row["id"]: vec for row, vec in zip(rows, vectors) if vec is not None}
+        new = await self.fetchall(
+            "bulk_new_rows",
+            "SELECT rowid, id, user_id, category FROM memories WHERE rowid > ? "
+            "AND id IN (SELECT value FROM json_each(?))",
+            (hi, json.dumps([row["id"] for row in rows])),
+        )
+        items = [(int(n["rowid"]), vec_by_id[n["id"]], n) for n in new if n["id"] in vec_by_id]
+        if items:
+            await self.executemany(
+                "bulk_insert_vector",
+                f"INSERT INTO {self.vec_table}(rowid, embedding) VALUES (?, {self._vec_param()})",
+                [(rowid, buf) for rowid, buf, _ in items],
+            )
+            if self.qvec_table:
+                await self.executemany(
+                    "bulk_insert_qvector",
+                    f"INSERT INTO {self.qvec_table}(rowid, embedding)"
+                    f" VALUES (?, {quantize_expr(self.quantization)})",
+                    [(rowid, buf) for rowid, buf, _ in items],
+                )
+            await self.add_stat(f"vectors:{self.vec_table}", len(items))
+        await self.commit()
+        if self.index is not None:
+            for rowid, buf, n in items:
+                self.index.add(rowid, buf, user_id=n["user_id"], category=n["category"])
+        return len(new), len(items)
+
+    async def soft_delete_ids(self, ids: Iterable[str]) -> int:
+        n = 0
+        for chunk in id_chunks(ids):
+            if self.index is not None:
+                rows = await self.fetchall(
+                    "soft_delete_rowids",
+                    "SELECT rowid FROM memories WHERE id IN (SELECT value FROM json_each(?))",
+                    (chunk,),
+                )
+                self.index.remove(int(r["rowid"]) for r in rows)
+            cur = await self.execute(
+                "soft_delete",
+                "UPDATE memories SET deleted_at = CURRENT_TIMESTAMP"
+                " WHERE id IN (SELECT value FROM json_each(?))",
+                (chunk,),
+            )
+            n += cur.rowcount
+        if n:
+            await self.commit()
+        if self.archive is not None:
+            n += await self.archive.soft_delete_ids(ids)
+        return n
 
     # ---------------- Reads / Hydration ----------------
 
     async def fetch_one_by_id(self, id: str) -> Optional[dict]:
-        assert self.conn is not None
-        cur = await self.conn.execute(
-            "SELECT * FROM memories WHERE id = ? AND deleted_at IS NULL", (id,)
+        row = await self.fetchone(
+            "fetch_one", "SELECT * FROM memories WHERE id = ? AND deleted_at IS NULL", (id,)
         )
-        row = await cur.fetchone()
         return dict(row) if row else None
 
     async def fetch_rowid_by_id(self, id: str) -> Optional[int]:
-        assert self.conn is not None
-        cur = await self.conn.execute(
-            "SELECT rowid FROM memories WHERE id = ? AND deleted_at IS NULL", (id,)
+        r = await self.fetchone(
+            "fetch_rowid", "SELECT rowid FROM memories WHERE id = ? AND deleted_at IS NULL", (id,)
         )
-        r = await cur.fetchone()
         return int(r["rowid"]) if r else None
 
-    async def fetch_many_by_ids_ordered(self, ids: Sequence[str]) -> list[dict]:
-        assert self.conn is not None
-        if not ids:
-            return []
-        q = ",".join("?" for _ in ids)
-        cur = await self.conn.execute(
-            f"SELECT * FROM memories WHERE id IN ({q}) AND deleted_at IS NULL", tuple(ids)
+    async def fetch_export_chunk(
+        self, columns: Sequence[str], *, after_rowid: int = 0, limit: int = 5000,
+        user_id: Optional[str] = None,
+    ) -> list[dict]:
+        """Live rows in rowid order with their active-space vector (None if missing)."""
+        where = "m.rowid > ? AND m.deleted_at IS NULL" + (" AND m.user_id = ?" if user_id else "")
+        params = (after_rowid, user_id, limit) if user_id else (after_rowid, limit)
+        cols = ", ".join("m." + c for c in columns)
+        rows = await self.fetchall(
+            "export_chunk",
+            f"""
+            SELECT m.rowid AS rowid, {cols}, {self.vec_expr()} AS embedding
+            FROM memories m LEFT JOIN {self.vec_table} v ON v.rowid = m.rowid
+            WHERE {where}
+            ORDER BY m.rowid
+            LIMIT ?
+            """,
+            params,
         )
-        rows = [dict(r) for r in await cur.fetchall()]
-        pos = {mid: i for i, mid in enumerate(ids)}
-        rows.sort(key=lambda r: pos.get(r["id"], 1_000_000))
+        return [dict(r) for r in rows]
+
+    async def fetch_many_by_ids_ordered(self, ids: Sequence[str]) -> list[dict]:
+        rows: list[dict] = []
+        for chunk in id_chunks(ids):
+            rows.extend(_dicts(await self.fetchall(
+                "hydrate",
+                """
+                SELECT m.* FROM json_each(?) j CROSS JOIN memories m ON m.id = j.value
+                WHERE m.deleted_at IS NULL
+                ORDER BY j.key
+                """,
+                (chunk,),
+            )))
         return rows
 
-    async def fetch_meta_for_ids(self, ids: Sequence[str]) -> dict[str, dict]:
-        assert self.conn is not None
-        if not ids:
-            return {}
-        q = ",".join("?" for _ in ids)
-        cur = await self.conn.execute(
+    async def fetch_snippets_by_ids_ordered(
+        self, ids: Sequence[str], *, chars: int = 160
+    ) -> list[dict]:
+        """Lean hydration: leading window of content plus the fields a result list shows."""
+        rows: list[dict] = []
+        for chunk in id_chunks(ids):
+            rows.extend(_dicts(await self.fetchall(
+                "hydrate_snippets",
+                """
+                SELECT m.id, m.category, m.created_at, substr(m.content, 1, ?) AS snippet,
+                       length(m.content) AS content_len
+                FROM json_each(?) j CROSS JOIN memories m ON m.id = j.value
+                WHERE m.deleted_at IS NULL
+                ORDER BY j.key
+                """,
+                (int(chars), chunk),
+            )))
+        return rows
+
+    async def fetch_window(
+        self, user_id: str, window: Window, *, category: Optional[str] = None, limit: int = 1000
+    ) -> list[dict]:
+        """
+        Live rows created in the window, newest first: (rowid, id, created_at_ts).
+        Walks idx_user_created over the window only; `+` keeps the planner off the other indexes.
+        """
+        where, params = window_sql(window)
+        if category:
+            where, params = where + " AND +m.category = ?", params + (category,)
+        rows = await self.fetchall(
+            "fetch_window",
             f"""
-            SELECT id, strftime('%s', created_at) AS created_at_ts, access_count, importance_score
-            FROM memories WHERE id IN ({q}) AND deleted_at IS NULL
+            SELECT m.rowid AS rowid, m.id AS id, strftime('%s', m.created_at) AS created_at_ts
+            FROM memories m
+            WHERE m.user_id = ?{where} AND +m.deleted_at IS NULL
+            ORDER BY m.created_at DESC
+            LIMIT ?
             """,
-            tuple(ids),
+            (user_id, *params, int(limit)),
         )
+        return _dicts(rows)
+
+    async def fetch_meta_for_ids(self, ids: Sequence[str]) -> dict[str, dict]:
         out: dict[str, dict] = {}
-        for r in await cur.fetchall():
-            out[r["id"]] = {
-                "created_at_ts": int(r["created_at_ts"]),
-                "access_count": int(r["access_count"]),
-                "importance": float(r["importance_score"]),
-            }
+        for chunk in id_chunks(ids):
+            rows = await self.fetchall(
+                "fetch_meta",
+                """
+                SELECT m.id, strftime('%s', m.created_at) AS created_at_ts, m.access_count,
+                       m.importance_score, m.category
+                FROM json_each(?) j CROSS JOIN memories m ON m.id = j.value
+                WHERE m.deleted_at IS NULL
+                """,
+                (chunk,),
+            )
+            for r in rows:
+                out[r["id"]] = {
+                    "created_at_ts": int(r["created_at_ts"]),
+                    "access_count": int(r["access_count"]),
+                    "importance": float(r["importance_score"]),
+                    "category": r["category"],
+                }
         return out
 
     async def bump_access(self, ids: Iterable[str]) -> None:
-        assert self.conn is not None
-        ids = list(ids)
-        if not ids:
+        chunks = list(id_chunks(ids))
+        if not chunks:
             return
-        q = ",".join("?" for _ in ids)
-        await self.conn.execute(
-            f"""
+        # `+deleted_at` keeps the planner on id lookups instead of the deleted_at index.
+        await self.executemany(
+            "bump_access",
+            """
             UPDATE memories
             SET access_count = access_count + 1,
                 last_accessed = CURRENT_TIMESTAMP
-            WHERE id IN ({q}) AND deleted_at IS NULL
+            WHERE id IN (SELECT value FROM json_each(?)) AND +deleted_at IS NULL
             """,
-            tuple(ids),
+            [(c,) for c in chunks],
         )
-        await self.conn.commit()
+        await self.commit()
 
     async def update_content_and_embedding(
         self,
@@ -242,11 +904,12 @@ class SQLiteManager:
         new_content_hash: str,
         new_simhash64: str | None,
         new_embedding: Sequence[float],
-        new_embedding_version: int = 1,
+        new_embedding_version: int | None = None,
     ) -> None:
         assert self.conn is not None
         async with self.conn.execute("BEGIN"):
-            await self.conn.execute(
+            await self.execute(
+                "update_content",
                 """
                 UPDATE memories
                 SET content = ?, keywords = ?, category = ?,
@@ -259,7 +922,7 @@ class SQLiteManager:
                     new_category,
                     new_content_hash,
                     new_simhash64,
-                    new_embedding_version,
+                    new_embedding_version or self.embedding_version,
                     id,
                 ),
             )
@@ -267,30 +930,171 @@ class SQLiteManager:
             if rowid is None:
                 raise ValueError("id not found or deleted")
             buf = array("f", new_embedding).tobytes()
-            await self.conn.execute("DELETE FROM memory_embeddings WHERE rowid = ?", (rowid,))
-            await self.conn.execute(
-                "INSERT INTO memory_embeddings(rowid, embedding) VALUES (?, ?)",
-                (rowid, buf),
-            )
-        await self.conn.commit()
+            await self._write_vector(self.vec_table, rowid, buf, replace=True)
+        await self.commit()
 
     # ---------------- Maintenance ----------------
 
     async def vacuum_analyze(self) -> None:
-        assert self.conn is not None
-        await self.conn.execute("VACUUM")
-        await self.conn.execute("ANALYZE")
-        await self.conn.commit()
+        await self.execute("vacuum", "VACUUM")
+        await self.execute("analyze", "ANALYZE")
+        await self.commit()
 
     async def fts_rebuild(self) -> None:
+        await self.execute(
+            "fts_rebuild", "INSERT INTO memories_fts(memories_fts) VALUES('rebuild');"
+        )
+        await self.commit()
+
+    async def fts_optimize(self) -> None:
+        """Merge FTS segments, dropping the delete markers a large bulk delete leaves behind."""
+        await self.execute(
+            "fts_optimize", "INSERT INTO memories_fts(memories_fts) VALUES('optimize');"
+        )
+        await self.commit()
+
+    async def snapshot(
+        self, dest: str, *, step_pages: int | None = None, pause_ms: float | None = None
+    ) -> dict:
+        """
+        Consistent copy of the live DB at `dest` with the SQLite backup API, made on its own
+        connection off the event loop, `step_pages` pages per step with a pause in between.
+        The copy is written next to `dest` and renamed into place once complete.
+        """
+        dest = os.path.expanduser(dest)
+        pathlib.Path(dest).parent.mkdir(parents=True, exist_ok=True)
+        with span("sql.snapshot") as sp:
+            stats = await asyncio.to_thread(
+                _backup_file, self.db_path, dest,
+                int(step_pages or settings.snapshot_step_pages),
+                float(settings.snapshot_step_pause_ms if pause_ms is None else pause_ms),
+            )
+            sp.set(pages=stats["pages"], steps=stats["steps"])
+        if self.archive is not None:
+            stats["archive"] = await self.archive.snapshot(
+                f"{dest}.archive", step_pages=step_pages, pause_ms=pause_ms
+            )
+        return stats
+
+    async def restore(self, src: str) -> dict:
+        """
+        Replace the live DB with snapshot `src` in one write transaction (backup API, all pages
+        in one step), then reload embedding space, FTS options and the vector index from it.
+        """
+        src = os.path.expanduser(src)
+        await asyncio.to_thread(_check_snapshot, src)
+        with span("sql.restore") as sp:
+            stats = await asyncio.to_thread(_backup_file, src, self.db_path, -1, 0.0, in_place=True)
+            sp.set(pages=stats["pages"])
+        # Derived index files describe the old rows; they are rebuilt from the restored tables.
+        if self.index is not None:
+            await asyncio.to_thread(self.index.close)
+            self.index = None
+        for path in [f"{self.db_path}.ivf.npz", *glob.glob(f"{glob.escape(self.db_path)}.vecs.*")]:
+            pathlib.Path(path).unlink(missing_ok=True)
         assert self.conn is not None
-        await self.conn.execute("INSERT INTO memories_fts(memories_fts) VALUES('rebuild');")
+        await self.conn.executescript(SCHEMA_SQL)  # snapshots from older versions
+        self._restore_token = uuid.uuid4().hex
+        await self.execute(
+            "restore_token", "INSERT OR REPLACE INTO restores(id, token) VALUES (1, ?)",
+            (self._restore_token,),
+        )
         await self.conn.commit()
+        await self._migrate_triggers()
+        await self._ensure_stats()
+        await self._ensure_fts()
+        await self._load_active_space()
+        self.embed_pending.set()  # the snapshot may carry queued rows
+        if self.archive is not None:
+            if os.path.exists(f"{src}.archive"):
+                stats["archive"] = await self.archive.restore(f"{src}.archive")
+            else:  # taken before tiering: nothing was archived then
+                await self.archive.execute("restore_archive", "DELETE FROM memories")
+                await self.archive.commit()
+        return stats
+
+    # ---------------- Hot set (cache warming) ----------------
+
+    def note_query(self, user_id: str, query: str, category: Optional[str] = None) -> None:
+        """Count a recall in memory; save_hot_queries persists the counts."""
+        if len(self.query_hits) >= 10_000:
+            self.query_hits = Counter(dict(self.query_hits.most_common(5_000)))
+        self.query_hits[(user_id, query, category or "")] += 1
+
+    async def save_hot_queries(self, *, keep: int, decay: float) -> int:
+        """
+        Fold the counts since the last save into hot_queries: older counts fade by `decay`,
+        and only the `keep` hottest queries stay. Returns the number of queries counted.
+        """
+        hits, self.query_hits = self.query_hits, Counter()
+        now = time.time()
+        await self.execute(
+            "hot_queries_decay", "UPDATE hot_queries SET hits = hits * ?", (float(decay),)
+        )
+        if hits:
+            await self.executemany(
+                "hot_queries_upsert",
+                """
+                INSERT INTO hot_queries(user_id, query, category, hits, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, query, category)
+                DO UPDATE SET hits = hits + excluded.hits, last_seen = excluded.last_seen
+                """,
+                [(u, q, c, float(n), now) for (u, q, c), n in hits.items()],
+            )
+        await self.execute(
+            "hot_queries_prune",
+            "DELETE FROM hot_queries"
+            " WHERE rowid NOT IN (SELECT rowid FROM hot_queries ORDER BY hits DESC LIMIT ?)",
+            (int(keep),),
+        )
+        await self.commit()
+        return len(hits)
+
+    async def fetch_hot_queries(self, limit: int) -> list[dict]:
+        """[{user_id, query, category}] hottest first; category None for unfiltered recalls."""
+        rows = await self.fetchall(
+            "hot_queries",
+            "SELECT user_id, query, NULLIF(category, '') AS category"
+            " FROM hot_queries ORDER BY hits DESC LIMIT ?",
+            (int(limit),),
+        )
+        return [dict(r) for r in rows]
+
+    async def fetch_hot_rowids(self, limit: int) -> list[int]:
+        rows = await self.fetchall(
+            "hot_rowids",
+            """
+            SELECT rowid FROM memories WHERE deleted_at IS NULL
+            ORDER BY access_count DESC, last_accessed DESC
+            LIMIT ?
+            """,
+            (int(limit),),
+        )
+        return [int(r["rowid"]) for r in rows]
+
+    async def touch_rows(self, rowids: Sequence[int]) -> int:
+        """Read the memory rows and active-space vectors of `rowids` into the page cache."""
+        ids = json.dumps(list(rowids))
+        r = await self.fetchone(
+            "touch_memories",
+            "SELECT COUNT(length(m.content)) AS n"
+            " FROM json_each(?) j CROSS JOIN memories m ON m.rowid = j.value",
+            (ids,),
+        )
+        # vec0 answers a join on rowid with point lookups; an IN list would scan the table.
+        await self.fetchone(
+            "touch_vectors",
+            "SELECT COUNT(v.embedding) AS n"
+            f" FROM json_each(?) j CROSS JOIN {self.vec_table} v ON v.rowid = j.value",
+            (ids,),
+        )
+        return int(r["n"]) if r else 0
 
     async def fetch_ttl_expired_ids(self, limit: int = 500) -> list[str]:
         """IDs where ttl_seconds expired and not yet soft-deleted."""
-        assert self.conn is not None
-        cur = await self.conn.execute(
+        rows = await self.fetchall(
+            "ttl_expired",
             """
             SELECT id
             FROM memories
@@ -301,13 +1105,12 @@ class SQLiteManager:
             """,
             (limit,),
         )
-        return [r["id"] for r in await cur.fetchall()]
+        return [r["id"] for r in rows]
 
     async def find_simhash_dupe_ids(self, limit_groups: int = 100) -> list[str]:
         """
         Return IDs to delete for exact simhash duplicates, keeping the oldest row per simhash64.
         """
-        assert self.conn is not None
         sql = """
         WITH dups AS (
           SELECT simhash64
@@ -329,13 +1132,12 @@ class SQLiteManager:
         JOIN keepers k ON k.simhash64 = m.simhash64
         WHERE m.deleted_at IS NULL AND m.created_at > k.min_created
         """
-        cur = await self.conn.execute(sql, (limit_groups,))
-        return [r["id"] for r in await cur.fetchall()]
+        return [r["id"] for r in await self.fetchall("simhash_dupes", sql, (limit_groups,))]
 
     async def purge_soft_deleted(self, older_than_days: int) -> int:
         """Hard-delete rows soft-deleted before threshold. Triggers clean vec + FTS."""
-        assert self.conn is not None
-        cur = await self.conn.execute(
+        cur = await self.execute(
+            "purge_soft_deleted",
             """
             DELETE FROM memories
             WHERE deleted_at IS NOT NULL
@@ -343,5 +1145,892 @@ class SQLiteManager:
             """,
             (older_than_days,),
         )
-        await self.conn.commit()
+        await self.commit()
         return cur.rowcount
+
+    # ---------------- Tiering ----------------
+
+    @property
+    def archive_path(self) -> str:
+        return f"{self.db_path}.archive"
+
+    async def _open_archive(self) -> None:
+        """
+        Open the cold tier: a database of the same shape, so search and hydration run on it
+        unchanged. An empty archive is given the active embedding space of this one.
+        """
+        wanted = self.tiered or settings.tiering or os.path.exists(self.archive_path)
+        if self.tiered is False or not wanted:
+            return
+        archive = SQLiteManager(
+            self.archive_path, quantization="none", vector_index="exact", tiered=False
+        )
+        await archive.initialize()
+        if not self.archive_matches(archive) and not (await archive.fetch_stats()).get("live"):
+            space = await archive.create_embedding_space(self.embedding_model, self.embedding_dim)
+            await archive.activate_embedding_space(int(space["version"]))
+        self.archive = archive
+
+    def archive_matches(self, archive: Optional[SQLiteManager] = None) -> bool:
+        """Archived vectors come from the active model: query vectors and moved rows fit both."""
+        archive = archive or self.archive
+        return archive is not None and (archive.embedding_model, archive.embedding_dim) == (
+            self.embedding_model, self.embedding_dim
+        )
+
+    async def fetch_cold_window(
+        self, after_rowid: int, limit: int, *, idle_days: float
+    ) -> Optional[tuple[int, list[dict]]]:
+        """
+        (hi, rows): the next `limit` rowids after `after_rowid` end at hi; rows are the cold ones
+        among them (live, never accessed, untouched for `idle_days`, no TTL, vector in the
+        active space) with their vector. None past the last row.
+        """
+        r = await self.fetchone(
+            "cold_window",
+            "SELECT MAX(rowid) AS hi"
+            " FROM (SELECT rowid FROM memories WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+            (after_rowid, limit),
+        )
+        if r is None or r["hi"] is None:
+            return None
+        hi = int(r["hi"])
+        cols = ", ".join("m." + c for c in MEMORY_COLUMNS)
+        rows = await self.fetchall(
+            "cold_rows",
+            f"""
+            SELECT m.rowid AS rowid, {cols}, {self.vec_expr()} AS embedding
+            FROM memories m CROSS JOIN {self.vec_table} v ON v.rowid = m.rowid
+            WHERE m.rowid > ? AND m.rowid <= ? AND m.deleted_at IS NULL AND m.access_count = 0
+              AND m.ttl_seconds IS NULL AND m.embedding_version = ?
+              AND m.last_accessed < datetime('now', printf('-%f days', ?))
+            """,
+            (after_rowid, hi, self.embedding_version, float(idle_days)),
+        )
+        return hi, _dicts(rows)
+
+    async def demote(self, rows: Sequence[dict]) -> int:
+        """
+        Move rows from fetch_cold_window to the archive: committed there first, then deleted
+        here unless they were accessed meanwhile (then their archive copy goes instead). A
+        row the archive skipped, because it holds the same content under another id, stays
+        here. A crash in between leaves a row in both tiers; recall reads the hot one and the
+        next pass finishes the move. Returns the number moved.
+        """
+        assert self.archive is not None
+        if not rows:
+            return 0
+        await self.archive.bulk_insert_memories(
+            [{c: r[c] for c in MEMORY_COLUMNS} for r in rows], [r["embedding"] for r in rows]
+        )
+        held = await self.archive.held_ids(r["id"] for r in rows)
+        if not held:
+            return 0
+        gone = await self.fetchall(
+            "demote",
+            """
+            DELETE FROM memories
+            WHERE id IN (SELECT value FROM json_each(?)) AND access_count = 0 AND deleted_at IS NULL
+            RETURNING rowid, id
+            """,
+            (json.dumps(sorted(held)),),
+        )
+        await self.commit()
+        if self.index is not None:
+            self.index.remove(int(g["rowid"]) for g in gone)
+        moved = {g["id"] for g in gone}
+        if len(moved) < len(held):
+            await self.archive.delete_ids([i for i in held if i not in moved])
+        return len(moved)
+
+    async def promote(self, ids: Sequence[str]) -> list[str]:
+        """
+        Move these ids back from the archive, e.g. because recall returned them: inserted and
+        committed here first, then deleted there. Ids the archive does not hold are ignored;
+        a row whose content is hot under another id stays archived. Returns the ids moved.
+        """
+        if self.archive is None or not ids:
+            return []
+        rows: list[dict] = []
+        for chunk in id_chunks(ids):
+            rows.extend(_dicts(await self.archive.fetchall(
+                "promote_rows",
+                f"""
+                SELECT {', '.join('m.' + c for c in MEMORY_COLUMNS)},
+                       {self.archive.vec_expr()} AS embedding
+                FROM json_each(?) j CROSS JOIN memories m ON m.id = j.value
+                LEFT JOIN {self.archive.vec_table} v ON v.rowid = m.rowid
+                WHERE m.deleted_at IS NULL
+                """,
+                (chunk,),
+            )))
+        if not rows:
+            return []
+        keep = self.archive_matches()
+        await self.bulk_insert_memories(
+            [{c: r[c] for c in MEMORY_COLUMNS} for r in rows],
+            [r["embedding"] if keep else None for r in rows],
+        )
+        held = await self.held_ids(r["id"] for r in rows)
+        moved = [r["id"] for r in rows if r["id"] in held]
+        if moved:
+            await self.archive.delete_ids(moved)
+        return moved
+
+    async def held_ids(self, ids: Iterable[str]) -> set[str]:
+        """The ids among these that have a row here, deleted or not."""
+        out: set[str] = set()
+        for chunk in id_chunks(ids):
+            rows = await self.fetchall(
+                "held_ids",
+                "SELECT id FROM memories WHERE id IN (SELECT value FROM json_each(?))",
+                (chunk,),
+            )
+            out.update(r["id"] for r in rows)
+        return out
+
+    async def delete_ids(self, ids: Sequence[str]) -> int:
+        """Hard-delete rows by id (triggers clean vectors, FTS and counters)."""
+        n = 0
+        for chunk in id_chunks(ids):
+            if self.index is not None:
+                rows = await self.fetchall(
+                    "delete_rowids",
+                    "SELECT rowid FROM memories WHERE id IN (SELECT value FROM json_each(?))",
+                    (chunk,),
+                )
+                self.index.remove(int(r["rowid"]) for r in rows)
+            cur = await self.execute(
+                "delete_ids",
+                "DELETE FROM memories WHERE id IN (SELECT value FROM json_each(?))",
+                (chunk,),
+            )
+            n += max(0, cur.rowcount)
+        await self.commit()
+        return n
+
+    # ---------------- Leases ----------------
+
+    async def acquire_lease(self, name: str, holder: str, ttl_sec: float) -> bool:
+        """
+        Take lease `name` for `holder`, or extend it when `holder` already has it, for `ttl_sec`
+        from now. False while another holder's lease is unexpired.
+        """
+        now = time.time()
+        rows = await self.fetchall(
+            "lease_acquire",
+            """
+            INSERT INTO leases(name, holder, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(name)
+            DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at
+            WHERE leases.holder = excluded.holder OR leases.expires_at < ?
+            RETURNING holder
+            """,
+            (name, holder, now + float(ttl_sec), now),
+        )
+        await self.commit()
+        return bool(rows)
+
+    async def release_lease(self, name: str, holder: str) -> None:
+        await self.execute(
+            "lease_release", "DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder)
+        )
+        await self.commit()
+
+    async def lease(self, name: str) -> Optional[dict]:
+        row = await self.fetchone(
+            "lease", "SELECT holder, expires_at FROM leases WHERE name = ?", (name,)
+        )
+        return dict(row) if row else None
+
+    async def refresh_shared_state(self) -> bool:
+        """
+        Re-read what another process's background jobs may have switched: the active embedding
+        space (re-embed) and the FTS options (FTS rebuild). True when the space changed.
+        """
+        await self._load_fts_options()
+        if self.archive is not None:
+            await self.archive.refresh_shared_state()
+        row = await self.fetchone(
+            "active_space",
+            "SELECT version FROM embedding_spaces"
+            " WHERE state = 'active' ORDER BY version DESC LIMIT 1",
+        )
+        if row is None or int(row["version"]) == self.embedding_version:
+            return False
+        await self._load_active_space()
+        return True
+
+    # ---------------- Stats ----------------
+
+    async def _ensure_stats(self) -> None:
+        """
+        Counter triggers, and vector cleanup triggers that keep vectors:<table> (older DBs
+        have ones that don't). A DB without counters yet is counted once.
+        """
+        assert self.conn is not None
+        for sql in STATS_TRIGGERS_SQL:
+            await self.conn.execute(sql)
+        for table in await self._float_vec_tables():
+            r = await self.fetchone(
+                "schema_vec_trigger",
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                (f"vec_ad_{table}",),
+            )
+            if r is None or "memory_stats" not in r["sql"]:
+                await self.conn.execute(f"DROP TRIGGER IF EXISTS vec_ad_{table}")
+                await self.conn.execute(_vec_trigger_sql(table))
+        await self.conn.commit()
+        seeded = await self.fetchone(
+            "stats_seeded", "SELECT 1 FROM memory_stats WHERE key = 'live'"
+        )
+        if seeded is None:
+            await self.recount_stats()
+
+    async def _float_vec_tables(self) -> list[str]:
+        rows = await self.fetchall("space_tables", "SELECT vec_table FROM embedding_spaces")
+        return list(dict.fromkeys([LEGACY_VEC_TABLE, *(r["vec_table"] for r in rows)]))
+
+    async def add_stat(self, key: str, n: int) -> None:
+        """Add to a counter inside the caller's transaction."""
+        await self.execute(
+            "stats_add",
+            "INSERT INTO memory_stats(key, n) VALUES (?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET n = n + excluded.n",
+            (key, int(n)),
+        )
+
+    async def fetch_stats(self) -> dict[str, int]:
+        """All counters; a handful of rows whatever the number of memories."""
+        rows = await self.fetchall("stats", "SELECT key, n FROM memory_stats")
+        return {r["key"]: int(r["n"]) for r in rows}
+
+    async def recount_stats(self) -> dict[str, tuple[int, int]]:
+        """
+        Count everything again (full scans) and replace the counters in one transaction.
+        Returns {key: (counter, exact)} for the counters that were off.
+        """
+        assert self.conn is not None
+        before = await self.fetch_stats()
+        vectors = " ".join(
+            f"INSERT INTO memory_stats(key, n) SELECT 'vectors:{t}', COUNT(*) FROM {t};"
+            for t in await self._float_vec_tables()
+        )
+        # One script runs as one call on the connection thread: no statement of another task
+        # lands between the delete and the inserts.
+        with span("sql.recount_stats"), self._busy():
+            await self.conn.executescript(f"""
+                BEGIN IMMEDIATE;
+                DELETE FROM memory_stats;
+                WITH t AS (
+                  SELECT IFNULL(SUM(deleted_at IS NULL), 0) AS live,
+                         IFNULL(SUM(deleted_at IS NOT NULL), 0) AS deleted,
+                         IFNULL(SUM(deleted_at IS NULL AND ttl_seconds IS NOT NULL), 0) AS ttl
+                  FROM memories
+                )
+                INSERT INTO memory_stats(key, n)
+                  SELECT 'live', live FROM t UNION ALL SELECT 'deleted', deleted FROM t
+                  UNION ALL SELECT 'ttl', ttl FROM t;
+                INSERT INTO memory_stats(key, n)
+                  SELECT 'cat:' || IFNULL(category, ''), COUNT(*) FROM memories
+                  WHERE deleted_at IS NULL GROUP BY 1;
+                {vectors}
+                COMMIT;
+            """)
+        after = await self.fetch_stats()
+        return {
+            k: (before.get(k, 0), after.get(k, 0))
+            for k in before.keys() | after.keys()
+            if before.get(k, 0) != after.get(k, 0)
+        }
+
+    async def fts_segments(self) -> Optional[int]:
+        r = await self.fetchone(
+            "fts_structure", f"SELECT block FROM {FTS_TABLE}_data WHERE id = 10"
+        )
+        return fts_segment_count(bytes(r["block"])) if r and r["block"] else None
+
+    # ---------------- Full-text index ----------------
+
+    async def _ensure_fts(self) -> None:
+        """Create memories_fts with the configured options on a new DB; note an existing one's."""
+        await self.execute(
+            "create_fts", _fts_table_sql(FTS_TABLE, settings.fts_tokenizer, settings.fts_prefix)
+        )
+        for sql in _fts_triggers_sql(FTS_TABLE):
+            await self.execute("create_fts", sql)
+        await self.commit()
+        await self._load_fts_options()
+
+    async def _load_fts_options(self) -> None:
+        r = await self.fetchone(
+            "fts_options", "SELECT sql FROM sqlite_master WHERE name = ?", (FTS_TABLE,)
+        )
+        self.fts_tokenize, self.fts_prefix = fts_options(r["sql"] if r else "")
+
+    def fts_wanted(self) -> tuple[str, str]:
+        return fts_options(_fts_table_sql(FTS_TABLE, settings.fts_tokenizer, settings.fts_prefix))
+
+    def fts_needs_migration(self) -> bool:
+        return (self.fts_tokenize, self.fts_prefix) != self.fts_wanted()
+
+    async def fts_build_state(self) -> Optional[dict]:
+        row = await self.fetchone("fts_build", "SELECT * FROM fts_build WHERE id = 1")
+        return dict(row) if row else None
+
+    async def begin_fts_build(self, tokenize: str, prefix: str) -> dict:
+        """
+        Return the in-progress rebuild for these options, or start one: an empty memories_fts_next
+        kept in sync by triggers for rows at or below the copy cursor. Rows above it are copied
+        in batches by copy_fts_batch.
+        """
+        state = await self.fts_build_state()
+        if state and (state["tokenize"], state["prefix"]) == (tokenize, prefix):
+            return state
+        for name in ("fts_next_ai", "fts_next_ad", "fts_next_au"):
+            await self.execute("fts_build_drop", f"DROP TRIGGER IF EXISTS {name}")
+        await self.execute("fts_build_drop", f"DROP TABLE IF EXISTS {FTS_NEXT_TABLE}")
+        await self.execute("fts_build_drop", "DELETE FROM fts_build")
+        await self.execute("fts_build_create", _fts_table_sql(FTS_NEXT_TABLE, tokenize, prefix))
+        await self.execute(
+            "fts_build_create",
+            "INSERT INTO fts_build(id, tokenize, prefix, cursor_rowid) VALUES (1, ?, ?, 0)",
+            (tokenize, prefix),
+        )
+        guard = "{rowid} <= (SELECT cursor_rowid FROM fts_build WHERE id = 1)"
+        for sql in _fts_triggers_sql(FTS_NEXT_TABLE, "fts_next", guard):
+            await self.execute("fts_build_create", sql)
+        await self.commit()
+        state = await self.fts_build_state()
+        assert state is not None
+        return state
+
+    async def copy_fts_batch(self, after_rowid: int, limit: int) -> Optional[int]:
+        """
+        Index the next `limit` rows into memories_fts_next and advance the cursor. None when
+        done.
+        """
+        r = await self.fetchone(
+            "fts_build_window",
+            "SELECT MAX(rowid) AS hi FROM"
+            " (SELECT rowid FROM memories WHERE rowid > ? ORDER BY rowid LIMIT ?)",
+            (after_rowid, limit),
+        )
+        if r is None or r["hi"] is None:
+            return None
+        hi = int(r["hi"])
+        await self.execute(
+            "fts_build_copy",
+            f"""
+            INSERT INTO {FTS_NEXT_TABLE}(rowid, content, keywords, category)
+            SELECT rowid, content, keywords, category FROM memories WHERE rowid > ? AND rowid <= ?
+            """,
+            (after_rowid, hi),
+        )
+        await self.execute(
+            "fts_build_checkpoint", "UPDATE fts_build SET cursor_rowid = ? WHERE id = 1", (hi,)
+        )
+        await self.commit()
+        return hi
+
+    async def finish_fts_build(self) -> None:
+        """Swap memories_fts_next in for memories_fts in one transaction."""
+        assert self.conn is not None
+        swap = [
+            "BEGIN IMMEDIATE",
+            *(f"DROP TRIGGER IF EXISTS {p}_{op}"
+              for p in ("fts_next", "fts") for op in ("ai", "ad", "au")),
+            f"DROP TABLE IF EXISTS {FTS_TABLE}",
+            f"ALTER TABLE {FTS_NEXT_TABLE} RENAME TO {FTS_TABLE}",
+            *_fts_triggers_sql(FTS_TABLE),
+            "DELETE FROM fts_build",
+            "COMMIT",
+        ]
+        with span("sql.fts_build_swap"):
+            # One script, so no other statement on this connection lands mid-swap.
+            await self.conn.executescript(";\n".join(swap) + ";")
+        await self._load_fts_options()
+
+    # ---------------- Embedding spaces ----------------
+
+    def _set_space(self, row: dict) -> None:
+        self.qvec_table = None  # exact search until the new space's quantized copy is ready
+        if self.index is not None:
+            # Release the engine's lock before the next space opens. Its rows are the old
+            # space's (or were replaced by a restore), so they are not saved.
+            self.index.discard()
+        self.index = None
+        self.embedding_version = int(row["version"])
+        self.embedding_model = str(row["model"])
+        self.embedding_dim = int(row["dim"])
+        self.vec_table = str(row["vec_table"])
+
+    async def _load_active_space(self) -> None:
+        sql = "SELECT * FROM embedding_spaces WHERE state = 'active' ORDER BY version DESC LIMIT 1"
+        row = await self.fetchone("active_space", sql)
+        if row is None:
+            # Pre-existing DBs: the legacy table is v1, built with the configured model.
+            await self.execute(
+                "bootstrap_space",
+                """
+                INSERT OR IGNORE INTO embedding_spaces(
+                  version, model, dim, vec_table, state, activated_at
+                ) VALUES (1, ?, ?, ?, 'active', CURRENT_TIMESTAMP)
+                """,
+                (settings.embedding_model, LEGACY_VEC_DIM, LEGACY_VEC_TABLE),
+            )
+            await self.commit()
+            row = await self.fetchone("active_space", sql)
+        assert row is not None
+        self._set_space(dict(row))
+        spaces = await self.fetchall(
+            "live_spaces",
+            "SELECT vec_table, dim FROM embedding_spaces WHERE state IN ('active', 'building')",
+        )
+        for s in spaces:
+            await self._ensure_vector_layout(s["vec_table"], int(s["dim"]))
+        await self._ensure_quantized_index()
+        await self._load_index()
+
+    async def _ensure_vector_layout(self, table: str, dim: int) -> None:
+        """
+        Convert a float table to the layout vec_compact asks for, after vector_quantization
+        was switched on or off. Going back to vec0 keeps the float16 rounding. Only the plain
+        table is ever renamed; the cleanup trigger is recreated around it.
+        """
+        r = await self.fetchone(
+            "vec_layout", "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table,),
+        )
+        if r is None or ("USING vec0" in r["sql"]) != self.vec_compact:
+            return
+        tmp = f"{table}_convert"
+        if self.vec_compact:
+            steps = [
+                _vec_table_sql(tmp, dim, compact=True),
+                f"INSERT INTO {tmp}(rowid, embedding)"
+                f" SELECT rowid, vec_f16(embedding) FROM {table}",
+                f"DROP TRIGGER IF EXISTS vec_ad_{table}",
+                f"DROP TABLE {table}",
+                f"ALTER TABLE {tmp} RENAME TO {table}",
+            ]
+        else:
+            steps = [
+                f"DROP TRIGGER IF EXISTS vec_ad_{table}",
+                f"ALTER TABLE {table} RENAME TO {tmp}",
+                _vec_table_sql(table, dim),
+                f"INSERT INTO {table}(rowid, embedding)"
+                f" SELECT rowid, vec_f32(embedding) FROM {tmp}",
+                f"DROP TABLE {tmp}",
+            ]
+        script = ["BEGIN", *steps, _vec_trigger_sql(table), "COMMIT"]
+        with span("sql.vec_layout", table=table, compact=self.vec_compact):
+            await self.conn.executescript(";\n".join(script) + ";")
+
+    async def _ensure_quantized_index(self) -> None:
+        """Create (and backfill from the float table) the quantized copy of the active space."""
+        for mode in QUANT_MODES:
+            if mode != self.quantization:  # mode changed: the old copy would go stale
+                await self.execute(
+                    "drop_qspace", f"DROP TRIGGER IF EXISTS vec_ad_{self.vec_table}_{mode}"
+                )
+                await self.execute("drop_qspace", f"DROP TABLE IF EXISTS {self.vec_table}_{mode}")
+        if self.quantization == "none":
+            await self.commit()
+            self.qvec_table = None
+            return
+        qtable = f"{self.vec_table}_{self.quantization}"
+        await self.execute(
+            "create_qspace", _quant_table_sql(qtable, self.quantization, self.embedding_dim)
+        )
+        await self.execute("create_qspace", _vec_trigger_sql(qtable, counted=False))
+        r = await self.fetchone("count_vectors", f"SELECT COUNT(*) AS c FROM {self.vec_table}")
+        n_float = r["c"]
+        n_quant = (await self.fetchone("count_vectors", f"SELECT COUNT(*) AS c FROM {qtable}"))["c"]
+        # Mirror writes from here on; the backfill below is queued ahead of any later KNN.
+        self.qvec_table = qtable
+        if n_quant < n_float:
+            # Refilled whole: an INSERT reading its own table goes through a temp table,
+            # which drops the int8/bit subtype sqlite-vec tags quantized vectors with.
+            await self.execute("backfill_qspace", f"DELETE FROM {qtable}")
+            await self.execute(
+                "backfill_qspace",
+                f"INSERT INTO {qtable}(rowid, embedding)"
+                f" SELECT rowid, {quantize_expr(self.quantization, self.vec_expr('embedding'))}"
+                f" FROM {self.vec_table}",
+            )
+        await self.commit()
+
+    async def active_space(self) -> dict:
+        row = await self.fetchone(
+            "active_space", "SELECT * FROM embedding_spaces WHERE version = ?",
+            (self.embedding_version,),
+        )
+        assert row is not None
+        return dict(row)
+
+    async def building_space(self) -> Optional[dict]:
+        row = await self.fetchone(
+            "building_space",
+            "SELECT * FROM embedding_spaces WHERE state = 'building' ORDER BY version DESC LIMIT 1",
+        )
+        return dict(row) if row else None
+
+    async def create_embedding_space(self, model: str, dim: int) -> dict:
+        """
+        Return the in-progress space for (model, dim), or create a new vec table for it.
+        Any other half-built space is abandoned.
+        """
+        row = await self.fetchone(
+            "building_space",
+            "SELECT * FROM embedding_spaces WHERE state = 'building' AND model = ? AND dim = ?",
+            (model, dim),
+        )
+        if row:
+            return dict(row)
+        await self.execute(
+            "retire_space", "UPDATE embedding_spaces SET state = 'retired' WHERE state = 'building'"
+        )
+        r = await self.fetchone(
+            "next_space", "SELECT COALESCE(MAX(version), 0) + 1 AS v FROM embedding_spaces"
+        )
+        version = int(r["v"])
+        table = f"memory_embeddings_v{version}"
+        await self.execute("create_space", _vec_table_sql(table, dim, compact=self.vec_compact))
+        await self.execute("create_space", _vec_trigger_sql(table))
+        await self.execute(
+            "create_space",
+            "INSERT INTO embedding_spaces(version, model, dim, vec_table, state)"
+            " VALUES (?, ?, ?, ?, 'building')",
+            (version, model, dim, table),
+        )
+        await self.commit()
+        row = await self.fetchone(
+            "building_space", "SELECT * FROM embedding_spaces WHERE version = ?", (version,)
+        )
+        assert row is not None
+        return dict(row)
+
+    async def fetch_unembedded_batch(
+        self, version: int, *, after_rowid: int = 0, limit: int = 64
+    ) -> list[tuple[int, str, str]]:
+        """Live rows whose vector is not in space `version` yet: [(rowid, content, hash)]."""
+        rows = await self.fetchall(
+            "unembedded_batch",
+            """
+            SELECT rowid, content, content_hash FROM memories
+            WHERE rowid > ? AND embedding_version != ? AND deleted_at IS NULL
+            ORDER BY rowid
+            LIMIT ?
+            """,
+            (after_rowid, version, limit),
+        )
+        return [(int(r["rowid"]), r["content"], r["content_hash"]) for r in rows]
+
+    async def count_unembedded(self, version: int) -> int:
+        r = await self.fetchone(
+            "count_unembedded",
+            "SELECT COUNT(*) AS c FROM memories"
+            " WHERE embedding_version != ? AND deleted_at IS NULL",
+            (version,),
+        )
+        return int(r["c"]) if r else 0
+
+    async def write_space_vectors(
+        self,
+        space: dict,
+        items: Sequence[tuple[int, str, Sequence[float]]],
+        *,
+        cursor_rowid: int | None = None,
+        dequeue: Sequence[int] = (),
+    ) -> int:
+        """
+        Upsert [(rowid, content_hash, vector)] into a space's vec table and stamp the rows with
+        its version. The stamp is skipped when content changed since the batch was read, so the
+        row is picked up again. Optionally checkpoints the build cursor, or removes `dequeue`
+        rowids from the embed queue, in the same commit.
+        """
+        table, version = space["vec_table"], int(space["version"])
+        stamped = 0
+        for rowid, content_hash, vec in items:
+            await self._write_vector(table, rowid, array("f", vec).tobytes(), replace=True)
+            cur = await self.execute(
+                "space_stamp",
+                "UPDATE memories SET embedding_version = ? WHERE rowid = ? AND content_hash IS ?",
+                (version, rowid, content_hash),
+            )
+            stamped += max(0, cur.rowcount)
+        if cursor_rowid is not None:
+            await self.execute(
+                "space_checkpoint",
+                "UPDATE embedding_spaces SET cursor_rowid = ? WHERE version = ?",
+                (cursor_rowid, version),
+            )
+        if dequeue:
+            await self.execute(
+                "embed_dequeue",
+                "DELETE FROM embed_queue WHERE rowid IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(dequeue)),),
+            )
+        await self.commit()
+        return stamped
+
+    async def fetch_embed_queue(self, limit: int = 64) -> list[dict]:
+        """
+        Oldest queued rows: [{rowid, content, content_hash, user_id, enqueued_at}]. Rows
+        soft-deleted since they were queued come back with content None.
+        """
+        rows = await self.fetchall(
+            "embed_queue_batch",
+            """
+            SELECT q.rowid AS rowid, q.enqueued_at AS enqueued_at,
+                   CASE WHEN m.deleted_at IS NULL THEN m.content END AS content,
+                   m.content_hash AS content_hash, m.user_id AS user_id
+            FROM embed_queue q
+            LEFT JOIN memories m ON m.rowid = q.rowid
+            ORDER BY q.rowid
+            LIMIT ?
+            """,
+            (limit,),
+        )
+        return [dict(r) for r in rows]
+
+    async def embed_queue_stats(self) -> dict:
+        """Queued rows and the age of the oldest, in seconds."""
+        r = await self.fetchone(
+            "embed_queue_stats", "SELECT COUNT(*) AS n, MIN(enqueued_at) AS oldest FROM embed_queue"
+        )
+        n, oldest = (int(r["n"]), r["oldest"]) if r else (0, None)
+        lag = round(time.time() - float(oldest), 3) if oldest is not None else 0.0
+        return {"pending": n, "lag_sec": lag}
+
+    async def activate_embedding_space(self, version: int) -> dict:
+        """Atomically make `version` the space recall reads from; the previous one is retired."""
+        await self.execute(
+            "activate_space",
+            "UPDATE embedding_spaces SET state = 'retired' WHERE state = 'active' AND version != ?",
+            (version,),
+        )
+        await self.execute(
+            "activate_space",
+            "UPDATE embedding_spaces SET state = 'active', activated_at = CURRENT_TIMESTAMP"
+            " WHERE version = ?",
+            (version,),
+        )
+        await self.commit()
+        await self._load_active_space()
+        return await self.active_space()
+
+    async def drop_retired_spaces(self) -> list[str]:
+        """Free retired vec tables. The legacy v1 table is emptied rather than dropped."""
+        rows = await self.fetchall(
+            "retired_spaces",
+            "SELECT version, vec_table FROM embedding_spaces WHERE state = 'retired'",
+        )
+        dropped: list[str] = []
+        for r in rows:
+            table = r["vec_table"]
+            if table == self.vec_table:
+                continue
+            await self.execute("drop_space", f"DROP TABLE IF EXISTS {table}")
+            for mode in QUANT_MODES:
+                await self.execute("drop_space", f"DROP TRIGGER IF EXISTS vec_ad_{table}_{mode}")
+                await self.execute("drop_space", f"DROP TABLE IF EXISTS {table}_{mode}")
+            if table == LEGACY_VEC_TABLE:
+                await self.execute(
+                    "drop_space", _vec_table_sql(table, LEGACY_VEC_DIM, compact=self.vec_compact)
+                )
+            else:
+                await self.execute("drop_space", f"DROP TRIGGER IF EXISTS vec_ad_{table}")
+            await self.execute(
+                "drop_space", "DELETE FROM embedding_spaces WHERE version = ?", (r["version"],)
+            )
+            await self.execute(
+                "drop_space", "DELETE FROM memory_stats WHERE key = ?", (f"vectors:{table}",)
+            )
+            dropped.append(table)
+        await self.commit()
+        return dropped
+
+    # ---------------- In-process vector index ----------------
+
+    async def _load_index(self) -> None:
+        """
+        Open the configured engine for the active space and catch it up with rows written
+        since it was last saved. An unbuilt IVF index waits for the background job; the
+        mmap store is a plain copy, so its writer fills it right away.
+        """
+        version, dim = self.embedding_version, self.embedding_dim
+        if self.vector_index == "ivf":
+            path = f"{self.db_path}.ivf.npz"
+            idx = await asyncio.to_thread(IVFIndex.open, path, version=version, dim=dim)
+        elif self.vector_index == "mmap":
+            base = f"{self.db_path}.vecs"
+            idx = await asyncio.to_thread(MmapVectorStore.open, base, version=version, dim=dim)
+        else:
+            return
+        self.index = idx
+        if isinstance(idx, MmapVectorStore) and not idx.readonly and not idx.ready:
+            await self.rebuild_index()
+        else:
+            await self.sync_index(force=True)
+
+    async def sync_index(self, *, force: bool = False) -> None:
+        """
+        Catch this process's index up with the other processes on the file, at most every
+        `index_sync_sec` unless forced. After a restore by another process the index is
+        loaded again. A follower (IVF: not the file's saver; mmap: not the matrix's writer)
+        tries to take the lock over, in case its holder is gone; an IVF follower reloads the
+        file when the saver rewrote it. Then the rows written since `covered` are added; an
+        mmap follower leaves that to the writer.
+        """
+        idx = self.index
+        if idx is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._index_synced < float(settings.index_sync_sec):
+            return
+        self._index_synced = now
+        token = await self._read_restore_token()
+        if token != self._restore_token:
+            # Another process restored a snapshot: load its space, FTS options and index.
+            self._restore_token = token
+            await self._load_fts_options()
+            await self._load_active_space()
+            return
+        if idx.readonly and idx.claim():
+            if isinstance(idx, MmapVectorStore) and not idx.ready:
+                await self.rebuild_index()
+                return
+        elif isinstance(idx, IVFIndex) and idx.readonly and idx.file_changed():
+            fresh = await asyncio.to_thread(
+                IVFIndex.load, idx.path, version=idx.version, dim=idx.dim
+            )
+            if fresh is not None and self.index is idx:
+                fresh.readonly = True
+                self.index = idx = fresh
+        if idx.ready and not (isinstance(idx, MmapVectorStore) and idx.readonly):
+            await self._catch_up_index(idx)
+
+    async def _read_restore_token(self) -> Optional[str]:
+        r = await self.fetchone("restore_token", "SELECT token FROM restores WHERE id = 1")
+        return None if r is None else str(r["token"])
+
+    async def _catch_up_index(self, idx: IVFIndex | MmapVectorStore) -> None:
+        """
+        Add the live vectors above `idx.covered` that it lacks, and move `covered` up to the
+        row before the oldest one still waiting in embed_queue: its vector (and those of later
+        rows queued by other processes) may land after this pass.
+        """
+        mark = await self._index_mark()
+        after = idx.covered
+        while after < mark:
+            chunk = await self.fetch_vector_chunk(after_rowid=after, upto_rowid=mark)
+            if not chunk:
+                break
+            for rowid, buf, user_id, category in chunk:
+                if rowid not in idx:
+                    idx.add(rowid, buf, user_id=user_id, category=category)
+            after = chunk[-1][0]
+        idx.covered = max(idx.covered, mark)
+
+    async def _index_mark(self) -> int:
+        """Highest rowid below which every row that will get a vector has one now."""
+        r = await self.fetchone(
+            "index_mark",
+            """
+            SELECT (SELECT MAX(rowid) FROM memories) AS hi,
+                   (SELECT MIN(rowid) FROM embed_queue) AS queued
+            """,
+        )
+        mark = int(r["hi"] or 0)
+        if r["queued"] is not None:
+            mark = min(mark, int(r["queued"]) - 1)
+        return mark
+
+    async def max_memory_rowid(self) -> int:
+        r = await self.fetchone("max_rowid", "SELECT MAX(rowid) AS m FROM memories")
+        return int(r["m"] or 0)
+
+    async def fetch_vector_chunk(
+        self, *, after_rowid: int = 0, upto_rowid: Optional[int] = None, limit: int = 20000
+    ) -> list[tuple[int, bytes, str, Optional[str]]]:
+        """
+        Live rows of the active space in rowid order, after `after_rowid` and up to
+        `upto_rowid`: [(rowid, float32 blob, user_id, category)].
+        """
+        rows = await self.fetchall(
+            "vector_chunk",
+            f"""
+            SELECT m.rowid AS rowid, {self.vec_expr()} AS embedding, m.user_id AS user_id,
+                   m.category AS category
+            FROM memories m JOIN {self.vec_table} v ON v.rowid = m.rowid
+            WHERE m.rowid > ? AND m.rowid <= ? AND m.deleted_at IS NULL
+            ORDER BY m.rowid
+            LIMIT ?
+            """,
+            (after_rowid, (1 << 63) - 1 if upto_rowid is None else upto_rowid, limit),
+        )
+        return [(int(r["rowid"]), bytes(r["embedding"]), r["user_id"], r["category"]) for r in rows]
+
+    async def index_needs_rebuild(self) -> bool:
+        """
+        IVF: unbuilt and big enough, grown well past its list count, or too much delta and
+        tombstones. mmap: too many dead slots in the append log.
+        """
+        idx = self.index
+        if idx is None or getattr(idx, "readonly", False):
+            return False
+        if isinstance(idx, MmapVectorStore):
+            return not idx.ready or idx.churn() > float(settings.ann_max_churn)
+        if not idx.ready:
+            r = await self.fetchone("count_vectors", f"SELECT COUNT(*) AS c FROM {self.vec_table}")
+            return int(r["c"]) >= int(settings.ann_min_rows)
+        n = idx.stats()["vectors"]
+        return idx.churn() > float(settings.ann_max_churn) or n > 4 * idx.nlist ** 2
+
+    async def rebuild_index(self) -> Optional[dict]:
+        """
+        Rebuild the engine from the active vec table off the event loop and swap it in.
+        Writes that land while building are journaled on the live index and replayed.
+        """
+        if self.index is None or getattr(self.index, "readonly", False):
+            return None
+        live, dim = self.index, self.embedding_dim
+        live.begin_journal()
+        mark = await self._index_mark()
+        try:
+            rowids: list[np.ndarray] = []
+            vecs: list[np.ndarray] = []
+            users: list[str] = []
+            cats: list[Optional[str]] = []
+            after = 0
+            while True:
+                chunk = await self.fetch_vector_chunk(after_rowid=after)
+                if not chunk:
+                    break
+                rowids.append(np.fromiter((c[0] for c in chunk), dtype=np.int64, count=len(chunk)))
+                buf = b"".join(c[1] for c in chunk)
+                vecs.append(np.frombuffer(buf, dtype=np.float32).reshape(-1, dim))
+                users.extend(c[2] for c in chunk)
+                cats.extend(c[3] for c in chunk)
+                after = chunk[-1][0]
+            built = await asyncio.to_thread(
+                live.rebuilt,
+                rowids=np.concatenate(rowids) if rowids else np.empty(0, np.int64),
+                vecs=np.concatenate(vecs) if vecs else np.empty((0, dim), np.float32),
+                users=users, cats=cats, nlist=int(settings.ivf_nlist),
+            )
+        finally:
+            ops = live.end_journal()
+        if self.index is not live:  # space switched while building
+            return None
+        built.replay(ops)
+        built.covered = max(live.covered, mark)
+        self.index = built
+        await asyncio.to_thread(built.save)
+        return built.stats()
+
+    async def save_index(self) -> None:
+        if self.index is not None and self.index.dirty:
+            await asyncio.to_thread(self.index.save)
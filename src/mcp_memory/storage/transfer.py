@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import struct
+import zlib
+from typing import Any, AsyncIterator, Optional
+
+import numpy as np
+
+from .. import json_codec
+from ..config import settings
+from ..obs.tracing import span
+from .sqlite_manager import MEMORY_COLUMNS, SQLiteManager
+
+# Stream layout: one JSON header line, then frames. A frame is _FRAME (tag, rows length,
+# vectors length) followed by zlib(NDJSON rows) and zlib(.npy float32 matrix); a row's "v"
+# is its line in the matrix, or null. A DONE frame ends the stream.
+EXPORT_MAGIC = "mcp-memory-export"
+EXPORT_FORMAT = 1
+EXPORT_COLUMNS = MEMORY_COLUMNS
+_FRAME = struct.Struct("<4sII")
+_ROWS, _DONE = b"ROWS", b"DONE"
+_ZLEVEL = 1  # vectors barely compress; favour speed
+
+
+def _encode_frame(rows: list[dict], dim: int) -> bytes:
+    lines, blobs = [], []
+    for r in rows:
+        blob = r.pop("embedding", None)
+        r.pop("rowid", None)
+        r["v"] = len(blobs) if blob is not None else None
+        if blob is not None:
+            blobs.append(blob)
+        lines.append(json.dumps(r, ensure_ascii=False))
+    mat = np.frombuffer(b"".join(blobs), dtype=np.float32).reshape(-1, dim)
+    npy = io.BytesIO()
+    np.save(npy, mat, allow_pickle=False)
+    zrows = zlib.compress("\n".join(lines).encode("utf-8"), _ZLEVEL)
+    zvecs = zlib.compress(npy.getvalue(), _ZLEVEL)
+    return _FRAME.pack(_ROWS, len(zrows), len(zvecs)) + zrows + zvecs
+
+
+def _keywords_json(v: Any) -> str:
+    """Keywords as a JSON array of strings: recall passes the stored text through unparsed."""
+    if isinstance(v, str):
+        try:
+            v = json.loads(v)
+        except ValueError:
+            v = []
+    return json_codec.dumps_str([str(k) for k in v] if isinstance(v, list) else [])
+
+
+def _decode_frame(zrows: bytes, zvecs: bytes) -> tuple[list[dict], np.ndarray]:
+    rows = [json.loads(line) for line in zlib.decompress(zrows).decode("utf-8").split("\n") if line]
+    for r in rows:
+        r["keywords"] = _keywords_json(r.get("keywords"))
+    vecs = np.load(io.BytesIO(zlib.decompress(zvecs)), allow_pickle=False)
+    return rows, vecs
+
+
+async def export_stream(
+    db: SQLiteManager, *, user_id: Optional[str] = None, chunk_rows: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Live memories (all users, or one; archived ones too) with their vectors from the active
+    space, as bytes.
+    """
+    header = {
+        "format": EXPORT_MAGIC, "version": EXPORT_FORMAT, "columns": list(EXPORT_COLUMNS),
+        "embedding_version": db.embedding_version, "model": db.embedding_model,
+        "dim": db.embedding_dim,
+    }
+    yield (json.dumps(header) + "\n").encode("utf-8")
+    limit, dim = int(chunk_rows or settings.export_chunk_rows), db.embedding_dim
+    # Archived memories follow the hot ones; their vectors only when they share the model.
+    tiers = [(db, True)] + ([(db.archive, db.archive_matches())] if db.archive is not None else [])
+    for tier, vectors in tiers:
+        after = 0
+        while True:
+            rows = await tier.fetch_export_chunk(
+                EXPORT_COLUMNS, after_rowid=after, limit=limit, user_id=user_id
+            )
+            if not rows:
+                break
+            after = rows[-1]["rowid"]
+            if not vectors:
+                for r in rows:
+                    r["embedding"] = None
+            with span("export.encode", n=len(rows)):
+                yield await asyncio.to_thread(_encode_frame, rows, dim)
+    yield _FRAME.pack(_DONE, 0, 0)
+
+
+class _Reader:
+    """readline/readexactly over an async iterator of byte chunks of any size."""
+
+    def __init__(self, chunks: AsyncIterator[bytes]) -> None:
+        self._it = chunks.__aiter__()
+        self._buf = bytearray()
+
+    async def _more(self) -> None:
+        try:
+            self._buf += await self._it.__anext__()
+        except StopAsyncIteration:
+            raise ValueError("export stream is truncated") from None
+
+    async def readline(self, limit: int = 1 << 20) -> bytes:
+        while (i := self._buf.find(b"\n")) < 0:
+            if len(self._buf) > limit:
+                raise ValueError("not an mcp-memory export")
+            await self._more()
+        out = bytes(self._buf[:i])
+        del self._buf[: i + 1]
+        return out
+
+    async def readexactly(self, n: int) -> bytes:
+        while len(self._buf) < n:
+            await self._more()
+        out = bytes(self._buf[:n])
+        del self._buf[:n]
+        return out
+
+
+async def import_stream(
+    db: SQLiteManager, chunks: AsyncIterator[bytes], *, user_id: Optional[str] = None
+) -> dict:
+    """
+    Bulk-load an export. Ids and content hashes already present are skipped. Vectors are kept
+    verbatim when the export's model and dim match the active space; otherwise rows are stored
+    without them and the re-embed job fills them in. FTS is rebuilt once at the end, so an
+    interrupted import is completed by running it again. Raises ValueError on a bad stream.
+    """
+    reader = _Reader(chunks)
+    try:
+        header = json.loads(await reader.readline())
+    except json.JSONDecodeError as e:
+        raise ValueError("not an mcp-memory export") from e
+    if header.get("format") != EXPORT_MAGIC:
+        raise ValueError("not an mcp-memory export")
+    if int(header.get("version", 0)) > EXPORT_FORMAT:
+        raise ValueError(
+            f"export format {header['version']} is newer than this server ({EXPORT_FORMAT})"
+        )
+    keep_vectors = (header.get("model") == db.embedding_model
+                    and int(header.get("dim", 0)) == db.embedding_dim)
+    stats = {"rows": 0, "inserted": 0, "vectors": 0, "vectors_kept": keep_vectors,
+             "source_model": header.get("model"),
+             "source_embedding_version": header.get("embedding_version")}
+    await db.begin_bulk_load()
+    try:
+        while True:
+            tag, nrows, nvecs = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+            if tag == _DONE:
+                break
+            if tag != _ROWS:
+                raise ValueError("corrupt export frame")
+            zrows, zvecs = await reader.readexactly(nrows), await reader.readexactly(nvecs)
+            with span("import.decode"):
+                rows, vecs = await asyncio.to_thread(_decode_frame, zrows, zvecs)
+            if user_id:
+                for r in rows:
+                    r["user_id"] = user_id
+            inserted, written = await db.bulk_insert_memories(
+                [{c: r.get(c) for c in EXPORT_COLUMNS} for r in rows],
+                [vecs[r["v"]].tobytes() if keep_vectors and r.get("v") is not None else None
+                 for r in rows],
+            )
+            stats["rows"] += len(rows)
+            stats["inserted"] += inserted
+            stats["vectors"] += written
+    finally:
+        await db.end_bulk_load()
+    return stats
+
+
+async def file_chunks(path: str, size: int = 1 << 20) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, size):
+            yield chunk
@@ -0,0 +1,214 @@
+from __future__ import annotations
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+from structlog import get_logger
+from .config import settings
+from .storage.sqlite_manager import SQLiteManager
+from .storage.redis_cache import RedisCache
+from .intelligence.embeddings import EmbeddingService
+from .background.worker import BackgroundWorker
+from .background.ingest import IngestEmbedder
+from .background.warmup import CacheWarmer
+from .obs.metrics import METRICS
+
+log = get_logger()
+
+_TENANT_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._@-]{0,127}$")
+
+def valid_tenant(user_id: str) -> bool:
+    """Tenant ids become file names, so they are restricted to a safe alphabet."""
+    return bool(_TENANT_RE.match(user_id or ""))
+
+@dataclass
+class Shard:
+    """One open DB file with its embedder, maintenance worker, embed-queue drainer and hot set."""
+    path: str
+    db: SQLiteManager
+    embed: EmbeddingService
+    worker: Optional[BackgroundWorker] = None
+    ingest: Optional[IngestEmbedder] = None
+    warmer: Optional[CacheWarmer] = None
+    last_used: float = field(default_factory=time.monotonic)
+    leases: int = 0
+
+@dataclass
+class Tenant:
+    """What a request for one user works with."""
+    user_id: str
+    db: SQLiteManager
+    cache: Optional[RedisCache]
+    embed: EmbeddingService
+
+class TenantRouter:
+    """
+    Maps user ids to DB files and keeps an LRU of open SQLiteManagers.
+
+    Unsharded, every tenant shares db_path (rows are told apart by user_id, as before).
+    Sharded, each tenant has shard_dir/<user_id>.db with its own write lock, vector index
+    and background worker; the default tenant keeps db_path. Shards unused for
+    tenant_idle_sec, or beyond tenant_max_open, are closed unless a request holds them.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache: Optional[RedisCache],
+        embed: EmbeddingService,
+        sharded: Optional[bool] = None,
+        background: Optional[bool] = None,
+    ) -> None:
+        self.cache = cache
+        self.sharded = settings.tenant_sharding if sharded is None else sharded
+        self.background = settings.enable_background if background is None else background
+        self.max_open = max(1, int(settings.tenant_max_open))
+        self.idle_sec = int(settings.tenant_idle_sec)
+        self._models: dict[str, EmbeddingService] = {embed.model_name: embed}
+        self._shards: OrderedDict[str, Shard] = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> Shard:
+        """Open the default tenant, and start closing idle shards when sharded."""
+        shard = await self._shard(self.path_for(settings.user_id))
+        if self.sharded and self.idle_sec > 0:
+            self._reaper = asyncio.create_task(self._reap_idle(), name="tenant_reaper")
+        return shard
+
+    async def close(self) -> None:
+        if self._reaper:
+            self._reaper.cancel()
+            try:
+                await self._reaper
+            except asyncio.CancelledError:
+                pass
+            self._reaper = None
+        async with self._lock:
+            while self._shards:
+                _, shard = self._shards.popitem(last=False)
+                await self._close_shard(shard)
+
+    # ---------- routing ----------
+
+    def path_for(self, user_id: str) -> str:
+        if not self.sharded or user_id == settings.user_id:
+            return os.path.expanduser(settings.db_path)
+        return os.path.join(os.path.expanduser(settings.shard_dir), f"{user_id}.db")
+
+    @asynccontextmanager
+    async def tenant(self, user_id: Optional[str] = None) -> AsyncIterator[Tenant]:
+        """The tenant's DB, held open for the duration. Raises ValueError for a bad user id."""
+        user_id = user_id or settings.user_id
+        if not valid_tenant(user_id):
+            raise ValueError("invalid user_id")
+        shard = await self._shard(self.path_for(user_id))
+        shard.leases += 1
+        try:
+            cache = self.cache.for_user(user_id) if self.cache else None
+            yield Tenant(user_id=user_id, db=shard.db, cache=cache, embed=shard.embed)
+        finally:
+            shard.leases -= 1
+            shard.last_used = time.monotonic()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "sharded": self.sharded,
+            "open": len(self._shards),
+            "max_open": self.max_open,
+            "shards": [
+                {"path": s.path, "leases": s.leases, "idle_sec": round(now - s.last_used, 1),
+                 "leader": s.worker.lease.leading if s.worker and s.worker.lease else None}
+                for s in self._shards.values()
+            ],
+        }
+
+    # ---------- shards ----------
+
+    async def _shard(self, path: str) -> Shard:
+        shard = self._shards.get(path)
+        if shard is None:
+            async with self._lock:
+                shard = self._shards.get(path)
+                if shard is None:
+                    await self._make_room()
+                    shard = await self._open(path)
+                    self._shards[path] = shard
+        self._shards.move_to_end(path)
+        shard.last_used = time.monotonic()
+        return shard
+
+    def _embedder(self, model: str) -> EmbeddingService:
+        """
+        A tenant's own EmbeddingService sharing the loaded model of its name, so a tenant's
+        re-embed job can switch its model without switching anyone else's.
+        """
+        shared = self._models.get(model)
+        if shared is None:
+            shared = self._models[model] = EmbeddingService(model_name=model, warmup=True)
+        own = EmbeddingService(model_name=model, cache=self.cache)
+        own.adopt(shared)
+        return own
+
+    async def _open(self, path: str) -> Shard:
+        db = SQLiteManager(path)
+        await db.initialize()
+        embed = self._embedder(db.embedding_model)
+        if db.embedding_model != settings.embedding_model:
+            log.warning("embedding_model_migration_pending", db=path, active=db.embedding_model,
+                        configured=settings.embedding_model, bg=self.background)
+        worker = None
+        if self.background:
+            jitter = self.idle_sec / 2 if self.sharded else 0.0
+            worker = BackgroundWorker(db, embed, jitter_sec=jitter)
+            await worker.start()
+        # Always on when stores may queue: queued rows need a vector even without background.
+        ingest = None
+        if settings.ingest_async or (await db.embed_queue_stats())["pending"]:
+            ingest = IngestEmbedder(db, embed, cache=self.cache)
+            await ingest.start()
+        warmer = CacheWarmer(db, embed, cache=self.cache, lease=worker.lease if worker else None)
+        await warmer.start(warm=settings.warm_on_start)
+        await METRICS.inc("tenant_opens_total")
+        log.info("tenant_open", db=path, open=len(self._shards) + 1)
+        return Shard(path=path, db=db, embed=embed, worker=worker, ingest=ingest, warmer=warmer)
+
+    async def _close_shard(self, shard: Shard) -> None:
+        if shard.warmer:
+            await shard.warmer.stop()
+        if shard.ingest:
+            await shard.ingest.stop()
+        if shard.worker:
+            await shard.worker.stop()
+        await shard.db.close()
+        await METRICS.inc("tenant_closes_total")
+        log.info("tenant_close", db=shard.path)
+
+    async def _make_room(self) -> None:
+        """Close least recently used idle shards until one more fits (held shards are kept)."""
+        default = self.path_for(settings.user_id)
+        for path in list(self._shards):
+            if len(self._shards) < self.max_open:
+                return
+            shard = self._shards[path]
+            if shard.leases == 0 and path != default:
+                del self._shards[path]
+                await self._close_shard(shard)
+
+    async def _reap_idle(self) -> None:
+        default = self.path_for(settings.user_id)
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_sec / 4))
+            cutoff = time.monotonic() - self.idle_sec
+            async with self._lock:
+                for path, shard in list(self._shards.items()):
+                    if path != default and shard.leases == 0 and shard.last_used < cutoff:
+                        del self._shards[path]
+                        await self._close_shard(shard)
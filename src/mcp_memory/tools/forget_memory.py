@@ -4,7 +4,9 @@ from ..storage.sqlite_manager import SQLiteManager
 from ..storage.redis_cache import RedisCache
 from ..intelligence.embeddings import EmbeddingService
 from .recall_memory import recall_memory_tool
+from ..obs.tracing import traced
 
+@traced("tool.forget_memory")
 async def forget_memory_tool(
     *,
     db: SQLiteManager,
@@ -22,7 +24,8 @@ async def forget_memory_tool(
     if memory_id:
         ids = [memory_id]
     else:
-        res = await recall_memory_tool(db=db, cache=cache, embed=embed, query=query or "", user_id=user_id, limit=preview_limit)
+        res = await recall_memory_tool(db=db, cache=cache, embed=embed, query=query or "",
+                                       user_id=user_id, limit=preview_limit, fields="ids")
         ids = [r["id"] for r in res["answers"]]
         if not confirm:
             return {"to_delete": ids, "confirm": False}
@@ -0,0 +1,33 @@
+from __future__ import annotations
+from ..storage.sqlite_manager import SQLiteManager
+from .recall_memory import _coerce_keywords
+from ..obs.tracing import traced
+
+@traced("tool.get_memory")
+async def get_memory_tool(
+    *,
+    db: SQLiteManager,
+    memory_id: str,
+    user_id: str = "default",
+    raw_json: bool = False,
+) -> dict:
+    """
+    Full content for one id, e.g. after a snippet recall. Counts as an access, and moves an
+    archived memory back to the hot tier.
+    """
+    if not memory_id:
+        return {"success": False, "message": "Provide memory_id"}
+    tier = db
+    row = await db.fetch_one_by_id(memory_id)
+    if row is None and db.archive is not None:
+        # Ownership first: another user's id must not move between tiers.
+        row = await db.archive.fetch_one_by_id(memory_id)
+        if row is not None and row.get("user_id") == user_id:
+            if await db.promote([memory_id]):
+                row = await db.fetch_one_by_id(memory_id)
+            else:  # its content is hot under another id, so it stays archived
+                tier = db.archive
+    if row is None or row.get("user_id") != user_id:
+        return {"success": False, "message": "not found"}
+    await tier.bump_access([memory_id])
+    return _coerce_keywords(row, raw_json)
@@ -2,13 +2,59 @@ from __future__ import annotations
 import os
 from ..storage.sqlite_manager import SQLiteManager
 from ..storage.redis_cache import RedisCache
+from ..obs.sql_profile import SQL_PROFILER
+from ..obs.tracing import traced
 
-async def memory_health_tool(*, db: SQLiteManager, cache: RedisCache | None, db_path: str) -> dict:
-    assert db.conn is not None
-    cur = await db.conn.execute("SELECT COUNT(*) AS c FROM memories WHERE deleted_at IS NULL")
-    c = (await cur.fetchone())["c"]
-    cur = await db.conn.execute("SELECT COUNT(*) AS c FROM memory_embeddings")
-    ev = (await cur.fetchone())["c"]
-    size_mb = round(os.path.getsize(os.path.expanduser(db_path)) / (1024 * 1024), 2) if os.path.exists(os.path.expanduser(db_path)) else 0.0
+def _mb(path: str) -> float:
+    return round(os.path.getsize(path) / (1024 * 1024), 2) if os.path.exists(path) else 0.0
+
+@traced("tool.memory_health")
+async def memory_health_tool(
+    *, db: SQLiteManager, cache: RedisCache | None, db_path: str, exact: bool = False
+) -> dict:
+    """
+    Counts come from the memory_stats counters, so a health check costs the same at any size.
+    `exact` recounts them from the tables first (full scans) and reports any `drift`.
+    """
+    drift = await db.recount_stats() if exact else None
+    stats = await db.fetch_stats()
+    path = os.path.expanduser(db_path)
     lw = await cache.last_write_ts() if cache else "disabled"
-    return {"count": int(c), "embeddings": int(ev), "db_mb": size_mb, "last_write": lw}
+    out = {"count": stats.get("live", 0), "embeddings": stats.get(f"vectors:{db.vec_table}", 0),
+           "db_mb": _mb(path), "wal_mb": _mb(path + "-wal"), "last_write": lw,
+           "embedding_space": {"version": db.embedding_version, "model": db.embedding_model,
+                               "dim": db.embedding_dim}}
+    out["stats"] = {
+        "live": stats.get("live", 0), "deleted": stats.get("deleted", 0),
+        "ttl_pending": stats.get("ttl", 0),
+        "categories": {k[4:]: n for k, n in sorted(stats.items()) if k.startswith("cat:") and n},
+    }
+    if drift is not None:
+        out["stats"]["drift"] = {k: {"counter": a, "exact": b}
+                                 for k, (a, b) in sorted(drift.items())}
+    out["cache"] = cache.stats() if cache else {"state": "disabled"}
+    out["ingest_queue"] = await db.embed_queue_stats()
+    building = await db.building_space()
+    if building:
+        out["reembed"] = {"version": building["version"], "model": building["model"],
+                          "cursor_rowid": building["cursor_rowid"],
+                          "remaining": await db.count_unembedded(int(building["version"]))}
+    out["fts"] = {"tokenize": db.fts_tokenize, "prefix": db.fts_prefix,
+                  "segments": await db.fts_segments()}
+    fts_build = await db.fts_build_state()
+    if fts_build:
+        out["fts"]["migration"] = {"tokenize": fts_build["tokenize"], "prefix": fts_build["prefix"],
+                                   "cursor_rowid": fts_build["cursor_rowid"]}
+    if db.archive is not None:
+        if exact:
+            await db.archive.recount_stats()
+        cold = await db.archive.fetch_stats()
+        out["archive"] = {"count": cold.get("live", 0),
+                          "embeddings": cold.get(f"vectors:{db.archive.vec_table}", 0),
+                          "db_mb": _mb(db.archive.db_path), "model": db.archive.embedding_model,
+                          "searchable_by_vector": db.archive_matches()}
+    if db.index is not None:
+        out["vector_index"] = db.index.stats()
+    if SQL_PROFILER.enabled:
+        out["slow_queries"] = SQL_PROFILER.slowest(10)
+    return out
@@ -1,22 +1,346 @@
 from __future__ import annotations
-import json, time
-from typing import Optional, List, Tuple, Dict
-from ..storage.sqlite_manager import SQLiteManager
+import asyncio, base64, hashlib, json, math, re, time
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, List, Sequence, Tuple, Dict
+from ..config import settings
+from ..storage.sqlite_manager import SQLiteManager, Window
 from ..storage.redis_cache import RedisCache
 from ..intelligence.embeddings import EmbeddingService
-from ..search.vector_search import vector_topk
-from ..search.text_search import text_topk
+from ..search.vector_search import vector_topk, window_topk
+from ..search.text_search import text_snippets, text_topk
 from ..search.hybrid_search import rrf_fuse, composite_score
+from ..obs.tracing import timed, traced
+from .. import json_codec
 
-def _coerce_keywords(row: dict) -> dict:
+# What a recall returns per answer, cheapest first. Only snippet/full read content.
+PROJECTIONS = ("ids", "scores", "snippet", "full")
+
+Ranked = List[Tuple[str, float]]
+
+def _coerce_keywords(row: dict, raw_json: bool = False) -> dict:
+    """Decode the stored keywords; with `raw_json`, hand them to json_codec.dumps as stored."""
     v = row.get("keywords")
-    if isinstance(v, str):
+    if raw_json:
+        row["keywords"] = json_codec.raw_json(v)
+    elif isinstance(v, str):
         try:
             row["keywords"] = json.loads(v)
         except Exception:
             row["keywords"] = []
     return row
 
+def _search_type(category_filter: Optional[str], archive: bool = False) -> str:
+    """Query-cache namespace; filtered and unfiltered rankings must not share an entry."""
+    base = f"hybrid:cat:{category_filter}" if category_filter else "hybrid"
+    return f"{base}:archive" if archive else base
+
+# ---------- cursors ----------
+
+def _cursor_key(
+    query: str, category_filter: Optional[str], since: Any = None, until: Any = None,
+    include_archive: bool = False,
+) -> str:
+    # The window as the caller wrote it: a relative bound ("7d") keeps its cursors valid.
+    scope = f"\x00{since}\x00{until}" if since or until else ""
+    if include_archive:
+        scope += "\x00archive"  # another ranked list: its offsets mean other rows
+    key = f"{category_filter or ''}\x00{query}{scope}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+def encode_cursor(
+    query: str, category_filter: Optional[str], offset: int, *, since: Any = None,
+    until: Any = None, include_archive: bool = False,
+) -> str:
+    key = _cursor_key(query, category_filter, since, until, include_archive)
+    raw = json.dumps({"o": int(offset), "k": key}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(
+    cursor: Optional[str], query: str, category_filter: Optional[str], *, since: Any = None,
+    until: Any = None, include_archive: bool = False,
+) -> int:
+    """Offset into the ranked list. Raises ValueError for garbage or a cursor from another query."""
+    if not cursor:
+        return 0
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset, key = int(data["o"]), str(data["k"])
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if key != _cursor_key(query, category_filter, since, until, include_archive) or offset < 0:
+        raise ValueError("cursor does not belong to this query")
+    return offset
+
+# ---------- time windows ----------
+
+_AGE = re.compile(r"(\d+(?:\.\d+)?)\s*([mhdw])")
+_AGE_SEC = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _when(value: Any, *, now: float, end: bool) -> Optional[str]:
+    """
+    One window bound as stored created_at text (UTC). Takes unix seconds, ISO 8601 (naive
+    means UTC) or an age like "36h" / "7d" (that long before now). A bare date as the end
+    bound includes that whole day.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        ts = float(value)
+    else:
+        text = str(value).strip().lower()
+        if m := _AGE.fullmatch(text):
+            ts = now - float(m[1]) * _AGE_SEC[m[2]]
+        else:
+            try:
+                ts = float(text)
+            except ValueError:
+                try:
+                    dt = datetime.fromisoformat(text.upper())
+                except ValueError as e:
+                    raise ValueError(
+                        f"unreadable time {value!r}: use ISO 8601, unix seconds or an age like 7d"
+                    ) from e
+                if dt.tzinfo is None:
+                    dt = dt.replace(tzinfo=timezone.utc)
+                if end and _DATE.fullmatch(text):
+                    dt += timedelta(days=1)
+                ts = dt.timestamp()
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts))
+
+def parse_window(since: Any = None, until: Any = None) -> Optional[Window]:
+    """The [since, until) created_at range, None when both ends are open. Raises ValueError."""
+    now = time.time()
+    lo, hi = _when(since, now=now, end=False), _when(until, now=now, end=True)
+    if lo is None and hi is None:
+        return None
+    if lo and hi and lo >= hi:
+        raise ValueError("since must be before until")
+    return lo, hi
+
+async def _recent(
+    db: SQLiteManager, *, user_id: str, window: Window, category_filter: Optional[str],
+    half_life_days: int,
+) -> Ranked:
+    """A window without a query: its memories newest first, scored by the recency term alone."""
+    rows = await db.fetch_window(user_id, window, category=category_filter,
+                                 limit=int(settings.time_window_scan_max))
+    now, scale = time.time(), 86400.0 * half_life_days
+    return [(r["id"], math.exp(-max(0.0, now - float(r["created_at_ts"])) / scale)) for r in rows]
+
+# ---------- ranking ----------
+
+async def _retrieve(
+    db: SQLiteManager,
+    qvec: List[float],
+    query: str,
+    *,
+    user_id: str,
+    category_filter: Optional[str],
+    timings: Dict[str, float],
+    window: Optional[Window] = None,
+) -> Tuple[Ranked, Ranked]:
+    """Vector and FTS candidate lists for one query, among memories created in `window` if set."""
+    with timed(timings, "vector_ms", "recall.vector"):
+        if window:
+            v = await window_topk(db, qvec, user_id=user_id, k=50, window=window,
+                                  category=category_filter)
+        else:
+            v = await vector_topk(db, qvec, user_id=user_id, k=50, category=category_filter)
+    with timed(timings, "text_ms", "recall.text"):
+        t = await text_topk(db, query, user_id=user_id, k=50, window=window)
+    return v, t
+
+def _rank(
+    v: Ranked,
+    tlist: Ranked,
+    meta: Dict[str, Dict],
+    *,
+    rrf_k: int,
+    half_life_days: int,
+    category_filter: Optional[str],
+) -> Ranked:
+    fused = rrf_fuse([mid for mid, _ in v], [mid for mid, _ in tlist], k=rrf_k)
+    cos_map: Dict[str, float] = {mid: score for mid, score in v}
+    comp = composite_score(fused.keys(), cos_map=cos_map, meta=meta, half_life_days=half_life_days)
+    ranked = sorted(comp.items(), key=lambda x: x[1], reverse=True)
+    if category_filter:
+        ranked = [(mid, s) for mid, s in ranked
+                  if meta.get(mid, {}).get("category") == category_filter]
+    return ranked
+
+def _too_weak(v: Ranked, ranked: Ranked) -> bool:
+    """Hot answers worth a look in the archive: none, or no vector hit close enough."""
+    return not ranked or (bool(v) and v[0][1] < float(settings.archive_fallthrough_cos))
+
+async def _with_archive(
+    db: SQLiteManager,
+    qvec: Optional[List[float]],
+    query: str,
+    ranked: Ranked,
+    *,
+    user_id: str,
+    category_filter: Optional[str],
+    rrf_k: int,
+    half_life_days: int,
+    timings: Dict[str, float],
+    window: Optional[Window] = None,
+) -> Ranked:
+    """
+    `ranked` merged with the same ranking over the archive; an id in both tiers keeps its hot
+    score. Archived vectors from another model (re-embed pending) are searched by text only.
+    """
+    archive = db.archive
+    assert archive is not None
+    with timed(timings, "archive_ms", "recall.archive"):
+        if qvec is not None and db.archive_matches():
+            v, tlist = await _retrieve(archive, qvec, query, user_id=user_id,
+                                       category_filter=category_filter, timings={}, window=window)
+        else:
+            v, tlist = [], await text_topk(archive, query, user_id=user_id, k=50, window=window)
+        ids = {mid for mid, _ in v} | {mid for mid, _ in tlist}
+        meta = await archive.fetch_meta_for_ids(list(ids))
+        cold = _rank(v, tlist, meta, rrf_k=rrf_k, half_life_days=half_life_days,
+                     category_filter=category_filter)
+    hot = {mid for mid, _ in ranked}
+    merged = [*ranked, *((mid, s) for mid, s in cold if mid not in hot)]
+    return sorted(merged, key=lambda x: x[1], reverse=True)
+
+async def _ranking(
+    *,
+    db: SQLiteManager,
+    cache: Optional[RedisCache],
+    embed: EmbeddingService,
+    query: str,
+    user_id: str,
+    category_filter: Optional[str],
+    rrf_k: int,
+    recency_half_life_days: int,
+    timings: Dict[str, float],
+    text_only: bool = False,
+    degraded: Optional[List[str]] = None,
+    window: Optional[Window] = None,
+    include_archive: bool = False,
+) -> Tuple[Ranked, bool]:
+    """
+    The full ranked [(id, score)] list for a query, from the query cache when possible.
+    On a miss, `text_only` skips the embedder and vector search; that ranking is not cached.
+    Rankings over a `window` are neither: its bounds often move with the clock ("7d").
+    The archive is searched too when asked (`include_archive`) or when the hot tier has
+    nothing close (see _too_weak).
+    """
+    if window:
+        cache = None
+        if not query.strip():
+            with timed(timings, "window_ms", "recall.window"):
+                return await _recent(db, user_id=user_id, window=window,
+                                     category_filter=category_filter,
+                                     half_life_days=recency_half_life_days), False
+    search_type = _search_type(category_filter, include_archive)
+    with timed(timings, "cache_lookup_ms", "recall.cache_lookup"):
+        cached = await cache.get_query_ranking(query, search_type) if cache else None
+    if cached:
+        return cached, True
+
+    qvec: Optional[List[float]] = None
+    if text_only:
+        if degraded is not None:
+            degraded.append("text_only")
+        v: Ranked = []
+        with timed(timings, "text_ms", "recall.text"):
+            tlist = await text_topk(db, query, user_id=user_id, k=50, window=window)
+    else:
+        with timed(timings, "embed_ms", "recall.embed"):
+            qvec = await embed.embed_one(query)
+        v, tlist = await _retrieve(db, qvec, query, user_id=user_id,
+                                   category_filter=category_filter, timings=timings, window=window)
+
+    with timed(timings, "fuse_rescore_ms", "recall.fuse_rescore"):
+        fused_ids = {mid for mid, _ in v} | {mid for mid, _ in tlist}
+        meta = await db.fetch_meta_for_ids(list(fused_ids))
+        ranked = _rank(v, tlist, meta, rrf_k=rrf_k, half_life_days=recency_half_life_days,
+                       category_filter=category_filter)
+    if db.archive is not None and (include_archive or _too_weak(v, ranked)):
+        ranked = await _with_archive(db, qvec, query, ranked, user_id=user_id,
+                                     category_filter=category_filter, rrf_k=rrf_k,
+                                     half_life_days=recency_half_life_days, timings=timings,
+                                     window=window)
+
+    with timed(timings, "cache_write_ms", "recall.cache_write"):
+        if cache and not text_only:
+            await cache.set_query_ranking(query, search_type, ranked)
+    return ranked, False
+
+# ---------- degradation ----------
+
+def _remaining_ms(deadline: Optional[float]) -> float:
+    return float("inf") if deadline is None else (deadline - time.perf_counter()) * 1000.0
+
+def _db_busy(db: SQLiteManager) -> bool:
+    return db.inflight >= int(settings.degrade_db_inflight)
+
+def _embed_too_slow(embed: EmbeddingService, deadline: Optional[float]) -> bool:
+    """Deep embedder queue, or (with a deadline) an embed likely to eat over half the time left."""
+    if embed.pending >= int(settings.degrade_embed_queue):
+        return True
+    return deadline is not None and embed.expected_wait_ms() > _remaining_ms(deadline) / 2
+
+# ---------- projection ----------
+
+async def _project(
+    db: SQLiteManager, page: Ranked, fields: str, *, query: Optional[str] = None,
+    raw_json: bool = False,
+) -> List[dict]:
+    """
+    Answers for a page of ranked ids. Returning content counts as an access, and moves
+    archived answers back to the hot tier.
+    Snippets are FTS excerpts around `query`'s matches, else the leading window of the text.
+    """
+    if fields == "ids":
+        return [{"id": mid} for mid, _ in page]
+    if fields == "scores":
+        return [{"id": mid, "score": s} for mid, s in page]
+    ids = [mid for mid, _ in page]
+    if fields == "snippet":
+        chars = int(settings.snippet_chars)
+        rows = await _hydrate(db, ids, lambda i: db.fetch_snippets_by_ids_ordered(i, chars=chars))
+        if query:
+            excerpts = await text_snippets(db, query, ids, tokens=int(settings.snippet_tokens))
+            _apply_excerpts(rows, excerpts)
+    else:
+        full = await _hydrate(db, ids, db.fetch_many_by_ids_ordered)
+        rows = [_coerce_keywords(r, raw_json) for r in full]
+    scores = dict(page)
+    for r in rows:
+        r["score"] = scores.get(r["id"])
+    await db.bump_access([r["id"] for r in rows])
+    return rows
+
+async def _hydrate(
+    db: SQLiteManager, ids: List[str], fetch: Callable[[List[str]], Awaitable[List[dict]]]
+) -> List[dict]:
+    """`fetch(ids)` from the hot tier, after promoting any of them that only the archive holds."""
+    rows = await fetch(ids)
+    if db.archive is None or len(rows) == len(set(ids)):
+        return rows
+    have = {r["id"] for r in rows}
+    return await fetch(ids) if await db.promote([mid for mid in ids if mid not in have]) else rows
+
+def _apply_excerpts(rows: List[dict], excerpts: Dict[str, str]) -> None:
+    for r in rows:
+        hit = excerpts.get(r["id"])
+        r["highlighted"] = hit is not None
+        if hit is not None:
+            r["snippet"] = hit
+
+def _bad_request(fields: str) -> Optional[dict]:
+    if fields not in PROJECTIONS:
+        return {"success": False, "message": f"fields must be one of {', '.join(PROJECTIONS)}"}
+    return None
+
+# ---------- tools ----------
+
+@traced("tool.recall_memory")
 async def recall_memory_tool(
     *,
     db: SQLiteManager,
@@ -28,68 +352,259 @@ async def recall_memory_tool(
     limit: int = 10,
     rrf_k: int = 60,
     recency_half_life_days: int = 14,
+    cursor: Optional[str] = None,
+    fields: str = "full",
+    deadline_ms: Optional[float] = None,
+    raw_json: bool = False,
+    since: Any = None,
+    until: Any = None,
+    include_archive: bool = False,
 ) -> dict:
+    """
+    One page of answers. `next_cursor` (when set) fetches the next page of the same ranking,
+    served from the query cache while nothing has been written.
+
+    `since`/`until` (unix seconds, ISO 8601 or an age like "7d") keep the memories created in
+    that range; with an empty `query` they are listed newest first. A window of at most
+    `time_window_scan_max` rows is scored row by row, so it costs what the window holds.
+
+    With tiering, archived memories are searched when `include_archive` is set or the hot
+    tier has nothing close; returning one moves it back to the hot tier.
+
+    Under load the answer degrades rather than waits, and `degraded` lists what was given up:
+    `cached_only` (DB busy: the cached ranking or nothing, without content), `text_only`
+    (embedder backed up, or too slow for `deadline_ms`: no vector search), `scores_only`
+    (deadline spent before hydration: ids and scores without content).
+
+    `raw_json` leaves stored JSON (keywords) encoded, for a caller that serializes the result
+    with json_codec.dumps.
+    """
+    if (err := _bad_request(fields)) is not None:
+        return err
+    scope = {"since": since, "until": until, "include_archive": include_archive}
+    try:
+        offset = decode_cursor(cursor, query, category_filter, **scope)
+        window = parse_window(since, until)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    if window is None:
+        db.note_query(user_id, query, category_filter)
     timings: Dict[str, float] = {}
+    degraded: List[str] = []
     t0 = time.perf_counter()
+    deadline = t0 + float(deadline_ms) / 1000.0 if deadline_ms else None
 
-    # try query cache
-    t = time.perf_counter()
-    cached_ids = await (cache.get_query_ids(query, "hybrid") if cache else None)
-    timings["cache_lookup_ms"] = (time.perf_counter() - t) * 1000.0
-    if cached_ids:
-        t = time.perf_counter()
-        rows = await db.fetch_many_by_ids_ordered(cached_ids[:limit])
-        rows = [_coerce_keywords(r) for r in rows]
-        await db.bump_access([r["id"] for r in rows])
-        timings["db_hydrate_ms"] = (time.perf_counter() - t) * 1000.0
-        timings["total_ms"] = (time.perf_counter() - t0) * 1000.0
-        return {"answers": rows, "cached": True, "timings_ms": timings}
-
-    # embed
-    t = time.perf_counter()
-    qvec = await embed.embed_one(query)
-    timings["embed_ms"] = (time.perf_counter() - t) * 1000.0
-
-    # vector
-    t = time.perf_counter()
-    v: List[Tuple[str, float]] = await vector_topk(db, qvec, user_id=user_id, k=50)
-    timings["vector_ms"] = (time.perf_counter() - t) * 1000.0
-
-    # text
-    t = time.perf_counter()
-    tlist: List[Tuple[str, float]] = await text_topk(db, query, user_id=user_id, k=50)
-    timings["text_ms"] = (time.perf_counter() - t) * 1000.0
-
-    # fuse + rescore
-    t = time.perf_counter()
-    vec_ids = [mid for mid, _ in v]
-    txt_ids = [mid for mid, _ in tlist]
-    fused = rrf_fuse(vec_ids, txt_ids, k=rrf_k)
-    cos_map: Dict[str, float] = {mid: score for mid, score in v}
-    meta = await db.fetch_meta_for_ids(list(fused.keys()))
-    comp = composite_score(fused.keys(), cos_map=cos_map, meta=meta, half_life_days=recency_half_life_days)
-    ranked_ids = [mid for mid, _ in sorted(comp.items(), key=lambda x: x[1], reverse=True)]
-    timings["fuse_rescore_ms"] = (time.perf_counter() - t) * 1000.0
+    if _db_busy(db):
+        degraded.append("cached_only")
+        with timed(timings, "cache_lookup_ms", "recall.cache_lookup"):
+            search_type = _search_type(category_filter, include_archive)
+            hit = (None if window or not cache
+                   else await cache.get_query_ranking(query, search_type))
+        ranked, cached = hit or [], bool(hit)
+    else:
+        ranked, cached = await _ranking(
+            db=db, cache=cache, embed=embed, query=query, user_id=user_id,
+            category_filter=category_filter, rrf_k=rrf_k,
+            recency_half_life_days=recency_half_life_days, timings=timings,
+            text_only=_embed_too_slow(embed, deadline), degraded=degraded, window=window,
+            include_archive=include_archive,
+        )
+    page = ranked[offset : offset + limit]
+    end = offset + len(page)
+    next_cursor = (encode_cursor(query, category_filter, end, **scope)
+                   if end < len(ranked) else None)
 
-    # optional category filter after ranking
-    if category_filter:
-        t = time.perf_counter()
-        rows_full = await db.fetch_many_by_ids_ordered(ranked_ids)
-        ranked_ids = [r["id"] for r in rows_full if r.get("category") == category_filter]
-        timings["category_filter_ms"] = (time.perf_counter() - t) * 1000.0
-
-    # hydrate
-    t = time.perf_counter()
-    rows = await db.fetch_many_by_ids_ordered(ranked_ids[:limit])
-    rows = [_coerce_keywords(r) for r in rows]
-    await db.bump_access([r["id"] for r in rows])
-    timings["db_hydrate_ms"] = (time.perf_counter() - t) * 1000.0
+    skip_hydrate = "cached_only" in degraded or _remaining_ms(deadline) <= 0
+    if fields in ("snippet", "full") and skip_hydrate:
+        if "cached_only" not in degraded:
+            degraded.append("scores_only")
+        fields = "scores"
+    with timed(timings, "db_hydrate_ms", "recall.hydrate"):
+        rows = await _project(db, page, fields, query=query, raw_json=raw_json)
+
+    timings["total_ms"] = (time.perf_counter() - t0) * 1000.0
+    out = {"answers": rows, "cached": cached, "next_cursor": next_cursor, "degraded": degraded,
+           "timings_ms": timings}
+    if window:
+        out["window"] = {"since": window[0], "until": window[1]}
+    return out
+
+async def recall_memory_stream(
+    *,
+    db: SQLiteManager,
+    cache: Optional[RedisCache],
+    embed: EmbeddingService,
+    query: str,
+    user_id: str = "default",
+    category_filter: Optional[str] = None,
+    limit: int = 10,
+    rrf_k: int = 60,
+    recency_half_life_days: int = 14,
+    cursor: Optional[str] = None,
+    fields: str = "full",
+    chunk: int = 5,
+    raw_json: bool = False,
+    since: Any = None,
+    until: Any = None,
+    include_archive: bool = False,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Same page as recall_memory_tool, as events: one `meta` (ranking done), `answer` per row
+    as each chunk hydrates, then `end` with timings. A bad request yields a single `error`.
+    """
+    if (err := _bad_request(fields)) is not None:
+        yield {"event": "error", "data": err}
+        return
+    scope = {"since": since, "until": until, "include_archive": include_archive}
+    try:
+        offset = decode_cursor(cursor, query, category_filter, **scope)
+        window = parse_window(since, until)
+    except ValueError as e:
+        yield {"event": "error", "data": {"success": False, "message": str(e)}}
+        return
+    if window is None:
+        db.note_query(user_id, query, category_filter)
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    ranked, cached = await _ranking(
+        db=db, cache=cache, embed=embed, query=query, user_id=user_id,
+        category_filter=category_filter, rrf_k=rrf_k,
+        recency_half_life_days=recency_half_life_days, timings=timings, window=window,
+        include_archive=include_archive,
+    )
+    page = ranked[offset : offset + limit]
+    end = offset + len(page)
+    yield {"event": "meta", "data": {
+        "cached": cached, "count": len(page),
+        "next_cursor": (encode_cursor(query, category_filter, end, **scope)
+                        if end < len(ranked) else None),
+        "rank_ms": (time.perf_counter() - t0) * 1000.0,
+    }}
+    for i in range(0, len(page), max(1, chunk)):
+        for row in await _project(db, page[i : i + chunk], fields, query=query, raw_json=raw_json):
+            yield {"event": "answer", "data": row}
+    timings["total_ms"] = (time.perf_counter() - t0) * 1000.0
+    yield {"event": "end", "data": {"timings_ms": timings}}
+
+@traced("tool.recall_memories")
+async def recall_memories_tool(
+    *,
+    db: SQLiteManager,
+    cache: Optional[RedisCache],
+    embed: EmbeddingService,
+    queries: Sequence[str],
+    user_id: str = "default",
+    category_filter: Optional[str] = None,
+    limit: int = 10,
+    rrf_k: int = 60,
+    recency_half_life_days: int = 14,
+    fields: str = "full",
+    raw_json: bool = False,
+    since: Any = None,
+    until: Any = None,
+    include_archive: bool = False,
+) -> dict:
+    """
+    Many recalls in one call: one embedding batch for the cache misses, retrievals run
+    concurrently, and a single metadata query and a single hydration query over the union
+    of ids. Per-query answers match `recall_memory_tool`; `since`/`until` and
+    `include_archive` apply to all.
+    """
+    if (err := _bad_request(fields)) is not None:
+        return err
+    try:
+        window = parse_window(since, until)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    if window:
+        cache = None
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    queries = list(queries)
+    if window is None:
+        for q in queries:
+            db.note_query(user_id, q, category_filter)
+    search_type = _search_type(category_filter, include_archive)
+    per: List[Dict[str, float]] = [{} for _ in queries]
+
+    with timed(timings, "cache_lookup_ms", "recalls.cache_lookup"):
+        if cache:
+            cached = list(await asyncio.gather(
+                *(cache.get_query_ranking(q, search_type) for q in queries)
+            ))
+        else:
+            cached = [None] * len(queries)
+    misses = [i for i, ranked in enumerate(cached) if not ranked]
+    # As in recall_memory_tool, an empty query over a window lists the window's memories.
+    listed = [i for i in misses if window and not queries[i].strip()]
+    misses = [i for i in misses if i not in listed]
+
+    with timed(timings, "embed_ms", "recalls.embed"):
+        qvecs = await embed.embed_many([queries[i] for i in misses]) if misses else []
+
+    with timed(timings, "retrieve_ms", "recalls.retrieve"):
+        hits = await asyncio.gather(*(
+            _retrieve(db, qvec, queries[i], user_id=user_id, category_filter=category_filter,
+                      timings=per[i], window=window)
+            for i, qvec in zip(misses, qvecs)
+        ))
+
+    ranked: List[Ranked] = [list(r or []) for r in cached]
+    if window and listed:
+        with timed(timings, "window_ms", "recalls.window"):
+            for i in listed:
+                ranked[i] = await _recent(db, user_id=user_id, window=window,
+                                          category_filter=category_filter,
+                                          half_life_days=recency_half_life_days)
+    with timed(timings, "fuse_rescore_ms", "recalls.fuse_rescore"):
+        union: Dict[str, None] = {}
+        for v, tlist in hits:
+            union.update((mid, None) for mid, _ in v)
+            union.update((mid, None) for mid, _ in tlist)
+        meta = await db.fetch_meta_for_ids(list(union))
+        for i, (v, tlist) in zip(misses, hits):
+            ranked[i] = _rank(v, tlist, meta, rrf_k=rrf_k, half_life_days=recency_half_life_days,
+                              category_filter=category_filter)
+    if db.archive is not None:
+        for i, qvec, (v, _) in zip(misses, qvecs, hits):
+            if include_archive or _too_weak(v, ranked[i]):
+                ranked[i] = await _with_archive(
+                    db, qvec, queries[i], ranked[i], user_id=user_id,
+                    category_filter=category_filter, rrf_k=rrf_k,
+                    half_life_days=recency_half_life_days, timings=per[i], window=window,
+                )
+
+    with timed(timings, "db_hydrate_ms", "recalls.hydrate"):
+        wanted: Dict[str, float] = {}
+        for r in ranked:
+            for mid, s in r[:limit]:
+                wanted.setdefault(mid, s)
+        rows = await _project(db, list(wanted.items()), fields, raw_json=raw_json)
+        by_id = {row["id"]: row for row in rows}
+        answers = [
+            [dict(by_id[mid], score=s) if "score" in by_id[mid] else by_id[mid]
+             for mid, s in r[:limit] if mid in by_id]
+            for r in ranked
+        ]
+        if fields == "snippet":
+            # Excerpts depend on the query, so they are cut per query over its own page.
+            cut = [(q, rows) for q, rows in zip(queries, answers) if q]
+            excerpts = await asyncio.gather(*(
+                text_snippets(db, q, [a["id"] for a in rows], tokens=int(settings.snippet_tokens))
+                for q, rows in cut
+            ))
+            for (_, rows), ex in zip(cut, excerpts):
+                _apply_excerpts(rows, ex)
 
-    # write cache
-    t = time.perf_counter()
-    if cache:
-        await cache.set_query_ids(query, "hybrid", ranked_ids)
-    timings["cache_write_ms"] = (time.perf_counter() - t) * 1000.0
+    with timed(timings, "cache_write_ms", "recalls.cache_write"):
+        if cache and misses:
+            await asyncio.gather(
+                *(cache.set_query_ranking(queries[i], search_type, ranked[i]) for i in misses)
+            )
 
     timings["total_ms"] = (time.perf_counter() - t0) * 1000.0
-    return {"answers": rows, "cached": False, "timings_ms": timings}
+    results = [
+        {"query": q, "answers": answers[i], "cached": bool(cached[i]), "timings_ms": per[i]}
+        for i, q in enumerate(queries)
+    ]
+    return {"results": results, "timings_ms": timings}
@@ -1,13 +1,15 @@
 from __future__ import annotations
-import json, uuid
+import uuid
 from typing import Optional
+from .. import json_codec
 from ..storage.sqlite_manager import SQLiteManager
 from ..storage.redis_cache import RedisCache
-from ..intelligence.utils import normalize_text, sha256_hex, simhash64
-from ..intelligence.keywords import extract_keywords
-from ..intelligence.categorize import categorize
+from ..intelligence.analysis import analyze
 from ..intelligence.embeddings import EmbeddingService
+from ..config import settings
+from ..obs.tracing import span, traced
 
+@traced("tool.store_memory")
 async def store_memory_tool(
     *,
     db: SQLiteManager,
@@ -18,28 +20,44 @@ async def store_memory_tool(
     category: Optional[str] = None,
     importance: Optional[float] = None,
     ttl_seconds: Optional[int] = None,
+    embed_later: Optional[bool] = None,
 ) -> dict:
-    n = normalize_text(content)
-    ch = sha256_hex(n)
-    sh = simhash64(n)
-    kws = extract_keywords(n)
-    cat = category or categorize(n, kws)
+    """
+    Analyze, embed and insert one memory. With `embed_later` (default: settings.ingest_async)
+    the row is committed and searchable by text right away and its vector is queued for the
+    ingest embedder, so the call never waits on the model.
+    """
+    if embed_later is None:
+        embed_later = settings.ingest_async
+    with span("store.analyze"):
+        a = analyze(content, category=category)
+        n, kws, cat = a.normalized, a.keywords, a.category
     imp = float(importance) if importance is not None else 1.0
-    vec = await embed.embed_one(n)
+    vec = None
+    if not embed_later:
+        with span("store.embed"):
+            vec = await embed.embed_one(n)
 
     mem_id = str(uuid.uuid4())
-    rowid = await db.insert_memory_row(
-        id=mem_id,
-        user_id=user_id,
-        content=content,
-        keywords_json=json.dumps(kws),
-        category=cat,
-        importance_score=imp,
-        content_hash=ch,
-        simhash64=sh,
-        ttl_seconds=ttl_seconds,
-    )
-    await db.insert_vector(rowid=rowid, embedding=vec)
+    with span("store.insert"):
+        rowid = await db.insert_memory_row(
+            id=mem_id,
+            user_id=user_id,
+            content=content,
+            keywords_json=json_codec.dumps_str(kws),
+            category=cat,
+            importance_score=imp,
+            content_hash=a.content_hash,
+            simhash64=a.simhash64,
+            embedding_version=db.embedding_version,
+            ttl_seconds=ttl_seconds,
+            embed_later=embed_later,
+        )
+        if vec is not None:
+            await db.insert_vector(rowid=rowid, embedding=vec)
     if cache:
         await cache.touch_last_write()
-    return {"id": mem_id, "category": cat, "keywords": kws}
+    out = {"id": mem_id, "category": cat, "keywords": kws}
+    if embed_later:
+        out["embedding"] = "queued"
+    return out
@@ -0,0 +1,109 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import numpy as np
+import pytest
+import pytest_asyncio
+from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.storage.sqlite_manager import LEGACY_VEC_DIM, SQLiteManager
+
+class HashModel:
+    """
+    Stands in for a SentenceTransformer: every distinct text gets its own seeded unit vector,
+    so equal texts have cosine 1 and different ones are near orthogonal.
+    """
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return LEGACY_VEC_DIM
+
+    def encode(self, texts: list[str], normalize_embeddings: bool = True) -> np.ndarray:
+        out = np.empty((len(texts), LEGACY_VEC_DIM), dtype=np.float32)
+        for i, t in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(t.encode("utf-8")).digest()[:8], "little")
+            v = np.random.default_rng(seed).standard_normal(LEGACY_VEC_DIM)
+            out[i] = v / np.linalg.norm(v)
+        return out
+
+class FlakyRedis:
+    """The few redis.asyncio commands the cache uses, over a dict; `down` fails every call."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+        self.down = False
+        self.hang = False
+        self.gets = 0
+
+    async def _hit(self) -> None:
+        if self.hang:
+            await asyncio.sleep(10)
+        if self.down:
+            raise ConnectionError("connection refused")
+
+    async def ping(self) -> bool:
+        await self._hit()
+        return True
+
+    async def get(self, key: str):
+        self.gets += 1
+        await self._hit()
+        return self.data.get(key)
+
+    async def set(self, key: str, value: str) -> bool:
+        await self._hit()
+        self.data[key] = value
+        return True
+
+    async def setex(self, key: str, ttl: int, value: str) -> bool:
+        return await self.set(key, value)
+
+    async def scan_iter(self, match: str, count: int = 10):
+        await self._hit()
+        for key in list(self.data):
+            if key.startswith("u:") and key.endswith(":lw"):
+                yield key
+
+    async def aclose(self) -> None:
+        pass
+
+@pytest.fixture
+def clustered():
+    """
+    Factory for clustered unit vectors (64 centres): data and held-out queries drawn from one
+    call share the clusters, the way real queries resemble stored memories.
+    """
+    def make(n: int, dim: int = LEGACY_VEC_DIM, seed: int = 0) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        centers = rng.standard_normal((64, dim)).astype(np.float32)
+        noise = 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+        x = centers[rng.integers(0, 64, n)] + noise
+        return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+    return make
+
+@pytest.fixture
+def embed() -> EmbeddingService:
+    svc = EmbeddingService()
+    svc._model = HashModel()
+    return svc
+
+@pytest_asyncio.fixture
+async def open_db(tmp_path):
+    """
+    Opens SQLiteManagers under tmp_path, e.g. two on one file as two workers would; closes
+    them after the test.
+    """
+    opened: list[SQLiteManager] = []
+
+    async def open_(name: str = "memory.db", **kw) -> SQLiteManager:
+        db = SQLiteManager(str(tmp_path / name), **kw)
+        await db.initialize()
+        opened.append(db)
+        return db
+
+    yield open_
+    for db in reversed(opened):
+        await db.close()
+
+@pytest_asyncio.fixture
+async def db(open_db) -> SQLiteManager:
+    return await open_db()
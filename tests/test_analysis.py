@@ -0,0 +1,64 @@
+from __future__ import annotations
+import hashlib
+import random
+from collections import Counter
+from mcp_memory.intelligence.analysis import analyze, analyze_many
+from mcp_memory.intelligence.categorize import _RULES, categorize
+from mcp_memory.intelligence.keywords import _STOP, extract_keywords
+from mcp_memory.intelligence.utils import normalize_text, sha256_hex, simhash64, tokens
+
+WORDS = [
+    "github", "api", "Docker", "email", "phone", "@", "bank", "$", "invoice", "meeting",
+    "sprint", "jira", "the", "and", "of", "deploy", "deploys", "notes", "café", "naïve",
+    "a.b@example.com", "v1.2-rc", "x_y", "release", "Release", "plan", "plan,", "(plan)",
+    "account", "number", "account number", "42", "ζ", "东京",
+]
+SPACES = [" ", "\u00a0", "\u2003", "\t", "\n", "\u2009", "\u202f", "\u3000", "\x1c", "\r\n", "  "]
+
+def _old_simhash64(text: str) -> str:
+    toks = tokens(text)
+    v = [0] * 64
+    for g in list(toks) + [f"{a} {b}" for a, b in zip(toks, toks[1:])]:
+        hv = int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(64):
+            v[i] += 1 if hv & (1 << i) else -1
+    return f"{sum(1 << i for i in range(64) if v[i] >= 0):016x}"
+
+def _old_categorize(text: str, keywords: list[str]) -> str:
+    blob = f"{text.lower()} {' '.join(keywords).lower()}"
+    for name, rx in _RULES:
+        if rx.search(blob):
+            return name
+    return "personal"
+
+def _old_keywords(text: str, max_keywords: int = 8) -> list[str]:
+    toks = [t for t in tokens(text) if t not in _STOP]
+    counts = Counter(toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])])
+    top = sorted(counts.items(), key=lambda kv: (kv[1], len(kv[0])), reverse=True)[:max_keywords]
+    return [w for w, _ in top]
+
+def _docs(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    docs = ["", "   ", " the ", "a"]
+    for _ in range(n):
+        words = rng.choices(WORDS, k=rng.randint(1, 60))
+        docs.append(rng.choice(SPACES[:3]).join(
+            w + rng.choice(SPACES) for w in words).strip(rng.choice(["", " "])))
+    return docs
+
+def test_analyze_matches_the_separate_helpers():
+    docs = _docs(400)
+    batch = analyze_many(docs)
+    for doc, got in zip(docs, batch):
+        n = normalize_text(doc)
+        kws = _old_keywords(n)
+        want = (n, sha256_hex(n), _old_simhash64(n), kws, _old_categorize(n, kws))
+        assert (got.normalized, got.content_hash, got.simhash64, got.keywords,
+                got.category) == want, doc
+        assert analyze(doc) == got
+        # The helpers callers still use give the same answers.
+        assert (simhash64(n), extract_keywords(n), categorize(n, kws)) == want[2:]
+
+def test_explicit_category_skips_the_rules():
+    got = analyze("Push the fix to GitHub", category="chores")
+    assert got.category == "chores" and got.keywords == _old_keywords("push the fix to github")
@@ -0,0 +1,45 @@
+from __future__ import annotations
+import asyncio
+import json
+import time
+import numpy as np
+from conftest import HashModel
+from mcp_memory import server
+from mcp_memory.config import settings
+from mcp_memory.tools.recall_memory import recall_memory_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+class SlowModel(HashModel):
+    def encode(self, texts: list[str], normalize_embeddings: bool = True) -> np.ndarray:
+        time.sleep(0.05)
+        return super().encode(texts, normalize_embeddings)
+
+async def _recall(db, embed, query: str) -> dict:
+    return await recall_memory_tool(db=db, cache=None, embed=embed, query=query, fields="ids")
+
+async def test_recalls_go_text_only_past_the_embed_queue(db, embed, monkeypatch):
+    monkeypatch.setattr(settings, "degrade_embed_queue", 2)
+    res = await store_memory_tool(db=db, cache=None, embed=embed, content="release checklist")
+    mid = res["id"]
+    embed._model = SlowModel()
+    first = [asyncio.create_task(_recall(db, embed, f"release {i}")) for i in range(2)]
+    for _ in range(200):
+        if embed.pending >= 2:
+            break
+        await asyncio.sleep(0.001)
+    assert embed.pending == 2  # both encodes queued, not run inline on the event loop
+    late = await asyncio.gather(*(_recall(db, embed, "release checklist") for _ in range(3)))
+    for res in late:
+        assert res["degraded"] == ["text_only"]
+        assert [a["id"] for a in res["answers"]] == [mid]
+    for res in await asyncio.gather(*first):
+        assert res["degraded"] == []
+    assert embed.pending == 0
+    assert (await _recall(db, embed, "release checklist"))["degraded"] == []
+
+async def test_bad_deadline_is_a_400(monkeypatch):
+    monkeypatch.setattr(server, "_router", object())
+    for bad in ("soon", "-5", "nan", [1]):
+        resp = await server.recall_memory_ep({"query": "x", "deadline_ms": bad})
+        assert resp.status_code == 400
+        assert json.loads(resp.body)["success"] is False
@@ -0,0 +1,23 @@
+from __future__ import annotations
+from mcp_memory.tools.forget_memory import forget_memory_tool
+from mcp_memory.tools.get_memory import get_memory_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+async def test_forget_by_query_previews_until_confirmed(db, embed):
+    ids = [(await store_memory_tool(db=db, cache=None, embed=embed,
+                                    content=f"old draft {i}"))["id"] for i in range(3)]
+    keep = (await store_memory_tool(db=db, cache=None, embed=embed, content="final report"))["id"]
+    preview = await forget_memory_tool(db=db, cache=None, embed=embed, query="draft")
+    assert preview["confirm"] is False and set(ids) <= set(preview["to_delete"])
+    assert (await db.fetch_stats())["live"] == 4  # nothing deleted yet
+
+    limited = await forget_memory_tool(db=db, cache=None, embed=embed, query="draft",
+                                       preview_limit=2)
+    assert len(limited["to_delete"]) == 2
+
+    done = await forget_memory_tool(db=db, cache=None, embed=embed, query="old draft 1",
+                                    confirm=True, preview_limit=1)
+    assert done == {"deleted": 1, "ids": [ids[1]], "confirm": True}
+    assert await get_memory_tool(db=db, memory_id=ids[1]) == {"success": False,
+                                                              "message": "not found"}
+    assert (await get_memory_tool(db=db, memory_id=keep))["id"] == keep
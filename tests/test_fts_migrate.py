@@ -0,0 +1,79 @@
+from __future__ import annotations
+from mcp_memory.background.fts_migrate import FtsMigrationJob
+from mcp_memory.config import settings
+from mcp_memory.search.text_search import text_topk
+from mcp_memory.storage.sqlite_manager import FTS_DEFAULT_TOKENIZE
+from mcp_memory.tools.store_memory import store_memory_tool
+
+async def _store(db, embed, content: str) -> str:
+    return (await store_memory_tool(db=db, cache=None, embed=embed, content=content))["id"]
+
+async def _hits(db, query: str) -> set[str]:
+    return {mid for mid, _ in await text_topk(db, query)}
+
+async def _triggers(db) -> dict[str, str]:
+    rows = await db.fetchall("t", "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'")
+    return {r["name"]: r["sql"] for r in rows}
+
+async def test_rebuild_swaps_in_new_options_and_keeps_writes_made_during_it(
+    open_db, embed, monkeypatch
+):
+    monkeypatch.setattr(settings, "fts_tokenizer", FTS_DEFAULT_TOKENIZE)
+    monkeypatch.setattr(settings, "fts_prefix", "")
+    db = await open_db()
+    ids = [await _store(db, embed, f"running shoes note {i}") for i in range(6)]
+    assert not db.fts_needs_migration()
+    assert await _hits(db, "run") == set()
+
+    monkeypatch.setattr(settings, "fts_tokenizer", "porter unicode61")
+    monkeypatch.setattr(settings, "fts_prefix", "2 3")
+    assert db.fts_needs_migration()
+    await db.begin_fts_build(*db.fts_wanted())
+    cursor = await db.copy_fts_batch(0, 3)
+    # Writes while the build is half done: behind the cursor the triggers keep the new table
+    # in sync; ahead of it the remaining batches pick the rows up.
+    edit = "UPDATE memories SET content = ?, keywords = ? WHERE id = ?"
+    await db.execute("t", edit, ("swimming goggles", "swimming", ids[0]))
+    await db.execute("t", "DELETE FROM memories WHERE id = ?", (ids[1],))
+    await db.execute("t", edit, ("cycling helmet", "cycling", ids[5]))
+    await db.commit()
+    late = await _store(db, embed, "running late again")
+    assert (await db.fts_build_state())["cursor_rowid"] == cursor
+    # The live table still serves the old options until the swap.
+    assert await _hits(db, "run") == set()
+
+    assert await FtsMigrationJob(db, batch_size=2, duty_cycle=1.0).run() is True
+    assert (db.fts_tokenize, db.fts_prefix) == ("porter unicode61", "2 3")
+    assert not db.fts_needs_migration() and await db.fts_build_state() is None
+    assert await _hits(db, "run") == {*ids[2:5], late}
+    assert await _hits(db, "swim") == {ids[0]} and await _hits(db, "cyc*") == {ids[5]}
+    await db.execute("t", "INSERT INTO memories_fts(memories_fts, rank) "
+                          "VALUES('integrity-check', 1)")
+    names = set(await _triggers(db))
+    assert {"fts_ai", "fts_ad", "fts_au"} <= names and not any(
+        n.startswith("fts_next") for n in names)
+    # Nothing left to do.
+    assert await FtsMigrationJob(db, duty_cycle=1.0).run() is False
+
+async def test_stale_triggers_are_replaced_on_open(open_db, embed):
+    db = await open_db()
+    mid = await _store(db, embed, "original wording")
+    await db.execute("t", "DROP TRIGGER fts_au")
+    # The old shape re-indexed on every UPDATE, access bumps included.
+    await db.execute(
+        "t",
+        "CREATE TRIGGER fts_au AFTER UPDATE ON memories BEGIN "
+        "INSERT INTO memories_fts(memories_fts, rowid, content, keywords, category) "
+        "VALUES ('delete', old.rowid, old.content, old.keywords, old.category); "
+        "INSERT INTO memories_fts(rowid, content, keywords, category) "
+        "VALUES (new.rowid, new.content, new.keywords, new.category); END",
+    )
+    await db.commit()
+    await db.close()
+
+    db = await open_db()
+    assert "UPDATE OF content, keywords, category" in (await _triggers(db))["fts_au"]
+    await db.execute("t", "UPDATE memories SET content = ?, keywords = ? WHERE id = ?",
+                     ("revised wording", "revised", mid))
+    await db.commit()
+    assert await _hits(db, "revised") == {mid} and await _hits(db, "original") == set()
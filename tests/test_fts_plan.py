@@ -0,0 +1,35 @@
+from __future__ import annotations
+from mcp_memory.config import settings
+from mcp_memory.search.text_search import NEAR_SPAN, plan_fts_query, text_topk
+from mcp_memory.tools.store_memory import store_memory_tool
+
+async def _store(db, embed, content: str) -> str:
+    return (await store_memory_tool(db=db, cache=None, embed=embed, content=content))["id"]
+
+def test_plan_goes_from_and_through_near_to_or():
+    assert plan_fts_query('what is the "rollout plan" for kube*?') == [
+        '"rollout plan" AND "what" AND "kube" *',
+        f'NEAR("rollout" "plan", {NEAR_SPAN}) AND "what" AND "kube" *',
+        f'NEAR("rollout" "plan", {NEAR_SPAN}) OR "what" OR "kube" *',
+    ]
+    assert plan_fts_query("the") == ['"the"']  # only stop-words: keep them
+    assert plan_fts_query("  ") == ['""']
+
+async def test_relaxed_expressions_fill_in_below_the_strict_hits(db, embed, monkeypatch):
+    monkeypatch.setattr(settings, "fts_fallback_min_hits", 3)
+    both = await _store(db, embed, "kubernetes upgrade checklist")
+    near = await _store(db, embed, "the upgrade of our kubernetes cluster went fine")
+    one = await _store(db, embed, "postgres upgrade notes")
+    await _store(db, embed, "grocery list")
+    # The exact phrase first, then the NEAR match.
+    assert [mid for mid, _ in await text_topk(db, '"kubernetes upgrade"')] == [both, near]
+    # Every term, then any of them.
+    got = [mid for mid, _ in await text_topk(db, "postgres upgrade notes checklist")]
+    assert got[0] in (both, one) and set(got) == {both, near, one}
+    # Enough strict hits: nothing relaxed runs.
+    monkeypatch.setattr(settings, "fts_fallback_min_hits", 1)
+    assert [mid for mid, _ in await text_topk(db, '"kubernetes upgrade"')] == [both]
+    # No strict hit at all still relaxes.
+    assert {mid for mid, _ in await text_topk(db, "postgres checklist")} == {both, one}
+    # Stemming and prefix terms come from the table's tokenizer and prefix index.
+    assert {mid for mid, _ in await text_topk(db, "upgrades kuber*")} == {both, near}
@@ -0,0 +1,39 @@
+from __future__ import annotations
+import json
+import random
+from mcp_memory.search.hybrid_search import apply_category_filter
+from mcp_memory.storage.sqlite_manager import ID_CHUNK, id_chunks
+
+N = ID_CHUNK * 2 + 200  # three chunks
+
+async def _load(db) -> list[str]:
+    rows = [{"id": f"m{i}", "user_id": "default", "content": f"memory {i}",
+             "content_hash": f"m{i}", "category": "even" if i % 2 == 0 else "odd"}
+            for i in range(N)]
+    await db.bulk_insert_memories(rows, [None] * N)
+    return [r["id"] for r in rows]
+
+def test_id_chunks_dedupe_in_first_seen_order():
+    chunks = [json.loads(c) for c in id_chunks(["b", "a", "b", "c", "a", "d"], size=2)]
+    assert chunks == [["b", "a"], ["c", "d"]]
+    assert list(id_chunks([])) == []
+
+async def test_long_id_lists_span_chunks_in_order(db):
+    ids = await _load(db)
+    order = random.Random(0).sample(ids, N)
+    deleted = order[ID_CHUNK - 1 : ID_CHUNK + 1]  # on the first chunk boundary
+    assert await db.soft_delete_ids(deleted + deleted) == 2
+    asked = order + ["missing"] + order[:50]  # repeats and unknown ids are dropped
+    live = [i for i in order if i not in deleted]
+
+    assert [r["id"] for r in await db.fetch_many_by_ids_ordered(asked)] == live
+    snippets = await db.fetch_snippets_by_ids_ordered(asked, chars=6)
+    assert [r["id"] for r in snippets] == live and snippets[0]["snippet"] == "memory"
+    assert set(await db.fetch_meta_for_ids(asked)) == set(live)
+    assert await apply_category_filter(db, order, "even") == [
+        i for i in order if int(i[1:]) % 2 == 0 and i not in deleted]
+
+    await db.bump_access(asked)  # once per id, however often it is listed
+    counts = await db.fetchall("t", "SELECT access_count, COUNT(*) AS n FROM memories"
+                                    " WHERE deleted_at IS NULL GROUP BY access_count")
+    assert [(r["access_count"], r["n"]) for r in counts] == [(1, N - 2)]
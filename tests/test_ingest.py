@@ -0,0 +1,46 @@
+from __future__ import annotations
+import asyncio
+from mcp_memory.background.ingest import IngestEmbedder
+from mcp_memory.search.vector_search import vector_topk
+from mcp_memory.tools.forget_memory import forget_memory_tool
+from mcp_memory.tools.recall_memory import recall_memory_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+async def test_queued_store_is_text_searchable_then_embedded(db, embed):
+    res = await store_memory_tool(db=db, cache=None, embed=embed, content="quarterly budget review",
+                                  embed_later=True)
+    assert res["embedding"] == "queued"
+    assert (await db.embed_queue_stats())["pending"] == 1
+    qvec = await embed.embed_one("quarterly budget review")
+    assert await vector_topk(db, qvec, k=1) == []
+    hit = await recall_memory_tool(db=db, cache=None, embed=embed, query="budget", fields="ids")
+    assert [a["id"] for a in hit["answers"]] == [res["id"]]
+
+    assert await IngestEmbedder(db, embed).drain() == 1
+    assert (await db.embed_queue_stats())["pending"] == 0
+    (mid, cos), = await vector_topk(db, qvec, k=1)
+    assert mid == res["id"] and cos > 0.99
+
+async def test_running_embedder_drains_a_burst(db, embed):
+    ingest = IngestEmbedder(db, embed, max_wait_ms=1)
+    await ingest.start()
+    try:
+        ids = [(await store_memory_tool(db=db, cache=None, embed=embed, content=f"burst {i}",
+                                        embed_later=True))["id"] for i in range(10)]
+        for _ in range(200):
+            if not (await db.embed_queue_stats())["pending"]:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await ingest.stop()
+    assert (await db.embed_queue_stats())["pending"] == 0
+    assert (await vector_topk(db, await embed.embed_one("burst 7"), k=1))[0][0] == ids[7]
+
+async def test_row_forgotten_while_queued_gets_no_vector(db, embed):
+    res = await store_memory_tool(db=db, cache=None, embed=embed, content="gone soon",
+                                  embed_later=True)
+    await forget_memory_tool(db=db, cache=None, embed=embed, memory_id=res["id"])
+    assert await IngestEmbedder(db, embed).drain() == 0
+    assert (await db.embed_queue_stats())["pending"] == 0
+    row = await db.fetchone("test_vectors", f"SELECT COUNT(*) AS n FROM {db.vec_table}")
+    assert row["n"] == 0
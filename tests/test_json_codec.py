@@ -0,0 +1,54 @@
+from __future__ import annotations
+import json
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from mcp_memory import json_codec
+from mcp_memory.server import FastJSONResponse
+from mcp_memory.tools.recall_memory import recall_memory_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+CONTENTS = [
+    "Deploy the API server on Friday",
+    'Café "naïve" résumé — 東京 meeting at 10:00 ✓',
+    "tabs\tand\nnewlines, a \\ backslash and a \x01 control char",
+    "invoice 42 paid in usd; email a.b@example.com",
+]
+
+def _old(content) -> bytes:
+    """What the endpoints sent before: FastAPI's encoder and JSONResponse."""
+    return JSONResponse(jsonable_encoder(content)).body
+
+async def test_recall_response_bytes_match_the_old_encoder(db, embed):
+    ids = [(await store_memory_tool(db=db, cache=None, embed=embed, content=c))["id"]
+           for c in CONTENTS]
+    # A row written before keywords were stored compactly, with escaped non-ASCII.
+    await db.execute("t", "UPDATE memories SET keywords = ? WHERE id = ?",
+                     (json.dumps(["café", "résumé"]), ids[1]))
+    await db.commit()
+    res = await recall_memory_tool(db=db, cache=None, embed=embed, query="meeting invoice")
+    assert {a["id"] for a in res["answers"]} == set(ids)
+    # New rows store keywords in the encoder's own compact form.
+    assert (await db.fetch_one_by_id(ids[0]))["keywords"] == '["server friday","deploy api",' \
+        '"api server","deploy","server","friday","api"]'
+    # The same answers the way the HTTP endpoints get them: stored keywords left encoded.
+    raw = {**res, "answers": []}
+    for a in res["answers"]:
+        stored = (await db.fetch_one_by_id(a["id"]))["keywords"]
+        raw["answers"].append({**a, "keywords": json_codec.raw_json(stored)})
+    assert FastJSONResponse(raw).body == _old(res)
+
+def test_dumps_matches_the_old_encoder_on_edge_values():
+    value = {"s": "é \x7f/<>&'\"", "n": None, "b": [True, False], "i": -(2**53),
+             "f": [0.1, 2.5, -0.0, 123456.789, 1.0], "nested": {"k": [[], {}]},
+             "keywords": json_codec.raw_json('["a","b c"]'), "bad": json_codec.raw_json("{")}
+    want = _old({**value, "keywords": ["a", "b c"], "bad": []})
+    assert json_codec.dumps(value) == want
+
+def test_raw_json_only_splices_the_compact_form():
+    assert json_codec.raw_json("") == [] and json_codec.raw_json(None) is None
+    for bad in ("[", '["]', '["a"', "{}", '["a\x01"]'):
+        assert json_codec.dumps(json_codec.raw_json(bad)) in (b"[]", b"{}")
+    if json_codec.RAW_JSON:
+        assert isinstance(json_codec.raw_json('["a","b c"]'), json_codec.orjson.Fragment)
+    for legacy in ('["a", "b"]', '["caf\\u00e9"]'):
+        assert json_codec.dumps(json_codec.raw_json(legacy)) == _old(json.loads(legacy))
@@ -0,0 +1,55 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from mcp_memory.config import settings
+from mcp_memory.search.vector_search import vector_topk
+
+async def _load(db, vecs: np.ndarray) -> None:
+    rows = [{"id": f"v{i}", "user_id": "default", "content": f"vector {i}", "content_hash": f"v{i}"}
+            for i in range(len(vecs))]
+    await db.bulk_insert_memories(rows, [v.astype(np.float32).tobytes() for v in vecs])
+
+async def _top(db, q: np.ndarray, k: int = 10) -> list[str]:
+    return [mid for mid, _ in await vector_topk(db, q.tolist(), k=k)]
+
+async def _vec0_tables(db) -> list[str]:
+    rows = await db.fetchall("test_vec0", "SELECT name, sql FROM sqlite_master WHERE type='table'")
+    return sorted(r["name"] for r in rows if "USING vec0" in (r["sql"] or ""))
+
+@pytest.mark.parametrize("mode, oversample", [("int8", 4), ("binary", 32)])
+async def test_quantized_recall_matches_exact(open_db, clustered, monkeypatch, mode, oversample):
+    monkeypatch.setattr(settings, "quant_oversample", oversample)
+    x = clustered(2040)
+    data, queries = x[:2000], x[2000:]
+    exact, quant = await open_db("exact.db"), await open_db("quant.db", quantization=mode)
+    await _load(exact, data)
+    await _load(quant, data)
+    # Only the quantized index is a vec0 table; the float vectors are float16 blobs.
+    assert await _vec0_tables(quant) == [f"{quant.vec_table}_{mode}"]
+    hits = 0
+    for q in queries:
+        want, got = await _top(exact, q), await _top(quant, q)
+        assert got[0] == want[0]
+        hits += len(set(got) & set(want))
+    assert hits / (10 * len(queries)) >= 0.95
+
+async def test_switching_modes_converts_vectors_in_place(open_db, clustered):
+    x = clustered(220)
+    data, queries = x[:200], x[200:]
+    db = await open_db()
+    await _load(db, data)
+    want = [await _top(db, q) for q in queries]
+    await db.close()
+    for mode in ("int8", "none"):
+        db = await open_db(quantization=mode)
+        assert (await db.fetch_stats())[f"vectors:{db.vec_table}"] == 200
+        # float16 rounding may reorder near ties, nothing more.
+        got = [await _top(db, q) for q in queries]
+        assert [g[0] for g in got] == [w[0] for w in want]
+        assert sum(len(set(g) & set(w)) for g, w in zip(got, want)) >= 0.95 * 10 * len(want)
+        chunk = await db.fetch_vector_chunk()
+        vecs = np.frombuffer(b"".join(c[1] for c in chunk), dtype=np.float32).reshape(-1, 384)
+        assert np.allclose(vecs, data, atol=1e-3)
+        vec0 = db.vec_table if mode == "none" else f"{db.vec_table}_{mode}"
+        assert await _vec0_tables(db) == [vec0]
+        await db.close()
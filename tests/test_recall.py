@@ -0,0 +1,117 @@
+from __future__ import annotations
+from mcp_memory.tools.recall_memory import (
+    recall_memories_tool, recall_memory_stream, recall_memory_tool,
+)
+from mcp_memory.tools.store_memory import store_memory_tool
+
+async def _store(db, embed, n: int, prefix: str = "project note") -> list[str]:
+    return [(await store_memory_tool(db=db, cache=None, embed=embed, content=f"{prefix} {i}"))["id"]
+            for i in range(n)]
+
+async def _age(db, mid: str, days: float) -> None:
+    await db.execute(
+        "test_age",
+        "UPDATE memories SET created_at = datetime('now', printf('-%f days', ?)) WHERE id = ?",
+        (float(days), mid),
+    )
+    await db.commit()
+
+async def _ids(db, embed, query: str, **kw) -> list[str]:
+    res = await recall_memory_tool(db=db, cache=None, embed=embed, query=query, fields="ids", **kw)
+    return [a["id"] for a in res["answers"]]
+
+def _unscored(answers: list[dict]) -> list[dict]:
+    return [{k: v for k, v in a.items() if k != "score"} for a in answers]
+
+async def test_cursor_pages_are_disjoint_and_end(db, embed):
+    ids = await _store(db, embed, 12)
+    seen: list[str] = []
+    cursor = None
+    for _ in range(5):
+        res = await recall_memory_tool(db=db, cache=None, embed=embed, query="project", limit=5,
+                                       cursor=cursor, fields="ids")
+        seen += [a["id"] for a in res["answers"]]
+        cursor = res["next_cursor"]
+        if cursor is None:
+            break
+    assert cursor is None
+    assert len(seen) == len(set(seen)) == 12
+    assert set(seen) == set(ids)
+
+async def test_cursor_of_another_query_is_refused(db, embed):
+    await _store(db, embed, 6)
+    res = await recall_memory_tool(db=db, cache=None, embed=embed, query="project", limit=2)
+    assert res["next_cursor"]
+    for query, cursor in (("note", res["next_cursor"]), ("project", "not-a-cursor")):
+        bad = await recall_memory_tool(db=db, cache=None, embed=embed, query=query, cursor=cursor)
+        assert bad["success"] is False
+    # The archive-inclusive ranking is another list: offsets into one are refused by the other.
+    bad = await recall_memory_tool(db=db, cache=None, embed=embed, query="project",
+                                   cursor=res["next_cursor"], include_archive=True)
+    assert bad["success"] is False
+    archived = await recall_memory_tool(db=db, cache=None, embed=embed, query="project", limit=2,
+                                        include_archive=True)
+    ok = await recall_memory_tool(db=db, cache=None, embed=embed, query="project", limit=2,
+                                  cursor=archived["next_cursor"], include_archive=True)
+    assert ok["answers"]
+
+async def test_window_keeps_rows_created_in_range(db, embed):
+    ids = await _store(db, embed, 4)
+    for mid, days in zip(ids, (0, 3, 10, 40)):
+        await _age(db, mid, days)
+    assert set(await _ids(db, embed, "project", since="7d")) == set(ids[:2])
+    res = await recall_memory_tool(db=db, cache=None, embed=embed, query="project", since="30d",
+                                   until="7d", fields="ids")
+    assert [a["id"] for a in res["answers"]] == [ids[2]]
+    assert res["window"]["since"] < res["window"]["until"]
+
+async def test_window_without_query_lists_newest_first(db, embed):
+    ids = await _store(db, embed, 3)
+    for mid, days in zip(ids, (5, 1, 2)):
+        await _age(db, mid, days)
+    assert await _ids(db, embed, "", since="1w") == [ids[1], ids[2], ids[0]]
+
+async def test_window_bounds_are_checked(db, embed):
+    for since, until in (("yesterday", None), ("1d", "7d")):
+        res = await recall_memory_tool(db=db, cache=None, embed=embed, query="x", since=since,
+                                       until=until)
+        assert res["success"] is False
+
+async def test_batch_matches_single_recalls(db, embed):
+    notes = await _store(db, embed, 5, "project note")
+    plans = await _store(db, embed, 5, "travel plan")
+    queries = ["project note 3", "travel plan 1"]
+    batch = await recall_memories_tool(db=db, cache=None, embed=embed, queries=queries, limit=3,
+                                       fields="ids")
+    assert [r["query"] for r in batch["results"]] == queries
+    for q, r in zip(queries, batch["results"]):
+        assert [a["id"] for a in r["answers"]] == await _ids(db, embed, q, limit=3)
+    assert [r["answers"][0]["id"] for r in batch["results"]] == [notes[3], plans[1]]
+
+async def test_batch_lists_a_window_for_an_empty_query_like_single_recall(db, embed):
+    ids = await _store(db, embed, 4)
+    for mid, days in zip(ids, (5, 1, 2, 30)):
+        await _age(db, mid, days)
+    queries = ["", "project note 2"]
+    batch = await recall_memories_tool(db=db, cache=None, embed=embed, queries=queries,
+                                       since="1w", fields="snippet")
+    for q, r in zip(queries, batch["results"]):
+        single = await recall_memory_tool(db=db, cache=None, embed=embed, query=q, since="1w",
+                                          fields="snippet")
+        # Recency scores move with the clock between the two calls; the rows must not.
+        assert _unscored(r["answers"]) == _unscored(single["answers"])
+    assert [a["id"] for a in batch["results"][0]["answers"]] == [ids[1], ids[2], ids[0]]
+
+async def test_stream_yields_the_same_page_as_events(db, embed):
+    await _store(db, embed, 8)
+    single = await recall_memory_tool(db=db, cache=None, embed=embed, query="project", limit=6)
+    events = [ev async for ev in recall_memory_stream(db=db, cache=None, embed=embed,
+                                                      query="project", limit=6, chunk=4)]
+    kinds = [ev["event"] for ev in events]
+    assert kinds == ["meta", *["answer"] * 6, "end"]
+    assert events[0]["data"]["count"] == 6
+    assert events[0]["data"]["next_cursor"] == single["next_cursor"]
+    assert [ev["data"]["id"] for ev in events[1:-1]] == [a["id"] for a in single["answers"]]
+    bad = [ev async for ev in recall_memory_stream(db=db, cache=None, embed=embed, query="x",
+                                                   cursor="not-a-cursor")]
+    assert [ev["event"] for ev in bad] == ["error"]
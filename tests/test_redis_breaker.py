@@ -0,0 +1,79 @@
+from __future__ import annotations
+import asyncio
+import time
+import pytest
+from conftest import FlakyRedis
+from mcp_memory.config import settings
+from mcp_memory.storage.redis_cache import RedisCache
+
+@pytest.fixture
+def breaker_settings(monkeypatch):
+    monkeypatch.setattr(settings, "redis_timeout_ms", 20.0)
+    monkeypatch.setattr(settings, "redis_breaker_failures", 3)
+    monkeypatch.setattr(settings, "redis_breaker_cooldown_sec", 0.01)
+
+def _cache() -> tuple[RedisCache, FlakyRedis]:
+    cache, fake = RedisCache("redis://fake"), FlakyRedis()
+    cache._link.client = fake
+    return cache, fake
+
+async def _until_closed(cache: RedisCache) -> None:
+    for _ in range(200):
+        if cache.stats()["state"] == "closed":
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("breaker stayed open")
+
+async def test_breaker_opens_after_consecutive_failures_and_closes_on_recovery(breaker_settings):
+    cache, fake = _cache()
+    try:
+        await cache.set_embedding("hello", [0.5, 0.25])
+        assert await cache.get_embedding("hello") == [0.5, 0.25]
+
+        fake.down = True
+        for _ in range(3):
+            assert await cache.get_embedding("hello") is None  # errors read as misses
+        assert cache.stats()["state"] == "open" and not cache.enabled
+        # Open: commands skip Redis (only the probe pings it) and still answer a miss.
+        fake.gets = 0
+        for _ in range(20):
+            assert await cache.get_embedding("hello") is None
+        assert fake.gets == 0
+
+        fake.down = False
+        await _until_closed(cache)
+        assert cache.enabled and cache.stats()["consecutive_failures"] == 0
+        assert await cache.get_embedding("hello") == [0.5, 0.25]
+    finally:
+        await cache.close()
+
+async def test_a_hanging_redis_costs_at_most_the_timeout(breaker_settings):
+    cache, fake = _cache()
+    try:
+        fake.hang = True
+        t = time.perf_counter()
+        assert await cache.get_embedding("hello") is None
+        assert time.perf_counter() - t < 0.5
+        assert cache.stats()["consecutive_failures"] == 1
+    finally:
+        await cache.close()
+
+async def test_writes_missed_while_open_invalidate_rankings_on_recovery(breaker_settings):
+    cache, fake = _cache()
+    ann = cache.for_user("ann")
+    try:
+        await ann.touch_last_write()
+        fake.data["u:ann:lw"] = "100"
+        await ann.set_query_ranking("q", "hybrid", [("m1", 0.9)])
+        assert await ann.get_query_ranking("q", "hybrid") == [("m1", 0.9)]
+
+        fake.down = True
+        for _ in range(3):
+            await cache.get_embedding("x")
+        await ann.touch_last_write()  # a delete during the outage: its bump is lost
+        fake.down = False
+        await _until_closed(cache)
+        assert fake.data["u:ann:lw"] != "100"
+        assert await ann.get_query_ranking("q", "hybrid") is None
+    finally:
+        await cache.close()
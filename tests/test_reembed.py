@@ -0,0 +1,63 @@
+from __future__ import annotations
+import asyncio
+import numpy as np
+from conftest import HashModel
+from mcp_memory.background.reembed import ReembedJob
+from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.search.vector_search import vector_topk
+from mcp_memory.tools.store_memory import store_memory_tool
+
+class SmallModel(HashModel):
+    """A different model: 128 dimensions, so its vectors cannot mix with the 384-d space."""
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return 128
+
+    def encode(self, texts: list[str], normalize_embeddings: bool = True) -> np.ndarray:
+        return np.ascontiguousarray(super().encode(texts)[:, :128] * np.sqrt(384 / 128))
+
+def _target() -> EmbeddingService:
+    svc = EmbeddingService(model_name="small-model")
+    svc._model = SmallModel()
+    return svc
+
+async def _top(db, embed, text: str) -> str:
+    return (await vector_topk(db, await embed.embed_one(text), k=1))[0][0]
+
+async def test_job_builds_the_new_space_then_swaps_recall_to_it(db, embed):
+    ids = [(await store_memory_tool(db=db, cache=None, embed=embed, content=f"fact {i}"))["id"]
+           for i in range(10)]
+    target = _target()
+    active = await ReembedJob(db, target, batch_size=4, duty_cycle=1.0).run()
+    assert active["model"] == "small-model" and active["dim"] == 128
+    assert (db.embedding_model, db.embedding_dim, db.vec_table) == (
+        "small-model", 128, active["vec_table"])
+    assert (await db.fetch_stats())[f"vectors:{db.vec_table}"] == 10
+    assert await _top(db, target, "fact 6") == ids[6]
+    assert await db.drop_retired_spaces() == ["memory_embeddings"]
+    # Already on the target model: a second run only repairs gaps.
+    assert await ReembedJob(db, target, duty_cycle=1.0).run() is None
+
+async def test_paused_build_resumes_and_recall_stays_on_the_old_space(db, embed):
+    ids = [(await store_memory_tool(db=db, cache=None, embed=embed, content=f"fact {i}"))["id"]
+           for i in range(10)]
+    target, stopping = _target(), asyncio.Event()
+    encode = target.embed_many
+
+    async def one_batch_then_stop(texts):
+        stopping.set()
+        return await encode(texts)
+
+    target.embed_many = one_batch_then_stop
+    assert await ReembedJob(db, target, batch_size=4, stopping=stopping).run() is None
+    building = await db.building_space()
+    assert building["cursor_rowid"] > 0 and await db.count_unembedded(building["version"]) == 6
+    assert db.embedding_version == 1 and await _top(db, embed, "fact 8") == ids[8]
+
+    target.embed_many = encode
+    # Written mid-build with the old model: the next pass picks it up before the swap.
+    late = (await store_memory_tool(db=db, cache=None, embed=embed, content="late fact"))["id"]
+    active = await ReembedJob(db, target, batch_size=4, duty_cycle=1.0).run()
+    assert active["version"] == building["version"]
+    assert await db.count_unembedded(active["version"]) == 0
+    assert await _top(db, target, "late fact") == late
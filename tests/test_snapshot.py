@@ -0,0 +1,41 @@
+from __future__ import annotations
+import pytest
+from mcp_memory.search.text_search import text_topk
+from mcp_memory.search.vector_search import vector_topk
+from mcp_memory.tools.forget_memory import forget_memory_tool
+from mcp_memory.tools.get_memory import get_memory_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+async def _store(db, embed, content: str) -> str:
+    return (await store_memory_tool(db=db, cache=None, embed=embed, content=content))["id"]
+
+async def _found(db, memory_id: str) -> bool:
+    return "id" in await get_memory_tool(db=db, memory_id=memory_id)
+
+async def test_restore_brings_back_the_snapshot_exactly(db, embed, tmp_path):
+    ids = [await _store(db, embed, f"release note {i}") for i in range(5)]
+    stats = await db.snapshot(str(tmp_path / "snaps" / "a.db"), step_pages=2, pause_ms=0)
+    assert stats["pages"] > 0 and stats["steps"] > 1
+
+    later = await _store(db, embed, "written after the snapshot")
+    await forget_memory_tool(db=db, cache=None, embed=embed, memory_id=ids[0], confirm=True)
+    assert not await _found(db, ids[0])
+    token = db._restore_token
+
+    await db.restore(str(tmp_path / "snaps" / "a.db"))
+    assert all([await _found(db, i) for i in ids]) and not await _found(db, later)
+    assert (await db.fetch_stats())["live"] == 5
+    assert db._restore_token != token
+    # Vectors and FTS answer from the restored rows.
+    assert (await vector_topk(db, await embed.embed_one("release note 3"), k=1))[0][0] == ids[3]
+    assert {mid for mid, _ in await text_topk(db, "release")} == set(ids)
+
+async def test_restore_rejects_a_file_that_is_not_a_memory_db(db, embed, tmp_path):
+    mid = await _store(db, embed, "keep me")
+    bad = tmp_path / "bad.db"
+    bad.write_bytes(b"not a database" * 100)
+    with pytest.raises(ValueError):
+        await db.restore(str(bad))
+    with pytest.raises(ValueError):
+        await db.restore(str(tmp_path / "missing.db"))
+    assert await _found(db, mid)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+from mcp_memory.config import settings
+from mcp_memory.search.text_search import ELLIPSIS, HIGHLIGHT_CLOSE, HIGHLIGHT_OPEN
+from mcp_memory.tools.recall_memory import recall_memory_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+LONG = " ".join(f"filler{i}" for i in range(80))
+
+async def _store(db, embed, content: str) -> str:
+    return (await store_memory_tool(db=db, cache=None, embed=embed, content=content))["id"]
+
+async def _answers(db, embed, query: str, fields: str) -> dict[str, dict]:
+    res = await recall_memory_tool(db=db, cache=None, embed=embed, query=query, fields=fields)
+    return {a["id"]: a for a in res["answers"]}
+
+async def test_snippet_highlights_the_match_inside_long_content(db, embed):
+    mid = await _store(db, embed, f"{LONG} the kubernetes upgrade failed {LONG}")
+    other = await _store(db, embed, "unrelated grocery list")
+    got = await _answers(db, embed, "kubernetes upgrade", "snippet")
+    hit = got[mid]
+    assert hit["highlighted"] is True
+    assert f"{HIGHLIGHT_OPEN}kubernetes{HIGHLIGHT_CLOSE}" in hit["snippet"]
+    assert hit["snippet"].startswith(ELLIPSIS) and len(hit["snippet"]) < len(LONG)
+    assert hit["content_len"] == len(LONG) * 2 + len(" the kubernetes upgrade failed ")
+    assert "content" not in hit
+    # A vector-only hit gets the leading window of its text instead.
+    assert got[other]["highlighted"] is False
+    assert got[other]["snippet"] == "unrelated grocery list"[: settings.snippet_chars]
+
+async def test_projection_reads_and_counts_only_what_is_asked(db, embed):
+    mid = await _store(db, embed, "projection check")
+    for fields, keys in (("ids", {"id"}), ("scores", {"id", "score"})):
+        got = await _answers(db, embed, "projection", fields)
+        assert set(got[mid]) == keys
+    assert (await db.fetch_one_by_id(mid))["access_count"] == 0  # ids/scores are no access
+    full = await _answers(db, embed, "projection", "full")
+    assert full[mid]["content"] == "projection check"
+    assert (await db.fetch_one_by_id(mid))["access_count"] == 1
+    bad = await recall_memory_tool(db=db, cache=None, embed=embed, query="x", fields="bogus")
+    assert bad["success"] is False
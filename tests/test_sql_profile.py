@@ -0,0 +1,36 @@
+from __future__ import annotations
+import pytest
+from mcp_memory.obs.metrics import METRICS
+from mcp_memory.obs.sql_profile import SQL_PROFILER
+
+@pytest.fixture
+def profiler(monkeypatch):
+    monkeypatch.setattr(SQL_PROFILER, "enabled", True)
+    monkeypatch.setattr(SQL_PROFILER, "threshold_ms", 0.0)
+    monkeypatch.setattr(SQL_PROFILER, "capacity", 3)
+    SQL_PROFILER.reset()
+    yield SQL_PROFILER
+    SQL_PROFILER.reset()
+
+async def test_slow_statement_is_logged_with_its_plan(db, profiler):
+    await db.fetchall("test_by_user", "SELECT id FROM memories\n  WHERE user_id = ?", ("u",))
+    (entry,) = [e for e in profiler.slowest() if e["name"] == "test_by_user"]
+    assert entry["sql"] == "SELECT id FROM memories WHERE user_id = ?"
+    assert entry["rows"] == 0
+    assert any("idx_user" in step for step in entry["plan"])
+    prom = await METRICS.export_prom()
+    assert "sql_test_by_user_ms_count" in prom and "sql_test_by_user_rows_total" in prom
+
+async def test_ring_keeps_the_slowest_first(db, profiler):
+    for i in range(10):
+        await db.fetchone(f"test_select_{i}", "SELECT ?", (i,))
+    slowest = profiler.slowest()
+    assert len(slowest) == 3
+    assert [e["ms"] for e in slowest] == sorted((e["ms"] for e in slowest), reverse=True)
+    assert profiler.slowest(1) == slowest[:1]
+
+async def test_statements_under_the_threshold_are_only_timed(db, profiler, monkeypatch):
+    monkeypatch.setattr(profiler, "threshold_ms", 60_000.0)
+    await db.execute("test_fast_write", "UPDATE memories SET access_count = 0 WHERE 0")
+    assert profiler.slowest() == []
+    assert "sql_test_fast_write_ms_count" in await METRICS.export_prom()
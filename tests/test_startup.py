@@ -0,0 +1,61 @@
+from __future__ import annotations
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+from conftest import HashModel
+from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.tools.forget_memory import forget_memory_tool
+from mcp_memory.tools.memory_health import memory_health_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+_IMPORT_CHILD = """
+import json, sys
+import mcp_memory.mcp_server, mcp_memory.server
+print(json.dumps([m for m in ("torch", "sentence_transformers") if m in sys.modules]))
+"""
+
+def test_importing_the_servers_loads_no_model(tmp_path):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path),
+               MCP_MEMORY_DB_PATH=str(tmp_path / "memory.db"))
+    out = subprocess.run([sys.executable, "-c", _IMPORT_CHILD], env=env, capture_output=True,
+                         text=True, check=True)
+    assert json.loads(out.stdout.strip().splitlines()[-1]) == []
+
+async def test_warmup_loads_the_model_once_in_the_background(monkeypatch):
+    gate, loads = threading.Event(), []
+
+    def load(self):
+        gate.wait(5)
+        loads.append(1)
+        self._model = HashModel()
+        return self._model
+
+    monkeypatch.setattr(EmbeddingService, "_load", load)
+    svc = EmbeddingService()
+    assert not svc.ready and svc._loading is None  # constructing it is free
+    fut = svc.start_warmup()
+    assert svc.start_warmup() is fut and not svc.ready
+    gate.set()
+    assert len(await svc.embed_one("warm")) == 384
+    assert svc.ready and loads == [1]
+
+async def test_health_and_forget_by_id_do_not_wait_for_the_model(db, embed, monkeypatch):
+    mid = (await store_memory_tool(db=db, cache=None, embed=embed, content="keep or drop"))["id"]
+    gate = threading.Event()
+    monkeypatch.setattr(EmbeddingService, "_load", lambda self: gate.wait(5))
+    cold = EmbeddingService()
+    cold.start_warmup()
+    try:
+        health = await asyncio.wait_for(
+            memory_health_tool(db=db, cache=None, db_path=db.db_path), timeout=2
+        )
+        assert health["count"] == 1
+        res = await asyncio.wait_for(
+            forget_memory_tool(db=db, cache=None, embed=cold, memory_id=mid), timeout=2
+        )
+        assert res["deleted"] == 1 and not cold.ready
+    finally:
+        gate.set()
@@ -0,0 +1,36 @@
+from __future__ import annotations
+from mcp_memory.tools.forget_memory import forget_memory_tool
+from mcp_memory.tools.memory_health import memory_health_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+async def test_counters_follow_writes_without_drift(db, embed):
+    rows = (
+        ("invoice 12 paid", "finance", None),
+        ("call the dentist", "personal", 3600),
+        ("deploy the server", "technical", None),
+    )
+    ids = []
+    for text, cat, ttl in rows:
+        res = await store_memory_tool(db=db, cache=None, embed=embed, content=text, category=cat,
+                                      ttl_seconds=ttl)
+        ids.append(res["id"])
+    await forget_memory_tool(db=db, cache=None, embed=embed, memory_id=ids[0])
+    stats = await db.fetch_stats()
+    assert (stats["live"], stats["deleted"], stats["ttl"]) == (2, 1, 1)
+    assert stats["cat:personal"] == stats["cat:technical"] == 1
+    assert stats.get("cat:finance", 0) == 0
+    assert stats[f"vectors:{db.vec_table}"] == 3
+    assert await db.recount_stats() == {}
+
+async def test_recount_reports_and_repairs_drift(db, embed):
+    for i in range(4):
+        await store_memory_tool(db=db, cache=None, embed=embed, content=f"note {i}",
+                                category="work")
+    await db.execute("test_tamper", "UPDATE memory_stats SET n = n + 5 WHERE key = 'live'")
+    await db.execute("test_tamper", "DELETE FROM memory_stats WHERE key = 'cat:work'")
+    await db.commit()
+    health = await memory_health_tool(db=db, cache=None, db_path=db.db_path, exact=True)
+    assert health["stats"]["drift"] == {"cat:work": {"counter": 0, "exact": 4},
+                                        "live": {"counter": 9, "exact": 4}}
+    assert (await db.fetch_stats())["live"] == 4
+    assert await db.recount_stats() == {}
@@ -0,0 +1,67 @@
+from __future__ import annotations
+import pytest
+from mcp_memory.config import settings
+from mcp_memory.tenants import TenantRouter
+from mcp_memory.tools.get_memory import get_memory_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+@pytest.fixture
+def shard_settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "db_path", str(tmp_path / "memory.db"))
+    monkeypatch.setattr(settings, "shard_dir", str(tmp_path / "tenants"))
+    monkeypatch.setattr(settings, "tenant_max_open", 3)
+    monkeypatch.setattr(settings, "tenant_idle_sec", 0)
+    monkeypatch.setattr(settings, "warm_on_start", False)
+
+def _open(router: TenantRouter) -> list[str]:
+    return [s["path"].rsplit("/", 1)[-1] for s in router.stats()["shards"]]
+
+async def _store(router: TenantRouter, user: str, content: str) -> str:
+    async with router.tenant(user) as t:
+        return (await store_memory_tool(db=t.db, cache=None, embed=t.embed, content=content,
+                                        user_id=user))["id"]
+
+async def test_least_recently_used_idle_shard_is_closed_first(shard_settings, embed):
+    router = TenantRouter(cache=None, embed=embed, sharded=True, background=False)
+    await router.start()
+    try:
+        bob = await _store(router, "bob", "bob's note")
+        await _store(router, "ann", "ann's note")
+        async with router.tenant("bob") as t:
+            bob_db = t.db
+        assert _open(router) == ["memory.db", "ann.db", "bob.db"]
+
+        await _store(router, "cy", "cy's note")  # ann was used longest ago
+        assert _open(router) == ["memory.db", "bob.db", "cy.db"]
+
+        # A shard a request still holds stays open, even when it is the oldest.
+        async with router.tenant("bob"), router.tenant("cy"):
+            pass
+        async with router.tenant("bob"):
+            await _store(router, "dan", "dan's note")
+            assert _open(router) == ["memory.db", "bob.db", "dan.db"]
+            assert bob_db.conn is not None
+        await _store(router, "ann", "ann again")
+        assert _open(router) == ["memory.db", "dan.db", "ann.db"]
+        assert bob_db.conn is None  # closed on eviction
+
+        # Reopened from its file with everything it had.
+        async with router.tenant("bob") as t:
+            got = await get_memory_tool(db=t.db, memory_id=bob, user_id="bob")
+            assert got["content"] == "bob's note"
+        with pytest.raises(ValueError):
+            async with router.tenant("../escape"):
+                pass
+    finally:
+        await router.close()
+    assert router.stats()["open"] == 0
+
+async def test_unsharded_tenants_share_the_default_db(shard_settings, embed):
+    router = TenantRouter(cache=None, embed=embed, sharded=False, background=False)
+    await router.start()
+    try:
+        async with router.tenant("ann") as a, router.tenant("bob") as b:
+            assert a.db is b.db
+        assert _open(router) == ["memory.db"]
+    finally:
+        await router.close()
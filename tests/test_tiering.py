@@ -0,0 +1,79 @@
+from __future__ import annotations
+import json
+import pytest_asyncio
+from mcp_memory.background.tiering import TieringJob
+from mcp_memory.tools.get_memory import get_memory_tool
+from mcp_memory.tools.recall_memory import recall_memory_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+@pytest_asyncio.fixture
+async def db(open_db):
+    return await open_db(tiered=True)
+
+async def _store(db, embed, content: str) -> str:
+    return (await store_memory_tool(db=db, cache=None, embed=embed, content=content))["id"]
+
+async def _chill(db, ids: list[str]) -> list[dict]:
+    """Make these rows cold; returns them as fetch_cold_window hands them to demote."""
+    await db.execute(
+        "test_chill",
+        "UPDATE memories SET last_accessed = datetime('now', '-200 days')"
+        " WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(ids),),
+    )
+    await db.commit()
+    _hi, rows = await db.fetch_cold_window(0, 1000, idle_days=90)
+    return rows
+
+async def test_job_archives_cold_rows_and_recall_brings_them_back(db, embed):
+    ids = [await _store(db, embed, f"trip to city {i}") for i in range(4)]
+    await _chill(db, ids[:2])
+    assert await TieringJob(db, idle_days=90, duty_cycle=1.0).run() == 2
+    assert await db.fetch_one_by_id(ids[0]) is None
+    assert await db.archive.fetch_one_by_id(ids[0]) is not None
+    assert await db.fetch_one_by_id(ids[2]) is not None
+
+    res = await recall_memory_tool(db=db, cache=None, embed=embed, query="trip to city 0",
+                                   include_archive=True, limit=1)
+    assert [a["id"] for a in res["answers"]] == [ids[0]]
+    assert (await db.fetch_one_by_id(ids[0]))["access_count"] == 1
+    assert await db.archive.fetch_one_by_id(ids[0]) is None
+
+async def test_demote_keeps_rows_accessed_meanwhile(db, embed):
+    ids = [await _store(db, embed, f"receipt {i}") for i in range(3)]
+    rows = await _chill(db, ids)
+    await db.bump_access([ids[1]])
+    assert await db.demote(rows) == 2
+    assert await db.fetch_one_by_id(ids[1]) is not None
+    assert await db.archive.fetch_one_by_id(ids[1]) is None
+
+async def test_promote_leaves_row_whose_content_is_hot(db, embed):
+    old = await _store(db, embed, "wifi password is hunter2")
+    assert await db.demote(await _chill(db, [old])) == 1
+    new = await _store(db, embed, "wifi password is hunter2")
+    assert await db.promote([old]) == []
+    assert await db.archive.fetch_one_by_id(old) is not None
+    assert await db.fetch_one_by_id(new) is not None
+
+    assert await get_memory_tool(db=db, memory_id=old, user_id="mallory") == {
+        "success": False, "message": "not found"}
+    got = await get_memory_tool(db=db, memory_id=old)
+    assert got["content"] == "wifi password is hunter2"
+    assert (await db.archive.fetch_one_by_id(old))["access_count"] == 1
+
+async def test_demote_leaves_row_whose_content_is_archived(db, embed):
+    old = await _store(db, embed, "parking spot 42")
+    assert await db.demote(await _chill(db, [old])) == 1
+    new = await _store(db, embed, "parking spot 42")
+    assert await db.demote(await _chill(db, [new])) == 0
+    assert await db.fetch_one_by_id(new) is not None
+    assert await db.archive.fetch_one_by_id(new) is None
+    assert await db.archive.fetch_one_by_id(old) is not None
+
+async def test_get_memory_does_not_promote_another_users_row(db, embed):
+    mid = await _store(db, embed, "locker code 1234")
+    assert await db.demote(await _chill(db, [mid])) == 1
+    assert (await get_memory_tool(db=db, memory_id=mid, user_id="mallory"))["success"] is False
+    assert await db.fetch_one_by_id(mid) is None
+    assert (await get_memory_tool(db=db, memory_id=mid))["content"] == "locker code 1234"
+    assert await db.fetch_one_by_id(mid) is not None
@@ -0,0 +1,42 @@
+from __future__ import annotations
+import json
+import pytest
+from mcp_memory.obs.tracing import TRACER, InMemoryCollector, JsonlExporter
+from mcp_memory.tools.recall_memory import recall_memory_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+@pytest.fixture
+def collector(monkeypatch) -> InMemoryCollector:
+    out = InMemoryCollector()
+    monkeypatch.setattr(TRACER, "exporter", out)
+    monkeypatch.setattr(TRACER, "sample_rate", 1.0)
+    return out
+
+async def test_recall_is_one_trace_of_nested_stage_spans(db, embed, collector):
+    await store_memory_tool(db=db, cache=None, embed=embed, content="tracing the recall path")
+    collector.clear()
+    await recall_memory_tool(db=db, cache=None, embed=embed, query="recall path")
+    (trace,) = collector.traces()
+    spans = {s["name"]: s for s in trace["spans"]}
+    root = spans["tool.recall_memory"]
+    assert root["parent_id"] is None
+    assert {"recall.embed", "embed.one", "recall.fuse_rescore", "recall.hydrate"} <= set(spans)
+    assert spans["recall.embed"]["parent_id"] == root["span_id"]
+    assert spans["embed.one"]["parent_id"] == spans["recall.embed"]["span_id"]
+    assert any(n.startswith("sql.") for n in spans)
+    assert all(s["trace_id"] == root["trace_id"] and s["duration_ms"] >= 0
+               for s in trace["spans"])
+
+async def test_unsampled_calls_record_nothing(db, embed, collector, monkeypatch):
+    monkeypatch.setattr(TRACER, "sample_rate", 0.0)
+    await store_memory_tool(db=db, cache=None, embed=embed, content="not traced")
+    assert collector.traces() == []
+
+async def test_jsonl_export_writes_one_line_per_span(db, embed, monkeypatch, tmp_path):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(TRACER, "exporter", JsonlExporter(str(path)))
+    monkeypatch.setattr(TRACER, "sample_rate", 1.0)
+    await store_memory_tool(db=db, cache=None, embed=embed, content="exported span")
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert spans[-1]["name"] == "tool.store_memory" and spans[-1]["parent_id"] is None
+    assert len({s["trace_id"] for s in spans}) == 1
@@ -0,0 +1,68 @@
+from __future__ import annotations
+import pytest
+from mcp_memory.search.text_search import text_topk
+from mcp_memory.search.vector_search import vector_topk
+from mcp_memory.storage.sqlite_manager import MEMORY_COLUMNS
+from mcp_memory.storage.transfer import export_stream, import_stream
+from mcp_memory.tools.store_memory import store_memory_tool
+
+COLS = ", ".join(MEMORY_COLUMNS)
+
+async def _export(db, **kw) -> list[bytes]:
+    return [chunk async for chunk in export_stream(db, **kw)]
+
+async def _chunks(parts: list[bytes]):
+    for p in parts:
+        yield p
+
+async def _rows(db) -> list[dict]:
+    return [dict(r) for r in await db.fetchall("t", f"SELECT {COLS} FROM memories ORDER BY id")]
+
+async def _vectors(db) -> dict[str, bytes]:
+    rows = await db.fetchall(
+        "t", f"SELECT m.id, v.embedding FROM memories m JOIN {db.vec_table} v ON v.rowid = m.rowid")
+    return {r["id"]: bytes(r["embedding"]) for r in rows}
+
+async def test_export_then_import_reproduces_rows_and_vectors(open_db, embed):
+    src = await open_db("a.db")
+    for i in range(7):
+        await store_memory_tool(db=src, cache=None, embed=embed, content=f"design decision {i}",
+                                user_id="ann" if i % 2 else "bob", category="work")
+    parts = await _export(src, chunk_rows=3)
+    assert len(parts) == 1 + 3 + 1  # header, three frames, DONE
+
+    dst = await open_db("b.db")
+    # Feed the stream in pieces that do not line up with its frames.
+    blob = b"".join(parts)
+    stats = await import_stream(dst, _chunks([blob[i:i + 97] for i in range(0, len(blob), 97)]))
+    assert (stats["rows"], stats["inserted"], stats["vectors"]) == (7, 7, 7)
+    assert stats["vectors_kept"] is True
+    assert await _rows(dst) == await _rows(src)
+    assert await _vectors(dst) == await _vectors(src)
+    q = await embed.embed_one("design decision 4")
+    top = [await vector_topk(d, q, user_id="bob", k=1) for d in (src, dst)]
+    assert top[0] == top[1]
+    assert len(await text_topk(dst, "decision", user_id="ann")) == 3
+
+    # Importing the same export again adds nothing.
+    again = await import_stream(dst, _chunks(parts))
+    assert (again["rows"], again["inserted"]) == (7, 0)
+
+async def test_export_of_one_user_imports_under_another(open_db, embed):
+    src = await open_db("a.db")
+    for i, user in enumerate(["ann", "bob", "ann"]):
+        await store_memory_tool(db=src, cache=None, embed=embed, content=f"note {i}", user_id=user)
+    dst = await open_db("b.db")
+    stats = await import_stream(dst, _chunks(await _export(src, user_id="ann")), user_id="cy")
+    assert stats["inserted"] == 2
+    assert {r["user_id"] for r in await _rows(dst)} == {"cy"}
+
+async def test_import_rejects_foreign_and_truncated_streams(open_db, embed):
+    src = await open_db("a.db")
+    await store_memory_tool(db=src, cache=None, embed=embed, content="one memory")
+    parts = await _export(src)
+    dst = await open_db("b.db")
+    with pytest.raises(ValueError, match="not an mcp-memory export"):
+        await import_stream(dst, _chunks([b'{"format": "other"}\n']))
+    with pytest.raises(ValueError, match="truncated"):
+        await import_stream(dst, _chunks([b"".join(parts)[:-20]]))
@@ -0,0 +1,46 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+from mcp_memory.search.vector_search import vector_topk
+
+async def _load(db, vecs: np.ndarray, start: int = 0) -> None:
+    rows = [{"id": f"v{i}", "user_id": "default", "content": f"vector {i}", "content_hash": f"v{i}"}
+            for i in range(start, start + len(vecs))]
+    await db.bulk_insert_memories(rows, [v.astype(np.float32).tobytes() for v in vecs])
+
+async def _top(db, q: np.ndarray, k: int = 10) -> list[str]:
+    return [mid for mid, _ in await vector_topk(db, q.tolist(), k=k)]
+
+async def _recall_at_10(exact, db, queries: np.ndarray) -> float:
+    hits = 0
+    for q in queries:
+        hits += len(set(await _top(exact, q)) & set(await _top(db, q)))
+    return hits / (10 * len(queries))
+
+@pytest.mark.parametrize("engine", ["ivf", "mmap"])
+async def test_engine_matches_exact_knn(open_db, clustered, engine):
+    x = clustered(3040)
+    data, queries = x[:3000], x[3000:]
+    exact, db = await open_db("exact.db"), await open_db("index.db", vector_index=engine)
+    await _load(exact, data)
+    await _load(db, data)
+    await db.rebuild_index()
+    assert db.index.ready and db.index.covered == await db.max_memory_rowid()
+    assert await _recall_at_10(exact, db, queries) >= 0.95
+    # Rows written after the build are searchable at once.
+    await _load(db, queries[:1], start=len(data))
+    assert (await _top(db, queries[0], k=1)) == [f"v{len(data)}"]
+
+@pytest.mark.parametrize("engine", ["ivf", "mmap"])
+async def test_saved_engine_reopens_where_it_stopped(open_db, clustered, engine):
+    x = clustered(1020)
+    data, queries = x[:1000], x[1000:]
+    db = await open_db(vector_index=engine)
+    await _load(db, data)
+    await db.rebuild_index()
+    want = [await _top(db, q) for q in queries]
+    covered = db.index.covered
+    await db.close()
+    db = await open_db(vector_index=engine)
+    assert db.index.ready and db.index.covered == covered
+    assert [await _top(db, q) for q in queries] == want
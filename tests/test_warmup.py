@@ -0,0 +1,55 @@
+from __future__ import annotations
+from conftest import FlakyRedis, HashModel
+from mcp_memory.background.warmup import CacheWarmer
+from mcp_memory.config import settings
+from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.storage.redis_cache import RedisCache
+from mcp_memory.tools.recall_memory import _search_type, recall_memory_tool
+from mcp_memory.tools.store_memory import store_memory_tool
+
+async def _recall(db, embed, query: str, times: int) -> None:
+    for _ in range(times):
+        await recall_memory_tool(db=db, cache=None, embed=embed, query=query)
+
+async def test_hot_queries_are_counted_saved_and_decayed(db, embed, monkeypatch):
+    monkeypatch.setattr(settings, "warm_queries", 2)
+    monkeypatch.setattr(settings, "hot_query_decay", 0.5)
+    await store_memory_tool(db=db, cache=None, embed=embed, content="alpha beta gamma")
+    await _recall(db, embed, "alpha", 3)
+    await _recall(db, embed, "beta", 1)
+    await _recall(db, embed, "gamma", 2)
+    warmer = CacheWarmer(db, embed)
+    await warmer.save()
+    # Only the `warm_queries` hottest are kept.
+    assert [h["query"] for h in await db.fetch_hot_queries(10)] == ["alpha", "gamma"]
+
+    await _recall(db, embed, "beta", 3)
+    await warmer.save()  # alpha 1.5, gamma 1.0, beta 3
+    assert [h["query"] for h in await db.fetch_hot_queries(10)] == ["beta", "alpha"]
+
+async def test_restart_replays_hot_queries_into_the_caches(open_db, embed, monkeypatch):
+    db = await open_db()
+    for i in range(5):
+        await store_memory_tool(db=db, cache=None, embed=embed, content=f"deploy runbook {i}")
+    await _recall(db, embed, "deploy", 2)
+    await _recall(db, embed, "runbook", 1)
+    warmer = CacheWarmer(db, embed)
+    await warmer.start(warm=False)
+    await warmer.stop()  # saves the counts
+    await db.close()
+
+    # A fresh process: empty Redis, new connection.
+    db = await open_db()
+    cache, fake = RedisCache("redis://fake"), FlakyRedis()
+    cache._link.client = fake
+    cold = EmbeddingService(cache=cache)
+    cold._model = HashModel()
+    res = await CacheWarmer(db, cold, cache=cache, rate_per_sec=1000).warm()
+    assert res["queries"] == 2 and res["rows"] == 5
+    for q in ("deploy", "runbook"):
+        assert await cache.get_query_ranking(q, _search_type(None))
+    assert sum(k.startswith("embed:") for k in fake.data) == 2
+    # A recall of a replayed query now starts from the cache.
+    hit = await recall_memory_tool(db=db, cache=cache, embed=cold, query="deploy")
+    assert hit["cached"] and len(hit["answers"]) == 5
+    assert (await db.fetch_hot_queries(10))[0]["query"] == "deploy"
@@ -0,0 +1,31 @@
+from __future__ import annotations
+import time
+import numpy as np
+import pytest
+from mcp_memory.search.vector_search import window_topk
+
+def _since(days: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(time.time() - days * 86400))
+
+@pytest.mark.parametrize("days, plan", [(5.03, "scan"), (60.03, "knn")])
+async def test_window_topk_matches_exact_on_both_plans(db, clustered, days, plan):
+    n = 1600
+    x = clustered(n + 20)
+    data, queries = x[:n], x[n:]
+    rows = [{"id": f"v{i}", "user_id": "default", "content": f"vector {i}", "content_hash": f"v{i}"}
+            for i in range(n)]
+    await db.bulk_insert_memories(rows, [v.tobytes() for v in data])
+    # Row i is (n - 1 - i) / 16 days old, newest last; window edges fall between rows.
+    await db.execute(
+        "test_spread",
+        "UPDATE memories SET created_at = datetime('now', printf('-%f days', (? - rowid) / 16.0))",
+        (n,),
+    )
+    await db.commit()
+    age = (n - np.arange(1, n + 1)) / 16.0
+    inside = np.flatnonzero(age < days)
+    assert (len(inside) <= n // 16) == (plan == "scan")
+    for q in queries:
+        want = [f"v{i}" for i in inside[np.argsort(-(data[inside] @ q))[:10]]]
+        got = await window_topk(db, q.tolist(), k=10, window=(_since(days), None))
+        assert [mid for mid, _ in got] == want
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import asyncio
+import time
+import numpy as np
+import pytest
+from mcp_memory.background.leader import LeaderLease
+from mcp_memory.config import settings
+from mcp_memory.intelligence import sidecar
+from mcp_memory.intelligence.embeddings import EmbeddingService
+from mcp_memory.search.vector_search import vector_topk
+from mcp_memory.tools.store_memory import store_memory_tool
+
+# Two SQLiteManagers on one file stand in for two workers: each has its own connection and
+# its own index lock file descriptor, so they contend like separate processes.
+
+@pytest.fixture
+def index_settings(monkeypatch):
+    monkeypatch.setattr(settings, "ann_min_rows", 20)
+    monkeypatch.setattr(settings, "index_sync_sec", 0.0)
+
+async def _store(db, embed, content: str) -> str:
+    return (await store_memory_tool(db=db, cache=None, embed=embed, content=content))["id"]
+
+async def _top(db, embed, text: str) -> tuple[str, float]:
+    return (await vector_topk(db, await embed.embed_one(text), k=1))[0]
+
+async def _indexed_db(open_db, embed, engine: str):
+    db = await open_db(vector_index=engine)
+    for i in range(30):
+        await _store(db, embed, f"memory {i}")
+    await db.rebuild_index()
+    return db
+
+async def _wait_for(cond, timeout: float = 3.0) -> bool:
+    t = time.monotonic()
+    while not cond() and time.monotonic() - t < timeout:
+        await asyncio.sleep(0.05)
+    return cond()
+
+async def test_one_leader_and_handover_on_stop(open_db):
+    a, b = await open_db(), await open_db()
+    la, lb = LeaderLease(a, ttl_sec=1.0, name="test"), LeaderLease(b, ttl_sec=1.0, name="test")
+    await la.start()
+    await lb.start()
+    try:
+        assert la.leading and not lb.leading
+        assert (await a.lease("test"))["holder"] == la.holder
+        await la.stop()
+        assert await _wait_for(lambda: lb.leading)
+        assert not la.leading
+    finally:
+        await lb.stop()
+
+@pytest.mark.parametrize("engine", ["ivf", "mmap"])
+async def test_workers_find_each_others_rows(open_db, embed, index_settings, engine):
+    a = await _indexed_db(open_db, embed, engine)
+    b = await open_db(vector_index=engine)
+    assert not a.index.readonly and b.index.readonly and b.index.ready
+
+    by_b = await _store(b, embed, "written by b")
+    by_a = await _store(a, embed, "written by a")
+    assert (await _top(a, embed, "written by b"))[0] == by_b
+    assert (await _top(b, embed, "written by a"))[0] == by_a
+    assert await a.fetch_rowid_by_id(by_b) in a.index  # the writer caught up
+
+    await a.close()
+    await b.sync_index(force=True)
+    assert not b.index.readonly
+    late = await _store(b, embed, "after the writer left")
+    assert (await _top(b, embed, "after the writer left"))[0] == late
+
+@pytest.mark.parametrize("engine", ["ivf", "mmap"])
+async def test_follower_reloads_after_restore(open_db, embed, index_settings, tmp_path, engine):
+    a = await _indexed_db(open_db, embed, engine)
+    await a.snapshot(str(tmp_path / "snap.db"))
+    b = await open_db(vector_index=engine)
+    gone = await _store(a, embed, "stored after the snapshot")
+    assert (await _top(b, embed, "stored after the snapshot"))[0] == gone
+
+    await a.restore(str(tmp_path / "snap.db"))
+    await a.rebuild_index()
+    reused = await _store(a, embed, "stored after the restore")  # takes gone's rowid
+    mid, cos = await _top(b, embed, "stored after the snapshot")
+    assert mid != gone and cos < 0.9
+    assert (await _top(b, embed, "stored after the restore"))[0] == reused
+
+async def test_sidecar_serves_workers_the_local_vectors(embed, tmp_path, monkeypatch):
+    monkeypatch.setattr(sidecar, "_load_model", lambda name: embed._model)
+    path = str(tmp_path / "embed.sock")
+    side = sidecar.EmbedSidecar(path, batch_wait_ms=5)
+    await side.start()
+    try:
+        monkeypatch.setattr(settings, "embed_socket", path)
+        workers = [EmbeddingService(), EmbeddingService()]
+        for w in workers:
+            await w.get_model()
+            assert isinstance(w._model, sidecar.SidecarModel)
+        texts = [f"text {i}" for i in range(20)]
+        got = await asyncio.gather(*(workers[i % 2].embed_one(t) for i, t in enumerate(texts)))
+        assert np.allclose(got, await embed.embed_many(texts), atol=1e-6)
+    finally:
+        await side.close()